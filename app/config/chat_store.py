@@ -119,3 +119,19 @@ class ChatStore:
         stats["total_output_tokens"] = (
             int(stats.get("total_output_tokens") or 0) + output_tokens
         )
+
+    def update_process_stats(self, chat_id: ChatKey, process: dict) -> None:
+        # 记录 Codex 进程的峰值内存与 CPU 时间，和令牌用量一起在 /status 展示。
+        if not isinstance(process, dict) or not process:
+            return
+        peak_rss_mb = float(process.get("peak_rss_mb") or 0)
+        cpu_sec = float(process.get("cpu_sec") or 0)
+        stats = self.usage_stats[chat_id]
+        stats["last_peak_rss_mb"] = peak_rss_mb
+        stats["last_cpu_sec"] = cpu_sec
+        stats["max_peak_rss_mb"] = max(
+            float(stats.get("max_peak_rss_mb") or 0), peak_rss_mb
+        )
+        stats["total_cpu_sec"] = round(
+            float(stats.get("total_cpu_sec") or 0) + cpu_sec, 2
+        )
@@ -7,6 +7,20 @@ from dotenv import load_dotenv
 from app.config.env_store import upsert_env_key
 
 
+IONICE_CLASSES = ("idle", "best-effort")
+
+
+# Codex 子进程的资源限制；全部为 0/空时按原样启动。
+@dataclass(frozen=True)
+class ProcessLimits:
+    nice: int = 0
+    ionice_class: str = ""
+    ionice_level: int = 7
+    max_memory_mb: int = 0
+    max_cpu_sec: int = 0
+    cgroup_dir: str = ""
+
+
 @dataclass(frozen=True)
 class AppConfig:
     telegram_bot_token: str
@@ -20,6 +34,7 @@ class AppConfig:
     allowed_user_ids_raw: str
     feishu_app_id: str = ""
     feishu_app_secret: str = ""
+    codex_limits: ProcessLimits = ProcessLimits()
 VALID_REASONING_EFFORTS = {"none", "minimal", "low", "medium", "high", "xhigh"}
 
 
@@ -70,6 +85,35 @@ def migrate_codex_bin_env_if_needed(
         return False
 
 
+def _read_non_negative_int_env(name: str) -> int:
+    raw = os.getenv(name, "").strip()
+    try:
+        value = int(raw)
+    except ValueError:
+        return 0
+    return max(0, value)
+
+
+def load_process_limits() -> ProcessLimits:
+    # CODEX_IONICE 形如 idle 或 best-effort:7；无法识别时忽略。
+    raw_ionice = os.getenv("CODEX_IONICE", "").strip().lower()
+    ionice_class, _, raw_level = raw_ionice.partition(":")
+    if ionice_class not in IONICE_CLASSES:
+        ionice_class = ""
+    try:
+        ionice_level = min(7, max(0, int(raw_level))) if raw_level else 7
+    except ValueError:
+        ionice_level = 7
+    return ProcessLimits(
+        nice=min(19, _read_non_negative_int_env("CODEX_NICE")),
+        ionice_class=ionice_class,
+        ionice_level=ionice_level,
+        max_memory_mb=_read_non_negative_int_env("CODEX_MAX_MEMORY_MB"),
+        max_cpu_sec=_read_non_negative_int_env("CODEX_MAX_CPU_SEC"),
+        cgroup_dir=os.path.expanduser(os.getenv("CODEX_CGROUP_DIR", "").strip()),
+    )
+
+
 def load_config(require_telegram_bot_token: bool = True) -> AppConfig:
     load_dotenv()
 
@@ -98,4 +142,5 @@ def load_config(require_telegram_bot_token: bool = True) -> AppConfig:
         allowed_user_ids_raw=os.getenv("ALLOWED_USER_IDS", "").strip(),
         feishu_app_id=os.getenv("FEISHU_APP_ID", "").strip(),
         feishu_app_secret=os.getenv("FEISHU_APP_SECRET", "").strip(),
+        codex_limits=load_process_limits(),
     )
@@ -0,0 +1,189 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import uuid
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+from app.config.settings import LOG_FILE, read_bool_env, read_positive_int_env
+
+TEXT_LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_chat_id_var: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "log_chat_id", default=""
+)
+_trace_id_var: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "log_trace_id", default=""
+)
+_queue_listener: Optional[QueueListener] = None
+
+
+def _read_non_negative_int_env(name: str, default: int) -> int:
+    raw = (os.getenv(name, str(default)) or "").strip()
+    try:
+        value = int(raw)
+    except ValueError:
+        return default
+    return value if value >= 0 else default
+
+
+def _read_rate_env(name: str, default: float) -> float:
+    raw = (os.getenv(name, str(default)) or "").strip()
+    try:
+        value = float(raw)
+    except ValueError:
+        return default
+    return min(1.0, max(0.0, value))
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def log_context(chat_id="", trace_id: str = ""):
+    chat_token = _chat_id_var.set(str(chat_id) if chat_id != "" else "")
+    trace_token = _trace_id_var.set(trace_id or new_trace_id())
+    try:
+        yield _trace_id_var.get()
+    finally:
+        _trace_id_var.reset(trace_token)
+        _chat_id_var.reset(chat_token)
+
+
+def current_trace_id() -> str:
+    return _trace_id_var.get()
+
+
+def format_payload(text, max_chars: Optional[int] = None, sample_rate: Optional[float] = None) -> str:
+    # 消息正文可能有几十 KB，日志里默认只保留前缀，避免格式化与写盘拖慢事件循环。
+    value = "" if text is None else str(text)
+    if max_chars is None:
+        max_chars = _read_non_negative_int_env("BOT_LOG_PAYLOAD_MAX_CHARS", 500)
+    if sample_rate is None:
+        sample_rate = _read_rate_env("BOT_LOG_PAYLOAD_SAMPLE_RATE", 1.0)
+    if max_chars == 0 or (sample_rate < 1.0 and random.random() >= sample_rate):
+        return f"<omitted len={len(value)}>"
+    if len(value) <= max_chars:
+        return value
+    return f"{value[:max_chars]}…(+{len(value) - max_chars} chars)"
+
+
+class LogContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "chat_id", ""):
+            record.chat_id = _chat_id_var.get()
+        if not getattr(record, "trace_id", ""):
+            record.trace_id = _trace_id_var.get()
+        return True
+
+
+class JsonLogFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        chat_id = getattr(record, "chat_id", "")
+        trace_id = getattr(record, "trace_id", "")
+        if chat_id:
+            payload["chat_id"] = chat_id
+        if trace_id:
+            payload["trace_id"] = trace_id
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 提前渲染异常堆栈，后台线程只负责写出。
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # 队列满时丢弃而不是阻塞事件循环。
+            self.dropped += 1
+
+
+def build_formatter(log_format: Optional[str] = None) -> logging.Formatter:
+    selected = (log_format or os.getenv("BOT_LOG_FORMAT", "text")).strip().lower()
+    if selected == "json":
+        return JsonLogFormatter()
+    return logging.Formatter(TEXT_LOG_FORMAT)
+
+
+def setup_logging(log_file: str = LOG_FILE) -> QueueListener:
+    global _queue_listener
+
+    max_bytes = read_positive_int_env("BOT_LOG_MAX_BYTES", 5 * 1024 * 1024)
+    backup_count = read_positive_int_env("BOT_LOG_BACKUP_COUNT", 5)
+    log_to_stdout = read_bool_env("BOT_LOG_TO_STDOUT", True)
+    queue_size = read_positive_int_env("BOT_LOG_QUEUE_SIZE", 10000)
+    formatter = build_formatter()
+
+    shutdown_logging()
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.handlers.clear()
+
+    sinks: list[logging.Handler] = []
+    file_handler = RotatingFileHandler(
+        log_file,
+        maxBytes=max_bytes,
+        backupCount=backup_count,
+        encoding="utf-8",
+    )
+    file_handler.setFormatter(formatter)
+    sinks.append(file_handler)
+
+    if log_to_stdout:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+        sinks.append(stream_handler)
+
+    # 文件写入与轮转交给后台线程，事件循环里只做一次入队。
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    queue_handler.addFilter(LogContextFilter())
+    root_logger.addHandler(queue_handler)
+
+    _queue_listener = QueueListener(
+        queue_handler.queue, *sinks, respect_handler_level=True
+    )
+    _queue_listener.start()
+    return _queue_listener
+
+
+def shutdown_logging() -> None:
+    global _queue_listener
+    listener = _queue_listener
+    _queue_listener = None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+atexit.register(shutdown_logging)
@@ -1,32 +1,114 @@
+import json
+import logging
 import os
+import threading
+from typing import Optional
 
+from app.config.chat_store import ChatKey
 from app.config.env_store import read_env_key, upsert_env_key
 
+logger = logging.getLogger(__name__)
+
+# 多平台同进程时各自持有 ProjectService，但共用同一个会话目录文件，写入需要串行。
+_CHAT_PROJECTS_FILE_LOCK = threading.Lock()
+
+
+def resolve_project_path(raw_path: str) -> tuple[str, bool]:
+    # 支持 "~" 与相对路径输入，统一归一化为绝对目录；不存在时自动创建。
+    new_path = os.path.abspath(os.path.expanduser(raw_path.strip()))
+    if not os.path.exists(new_path):
+        os.makedirs(new_path, exist_ok=True)
+        return new_path, True
+    if not os.path.isdir(new_path):
+        raise ValueError(f"路径不是目录：{new_path}")
+    return new_path, False
+
 
 class ProjectService:
-    def __init__(self, initial_project_dir: str, env_path: str):
+    def __init__(
+        self,
+        initial_project_dir: str,
+        env_path: str,
+        chat_projects_path: Optional[str] = None,
+    ):
         self._project_dir = initial_project_dir
         self._env_path = env_path
+        # 会话级项目目录：/setproject 只影响发起的会话，未设置的会话使用全局默认目录。
+        self._chat_projects_path = chat_projects_path
+        self._chat_project_dirs: dict[str, str] = {}
+        self._load_chat_project_dirs()
 
     @property
     def project_dir(self) -> str:
         return self._project_dir
 
+    @property
+    def chat_projects_path(self) -> Optional[str]:
+        return self._chat_projects_path
+
+    def project_dir_for(self, chat_key: ChatKey) -> str:
+        return self._chat_project_dirs.get(str(chat_key)) or self._project_dir
+
+    def chat_project_dir(self, chat_key: ChatKey) -> str:
+        return self._chat_project_dirs.get(str(chat_key), "")
+
+    def set_chat_project_dir(self, chat_key: ChatKey, raw_path: str) -> tuple[str, bool]:
+        new_path, created = resolve_project_path(raw_path)
+        self._chat_project_dirs[str(chat_key)] = new_path
+        self._save_chat_project_dir(str(chat_key), new_path)
+        return new_path, created
+
+    def clear_chat_project_dir(self, chat_key: ChatKey) -> None:
+        if self._chat_project_dirs.pop(str(chat_key), None) is not None:
+            self._save_chat_project_dir(str(chat_key), None)
+
+    def _load_chat_project_dirs(self) -> None:
+        path = self._chat_projects_path
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as exc:
+            logger.warning("加载会话项目目录失败：%s (file=%s)", exc, path)
+            return
+        if isinstance(data, dict):
+            self._chat_project_dirs = {
+                str(key): value for key, value in data.items() if isinstance(value, str) and value
+            }
+
+    def _save_chat_project_dir(self, key: str, value: Optional[str]) -> None:
+        # 先读后写，只改本会话这一项，保留其他平台实例写入的条目。
+        path = self._chat_projects_path
+        if not path:
+            return
+        with _CHAT_PROJECTS_FILE_LOCK:
+            data: dict = {}
+            if os.path.exists(path):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        loaded = json.load(f)
+                    data = loaded if isinstance(loaded, dict) else {}
+                except Exception:
+                    data = {}
+            if value is None:
+                data.pop(key, None)
+            else:
+                data[key] = value
+            try:
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except OSError as exc:
+                logger.warning("保存会话项目目录失败：%s (file=%s)", exc, path)
+
     @property
     def env_path(self) -> str:
         return self._env_path
 
     def set_project_dir(self, raw_path: str) -> tuple[str, bool, str]:
-        # 支持 "~" 与相对路径输入，统一归一化为绝对目录。
-        new_path = os.path.abspath(os.path.expanduser(raw_path.strip()))
-        created = False
-
-        if not os.path.exists(new_path):
-            os.makedirs(new_path, exist_ok=True)
-            created = True
-        elif not os.path.isdir(new_path):
-            raise ValueError(f"路径不是目录：{new_path}")
-
+        new_path, created = resolve_project_path(raw_path)
         self._project_dir = new_path
         # 切换成功后同步写回 .env，保证重启后仍使用该目录。
         env_path = self._persist_project_dir_to_env(new_path)
@@ -0,0 +1,48 @@
+import os
+
+from dotenv import load_dotenv
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+load_dotenv(os.path.join(REPO_ROOT, ".env"))
+LOG_FILE = os.getenv("BOT_LOG_FILE", os.path.join(REPO_ROOT, "bot.log"))
+
+DEFAULT_MAX_TURNS = 12
+CHAT_HISTORY_FILE = os.path.join(REPO_ROOT, "chat_histories.json")
+CHAT_PROJECTS_FILE = os.path.join(REPO_ROOT, "chat_projects.json")
+WORKTREES_DIR = os.path.join(REPO_ROOT, "worktrees")
+CODEX_LATENCY_FILE = os.path.join(REPO_ROOT, "codex_latency.json")
+
+SYSTEM_PROMPT = (
+    "You are Codex, a pragmatic coding assistant. "
+    "Answer clearly and concisely. Prefer actionable code-level guidance. "
+    "When you want Telegram to send a local image file, always include a Markdown image "
+    "reference with an absolute path, e.g. ![screenshot](/tmp/example.png). "
+    "Only Markdown image syntax starting with ![ triggers Telegram image sending. "
+    "A normal Markdown link like [text](url) is just a link and must not be used when you want Telegram to send an image. "
+    "Do not return only a plain file path for images."
+)
+
+
+def read_positive_int_env(name: str, default: int) -> int:
+    raw = (os.getenv(name, str(default)) or "").strip()
+    try:
+        value = int(raw)
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+def read_positive_float_env(name: str, default: float) -> float:
+    raw = (os.getenv(name, str(default)) or "").strip()
+    try:
+        value = float(raw)
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+def read_bool_env(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() not in {"0", "false", "no", "off"}
@@ -0,0 +1,258 @@
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from app.core.bridge_core import BridgeCore
+from app.core.codex_client import build_prompt
+from app.core.platform_messages import (
+    ChatKey,
+    OutboundPart,
+    PlatformOutboundMessage,
+    build_outbound_parts,
+)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_STATE_LABELS = {
+    JOB_QUEUED: "排队中",
+    JOB_RUNNING: "运行中",
+    JOB_DONE: "已完成",
+    JOB_FAILED: "失败",
+}
+DEFAULT_BG_MAX_RUNNING = 2
+DEFAULT_BG_MAX_JOBS_PER_CHAT = 3
+
+# (job, outbound) -> None：各平台把结果作为一条新消息发回原会话。
+JobDeliverer = Callable[["BackgroundJob", PlatformOutboundMessage], Awaitable[None]]
+
+
+@dataclass
+class BackgroundJob:
+    id: int
+    platform: str
+    reply_target: ChatKey
+    history_key: ChatKey
+    prompt: str
+    reasoning_effort: Optional[str] = None
+    state: str = JOB_QUEUED
+    created_at: float = 0.0
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    reply_text: str = ""
+    error: str = ""
+    worktree: str = ""
+
+    @property
+    def active(self) -> bool:
+        return self.state in {JOB_QUEUED, JOB_RUNNING}
+
+    def elapsed_sec(self, now: Optional[float] = None) -> float:
+        if not self.started_at:
+            return 0.0
+        end = self.finished_at or (time.time() if now is None else now)
+        return max(0.0, end - self.started_at)
+
+
+def _excerpt(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
+
+
+def render_job_line(job: BackgroundJob, now: Optional[float] = None) -> str:
+    label = JOB_STATE_LABELS.get(job.state, job.state)
+    elapsed = f" {job.elapsed_sec(now):.0f}s" if job.started_at else ""
+    return f"- #{job.id} {label}{elapsed}：{_excerpt(job.prompt, 40)}"
+
+
+def render_job_detail(job: BackgroundJob, now: Optional[float] = None) -> str:
+    lines = [
+        f"后台任务 #{job.id}：{JOB_STATE_LABELS.get(job.state, job.state)}",
+        f"- 提交时间：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(job.created_at))}",
+        f"- 耗时：{job.elapsed_sec(now):.0f}s",
+        f"- 任务：{_excerpt(job.prompt, 200)}",
+    ]
+    if job.worktree:
+        lines.append(f"- 工作区：{job.worktree}")
+    if job.state == JOB_DONE:
+        lines.append(f"- 结果摘要：{_excerpt(job.reply_text, 300)}")
+    if job.state == JOB_FAILED:
+        lines.append(f"- 错误：{job.error}")
+    return "\n".join(lines)
+
+
+# 后台任务：/bg 提交的长任务脱离会话的单一处理槽独立运行，完成后作为新消息送达；
+# 同时运行数受 max_running 限制，实际 Codex 调用经过 BridgeCore（项目目录锁、全局调度器）。
+# submit 可从命令线程调用，任务在 attach 的事件循环里执行；任务只保存在内存中。
+class BackgroundJobManager:
+    def __init__(
+        self,
+        platform: str,
+        core: BridgeCore,
+        deliver: JobDeliverer,
+        logger: logging.Logger,
+        max_running: int = DEFAULT_BG_MAX_RUNNING,
+        max_jobs_per_chat: int = DEFAULT_BG_MAX_JOBS_PER_CHAT,
+        keep_finished: int = 20,
+    ):
+        self.platform = platform
+        self.core = core
+        self.deliver = deliver
+        self.logger = logger
+        self.max_running = max(1, max_running)
+        self.max_jobs_per_chat = max(1, max_jobs_per_chat)
+        self.keep_finished = max(0, keep_finished)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._jobs: dict[int, BackgroundJob] = {}
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+
+    def submit(
+        self,
+        reply_target: ChatKey,
+        history_key: ChatKey,
+        prompt: str,
+        reasoning_effort: Optional[str] = None,
+    ) -> BackgroundJob:
+        if self.loop is None or self.loop.is_closed():
+            raise RuntimeError("后台任务尚未就绪，请稍后再试。")
+        with self._lock:
+            active = sum(
+                1 for job in self._jobs.values() if job.history_key == history_key and job.active
+            )
+            if active >= self.max_jobs_per_chat:
+                raise RuntimeError(
+                    f"当前会话已有 {active} 个后台任务未完成（上限 {self.max_jobs_per_chat}），"
+                    "请等待完成后再提交。"
+                )
+            job = BackgroundJob(
+                id=next(self._ids),
+                platform=self.platform,
+                reply_target=reply_target,
+                history_key=history_key,
+                prompt=prompt,
+                reasoning_effort=reasoning_effort,
+                created_at=time.time(),
+            )
+            self._jobs[job.id] = job
+            self._prune_locked()
+        self.loop.call_soon_threadsafe(self._spawn, job)
+        self.logger.info("后台任务已提交：#%s history=%s", job.id, history_key)
+        return job
+
+    def list_jobs(self, history_key: ChatKey) -> list[BackgroundJob]:
+        with self._lock:
+            return [job for job in self._jobs.values() if job.history_key == history_key]
+
+    def get(self, history_key: ChatKey, job_id: int) -> Optional[BackgroundJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        # 只能查看本会话的任务。
+        return job if job is not None and job.history_key == history_key else None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            states = [job.state for job in self._jobs.values()]
+        return {
+            "max_running": self.max_running,
+            "running": states.count(JOB_RUNNING),
+            "queued": states.count(JOB_QUEUED),
+        }
+
+    async def shutdown(self) -> None:
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _prune_locked(self) -> None:
+        finished = [job for job in self._jobs.values() if not job.active]
+        for job in finished[: max(0, len(finished) - self.keep_finished)]:
+            self._jobs.pop(job.id, None)
+
+    def _spawn(self, job: BackgroundJob) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_running)
+        task = asyncio.get_running_loop().create_task(self._run(job), name=f"bg-job-{job.id}")
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _task: self._tasks.pop(job.id, None))
+
+    async def _run(self, job: BackgroundJob) -> None:
+        async with self._semaphore:
+            job.state = JOB_RUNNING
+            job.started_at = time.time()
+            try:
+                # 带上提交时的会话上下文，但不写入会话历史，避免和前台对话交错。
+                history = list(self.core.chat_store.histories.get(job.history_key, []))
+                history.append({"role": "user", "content": job.prompt})
+                reply_text, meta = await self.core.request_chat_reply(
+                    job.history_key,
+                    build_prompt(self.core.system_prompt, history),
+                    job.reasoning_effort,
+                    # 启用 worktree 时每个后台任务用独立 worktree，与会话和其他任务互不干扰。
+                    workspace_key=f"{job.history_key}-job{job.id}",
+                )
+            except asyncio.CancelledError:
+                job.state = JOB_FAILED
+                job.error = "进程退出，任务已中断"
+                job.finished_at = time.time()
+                raise
+            except Exception as exc:
+                job.state = JOB_FAILED
+                job.error = str(exc) or exc.__class__.__name__
+                job.finished_at = time.time()
+                self.logger.warning("后台任务 #%s 失败：%s", job.id, job.error)
+                outbound = self._build_outbound(
+                    job, f"后台任务 #{job.id} 失败：{job.error}", ()
+                )
+            else:
+                job.state = JOB_DONE
+                job.reply_text = reply_text
+                job.finished_at = time.time()
+                self.logger.info(
+                    "后台任务 #%s 完成：耗时 %.1fs reply_len=%s",
+                    job.id,
+                    job.elapsed_sec(),
+                    len(reply_text),
+                )
+                # 结果作为一轮命令对话记入历史，后续追问可以接上。
+                self.core.chat_store.append_command_history(
+                    job.history_key, f"/bg {job.prompt}", reply_text
+                )
+                job.worktree = (meta or {}).get("worktree") or ""
+                base_dir = job.worktree or self.core.asset_base_dir(job.history_key)
+                header = (
+                    f"后台任务 #{job.id} 已完成（耗时 {job.elapsed_sec():.0f}s）："
+                    f"{_excerpt(job.prompt, 40)}"
+                )
+                if job.worktree:
+                    header += f"\n工作区：{job.worktree}"
+                outbound = self._build_outbound(
+                    job,
+                    header,
+                    build_outbound_parts(reply_text, base_dir=base_dir),
+                )
+        try:
+            await self.deliver(job, outbound)
+        except Exception:
+            self.logger.exception("后台任务 #%s 结果发送失败", job.id)
+
+    @staticmethod
+    def _build_outbound(
+        job: BackgroundJob, header: str, parts: tuple[OutboundPart, ...]
+    ) -> PlatformOutboundMessage:
+        return PlatformOutboundMessage(
+            parts=(OutboundPart.notice_part(header),) + tuple(parts),
+            meta={},
+            history_key=job.history_key,
+        )
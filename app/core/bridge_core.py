@@ -1,14 +1,21 @@
+import asyncio
 from typing import Awaitable, Callable, Optional
 
 from app.core.codex_client import build_prompt
+from app.core.latency_tracker import render_eta_text
 from app.core.platform_messages import (
     ChatKey,
     PlatformInboundMessage,
     PlatformOutboundMessage,
     build_outbound_parts,
 )
+from app.core.project_locks import ProjectLockManager, render_project_lock_wait
+from app.core.worktrees import WorktreeManager
 
-ReplyRequester = Callable[[str, Optional[str]], Awaitable[tuple[str, dict]]]
+# (prompt, reasoning_effort[, on_event][, project_dir=...]) -> (reply_text, meta)
+ReplyRequester = Callable[..., Awaitable[tuple[str, dict]]]
+# 预览提示：收到文本后更新预览（排队等待项目目录等）。
+StatusCallback = Callable[[str], Awaitable[None]]
 BridgeInboundMessage = PlatformInboundMessage
 BridgeReply = PlatformOutboundMessage
 
@@ -20,11 +27,21 @@ class BridgeCore:
         system_prompt: str,
         request_reply: ReplyRequester,
         resolve_asset_base_dir: Optional[Callable[[], Optional[str]]] = None,
+        resolve_project_dir: Optional[Callable[[ChatKey], str]] = None,
+        project_locks: Optional[ProjectLockManager] = None,
+        resolve_read_only: Optional[Callable[[], bool]] = None,
+        worktrees: Optional[WorktreeManager] = None,
+        estimate_eta: Optional[Callable[[str, Optional[str]], Optional[float]]] = None,
     ):
         self.chat_store = chat_store
         self.system_prompt = system_prompt
         self.request_reply = request_reply
         self.resolve_asset_base_dir = resolve_asset_base_dir
+        self.resolve_project_dir = resolve_project_dir
+        self.project_locks = project_locks
+        self.resolve_read_only = resolve_read_only
+        self.worktrees = worktrees
+        self.estimate_eta = estimate_eta
 
     @staticmethod
     def build_history_key(platform: str, chat_id: ChatKey) -> ChatKey:
@@ -32,21 +49,106 @@ class BridgeCore:
             return chat_id
         return f"{platform}:{chat_id}"
 
-    async def process_user_text(self, inbound: BridgeInboundMessage) -> BridgeReply:
+    async def process_user_text(
+        self,
+        inbound: BridgeInboundMessage,
+        on_event: Optional[Callable[[dict], None]] = None,
+        on_status: Optional[StatusCallback] = None,
+    ) -> BridgeReply:
         history_key = self.build_history_key(inbound.platform, inbound.chat_id)
         history = self.chat_store.append_user_message(history_key, inbound.text)
         prompt = build_prompt(self.system_prompt, history)
-        reply_text, meta = await self.request_reply(
-            prompt, inbound.reasoning_effort
+        reply_text, meta = await self.request_chat_reply(
+            history_key, prompt, inbound.reasoning_effort, on_event, on_status
         )
         usage = (meta or {}).get("usage") if isinstance(meta, dict) else {}
         self.chat_store.update_usage_stats(
             history_key, usage if isinstance(usage, dict) else {}
         )
+        if isinstance(meta, dict):
+            self.chat_store.update_process_stats(history_key, meta.get("process") or {})
         self.chat_store.append_assistant_message(history_key, reply_text)
-        base_dir = self.resolve_asset_base_dir() if self.resolve_asset_base_dir else None
+        worktree = meta.get("worktree") if isinstance(meta, dict) else None
+        base_dir = worktree or self.asset_base_dir(history_key)
         return BridgeReply(
             parts=build_outbound_parts(reply_text, base_dir=base_dir),
             meta=meta if isinstance(meta, dict) else {},
             history_key=history_key,
         )
+
+    def asset_base_dir(self, history_key: ChatKey) -> Optional[str]:
+        # 答复里的相对图片路径相对于本会话的项目目录解析。
+        if self.resolve_project_dir is not None:
+            return self.resolve_project_dir(history_key)
+        return self.resolve_asset_base_dir() if self.resolve_asset_base_dir else None
+
+    async def request_chat_reply(
+        self,
+        history_key: ChatKey,
+        prompt: str,
+        reasoning_effort: Optional[str] = None,
+        on_event: Optional[Callable[[dict], None]] = None,
+        on_status: Optional[StatusCallback] = None,
+        workspace_key: Optional[str] = None,
+    ) -> tuple[str, dict]:
+        # 按会话解析项目目录（启用 worktree 时换成会话/任务自己的 worktree），
+        # 并持有目录锁：同目录串行，不同目录并行。
+        args: tuple = (prompt, reasoning_effort)
+        if on_event is not None:
+            # 需要实时预览时才传第三个参数，兼容只接收 (prompt, effort) 的请求函数。
+            args += (on_event,)
+        eta_text = render_eta_text(
+            self.estimate_eta(prompt, reasoning_effort) if self.estimate_eta else None
+        )
+        if self.resolve_project_dir is None:
+            await self._announce_start(on_status, 0.0, eta_text)
+            return await self.request_reply(*args)
+        project_dir = self.resolve_project_dir(history_key)
+        run_dir = project_dir
+        if self.worktrees is not None:
+            run_dir = await asyncio.to_thread(
+                self.worktrees.acquire, project_dir, workspace_key or history_key
+            )
+        try:
+            reply_text, meta = await self._request_in_dir(run_dir, args, on_status, eta_text)
+        finally:
+            if run_dir != project_dir:
+                await asyncio.to_thread(self.worktrees.release, run_dir)
+        if isinstance(meta, dict) and run_dir != project_dir:
+            meta["worktree"] = run_dir
+        return reply_text, meta
+
+    @staticmethod
+    async def _announce_start(
+        on_status: Optional[StatusCallback], waited_sec: float, eta_text: str
+    ) -> None:
+        # 开始请求前更新预览：排过队就说明等了多久，有历史耗时就给出预计时间。
+        if on_status is None or (waited_sec < 1.0 and not eta_text):
+            return
+        text = f"正在请求 Codex（{eta_text}）..." if eta_text else "正在请求 Codex..."
+        if waited_sec >= 1.0:
+            text = f"已排队等待项目目录 {waited_sec:.0f}s，{text}"
+        await on_status(text)
+
+    async def _request_in_dir(
+        self,
+        run_dir: str,
+        args: tuple,
+        on_status: Optional[StatusCallback],
+        eta_text: str = "",
+    ) -> tuple[str, dict]:
+        if self.project_locks is None:
+            await self._announce_start(on_status, 0.0, eta_text)
+            return await self.request_reply(*args, project_dir=run_dir)
+
+        async def on_wait(waited_sec: float) -> None:
+            if on_status is not None:
+                await on_status(render_project_lock_wait(run_dir, waited_sec))
+
+        read_only = bool(self.resolve_read_only()) if self.resolve_read_only else False
+        async with self.project_locks.hold(run_dir, read_only, on_wait) as waited_sec:
+            await self._announce_start(on_status, waited_sec, eta_text)
+            reply_text, meta = await self.request_reply(*args, project_dir=run_dir)
+        if isinstance(meta, dict) and waited_sec:
+            meta["project_lock_wait_sec"] = round(waited_sec, 3)
+        return reply_text, meta
@@ -1,11 +1,71 @@
 import json
 import os
 import subprocess
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
-
-from app.config.config import AppConfig, normalize_reasoning_effort
+from typing import Callable, Optional
+
+from app.config.config import AppConfig, ProcessLimits, normalize_reasoning_effort
+from app.core.latency_tracker import LatencyTracker
+from app.core.process_limits import (
+    CgroupRun,
+    ProcessGroupReaper,
+    apply_process_limits,
+    build_command_prefix,
+)
+
+
+CODEX_RESUME_PROMPT = (
+    "Your previous turn was interrupted. Continue where you left off and finish "
+    "replying to the latest user message."
+)
+
+
+# Codex 运行失败：带上退出码、已知的 thread_id 和是否（自适应）超时，供重试策略分类。
+class CodexRunError(RuntimeError):
+    def __init__(
+        self,
+        message: str,
+        returncode: Optional[int] = None,
+        thread_id: str = "",
+        timed_out: bool = False,
+        adaptive_timeout: bool = False,
+    ):
+        super().__init__(message)
+        self.returncode = returncode
+        self.thread_id = thread_id
+        self.timed_out = timed_out
+        # 超时来自按历史耗时收紧的自适应超时，而不是 CODEX_TIMEOUT_SEC。
+        self.adaptive_timeout = adaptive_timeout
+
+
+# 把 asyncio 侧的取消传到工作线程里的 Codex 子进程：等待答复的任务被取消（排空超时、退出）时
+# 直接结束子进程，不让它在后台继续跑满 CODEX_TIMEOUT_SEC，也不和下次启动的重放重复干活。
+class CodexCancelScope:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kill: Optional[Callable[[], None]] = None
+        self.cancelled = False
+
+    def bind(self, kill: Callable[[], None]) -> None:
+        with self._lock:
+            self._kill = kill
+            cancelled = self.cancelled
+        if cancelled:
+            kill()
+
+    def unbind(self) -> None:
+        with self._lock:
+            self._kill = None
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            kill = self._kill
+        if kill is not None:
+            kill()
 
 
 def build_prompt(system_prompt: str, history: list[dict]) -> str:
@@ -24,7 +84,13 @@ def ask_codex(config: AppConfig, prompt: str) -> str:
 
 
 def ask_codex_with_meta(
-    config: AppConfig, prompt: str, reasoning_effort: Optional[str] = None
+    config: AppConfig,
+    prompt: str,
+    reasoning_effort: Optional[str] = None,
+    on_event: Optional[Callable[[dict], None]] = None,
+    resume_thread_id: Optional[str] = None,
+    latency: Optional[LatencyTracker] = None,
+    cancel_scope: Optional[CodexCancelScope] = None,
 ) -> tuple[str, dict]:
     cmd = [config.codex_bin, "exec", "--skip-git-repo-check"]
     if config.codex_project_dir:
@@ -42,30 +108,57 @@ def ask_codex_with_meta(
         # codex exec 通过 -c 覆盖配置键来控制推理等级。
         cmd.extend(["-c", f'model_reasoning_effort="{resolved_effort}"'])
 
-    exec_cmd = cmd + ["--json", prompt]
-    result = subprocess.run(
-        exec_cmd,
-        capture_output=True,
-        text=True,
-        timeout=config.codex_timeout_sec,
-        check=False,
-    )
-    if result.returncode != 0:
-        stderr = (result.stderr or "").strip()
-        stdout = (result.stdout or "").strip()
-        details = stderr or stdout or f"codex exited with {result.returncode}"
-        raise RuntimeError(details)
+    cmd.append("--json")
+    if resume_thread_id:
+        # 接着超时前的 thread 继续，而不是从头再跑一遍；thread 里已有完整上下文，只发一句续写指令。
+        cmd.extend(["resume", resume_thread_id])
+        exec_cmd = cmd + [CODEX_RESUME_PROMPT]
+    else:
+        exec_cmd = cmd + [prompt]
+    timeout_sec = config.codex_timeout_sec
+    latency_key = ""
+    if latency is not None and not resume_thread_id:
+        # 续跑只是上一轮的后半段，不计入也不按它调整超时。
+        latency_key = latency.key_for(config.codex_model, resolved_effort, len(prompt))
+        timeout_sec = latency.timeout_for(latency_key, timeout_sec)
+    if cancel_scope is not None and cancel_scope.cancelled:
+        # 排队等执行名额期间就被取消了，不再启动子进程。
+        raise CodexRunError("codex run cancelled")
+    started_at = time.monotonic()
+    try:
+        returncode, stdout_lines, stderr, process_usage = _run_codex_process(
+            exec_cmd, timeout_sec, on_event, config.codex_limits, cancel_scope
+        )
+    except subprocess.TimeoutExpired as exc:
+        if latency_key:
+            latency.record(latency_key, timeout_sec)
+        raise CodexRunError(
+            f"codex timed out after {timeout_sec}s",
+            thread_id=_find_thread_id(exc.output or "") or (resume_thread_id or ""),
+            timed_out=True,
+            adaptive_timeout=timeout_sec < config.codex_timeout_sec,
+        ) from None
+    stdout = "\n".join(stdout_lines)
+    if cancel_scope is not None and cancel_scope.cancelled:
+        raise CodexRunError("codex run cancelled", returncode=returncode)
+    if returncode != 0:
+        # 只取 stderr 和 JSONL 里的 error/turn.failed 事件，不带普通输出：
+        # 答复正文里出现的 "401"、"quota" 之类字样不能被当成后端故障。
+        details = "\n".join(
+            part for part in ((stderr or "").strip(), _find_error_events(stdout)) if part
+        )
+        raise CodexRunError(
+            details or f"codex exited with {returncode}",
+            returncode=returncode,
+            thread_id=_find_thread_id(stdout),
+        )
 
     reply = ""
-    meta: dict = {}
+    meta: dict = {"process": process_usage} if process_usage else {}
     # codex --json 为 JSONL 流；非 JSON 行（日志/告警）直接忽略。
-    for raw_line in (result.stdout or "").splitlines():
-        line = raw_line.strip()
-        if not line or not line.startswith("{"):
-            continue
-        try:
-            evt = json.loads(line)
-        except Exception:
+    for raw_line in (stdout or "").splitlines():
+        evt = _parse_event_line(raw_line)
+        if evt is None:
             continue
         if evt.get("type") == "thread.started":
             meta["thread_id"] = evt.get("thread_id", "")
@@ -85,10 +178,133 @@ def ask_codex_with_meta(
 
     reply = reply.strip()
     if not reply:
-        raise RuntimeError("codex returned empty output")
+        raise CodexRunError("codex returned empty output", returncode=0)
+    run_sec = time.monotonic() - started_at
+    meta["codex_run_sec"] = round(run_sec, 3)
+    if latency_key:
+        latency.record(latency_key, run_sec)
     return reply, meta
 
 
+def _parse_event_line(raw_line: str) -> Optional[dict]:
+    line = raw_line.strip()
+    if not line or not line.startswith("{"):
+        return None
+    try:
+        evt = json.loads(line)
+    except Exception:
+        return None
+    return evt if isinstance(evt, dict) else None
+
+
+def _find_thread_id(stdout: str) -> str:
+    for raw_line in stdout.splitlines():
+        evt = _parse_event_line(raw_line)
+        if evt is not None and evt.get("type") == "thread.started":
+            return evt.get("thread_id", "") or ""
+    return ""
+
+
+def _find_error_events(stdout: str) -> str:
+    messages = []
+    for raw_line in stdout.splitlines():
+        evt = _parse_event_line(raw_line)
+        if evt is None:
+            continue
+        if evt.get("type") == "error":
+            messages.append(str(evt.get("message") or ""))
+        elif evt.get("type") == "turn.failed":
+            error = evt.get("error")
+            messages.append(str(error.get("message") or "") if isinstance(error, dict) else "")
+    return "\n".join(message.strip() for message in messages if message.strip())
+
+
+def _run_codex_process(
+    exec_cmd: list[str],
+    timeout_sec: int,
+    on_event: Optional[Callable[[dict], None]] = None,
+    limits: ProcessLimits = ProcessLimits(),
+    cancel_scope: Optional[CodexCancelScope] = None,
+) -> tuple[int, list[str], str, dict]:
+    # 逐行读取 JSONL，让调用方在 Codex 运行过程中就能拿到中间事件（用于实时预览）；
+    # 按配置降低优先级、加资源限制，结束时返回本次运行的峰值内存与 CPU 时间。
+    cgroup = CgroupRun.create(limits)
+    process = subprocess.Popen(
+        build_command_prefix(limits) + exec_cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True,
+    )
+    apply_process_limits(process.pid, limits, cgroup)
+    reaper = ProcessGroupReaper(process, cgroup)
+    stderr_chunks: list[str] = []
+    stderr_thread = threading.Thread(
+        target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True
+    )
+    stderr_thread.start()
+    timed_out = threading.Event()
+
+    def kill_on_timeout() -> None:
+        timed_out.set()
+        reaper.kill()
+
+    timer = threading.Timer(timeout_sec, kill_on_timeout)
+    timer.start()
+    if cancel_scope is not None:
+        cancel_scope.bind(reaper.kill)
+    stdout_lines: list[str] = []
+    usage: dict = {}
+    try:
+        for raw_line in process.stdout:
+            stdout_lines.append(raw_line.rstrip("\n"))
+            if on_event is None:
+                continue
+            evt = _parse_event_line(raw_line)
+            if evt is None:
+                continue
+            try:
+                on_event(evt)
+            except Exception:
+                # 预览回调失败不影响最终答复。
+                pass
+        returncode, usage = reaper.wait()
+    finally:
+        timer.cancel()
+        if cancel_scope is not None:
+            cancel_scope.unbind()
+        if process.returncode is None:
+            reaper.kill()
+            reaper.wait()
+        stderr_thread.join(timeout=5)
+        process.stdout.close()
+        process.stderr.close()
+        if cgroup is not None:
+            # cgroup 统计覆盖整组进程（含 Codex 派生的构建/测试进程），比 wait4 更准。
+            usage.update(cgroup.usage())
+            cgroup.close()
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(exec_cmd, timeout_sec, output="\n".join(stdout_lines))
+    return returncode, stdout_lines, "".join(stderr_chunks), usage
+
+
+def extract_progress_text(evt: dict) -> str:
+    # 把 Codex 中间事件转成给用户看的进度文本；无展示价值的事件返回空串。
+    if evt.get("type") not in {"item.started", "item.updated", "item.completed"}:
+        return ""
+    item = evt.get("item") or {}
+    item_type = item.get("type")
+    if item_type == "agent_message":
+        return (item.get("text") or "").strip()
+    if item_type == "reasoning":
+        text = (item.get("text") or "").strip()
+        return f"思考中：{text}" if text else ""
+    if item_type == "command_execution":
+        command = (item.get("command") or "").strip()
+        return f"正在执行命令：{command}" if command else ""
+    return ""
+
+
 def get_codex_status(config: AppConfig) -> str:
     def run_cmd(cmd: list[str], timeout: int = 15) -> tuple[int, str]:
         result = subprocess.run(
@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import re
+import subprocess
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+from app.core.codex_client import CodexRunError
+from app.core.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CODEX_MAX_ATTEMPTS = 3
+DEFAULT_CODEX_RETRY_BASE_DELAY_SEC = 1.0
+DEFAULT_CODEX_BREAKER_THRESHOLD = 5
+DEFAULT_CODEX_BREAKER_COOLDOWN_SEC = 60.0
+# 鉴权/额度错误连续出现这么多次才直接打开熔断，单次误判不影响所有会话。
+CODEX_FATAL_TRIP_HITS = 2
+
+ERROR_KIND_LABELS = {
+    "transient": "Codex 临时故障",
+    "timeout": "Codex 运行超时",
+    "auth": "Codex 未登录或凭据失效（请在服务器上执行 codex login）",
+    "config": "Codex 配置错误",
+    "quota": "Codex 额度或频率受限",
+    "unavailable": "Codex 后端暂不可用",
+}
+
+# 按顺序匹配 stderr 与 JSONL 错误事件；都不命中的失败按临时故障处理，和原来"全部重试"的行为一致。
+# 只认完整的错误短语或带状态码上下文的数字，避免 stderr 里的普通日志（行号、文件名）误判。
+_STDERR_PATTERNS: tuple[tuple[str, re.Pattern], ...] = (
+    (
+        "auth",
+        re.compile(
+            r"\bnot logged in\b|\bplease (?:run `?codex login`?|log ?in)\b|\bunauthori[sz]ed\b|"
+            r"\b(?:http|status(?: code)?)[ :=]*401\b|\b(?:invalid|incorrect) api key\b|"
+            r"\bauthentication (?:failed|error|required)\b|"
+            r"\b(?:access|refresh) token (?:has )?(?:expired|been revoked|is invalid)\b",
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        "quota",
+        re.compile(
+            r"\b(?:http|status(?: code)?)[ :=]*429\b|\b429 too many requests\b|\btoo many requests\b|"
+            r"\brate limit(?:ed| exceeded| reached)\b|\binsufficient_quota\b|"
+            r"\bquota (?:exceeded|exhausted)\b|\bexceeded your (?:current )?quota\b|\busage limit\b",
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        "config",
+        re.compile(
+            r"\bmodel\b[^\n]{0,80}?\b(?:not found|does not exist|not supported)\b|"
+            r"\b(?:unknown|invalid) model\b|\bunexpected argument\b|"
+            r"\bunrecognized (?:option|argument|subcommand)\b|\binvalid value for\b|"
+            r"\berror parsing\b|\bconfig(?:uration)? error\b",
+            re.IGNORECASE,
+        ),
+    ),
+)
+# clap 参数错误退出码 2；找不到/不可执行分别是 127/126。
+_CONFIG_EXIT_CODES = {2, 126, 127}
+
+
+# 分类后的 Codex 失败：kind 决定是否重试以及是否计入熔断。
+class CodexError(RuntimeError):
+    def __init__(
+        self, kind: str, details: str, thread_id: str = "", adaptive_timeout: bool = False
+    ):
+        super().__init__(f"{ERROR_KIND_LABELS.get(kind, kind)}：{details}")
+        self.kind = kind
+        self.details = details
+        self.thread_id = thread_id
+        self.adaptive_timeout = adaptive_timeout
+
+
+def classify_codex_error(exc: BaseException) -> CodexError:
+    if isinstance(exc, CodexError):
+        return exc
+    details = str(exc).strip() or exc.__class__.__name__
+    if isinstance(exc, CodexRunError):
+        if exc.timed_out:
+            return CodexError("timeout", details, exc.thread_id, exc.adaptive_timeout)
+        for kind, pattern in _STDERR_PATTERNS:
+            if pattern.search(details):
+                return CodexError(kind, details, exc.thread_id)
+        if exc.returncode in _CONFIG_EXIT_CODES:
+            return CodexError("config", details, exc.thread_id)
+        return CodexError("transient", details, exc.thread_id)
+    if isinstance(exc, subprocess.TimeoutExpired):
+        return CodexError("timeout", details)
+    if isinstance(exc, (FileNotFoundError, PermissionError)):
+        # 找不到 codex 可执行文件或没有执行权限。
+        return CodexError("config", details)
+    for kind, pattern in _STDERR_PATTERNS:
+        if pattern.search(details):
+            return CodexError(kind, details)
+    return CodexError("transient", details)
+
+
+# Codex 后端熔断器：连续 threshold 次后端故障（鉴权/额度失败连续两次）后打开，
+# cooldown_sec 内所有会话直接快速失败；冷却结束放行一次试探请求，成功即恢复。
+# 配置错误多与单次请求参数有关，自适应超时是本地按历史耗时收紧的结果，都不计入熔断。
+# 多平台同进程时共用一个实例，跨线程安全。
+class CodexCircuitBreaker:
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_CODEX_BREAKER_THRESHOLD,
+        cooldown_sec: float = DEFAULT_CODEX_BREAKER_COOLDOWN_SEC,
+        metrics: Optional[MetricsRegistry] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_sec = cooldown_sec
+        self.metrics = metrics or MetricsRegistry()
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._consecutive_failures = 0
+        self._fatal_hits = 0
+        self._opened_at = 0.0
+        self._probe_inflight = False
+        self._last_error: Optional[CodexError] = None
+
+    def before_call(self) -> None:
+        # 熔断打开时抛出 CodexError("unavailable")；半开状态只放行一个试探请求。
+        with self._lock:
+            if self._state == "closed":
+                return
+            remaining = self._opened_at + self.cooldown_sec - self.clock()
+            if self._state == "open" and remaining <= 0:
+                self._set_state_locked("half_open")
+            if self._state == "half_open" and not self._probe_inflight:
+                self._probe_inflight = True
+                return
+            failures, last_error = self._consecutive_failures, self._last_error
+        self.metrics.inc("codex_breaker_rejected_total")
+        wait_text = f"约 {max(1, int(remaining + 0.999))}s 后自动重试" if remaining > 0 else "正在试探恢复"
+        raise CodexError(
+            "unavailable",
+            f"连续失败 {failures} 次，{wait_text}；最近错误：{last_error}",
+        )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            self._fatal_hits = 0
+            self._probe_inflight = False
+            if self._state != "closed":
+                logger.info("Codex 后端恢复，熔断关闭。")
+                self._set_state_locked("closed")
+
+    def record_failure(self, error: CodexError) -> None:
+        with self._lock:
+            self._probe_inflight = False
+            if error.kind in ("config", "unavailable") or error.adaptive_timeout:
+                return
+            self._consecutive_failures += 1
+            self._last_error = error
+            if error.kind in ("auth", "quota"):
+                self._fatal_hits += 1
+            trip = (
+                self._state == "half_open"
+                or self._fatal_hits >= CODEX_FATAL_TRIP_HITS
+                or self._consecutive_failures >= self.failure_threshold
+            )
+            if trip:
+                if self._state != "open":
+                    logger.warning(
+                        "Codex 后端熔断打开：连续失败=%s 冷却=%ss 最近错误=%s",
+                        self._consecutive_failures,
+                        self.cooldown_sec,
+                        error,
+                    )
+                self._opened_at = self.clock()
+                self._set_state_locked("open")
+
+    def release_probe(self) -> None:
+        # 试探请求被取消时让出名额，不改变熔断状态。
+        with self._lock:
+            self._probe_inflight = False
+
+    def _set_state_locked(self, state: str) -> None:
+        self._state = state
+        self.metrics.set_gauge("codex_breaker_open", 0 if state == "closed" else 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            snapshot = {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "last_error": str(self._last_error) if self._last_error else "",
+            }
+            if self._state == "open":
+                snapshot["retry_in_sec"] = round(
+                    max(0.0, self._opened_at + self.cooldown_sec - self.clock()), 1
+                )
+        return snapshot
+
+
+# 共享的 Codex 重试策略：只重试临时故障（指数退避）；超时且拿到了 thread_id 时改为 resume
+# 原 thread 续跑一次，不从头重跑，续跑成功时那次超时不计入熔断；鉴权/配置/额度错误立即失败。
+# 所有尝试都经过熔断器。
+class CodexRetryPolicy:
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_CODEX_MAX_ATTEMPTS,
+        base_delay_sec: float = DEFAULT_CODEX_RETRY_BASE_DELAY_SEC,
+        breaker: Optional[CodexCircuitBreaker] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay_sec = base_delay_sec
+        self.metrics = metrics or (breaker.metrics if breaker else MetricsRegistry())
+        self.breaker = breaker or CodexCircuitBreaker(metrics=self.metrics)
+
+    async def run(
+        self, attempt_call: Callable[[Optional[str]], Awaitable[tuple[str, dict]]]
+    ) -> tuple[str, dict]:
+        # attempt_call(resume_thread_id) 执行一次 Codex 请求；resume_thread_id 非空时续跑该 thread。
+        resume_thread_id: Optional[str] = None
+        # 等待续跑结果、暂未计入熔断的超时。
+        deferred_timeout: Optional[CodexError] = None
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                reply = await attempt_call(resume_thread_id)
+            except asyncio.CancelledError:
+                self.breaker.release_probe()
+                raise
+            except Exception as exc:
+                error = classify_codex_error(exc)
+                if deferred_timeout is not None:
+                    # 续跑也失败了，之前那次超时照常计入。
+                    self.breaker.record_failure(deferred_timeout)
+                    deferred_timeout = None
+                self.metrics.inc("codex_failures_total", kind=error.kind)
+                attempt += 1
+                if attempt >= self.max_attempts or not self._should_retry(error, resume_thread_id):
+                    self.breaker.record_failure(error)
+                    raise error from exc
+                if error.kind == "timeout":
+                    # 超时先不计入熔断：续跑成功说明后端正常，只是这一轮耗时长。
+                    logger.warning("Codex 运行超时，续跑 thread=%s", error.thread_id)
+                    deferred_timeout = error
+                    self.breaker.release_probe()
+                    resume_thread_id = error.thread_id
+                    continue
+                self.breaker.record_failure(error)
+                logger.warning("Codex 临时故障，第 %s 次重试：%s", attempt, error.details)
+                await asyncio.sleep(self.base_delay_sec * (2 ** (attempt - 1)))
+                continue
+            self.breaker.record_success()
+            return reply
+
+    @staticmethod
+    def _should_retry(error: CodexError, resume_thread_id: Optional[str]) -> bool:
+        if error.kind == "transient":
+            return True
+        # 超时只续跑一次：已经是续跑还超时，或没拿到 thread_id，就不再耗一整轮超时时间。
+        return error.kind == "timeout" and bool(error.thread_id) and not resume_thread_id
+
+    def snapshot(self) -> dict:
+        return self.breaker.snapshot()
+
+
+def render_codex_breaker_text(snapshot: dict) -> str:
+    labels = {"closed": "正常", "open": "熔断中", "half_open": "试探恢复中"}
+    state = snapshot.get("state", "closed")
+    line = (
+        f"- 状态={labels.get(state, state)}，连续失败={snapshot.get('consecutive_failures', 0)}"
+    )
+    if "retry_in_sec" in snapshot:
+        line += f"，{snapshot['retry_in_sec']}s 后试探"
+    lines = ["Codex 后端：", line]
+    if snapshot.get("last_error") and state != "closed":
+        lines.append(f"- 最近错误：{snapshot['last_error']}")
+    return "\n".join(lines)
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from app.core.metrics import MetricsRegistry
+
+T = TypeVar("T")
+
+DEFAULT_CODEX_MAX_CONCURRENCY = 4
+
+
+# 全局 Codex 调度器：所有平台的 Codex 调用都经由同一个固定大小的线程池执行，
+# 因此并发上限在多平台同进程时依然成立；不依赖调用方所在的事件循环，跨线程提交也安全。
+class CodexScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_CODEX_MAX_CONCURRENCY,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.metrics = metrics or MetricsRegistry()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="codex"
+        )
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._queued = 0
+        self._peak_inflight = 0
+
+    def _adjust(self, queued: int = 0, inflight: int = 0) -> None:
+        with self._lock:
+            self._queued += queued
+            self._inflight += inflight
+            self._peak_inflight = max(self._peak_inflight, self._inflight)
+            self.metrics.set_gauge("codex_queued", self._queued)
+            self.metrics.set_gauge("codex_inflight", self._inflight)
+
+    async def run(self, platform: str, func: Callable[..., T], *args) -> T:
+        submitted_at = time.monotonic()
+        self._adjust(queued=1)
+
+        def job() -> T:
+            started_at = time.monotonic()
+            self._adjust(queued=-1, inflight=1)
+            self.metrics.observe("codex_queue_wait_sec", started_at - submitted_at, platform=platform)
+            try:
+                return func(*args)
+            finally:
+                self._adjust(inflight=-1)
+                self.metrics.observe(
+                    "codex_run_sec", time.monotonic() - started_at, platform=platform
+                )
+
+        future = self._executor.submit(job)
+        try:
+            result = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # 还没开始执行就被取消时，排队计数要退回来。
+            if future.cancel():
+                self._adjust(queued=-1)
+            raise
+        except Exception:
+            self.metrics.inc("codex_requests_total", platform=platform, outcome="error")
+            raise
+        self.metrics.inc("codex_requests_total", platform=platform, outcome="ok")
+        return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            snapshot = {
+                "max_concurrency": self.max_concurrency,
+                "inflight": self._inflight,
+                "queued": self._queued,
+                "peak_inflight": self._peak_inflight,
+            }
+        snapshot["queue_wait"] = self.metrics.snapshot()["summaries"]
+        return snapshot
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def render_codex_scheduler_text(snapshot: dict) -> str:
+    lines = [
+        "Codex 调度：",
+        f"- 并发上限={snapshot.get('max_concurrency')}，运行中={snapshot.get('inflight', 0)}，"
+        f"排队={snapshot.get('queued', 0)}，峰值={snapshot.get('peak_inflight', 0)}",
+    ]
+    for key, summary in sorted((snapshot.get("queue_wait") or {}).items()):
+        if not key.startswith("codex_queue_wait_sec") or not summary:
+            continue
+        lines.append(
+            f"- 排队等待 {key[len('codex_queue_wait_sec'):] or ''}："
+            f"n={summary['count']} p50={summary['p50']:.2f}s p95={summary['p95']:.2f}s"
+        )
+    return "\n".join(lines)
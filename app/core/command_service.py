@@ -1,9 +1,15 @@
+import os
 from dataclasses import dataclass, replace
 from typing import Callable, Optional
 
+from app.core.background_jobs import BackgroundJobManager, render_job_detail, render_job_line
 from app.core.bridge_core import BridgeCore
 from app.config.config import AppConfig, normalize_reasoning_effort
 from app.config.env_store import read_env_key
+from app.core.codex_retry import render_codex_breaker_text
+from app.core.codex_scheduler import render_codex_scheduler_text
+from app.core.loop_monitor import render_loop_lag_text
+from app.core.worktrees import WorktreeManager
 
 
 @dataclass(frozen=True)
@@ -20,6 +26,9 @@ def render_status_text(
     health: Optional[dict] = None,
     reasoning_override: str = "",
     effective_reasoning_effort: str = "",
+    loop_lag: Optional[dict] = None,
+    codex_scheduler: Optional[dict] = None,
+    codex_backend: Optional[dict] = None,
 ) -> str:
     health = health or {}
     quota = runtime_info.get("quota") or {}
@@ -50,6 +59,7 @@ def render_status_text(
         f"- 累计：输入={usage.get('total_input_tokens', 0)}，"
         f"缓存={usage.get('total_cached_input_tokens', 0)}，"
         f"输出={usage.get('total_output_tokens', 0)}\n"
+        f"{render_process_stats_text(usage)}"
         "计划与模型：\n"
         f"- 账号状态：{runtime_info.get('login') or 'unknown'}\n"
         f"- 模型：{runtime_info.get('model')}\n"
@@ -60,15 +70,37 @@ def render_status_text(
         f"- 当前生效：{effective_reasoning_effort or 'default'}\n"
         f"{account_quota_text}"
     )
-    if not health.get("enabled", True):
-        return text
+    if health.get("enabled", True) and health.get("lines"):
+        # 平台自带渲染好的健康明细（如飞书长连接），直接拼接。
+        text = text + f"\n{health.get('title') or '连接健康'}：\n" + "\n".join(health["lines"])
+    elif health.get("enabled", True):
+        text = (
+            text
+            + "\n轮询健康：\n"
+            + f"- 状态={health.get('state', 'healthy')}\n"
+            + f"- 连续网络错误={health.get('consecutive_network_errors', 0)}\n"
+            + f"- 窗口内重启次数={health.get('restarts_in_window', 0)}\n"
+            + f"- 最近事件={health.get('last_event') or 'none'}"
+        )
+    if loop_lag:
+        text = text + "\n" + render_loop_lag_text(loop_lag)
+    if codex_scheduler:
+        text = text + "\n" + render_codex_scheduler_text(codex_scheduler)
+    if codex_backend:
+        text = text + "\n" + render_codex_breaker_text(codex_backend)
+    return text
+
+
+def render_process_stats_text(usage: dict) -> str:
+    # 没有记录过进程资源（例如还没跑过 Codex）时整段省略。
+    if "last_peak_rss_mb" not in usage:
+        return ""
     return (
-        text
-        + "\n轮询健康：\n"
-        + f"- 状态={health.get('state', 'healthy')}\n"
-        + f"- 连续网络错误={health.get('consecutive_network_errors', 0)}\n"
-        + f"- 窗口内重启次数={health.get('restarts_in_window', 0)}\n"
-        + f"- 最近事件={health.get('last_event') or 'none'}"
+        "进程资源：\n"
+        f"- 最近一次：峰值内存={usage.get('last_peak_rss_mb')}MB，"
+        f"CPU={usage.get('last_cpu_sec')}s\n"
+        f"- 累计：最大峰值内存={usage.get('max_peak_rss_mb')}MB，"
+        f"CPU={usage.get('total_cpu_sec')}s\n"
     )
 
 
@@ -84,6 +116,11 @@ class CommandService:
         get_runtime_info: Callable[[AppConfig], dict],
         list_skills: Callable[[], list[str]],
         get_health_snapshot: Callable[[], dict],
+        get_loop_lag_snapshot: Optional[Callable[[], dict]] = None,
+        get_codex_scheduler_snapshot: Optional[Callable[[], dict]] = None,
+        get_codex_backend_snapshot: Optional[Callable[[], dict]] = None,
+        background_jobs: Optional[BackgroundJobManager] = None,
+        worktrees: Optional[WorktreeManager] = None,
     ):
         self.config_getter = config_getter
         self.config_setter = config_setter
@@ -93,8 +130,16 @@ class CommandService:
         self.get_runtime_info = get_runtime_info
         self.list_skills = list_skills
         self.get_health_snapshot = get_health_snapshot
+        self.get_loop_lag_snapshot = get_loop_lag_snapshot
+        self.get_codex_scheduler_snapshot = get_codex_scheduler_snapshot
+        self.get_codex_backend_snapshot = get_codex_backend_snapshot
+        self.background_jobs = background_jobs
+        self.worktrees = worktrees
 
-    def try_handle(self, platform: str, chat_id, text: str) -> CommandResult:
+    def try_handle(
+        self, platform: str, chat_id, text: str, reply_target=None
+    ) -> CommandResult:
+        # reply_target：后台任务结果发往的会话，默认与 chat_id 相同（飞书按用户记历史、按会话发消息）。
         stripped = (text or "").strip()
         if not stripped.startswith("/"):
             return CommandResult(handled=False)
@@ -103,7 +148,9 @@ class CommandService:
         history_key = BridgeCore.build_history_key(platform, chat_id)
 
         try:
-            result = self._dispatch(command, args, history_key)
+            result = self._dispatch(
+                command, args, history_key, chat_id if reply_target is None else reply_target
+            )
         except Exception as exc:
             result = CommandResult(
                 handled=True,
@@ -129,7 +176,7 @@ class CommandService:
         args = parts[1] if len(parts) > 1 else ""
         return command, args
 
-    def _dispatch(self, command: str, args: str, history_key) -> CommandResult:
+    def _dispatch(self, command: str, args: str, history_key, reply_target) -> CommandResult:
         if command == "/new":
             self.chat_store.reset_chat(history_key)
             self.chat_reasoning_overrides.pop(history_key, None)
@@ -141,13 +188,19 @@ class CommandService:
         if command == "/setreasoning":
             return self._handle_setreasoning(history_key, args)
         if command == "/setproject":
-            return self._handle_setproject(args)
+            return self._handle_setproject(history_key, args)
         if command == "/models":
             return self._handle_models(args)
         if command == "/getproject":
-            return self._handle_getproject()
+            return self._handle_getproject(history_key)
         if command == "/history":
             return self._handle_history(history_key)
+        if command == "/bg":
+            return self._handle_bg(history_key, reply_target, args)
+        if command == "/jobs":
+            return self._handle_jobs(history_key)
+        if command == "/job":
+            return self._handle_job(history_key, args)
         return CommandResult(True, self._unknown_command_text(command), command)
 
     def _handle_skills(self) -> CommandResult:
@@ -173,6 +226,17 @@ class CommandService:
             health=self.get_health_snapshot(),
             reasoning_override=reasoning_override,
             effective_reasoning_effort=effective_effort,
+            loop_lag=(
+                self.get_loop_lag_snapshot() if self.get_loop_lag_snapshot else None
+            ),
+            codex_scheduler=(
+                self.get_codex_scheduler_snapshot()
+                if self.get_codex_scheduler_snapshot
+                else None
+            ),
+            codex_backend=(
+                self.get_codex_backend_snapshot() if self.get_codex_backend_snapshot else None
+            ),
         )
         return CommandResult(True, reply, "/status")
 
@@ -208,18 +272,29 @@ class CommandService:
         reply = f"已设置当前会话推理等级：{normalized}（并已写入 .env 作为全局默认）"
         return CommandResult(True, reply, command_text)
 
-    def _handle_setproject(self, args: str) -> CommandResult:
+    def _handle_setproject(self, history_key, args: str) -> CommandResult:
+        # 项目目录按会话设置，切换不会影响其他会话；全局默认目录仍来自 .env。
+        default_dir = self.project_service.project_dir
         if not args.strip():
             reply = (
-                f"当前项目目录：{self.project_service.project_dir}\n"
-                "用法：/setproject <目录路径>"
+                f"当前会话项目目录：{self.project_service.project_dir_for(history_key)}\n"
+                f"默认项目目录：{default_dir}\n"
+                "用法：/setproject <目录路径>，/setproject default 恢复默认目录"
             )
             return CommandResult(True, reply, "/setproject")
 
         command_text = f"/setproject {args}"
-        new_path, created, env_path = self.project_service.set_project_dir(args)
+        if args.strip().lower() == "default":
+            self.project_service.clear_chat_project_dir(history_key)
+            reply = f"当前会话已恢复默认项目目录：{default_dir}"
+            return CommandResult(True, reply, command_text)
+
+        new_path, created = self.project_service.set_chat_project_dir(history_key, args)
         action_text = "已创建并切换项目目录" if created else "已切换项目目录"
-        reply = f"{action_text}：{new_path}\n已同步写入：{env_path}"
+        reply = (
+            f"{action_text}：{new_path}\n"
+            "仅对当前会话生效；/setproject default 恢复默认目录。"
+        )
         return CommandResult(True, reply, command_text)
 
     def _handle_models(self, args: str) -> CommandResult:
@@ -254,13 +329,22 @@ class CommandService:
         reply = f"已设置模型：{selected}（并已写入 .env 作为全局默认）"
         return CommandResult(True, reply, command_text)
 
-    def _handle_getproject(self) -> CommandResult:
+    def _handle_getproject(self, history_key) -> CommandResult:
         env_value = self.project_service.read_env_project_dir() or "(未配置)"
+        project_dir = self.project_service.project_dir_for(history_key)
         reply = (
-            f"当前运行目录：{self.project_service.project_dir}\n"
+            f"当前运行目录：{project_dir}\n"
+            f"默认项目目录：{self.project_service.project_dir}\n"
             f".env 路径：{self.project_service.env_path}\n"
             f".env 中 CODEX_PROJECT_DIR：{env_value}"
         )
+        if self.worktrees is not None:
+            worktree = self.worktrees.peek(project_dir, history_key)
+            if worktree is None:
+                reply += "\n会话 worktree：项目目录不是 git 仓库，直接在项目目录中运行"
+            else:
+                suffix = "" if os.path.isdir(worktree) else "（首次运行时创建）"
+                reply += f"\n会话 worktree：{worktree}{suffix}"
         return CommandResult(True, reply, "/getproject")
 
     def _handle_history(self, history_key) -> CommandResult:
@@ -274,12 +358,53 @@ class CommandService:
         )
         return CommandResult(True, reply, "/history")
 
+    def _handle_bg(self, history_key, reply_target, args: str) -> CommandResult:
+        if self.background_jobs is None:
+            return CommandResult(True, "当前入口未启用后台任务。", "/bg", False)
+        prompt = args.strip()
+        if not prompt:
+            return CommandResult(
+                True, "用法：/bg <任务描述>\n任务在后台运行，完成后单独发消息通知。", "/bg", False
+            )
+        job = self.background_jobs.submit(
+            reply_target,
+            history_key,
+            prompt,
+            self.chat_reasoning_overrides.get(history_key),
+        )
+        reply = (
+            f"已创建后台任务 #{job.id}，完成后会单独发消息通知。\n"
+            f"期间可以继续对话；用 /jobs 查看全部任务，/job {job.id} 查看进度。"
+        )
+        return CommandResult(True, reply, f"/bg {prompt}", False)
+
+    def _handle_jobs(self, history_key) -> CommandResult:
+        if self.background_jobs is None:
+            return CommandResult(True, "当前入口未启用后台任务。", "/jobs", False)
+        jobs = self.background_jobs.list_jobs(history_key)
+        if not jobs:
+            return CommandResult(True, "当前会话没有后台任务。用法：/bg <任务描述>", "/jobs", False)
+        lines = ["后台任务："] + [render_job_line(job) for job in jobs]
+        return CommandResult(True, "\n".join(lines), "/jobs", False)
+
+    def _handle_job(self, history_key, args: str) -> CommandResult:
+        if self.background_jobs is None:
+            return CommandResult(True, "当前入口未启用后台任务。", "/job", False)
+        raw_id = args.strip().lstrip("#")
+        command_text = f"/job {args.strip()}".strip()
+        if not raw_id.isdigit():
+            return CommandResult(True, "用法：/job <任务编号>", command_text, False)
+        job = self.background_jobs.get(history_key, int(raw_id))
+        if job is None:
+            return CommandResult(True, f"未找到后台任务 #{raw_id}。", command_text, False)
+        return CommandResult(True, render_job_detail(job), command_text, False)
+
     @staticmethod
     def _unknown_command_text(command: str) -> str:
         return (
             f"未知命令：{command}\n"
             "支持的命令：/new、/skills、/status、/setproject、/setreasoning、"
-            "/models、/getproject、/history"
+            "/models、/getproject、/history、/bg、/jobs、/job"
         )
 
     def _update_config(self, current_config: AppConfig, next_config: AppConfig) -> None:
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPACT_EVERY = 200
+
+
+# 快照 + 追加日志的 JSON 持久化：每次变更只往 <path>.journal 追加一行 put/del 并 fsync，
+# 不再整份重写快照；日志累计 compact_every 行后把它改名为 <path>.journal.old，在后台线程里把
+# 当前状态写回 <path>，写完再删掉旧日志，整份重写因此不占事件循环。加载时依次重放快照、旧日志、
+# 日志；同一个 key 以最后一条记录为准，任何一步中途崩溃，重放结果都不变。
+# 不自带锁，由持有它的发件箱/收件箱在各自的锁里调用；追加只写一行加一次 fsync，在调用方线程里完成。
+class JsonJournal:
+    def __init__(
+        self,
+        path: Optional[str | Path],
+        key_field: str,
+        label: str,
+        compact_every: int = DEFAULT_COMPACT_EVERY,
+    ):
+        self.path = Path(path) if path else None
+        self.journal_path = self.path.with_name(self.path.name + ".journal") if self.path else None
+        self.rotated_path = (
+            self.path.with_name(self.path.name + ".journal.old") if self.path else None
+        )
+        self.key_field = key_field
+        self.label = label
+        self.compact_every = max(1, compact_every)
+        self._appended = 0
+        self._compaction: Optional[threading.Thread] = None
+
+    def load(self) -> list[dict]:
+        if self.path is None:
+            return []
+        items: dict[str, dict] = {}
+        if self.path.exists():
+            try:
+                payload = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError) as exc:
+                logger.warning("加载%s失败：%s (file=%s)", self.label, exc, self.path)
+                payload = None
+            entries = payload.get("entries") if isinstance(payload, dict) else None
+            for item in entries if isinstance(entries, list) else ():
+                if isinstance(item, dict) and self.key_field in item:
+                    items[str(item[self.key_field])] = item
+        self._appended = 0
+        intact = self._replay(items, self.rotated_path)
+        intact = self._replay(items, self.journal_path) and intact
+        if not intact or self.rotated_path.exists():
+            # 崩溃时只写了一半的最后一行没有换行符，先压缩掉，免得下一条追加接在它后面；
+            # 上次没做完的后台压缩也在这里补上。
+            self.compact(list(items.values()))
+        return list(items.values())
+
+    def _replay(self, items: dict[str, dict], path: Path) -> bool:
+        intact = True
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._appended += 1
+                    intact = self._apply(items, line) and intact
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            logger.warning("加载%s日志失败：%s (file=%s)", self.label, exc, path)
+        return intact
+
+    def _apply(self, items: dict[str, dict], line: str) -> bool:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            return False
+        if not isinstance(record, dict):
+            return True
+        item = record.get("item")
+        if record.get("op") == "put" and isinstance(item, dict) and self.key_field in item:
+            items[str(item[self.key_field])] = item
+        elif record.get("op") == "del":
+            items.pop(str(record.get("key")), None)
+        return True
+
+    def put(self, item: dict, snapshot: Callable[[], list[dict]]) -> None:
+        self._append({"op": "put", "item": item}, snapshot)
+
+    def delete(self, key: str, snapshot: Callable[[], list[dict]]) -> None:
+        self._append({"op": "del", "key": key}, snapshot)
+
+    def _append(self, record: dict, snapshot: Callable[[], list[dict]]) -> None:
+        # snapshot 返回已包含本次变更的完整状态，只在需要压缩时才调用。
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            created = not self.journal_path.exists()
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            if created:
+                _fsync_dir(self.path.parent)
+            self._appended += 1
+        except OSError as exc:
+            logger.warning("写入%s失败：%s (file=%s)", self.label, exc, self.journal_path)
+            return
+        if self._appended >= self.compact_every:
+            self._start_compaction(snapshot)
+
+    def _start_compaction(self, snapshot: Callable[[], list[dict]]) -> None:
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        # 上次后台压缩失败留下的旧日志还没并进快照时不能覆盖它，只重试写快照；
+        # 当前日志里的记录留着重放，结果不变。
+        if not self.rotated_path.exists():
+            try:
+                os.replace(self.journal_path, self.rotated_path)
+            except OSError as exc:
+                logger.warning("轮转%s日志失败：%s (file=%s)", self.label, exc, self.journal_path)
+                return
+        self._appended = 0
+        self._compaction = threading.Thread(
+            target=self._write_snapshot,
+            args=(snapshot(),),
+            name=f"journal-compact-{self.path.name}",
+            daemon=True,
+        )
+        self._compaction.start()
+
+    def _write_snapshot(self, items: list[dict]) -> None:
+        if self._replace_snapshot(items):
+            try:
+                self.rotated_path.unlink(missing_ok=True)
+            except OSError as exc:
+                logger.warning("删除%s旧日志失败：%s (file=%s)", self.label, exc, self.rotated_path)
+
+    def wait_compaction(self, timeout: Optional[float] = None) -> None:
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join(timeout)
+
+    def _replace_snapshot(self, items: list[dict]) -> bool:
+        payload = {"entries": items}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            # 改名落盘后才能删日志，否则断电时可能新快照没留下、日志却已经没了。
+            _fsync_dir(self.path.parent)
+            return True
+        except OSError as exc:
+            logger.warning("写入%s失败：%s (file=%s)", self.label, exc, self.path)
+            return False
+
+    def compact(self, items: list[dict]) -> bool:
+        # 同步压缩，只在加载时调用，此时还没有追加和后台压缩。
+        if self.path is None or not self._replace_snapshot(items):
+            return False
+        try:
+            with open(self.journal_path, "w", encoding="utf-8") as f:
+                os.fsync(f.fileno())
+            self.rotated_path.unlink(missing_ok=True)
+            self._appended = 0
+            return True
+        except OSError as exc:
+            logger.warning("写入%s失败：%s (file=%s)", self.label, exc, self.journal_path)
+            return False
+
+
+def _fsync_dir(path: Path) -> None:
+    # 让文件的创建/改名本身落盘；不支持打开目录的平台（Windows）跳过。
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
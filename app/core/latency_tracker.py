@@ -0,0 +1,179 @@
+import json
+import logging
+import math
+import os
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+from app.config.config import AppConfig, normalize_reasoning_effort
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_MAX_SAMPLES = 200
+DEFAULT_LATENCY_MIN_SAMPLES = 10
+DEFAULT_TIMEOUT_PERCENTILE = 95.0
+DEFAULT_TIMEOUT_MULTIPLIER = 2.0
+DEFAULT_TIMEOUT_FLOOR_SEC = 120.0
+# 按提示词字符数分桶：上下文越长，同样的模型/推理等级通常越慢。
+PROMPT_SIZE_BUCKETS = ((4_000, "s"), (16_000, "m"), (64_000, "l"))
+
+
+def prompt_size_bucket(prompt_chars: int) -> str:
+    for limit, name in PROMPT_SIZE_BUCKETS:
+        if prompt_chars < limit:
+            return name
+    return "xl"
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def render_eta_text(eta_sec: Optional[float]) -> str:
+    if not eta_sec:
+        return ""
+    if eta_sec < 90:
+        return f"通常约 {max(1, round(eta_sec))}s"
+    return f"通常约 {round(eta_sec / 60)} 分钟"
+
+
+# Codex 耗时统计：按 (模型, 推理等级, 提示词大小桶) 保留最近的成功运行耗时，落盘后重启可继续使用。
+# 开启 adaptive_timeouts 且样本足够时，单次超时取高分位耗时 × multiplier，夹在
+# [floor_sec, CODEX_TIMEOUT_SEC] 之间；默认关闭，长时间的 agent 任务不会被历史耗时提前掐断。
+# 中位数用作预览里的预计耗时。超时的运行按当次超时值记一笔，超时设得过紧时会逐步放宽。
+# 落盘在后台定时器线程里按 flush_interval_sec 合并进行，并发的 Codex 运行不用互相等写盘；退出时调用 flush。
+class LatencyTracker:
+    def __init__(
+        self,
+        path: str = "",
+        adaptive_timeouts: bool = False,
+        percentile: float = DEFAULT_TIMEOUT_PERCENTILE,
+        multiplier: float = DEFAULT_TIMEOUT_MULTIPLIER,
+        floor_sec: float = DEFAULT_TIMEOUT_FLOOR_SEC,
+        min_samples: int = DEFAULT_LATENCY_MIN_SAMPLES,
+        max_samples: int = DEFAULT_LATENCY_MAX_SAMPLES,
+        flush_interval_sec: float = 1.0,
+    ):
+        self.path = path
+        self.adaptive_timeouts = adaptive_timeouts
+        self.percentile = min(100.0, max(1.0, percentile))
+        self.multiplier = multiplier
+        self.floor_sec = floor_sec
+        self.min_samples = max(1, min_samples)
+        self.max_samples = max(self.min_samples, max_samples)
+        self.flush_interval_sec = flush_interval_sec
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+
+    @staticmethod
+    def key_for(model: str, reasoning_effort: str, prompt_chars: int) -> str:
+        return "|".join(
+            (model or "default", reasoning_effort or "default", prompt_size_bucket(prompt_chars))
+        )
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as exc:
+            logger.warning("加载 Codex 耗时统计失败：%s (file=%s)", exc, self.path)
+            return
+        if not isinstance(data, dict):
+            return
+        with self._lock:
+            for key, values in data.items():
+                if not isinstance(key, str) or not isinstance(values, list):
+                    continue
+                samples = [float(v) for v in values if isinstance(v, (int, float)) and v > 0]
+                self._samples[key] = deque(samples[-self.max_samples :], maxlen=self.max_samples)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            self._dirty = False
+            data = {key: list(samples) for key, samples in self._samples.items()}
+        tmp_path = f"{self.path}.tmp"
+        with self._save_lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except Exception as exc:
+                logger.warning("保存 Codex 耗时统计失败：%s (file=%s)", exc, self.path)
+                # 写盘失败时保留脏标记，下一次记录或退出时再试。
+                with self._lock:
+                    self._dirty = True
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            dirty = self._dirty
+        if dirty:
+            self.save()
+
+    def _flush_from_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.save()
+
+    def _schedule_save_locked(self) -> None:
+        self._dirty = True
+        if not self.path or self._timer is not None:
+            return
+        self._timer = threading.Timer(self.flush_interval_sec, self._flush_from_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def record(self, key: str, duration_sec: float) -> None:
+        if duration_sec <= 0:
+            return
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = deque(maxlen=self.max_samples)
+                self._samples[key] = samples
+            samples.append(round(duration_sec, 2))
+            self._schedule_save_locked()
+
+    def _values(self, key: str) -> list[float]:
+        with self._lock:
+            return list(self._samples.get(key) or ())
+
+    def timeout_for(self, key: str, ceiling_sec: int) -> int:
+        # 样本不足或关闭自适应时沿用全局 CODEX_TIMEOUT_SEC。
+        values = self._values(key)
+        if not self.adaptive_timeouts or len(values) < self.min_samples:
+            return ceiling_sec
+        target = _percentile(values, self.percentile) * self.multiplier
+        return int(min(ceiling_sec, max(self.floor_sec, math.ceil(target))))
+
+    def typical_sec(self, key: str) -> Optional[float]:
+        values = self._values(key)
+        if len(values) < self.min_samples:
+            return None
+        return _percentile(values, 50)
+
+
+def build_eta_estimator(
+    tracker: "LatencyTracker", config_getter: Callable[[], AppConfig]
+) -> Callable[[str, Optional[str]], Optional[float]]:
+    # 给 BridgeCore 用的 (prompt, reasoning_effort) -> 预计耗时，推理等级解析方式与 ask_codex_with_meta 一致。
+    def estimate(prompt: str, reasoning_effort: Optional[str]) -> Optional[float]:
+        config = config_getter()
+        effort = normalize_reasoning_effort(
+            reasoning_effort if reasoning_effort is not None else config.codex_reasoning_effort
+        )
+        return tracker.typical_sec(tracker.key_for(config.codex_model, effort, len(prompt)))
+
+    return estimate
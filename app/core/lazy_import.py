@@ -0,0 +1,28 @@
+import importlib
+from types import ModuleType
+from typing import Optional
+
+
+# 首次访问属性时才真正导入模块，避免启动阶段加载 lark_oapi 等重量级依赖。
+class LazyModule:
+    def __init__(self, module_name: str):
+        self._module_name = module_name
+        self._module: Optional[ModuleType] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._module is not None
+
+    def load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self._module_name)
+        return self._module
+
+    def __getattr__(self, name: str):
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<LazyModule {self._module_name} ({state})>"
@@ -0,0 +1,177 @@
+import asyncio
+import bisect
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Callable, Optional
+
+LAG_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+def _bucket_label(index: int) -> str:
+    if index < len(LAG_BUCKETS_MS):
+        return f"<={LAG_BUCKETS_MS[index]}ms"
+    return f">{LAG_BUCKETS_MS[-1]}ms"
+
+
+# 周期性 sleep 测量事件循环调度延迟；另起看门狗线程，在循环卡住时抓取事件循环线程的栈，
+# 用来定位热路径上的同步阻塞调用（同步写盘、读 .env、日志等）。
+class LoopLagMonitor:
+    def __init__(
+        self,
+        logger: logging.Logger,
+        interval_sec: float = 0.5,
+        stall_threshold_sec: float = 0.25,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.logger = logger
+        self.interval_sec = interval_sec
+        self.stall_threshold_sec = stall_threshold_sec
+        self.clock = clock
+        self.histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.samples = 0
+        self.max_lag_sec = 0.0
+        self.stalls = 0
+        self.last_stall_sec = 0.0
+        self.last_stall_stack = ""
+        self.last_stall_where = ""
+        self._lock = threading.Lock()
+        self._heartbeat = clock()
+        self._tick = 0
+        self._captured_tick = -1
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def record_lag(self, lag_sec: float) -> None:
+        lag_sec = max(0.0, lag_sec)
+        index = bisect.bisect_left(LAG_BUCKETS_MS, lag_sec * 1000)
+        with self._lock:
+            self.histogram[index] += 1
+            self.samples += 1
+            self.max_lag_sec = max(self.max_lag_sec, lag_sec)
+            if lag_sec < self.stall_threshold_sec:
+                return
+            self.stalls += 1
+            self.last_stall_sec = lag_sec
+            stack = self.last_stall_stack if self._captured_tick == self._tick else ""
+        if stack:
+            self.logger.warning(
+                "事件循环调度延迟 %.0fms，阻塞位置：\n%s", lag_sec * 1000, stack
+            )
+        else:
+            self.logger.warning("事件循环调度延迟 %.0fms。", lag_sec * 1000)
+
+    def capture_if_stalled(self) -> bool:
+        loop_thread_id = self._loop_thread_id
+        if loop_thread_id is None:
+            return False
+        with self._lock:
+            stalled_for = self.clock() - self._heartbeat
+            if stalled_for < self.stall_threshold_sec or self._captured_tick == self._tick:
+                return False
+            self._captured_tick = self._tick
+        frame = sys._current_frames().get(loop_thread_id)
+        if frame is None:
+            return False
+        summary = traceback.extract_stack(frame)
+        where = ""
+        if summary:
+            innermost = summary[-1]
+            where = f"{innermost.filename}:{innermost.lineno} in {innermost.name}"
+        with self._lock:
+            self.last_stall_stack = "".join(summary.format())
+            self.last_stall_where = where
+        return True
+
+    def _beat(self) -> None:
+        with self._lock:
+            self._heartbeat = self.clock()
+            self._tick += 1
+
+    async def run(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._beat()
+        try:
+            while True:
+                expected = self.clock() + self.interval_sec
+                await asyncio.sleep(self.interval_sec)
+                lag = self.clock() - expected
+                self.record_lag(lag)
+                self._beat()
+        except asyncio.CancelledError:
+            self.logger.info("loop_lag_monitor 已停止。")
+            raise
+
+    def _watchdog_main(self) -> None:
+        poll_sec = max(0.01, min(self.interval_sec, self.stall_threshold_sec) / 2)
+        while not self._stop_event.wait(poll_sec):
+            try:
+                self.capture_if_stalled()
+            except Exception:
+                self.logger.exception("loop_lag_monitor 看门狗抓栈失败")
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> asyncio.Task:
+        if self._task is not None and not self._task.done():
+            return self._task
+        loop = loop or asyncio.get_running_loop()
+        self._stop_event.clear()
+        self._task = loop.create_task(self.run(), name="loop_lag_monitor")
+        if self._watchdog_thread is None or not self._watchdog_thread.is_alive():
+            self._watchdog_thread = threading.Thread(
+                target=self._watchdog_main, name="loop-lag-watchdog", daemon=True
+            )
+            self._watchdog_thread.start()
+        return self._task
+
+    async def stop(self) -> None:
+        self._stop_event.set()
+        task = self._task
+        self._task = None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        thread = self._watchdog_thread
+        self._watchdog_thread = None
+        if thread is not None:
+            thread.join(timeout=1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            histogram = {
+                _bucket_label(index): count
+                for index, count in enumerate(self.histogram)
+                if count
+            }
+            return {
+                "samples": self.samples,
+                "max_lag_ms": round(self.max_lag_sec * 1000, 1),
+                "stall_threshold_ms": round(self.stall_threshold_sec * 1000, 1),
+                "stalls": self.stalls,
+                "last_stall_ms": round(self.last_stall_sec * 1000, 1),
+                "last_stall_where": self.last_stall_where,
+                "histogram": histogram,
+            }
+
+
+def render_loop_lag_text(snapshot: dict) -> str:
+    histogram = snapshot.get("histogram") or {}
+    histogram_text = "，".join(f"{label}:{count}" for label, count in histogram.items())
+    lines = [
+        "事件循环延迟：",
+        f"- 采样={snapshot.get('samples', 0)}，最大={snapshot.get('max_lag_ms', 0)}ms，"
+        f"超过 {snapshot.get('stall_threshold_ms', 0)}ms 的次数={snapshot.get('stalls', 0)}",
+        f"- 分布：{histogram_text or '(无)'}",
+    ]
+    if snapshot.get("stalls"):
+        lines.append(
+            f"- 最近一次阻塞：{snapshot.get('last_stall_ms', 0)}ms "
+            f"{snapshot.get('last_stall_where') or '(未抓到栈)'}"
+        )
+    return "\n".join(lines)
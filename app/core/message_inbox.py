@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from app.core.json_journal import JsonJournal
+from app.core.platform_messages import ChatKey
+
+logger = logging.getLogger(__name__)
+
+INBOX_QUEUED = "queued"
+INBOX_RUNNING = "running"
+DEFAULT_INBOX_RECOVERY_WINDOW_SEC = 900.0
+DEFAULT_INBOX_MAX_ATTEMPTS = 2
+
+
+@dataclass
+class InboxEntry:
+    key: str
+    platform: str
+    chat_id: ChatKey
+    text: str
+    payload: dict = field(default_factory=dict)
+    state: str = INBOX_QUEUED
+    accepted_at: float = 0.0
+    attempts: int = 0
+
+    @staticmethod
+    def from_dict(payload: dict) -> Optional["InboxEntry"]:
+        try:
+            return InboxEntry(
+                key=str(payload["key"]),
+                platform=str(payload["platform"]),
+                chat_id=payload["chat_id"],
+                text=str(payload.get("text") or ""),
+                payload=dict(payload.get("payload") or {}),
+                state=str(payload.get("state") or INBOX_QUEUED),
+                accepted_at=float(payload.get("accepted_at") or 0.0),
+                attempts=int(payload.get("attempts") or 0),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+
+def render_inbox_expired_notice(entry: InboxEntry, max_chars: int = 200) -> str:
+    excerpt = entry.text if len(entry.text) <= max_chars else entry.text[:max_chars] + "..."
+    return f"机器人重启前这条消息没有处理完，请重新发送：\n{excerpt}"
+
+
+# 已接收消息的持久化收件箱：平台确认收到（推进 update 水位 / 记录事件去重）的同时写入，
+# 处理完成才移除。进程中途崩溃后，启动时把恢复窗口内的消息重新排队，过旧或反复失败的
+# 通知用户重发，避免消息被静默吞掉。变更以追加日志的方式落盘，不在事件循环上重写整个文件。
+class MessageInbox:
+    def __init__(
+        self,
+        path: Optional[str | Path] = None,
+        recovery_window_sec: float = DEFAULT_INBOX_RECOVERY_WINDOW_SEC,
+        max_attempts: int = DEFAULT_INBOX_MAX_ATTEMPTS,
+    ):
+        self.path = Path(path) if path else None
+        self.recovery_window_sec = recovery_window_sec
+        self.max_attempts = max(1, max_attempts)
+        self._entries: dict[str, InboxEntry] = {}
+        # 上个进程遗留的条目，只有它们参与启动恢复，本进程新收的消息不会被重复调度。
+        self._recoverable: set[str] = set()
+        self._lock = threading.Lock()
+        self._journal = JsonJournal(self.path, key_field="key", label="收件箱")
+
+    def load(self) -> None:
+        items = self._journal.load()
+        with self._lock:
+            self._entries.clear()
+            for item in items:
+                entry = InboxEntry.from_dict(item)
+                if entry is not None:
+                    self._entries[entry.key] = entry
+            self._recoverable = set(self._entries)
+
+    def _snapshot_locked(self) -> list[dict]:
+        return [asdict(entry) for entry in self._entries.values()]
+
+    def _put_locked(self, entry: InboxEntry) -> None:
+        self._journal.put(asdict(entry), self._snapshot_locked)
+
+    def _delete_locked(self, key: str) -> None:
+        self._journal.delete(key, self._snapshot_locked)
+
+    def accept(
+        self, platform: str, key: str, chat_id: ChatKey, text: str, payload: dict
+    ) -> InboxEntry:
+        # 幂等：恢复重放的消息再次到达时沿用原条目，尝试次数继续累计。
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                return existing
+            entry = InboxEntry(
+                key=key,
+                platform=platform,
+                chat_id=chat_id,
+                text=text,
+                payload=payload,
+                accepted_at=time.time(),
+            )
+            self._entries[key] = entry
+            self._put_locked(entry)
+            return entry
+
+    def mark_running(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.state = INBOX_RUNNING
+            entry.attempts += 1
+            self._put_locked(entry)
+
+    def finish(self, key: str) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is None:
+                return
+            self._recoverable.discard(key)
+            self._delete_locked(key)
+
+    async def run(self, key: str, job: Callable[[], Awaitable[None]]) -> None:
+        # 正常结束或出错（已告知用户）都算处理完；被取消说明进程在排空/退出，留给下次恢复。
+        self.mark_running(key)
+        cancelled = False
+        try:
+            await job()
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            if not cancelled:
+                self.finish(key)
+
+    def recover(
+        self, platform: str, now: Optional[float] = None
+    ) -> tuple[list[InboxEntry], list[InboxEntry]]:
+        # 返回 (重新排队的, 需要通知用户重发的)；后者直接移出收件箱。
+        now = time.time() if now is None else now
+        retry: list[InboxEntry] = []
+        expired: list[InboxEntry] = []
+        with self._lock:
+            for key in list(self._recoverable):
+                entry = self._entries.get(key)
+                if entry is None or entry.platform != platform:
+                    continue
+                self._recoverable.discard(key)
+                if (
+                    now - entry.accepted_at > self.recovery_window_sec
+                    or entry.attempts >= self.max_attempts
+                ):
+                    self._entries.pop(key)
+                    self._delete_locked(key)
+                    expired.append(entry)
+                    continue
+                entry.state = INBOX_QUEUED
+                self._put_locked(entry)
+                retry.append(entry)
+        retry.sort(key=lambda entry: entry.accepted_at)
+        expired.sort(key=lambda entry: entry.accepted_at)
+        return retry, expired
+
+    def pending_count(self, platform: Optional[str] = None) -> int:
+        with self._lock:
+            return sum(
+                1
+                for entry in self._entries.values()
+                if platform is None or entry.platform == platform
+            )
@@ -0,0 +1,97 @@
+import threading
+from collections import deque
+from typing import Optional
+
+# (name, ((label, value), ...))
+MetricKey = tuple[str, tuple[tuple[str, str], ...]]
+
+
+def _key(name: str, labels: dict) -> MetricKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def format_metric_key(key: MetricKey) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+# 进程内的指标注册表：计数器、瞬时值与耗时分布，跨线程安全。
+# 多平台同进程运行时共用一份，/status 和基准脚本都从这里读数。
+class MetricsRegistry:
+    def __init__(self, sample_size: int = 512):
+        self.sample_size = max(1, sample_size)
+        self._counters: dict[MetricKey, float] = {}
+        self._gauges: dict[MetricKey, float] = {}
+        self._samples: dict[MetricKey, deque] = {}
+        self._totals: dict[MetricKey, tuple[int, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def add_gauge(self, name: str, delta: float, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0.0) + delta
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = deque(maxlen=self.sample_size)
+                self._samples[key] = samples
+            samples.append(value)
+            count, total, peak = self._totals.get(key, (0, 0.0, 0.0))
+            self._totals[key] = (count + 1, total + value, max(peak, value))
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0.0)
+
+    def gauge(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._gauges.get(_key(name, labels), 0.0)
+
+    def summary(self, name: str, **labels) -> Optional[dict]:
+        key = _key(name, labels)
+        with self._lock:
+            return self._summary_locked(key)
+
+    def _summary_locked(self, key: MetricKey) -> Optional[dict]:
+        if key not in self._totals:
+            return None
+        count, total, peak = self._totals[key]
+        ordered = sorted(self._samples[key])
+        return {
+            "count": count,
+            "mean": total / count if count else 0.0,
+            "max": peak,
+            "p50": _percentile(ordered, 50),
+            "p95": _percentile(ordered, 95),
+        }
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": {format_metric_key(k): v for k, v in self._counters.items()},
+                "gauges": {format_metric_key(k): v for k, v in self._gauges.items()},
+                "summaries": {
+                    format_metric_key(k): self._summary_locked(k) for k in self._totals
+                },
+            }
@@ -1,6 +1,7 @@
 import json
 import os
 from dataclasses import dataclass
+from typing import Optional
 
 
 REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
@@ -45,3 +46,21 @@ def load_platform_registry(
             supports_commands=bool(item.get("supports_commands", False)),
         )
     return registry
+
+
+def select_enabled_platforms(
+    registry: dict[str, PlatformDefinition],
+    environ: Optional[dict] = None,
+) -> list[str]:
+    # 凭据齐全的平台才启用；BOT_PLATFORMS 可以再收窄范围。
+    environ = os.environ if environ is None else environ
+    wanted_raw = (environ.get("BOT_PLATFORMS") or "").strip()
+    wanted = {item.strip().lower() for item in wanted_raw.split(",") if item.strip()}
+    enabled = []
+    for platform_id, definition in registry.items():
+        if wanted and platform_id not in wanted:
+            continue
+        if not all((environ.get(key) or "").strip() for key in definition.required_env_keys):
+            continue
+        enabled.append(platform_id)
+    return enabled
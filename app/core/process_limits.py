@@ -0,0 +1,193 @@
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import uuid
+from typing import Optional
+
+from app.config.config import ProcessLimits
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - 非 Unix 平台
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_IONICE_CLASS_IDS = {"best-effort": "2", "idle": "3"}
+_warned: set[str] = set()
+
+
+def _warn_once(key: str, message: str, *args) -> None:
+    if key in _warned:
+        return
+    _warned.add(key)
+    logger.warning(message, *args)
+
+
+def build_command_prefix(limits: ProcessLimits) -> list[str]:
+    # ionice 没有 Python 接口，借用 util-linux 的 ionice 命令包一层；不可用时跳过。
+    if not limits.ionice_class:
+        return []
+    ionice = shutil.which("ionice")
+    if not ionice:
+        _warn_once("ionice", "未找到 ionice 命令，忽略 CODEX_IONICE。")
+        return []
+    prefix = [ionice, "-c", _IONICE_CLASS_IDS[limits.ionice_class]]
+    if limits.ionice_class == "best-effort":
+        prefix += ["-n", str(limits.ionice_level)]
+    return prefix
+
+
+# 每次运行一个 cgroup v2 子组：内存上限写 memory.max，结束后读取整组（含孙进程）的峰值内存与 CPU 时间。
+# CODEX_CGROUP_DIR 需指向一个已委派给当前用户、开启了 memory/cpu 控制器的 cgroup 目录。
+class CgroupRun:
+    def __init__(self, parent_dir: str, max_memory_mb: int = 0):
+        self.path = os.path.join(parent_dir, f"codex-{uuid.uuid4().hex[:12]}")
+        os.mkdir(self.path)
+        if max_memory_mb:
+            try:
+                self._write("memory.max", str(max_memory_mb * 1024 * 1024))
+            except OSError as exc:
+                _warn_once("cgroup-memory", "设置 cgroup memory.max 失败：%s", exc)
+
+    @classmethod
+    def create(cls, limits: ProcessLimits) -> Optional["CgroupRun"]:
+        if not limits.cgroup_dir or not sys.platform.startswith("linux"):
+            return None
+        if not os.path.exists(os.path.join(limits.cgroup_dir, "cgroup.controllers")):
+            _warn_once("cgroup-dir", "CODEX_CGROUP_DIR 不是 cgroup v2 目录，忽略：%s", limits.cgroup_dir)
+            return None
+        try:
+            return cls(limits.cgroup_dir, limits.max_memory_mb)
+        except OSError as exc:
+            _warn_once("cgroup-create", "创建 cgroup 失败，忽略 CODEX_CGROUP_DIR：%s", exc)
+            return None
+
+    @property
+    def procs_path(self) -> str:
+        return os.path.join(self.path, "cgroup.procs")
+
+    def _write(self, name: str, value: str) -> None:
+        with open(os.path.join(self.path, name), "w", encoding="ascii") as f:
+            f.write(value)
+
+    def _read(self, name: str) -> str:
+        try:
+            with open(os.path.join(self.path, name), "r", encoding="ascii") as f:
+                return f.read()
+        except OSError:
+            return ""
+
+    def usage(self) -> dict:
+        usage: dict = {}
+        peak = self._read("memory.peak").strip()
+        if peak.isdigit():
+            usage["peak_rss_mb"] = round(int(peak) / (1024 * 1024), 1)
+        for line in self._read("cpu.stat").splitlines():
+            key, _, value = line.partition(" ")
+            if key == "usage_usec" and value.strip().isdigit():
+                usage["cpu_sec"] = round(int(value) / 1_000_000, 2)
+        return usage
+
+    def kill(self) -> None:
+        # 超时时连同 Codex 派生的子孙进程一起结束（cgroup.kill 需要 5.14+ 内核）。
+        try:
+            self._write("cgroup.kill", "1")
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        try:
+            os.rmdir(self.path)
+        except OSError:
+            # 还有残留进程时目录删不掉，留给下次手动清理。
+            pass
+
+
+def apply_process_limits(
+    pid: int, limits: ProcessLimits, cgroup: Optional[CgroupRun] = None
+) -> None:
+    # 在父进程里对刚启动的子进程设置限制，不用 preexec_fn：多线程进程里在 fork 与 exec 之间
+    # 执行 Python 代码可能死锁。Popen 返回时子进程刚 exec，还没来得及派生孙进程，之后派生的都会继承。
+    if cgroup is not None:
+        try:
+            with open(cgroup.procs_path, "w", encoding="ascii") as f:
+                f.write(str(pid))
+        except OSError as exc:
+            _warn_once("cgroup-procs", "把 Codex 进程加入 cgroup 失败：%s", exc)
+    if limits.nice:
+        try:
+            current = os.getpriority(os.PRIO_PROCESS, pid)
+            os.setpriority(os.PRIO_PROCESS, pid, min(19, current + limits.nice))
+        except OSError as exc:
+            _warn_once("nice", "设置 Codex 进程优先级失败：%s", exc)
+    # 放进了 cgroup 时内存由 memory.max 限制，RLIMIT_AS 对预留大量虚拟内存的运行时过于严格。
+    memory_bytes = limits.max_memory_mb * 1024 * 1024 if cgroup is None else 0
+    rlimits = []
+    if memory_bytes:
+        rlimits.append(("RLIMIT_AS", (memory_bytes, memory_bytes)))
+    if limits.max_cpu_sec:
+        # 软限制到点发 SIGXCPU，留几秒余量再由硬限制强杀。
+        rlimits.append(("RLIMIT_CPU", (limits.max_cpu_sec, limits.max_cpu_sec + 5)))
+    if not rlimits:
+        return
+    if resource is None or not hasattr(resource, "prlimit"):
+        _warn_once("prlimit", "当前平台不支持 prlimit，忽略 CODEX_MAX_MEMORY_MB/CODEX_MAX_CPU_SEC。")
+        return
+    for name, values in rlimits:
+        try:
+            resource.prlimit(pid, getattr(resource, name), values)
+        except (OSError, ValueError) as exc:
+            _warn_once(f"prlimit-{name}", "设置 Codex 进程 %s 失败：%s", name, exc)
+
+
+# Codex 以独立会话（进程组）启动，超时/取消时 killpg 连同它派生的构建、测试进程一起结束。
+# 回收与强杀互斥：先用 waitid(WNOWAIT) 等子进程退出但不回收，再在锁里 wait4 回收；
+# 强杀在同一把锁里检查是否已回收，避免定时器在 pid 被复用之后误杀别的进程组。
+class ProcessGroupReaper:
+    def __init__(self, process: subprocess.Popen, cgroup: Optional[CgroupRun] = None):
+        self.process = process
+        self.cgroup = cgroup
+        self._lock = threading.Lock()
+        self._reaped = False
+
+    def kill(self) -> None:
+        with self._lock:
+            if self._reaped:
+                return
+            if self.cgroup is not None:
+                self.cgroup.kill()
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    def wait(self) -> tuple[int, dict]:
+        # 回收子进程，同时用 wait4 拿到这一次运行的峰值内存和 CPU 时间。
+        pid = self.process.pid
+        if not hasattr(os, "waitid"):
+            return self._reap(pid)
+        try:
+            os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+        except ChildProcessError:
+            pass
+        with self._lock:
+            return self._reap(pid)
+
+    def _reap(self, pid: int) -> tuple[int, dict]:
+        self._reaped = True
+        try:
+            _pid, status, rusage = os.wait4(pid, 0)
+        except ChildProcessError:
+            return self.process.wait(), {}
+        self.process.returncode = os.waitstatus_to_exitcode(status)
+        # Linux 上 ru_maxrss 单位是 KB，macOS 上是字节。
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return self.process.returncode, {
+            "peak_rss_mb": round(rusage.ru_maxrss / divisor, 1),
+            "cpu_sec": round(rusage.ru_utime + rusage.ru_stime, 2),
+        }
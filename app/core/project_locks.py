@@ -0,0 +1,161 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from app.core.metrics import MetricsRegistry
+
+DEFAULT_LOCK_NOTIFY_INTERVAL_SEC = 2.0
+
+# (已等待秒数) -> None：排队期间周期性回调，用于在预览里展示等待时间。
+LockWaitCallback = Callable[[float], Awaitable[None]]
+
+
+def normalize_project_dir(project_dir: str) -> str:
+    return os.path.realpath(os.path.expanduser(project_dir or "."))
+
+
+def render_project_lock_wait(project_dir: str, waited_sec: float) -> str:
+    return f"项目目录正被其他任务使用，排队等待中（已等待 {waited_sec:.0f}s）：{project_dir}"
+
+
+@dataclass
+class _Waiter:
+    shared: bool
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future
+    granted: bool = False
+
+
+@dataclass
+class _DirLockState:
+    readers: int = 0
+    writer: bool = False
+    waiters: deque = field(default_factory=deque)
+
+    def can_grant(self, shared: bool) -> bool:
+        if self.writer:
+            return False
+        return shared or self.readers == 0
+
+    def take(self, shared: bool) -> None:
+        if shared:
+            self.readers += 1
+        else:
+            self.writer = True
+
+    @property
+    def idle(self) -> bool:
+        return not self.writer and self.readers == 0 and not self.waiters
+
+
+# 项目目录锁：按解析后的真实路径加读写锁，同一目录上的 Codex 运行串行执行，
+# 只读运行（sandbox=read-only）可按配置共享；不同目录互不影响，可以并行。
+# 排队按先来后到，等待者在各自的事件循环里被唤醒，多平台、多线程共用一个实例也安全。
+class ProjectLockManager:
+    def __init__(
+        self,
+        allow_shared_reads: bool = True,
+        metrics: Optional[MetricsRegistry] = None,
+        notify_interval_sec: float = DEFAULT_LOCK_NOTIFY_INTERVAL_SEC,
+    ):
+        self.allow_shared_reads = allow_shared_reads
+        self.metrics = metrics or MetricsRegistry()
+        self.notify_interval_sec = max(0.1, notify_interval_sec)
+        self._states: dict[str, _DirLockState] = {}
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def hold(
+        self,
+        project_dir: str,
+        read_only: bool = False,
+        on_wait: Optional[LockWaitCallback] = None,
+    ) -> AsyncIterator[float]:
+        # 产出本次排队等待的秒数，调用方据此提示用户或记录日志。
+        key = normalize_project_dir(project_dir)
+        shared = read_only and self.allow_shared_reads
+        waited_sec = await self._acquire(key, shared, on_wait)
+        self.metrics.observe(
+            "project_lock_wait_sec", waited_sec, mode="read" if shared else "write"
+        )
+        try:
+            yield waited_sec
+        finally:
+            self._release(key, shared)
+
+    async def _acquire(
+        self, key: str, shared: bool, on_wait: Optional[LockWaitCallback]
+    ) -> float:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._states.setdefault(key, _DirLockState())
+            if not state.waiters and state.can_grant(shared):
+                state.take(shared)
+                return 0.0
+            waiter = _Waiter(shared, loop, loop.create_future())
+            state.waiters.append(waiter)
+        started_at = time.monotonic()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(
+                        asyncio.shield(waiter.future), self.notify_interval_sec
+                    )
+                    break
+                except asyncio.TimeoutError:
+                    if on_wait is not None:
+                        await on_wait(time.monotonic() - started_at)
+        except BaseException:
+            # 取消或回调出错：还在排队就出队，已经拿到锁就立即归还。
+            with self._lock:
+                if waiter.granted:
+                    self._release_locked(key, shared)
+                else:
+                    state.waiters.remove(waiter)
+                    self._wake_locked(key, state)
+            raise
+        return time.monotonic() - started_at
+
+    def _release(self, key: str, shared: bool) -> None:
+        with self._lock:
+            self._release_locked(key, shared)
+
+    def _release_locked(self, key: str, shared: bool) -> None:
+        state = self._states.get(key)
+        if state is None:
+            return
+        if shared:
+            state.readers = max(0, state.readers - 1)
+        else:
+            state.writer = False
+        self._wake_locked(key, state)
+
+    def _wake_locked(self, key: str, state: _DirLockState) -> None:
+        while state.waiters and state.can_grant(state.waiters[0].shared):
+            waiter = state.waiters.popleft()
+            state.take(waiter.shared)
+            waiter.granted = True
+            waiter.loop.call_soon_threadsafe(_resolve_waiter, waiter.future)
+        if state.idle:
+            self._states.pop(key, None)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                key: {
+                    "readers": state.readers,
+                    "writer": state.writer,
+                    "waiting": len(state.waiters),
+                }
+                for key, state in self._states.items()
+            }
+
+
+def _resolve_waiter(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Optional
+
+from app.core.json_journal import JsonJournal
+from app.core.platform_messages import ChatKey, OutboundPart, PlatformOutboundMessage
+
+logger = logging.getLogger(__name__)
+
+_PART_FIELDS = {item.name for item in fields(OutboundPart)}
+
+
+@dataclass
+class OutboxEntry:
+    id: str
+    platform: str
+    chat_id: ChatKey
+    history_key: ChatKey
+    parts: list[dict]
+    delivered: set[int] = field(default_factory=set)
+    created_at: float = 0.0
+    attempts: int = 0
+    last_error: str = ""
+    # 产生这条答复的收件箱条目；有它在就说明 Codex 已经跑完，重放时只需补发。
+    source_key: str = ""
+
+    @property
+    def done(self) -> bool:
+        return len(self.delivered) >= len(self.parts)
+
+    def to_outbound(self) -> PlatformOutboundMessage:
+        parts = tuple(
+            OutboundPart(**{k: v for k, v in part.items() if k in _PART_FIELDS})
+            for part in self.parts
+        )
+        return PlatformOutboundMessage(parts=parts, meta={}, history_key=self.history_key)
+
+    def to_dict(self) -> dict:
+        payload = asdict(self)
+        payload["delivered"] = sorted(self.delivered)
+        return payload
+
+    @staticmethod
+    def from_dict(payload: dict) -> Optional["OutboxEntry"]:
+        try:
+            parts = [part for part in payload["parts"] if isinstance(part, dict)]
+            return OutboxEntry(
+                id=str(payload["id"]),
+                platform=str(payload["platform"]),
+                chat_id=payload["chat_id"],
+                history_key=payload.get("history_key", payload["chat_id"]),
+                parts=parts,
+                delivered={int(i) for i in payload.get("delivered") or ()},
+                created_at=float(payload.get("created_at") or 0.0),
+                attempts=int(payload.get("attempts") or 0),
+                last_error=str(payload.get("last_error") or ""),
+                source_key=str(payload.get("source_key") or ""),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+
+# 已生成答复的持久化发件箱：发送前先落盘，每发出一个部分就标记一次；
+# 进程崩溃或网络中断后，未送达的部分在启动/网络恢复时补发，不必重新跑 Codex。
+# 变更以追加日志的方式落盘，事件循环上的每次标记只写一行，不重写整个文件。
+class ReplyOutbox:
+    def __init__(
+        self,
+        path: Optional[str | Path] = None,
+        max_age_sec: float = 24 * 3600.0,
+        max_attempts: int = 10,
+    ):
+        self.path = Path(path) if path else None
+        self.max_age_sec = max_age_sec
+        self.max_attempts = max(1, max_attempts)
+        self._entries: dict[str, OutboxEntry] = {}
+        self._claimed: set[str] = set()
+        self._lock = threading.Lock()
+        self._journal = JsonJournal(self.path, key_field="id", label="发件箱")
+
+    def load(self) -> None:
+        items = self._journal.load()
+        with self._lock:
+            self._entries.clear()
+            for item in items:
+                entry = OutboxEntry.from_dict(item)
+                if entry is not None and not entry.done:
+                    self._entries[entry.id] = entry
+
+    def _snapshot_locked(self) -> list[dict]:
+        return [entry.to_dict() for entry in self._entries.values()]
+
+    def _put_locked(self, entry: OutboxEntry) -> None:
+        self._journal.put(entry.to_dict(), self._snapshot_locked)
+
+    def _delete_locked(self, entry_id: str) -> None:
+        self._journal.delete(entry_id, self._snapshot_locked)
+
+    def enqueue(
+        self,
+        platform: str,
+        chat_id: ChatKey,
+        outbound: PlatformOutboundMessage,
+        source_key: str = "",
+    ) -> OutboxEntry:
+        # 新入箱的条目由调用方直接发送，先标记为占用，避免补发流程同时再发一遍。
+        entry = OutboxEntry(
+            id=uuid.uuid4().hex,
+            platform=platform,
+            chat_id=chat_id,
+            history_key=outbound.history_key,
+            parts=[asdict(part) for part in outbound.parts],
+            created_at=time.time(),
+            source_key=source_key,
+        )
+        with self._lock:
+            self._entries[entry.id] = entry
+            self._claimed.add(entry.id)
+            self._put_locked(entry)
+        return entry
+
+    def mark_delivered(self, entry_id: str, index: int) -> None:
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                return
+            entry.delivered.add(index)
+            if entry.done:
+                self._entries.pop(entry_id, None)
+                self._claimed.discard(entry_id)
+                self._delete_locked(entry_id)
+            else:
+                self._put_locked(entry)
+
+    def record_failure(self, entry_id: str, error: str) -> None:
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                return
+            entry.attempts += 1
+            entry.last_error = error[:500]
+            self._put_locked(entry)
+
+    def release(self, entry_id: str) -> None:
+        with self._lock:
+            self._claimed.discard(entry_id)
+            entry = self._entries.get(entry_id)
+            if entry is not None and entry.done:
+                self._entries.pop(entry_id)
+                self._delete_locked(entry_id)
+
+    def claim_pending(self, platform: str, now: Optional[float] = None) -> list[OutboxEntry]:
+        # 取出可补发的条目并占用；过期或重试次数用尽的条目直接丢弃。
+        now = time.time() if now is None else now
+        claimed = []
+        with self._lock:
+            for entry_id, entry in list(self._entries.items()):
+                if entry.platform != platform or entry_id in self._claimed:
+                    continue
+                if (
+                    now - entry.created_at > self.max_age_sec
+                    or entry.attempts >= self.max_attempts
+                ):
+                    logger.warning(
+                        "丢弃无法送达的答复：chat=%s attempts=%s last_error=%s",
+                        entry.chat_id,
+                        entry.attempts,
+                        entry.last_error,
+                    )
+                    self._entries.pop(entry_id)
+                    self._delete_locked(entry_id)
+                    continue
+                self._claimed.add(entry_id)
+                claimed.append(entry)
+        claimed.sort(key=lambda entry: entry.created_at)
+        return claimed
+
+    def has_source(self, source_key: str) -> bool:
+        with self._lock:
+            return any(entry.source_key == source_key for entry in self._entries.values())
+
+    def pending_count(self, platform: Optional[str] = None) -> int:
+        with self._lock:
+            return sum(
+                1
+                for entry in self._entries.values()
+                if platform is None or entry.platform == platform
+            )
@@ -0,0 +1,220 @@
+import hashlib
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.platform_messages import ChatKey
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKTREE_IDLE_SEC = 24 * 3600.0
+DEFAULT_WORKTREE_GC_INTERVAL_SEC = 600.0
+GIT_TIMEOUT_SEC = 60
+
+
+@dataclass
+class WorktreeEntry:
+    path: str
+    repo_root: str
+    last_used: float
+    in_use: int = 0
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", value).strip("_") or "default"
+
+
+def _run_git(cwd: str, *args: str) -> str:
+    result = subprocess.run(
+        ["git", "-C", cwd, *args],
+        capture_output=True,
+        text=True,
+        timeout=GIT_TIMEOUT_SEC,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError((result.stderr or result.stdout or "").strip() or f"git {args[0]} failed")
+    return result.stdout.strip()
+
+
+# 会话级 git worktree：项目目录是 git 仓库时，每个会话（或后台任务）在自己的 worktree 里运行 Codex，
+# 同一仓库上的独立任务因此互不干扰、可以完全并行。worktree 首次使用时按仓库 HEAD 创建，
+# 空闲超过 idle_sec 且没有未提交改动时回收；非 git 目录或 git 失败时退回共享目录。
+# 锁只保护登记信息，git 命令都在锁外执行，release 不会被别的会话创建/回收 worktree 卡住。
+class WorktreeManager:
+    def __init__(
+        self,
+        root_dir: str,
+        idle_sec: float = DEFAULT_WORKTREE_IDLE_SEC,
+        gc_interval_sec: float = DEFAULT_WORKTREE_GC_INTERVAL_SEC,
+    ):
+        self.root_dir = os.path.realpath(os.path.expanduser(root_dir))
+        self.idle_sec = idle_sec
+        self.gc_interval_sec = gc_interval_sec
+        self._entries: dict[str, WorktreeEntry] = {}
+        # 正在执行 git worktree add/remove 的路径；git 调用在锁外进行，同一路径的其他调用等它结束。
+        self._pending: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._last_gc = time.time()
+        self._discover()
+
+    def _discover(self) -> None:
+        # 上次运行留下的 worktree 以目录修改时间作为最近使用时间，照常参与回收。
+        if not os.path.isdir(self.root_dir):
+            return
+        for repo_dir in os.scandir(self.root_dir):
+            if not repo_dir.is_dir():
+                continue
+            for item in os.scandir(repo_dir.path):
+                if item.is_dir() and os.path.exists(os.path.join(item.path, ".git")):
+                    self._entries[item.path] = WorktreeEntry(
+                        path=item.path, repo_root="", last_used=item.stat().st_mtime
+                    )
+
+    @staticmethod
+    def _repo_location(project_dir: str) -> Optional[tuple[str, str]]:
+        # (仓库根目录, 项目目录相对仓库根的子路径)；不是 git 仓库返回 None。
+        real_dir = os.path.realpath(project_dir)
+        try:
+            repo_root = os.path.realpath(_run_git(real_dir, "rev-parse", "--show-toplevel"))
+        except (OSError, RuntimeError, subprocess.TimeoutExpired):
+            return None
+        return repo_root, os.path.relpath(real_dir, repo_root)
+
+    def _worktree_path(self, repo_root: str, key: str) -> str:
+        digest = hashlib.sha1(repo_root.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(
+            self.root_dir, f"{_slug(os.path.basename(repo_root))}-{digest}", _slug(key)
+        )
+
+    @staticmethod
+    def _with_subdir(path: str, subdir: str) -> str:
+        return path if subdir == "." else os.path.join(path, subdir)
+
+    def peek(self, project_dir: str, key: ChatKey) -> Optional[str]:
+        # 只计算会话 worktree 的位置，不创建；项目目录不是 git 仓库时返回 None。
+        location = self._repo_location(project_dir)
+        if location is None:
+            return None
+        repo_root, subdir = location
+        return self._with_subdir(self._worktree_path(repo_root, str(key)), subdir)
+
+    def acquire(self, project_dir: str, key: ChatKey) -> str:
+        # 返回本次运行使用的目录并标记占用；调用方结束后必须 release 同一路径。
+        self.maybe_collect()
+        location = self._repo_location(project_dir)
+        if location is None:
+            return project_dir
+        repo_root, subdir = location
+        path = self._worktree_path(repo_root, str(key))
+        while True:
+            with self._lock:
+                pending = self._pending.get(path)
+                if pending is None:
+                    entry = self._entries.get(path)
+                    if entry is not None and os.path.isdir(path):
+                        entry.repo_root = entry.repo_root or repo_root
+                        entry.in_use += 1
+                        entry.last_used = time.time()
+                        return self._with_subdir(path, subdir)
+                    self._pending[path] = threading.Event()
+                    break
+            # 同一路径正在创建或回收，等它结束后重新判断。
+            pending.wait()
+
+        created = False
+        try:
+            self._create(repo_root, path)
+            created = True
+        except (OSError, RuntimeError, subprocess.TimeoutExpired) as exc:
+            logger.warning("创建 git worktree 失败，改用共享目录：%s (repo=%s)", exc, repo_root)
+        finally:
+            with self._lock:
+                if created:
+                    self._entries[path] = WorktreeEntry(
+                        path=path, repo_root=repo_root, last_used=time.time(), in_use=1
+                    )
+                self._pending.pop(path).set()
+        return self._with_subdir(path, subdir) if created else project_dir
+
+    def release(self, run_dir: str) -> None:
+        with self._lock:
+            for path, entry in self._entries.items():
+                if run_dir == path or run_dir.startswith(path + os.sep):
+                    entry.in_use = max(0, entry.in_use - 1)
+                    entry.last_used = time.time()
+                    return
+
+    def _create(self, repo_root: str, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 目录残留但已不是有效 worktree（例如被手动删过 .git）时先清掉登记。
+        _run_git(repo_root, "worktree", "prune")
+        _run_git(repo_root, "worktree", "add", "--detach", path, "HEAD")
+        logger.info("已创建 git worktree：%s (repo=%s)", path, repo_root)
+
+    def maybe_collect(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        if now - self._last_gc < self.gc_interval_sec:
+            return
+        self._last_gc = now
+        self.collect_idle(now)
+
+    def collect_idle(self, now: Optional[float] = None) -> list[str]:
+        now = time.time() if now is None else now
+        with self._lock:
+            idle = [
+                entry
+                for entry in self._entries.values()
+                if not entry.in_use and now - entry.last_used >= self.idle_sec
+            ]
+        removed = []
+        for entry in idle:
+            if self._remove(entry):
+                removed.append(entry.path)
+        return removed
+
+    def _remove(self, entry: WorktreeEntry) -> bool:
+        try:
+            if os.path.isdir(entry.path) and (
+                _run_git(entry.path, "status", "--porcelain")
+                or _run_git(entry.path, "rev-list", "-1", "HEAD", "--not", "--branches", "--remotes")
+            ):
+                # 有未提交的改动或不在任何分支上的提交就保留，避免回收掉用户还没取走的修改。
+                logger.info("worktree 有未取走的改动，暂不回收：%s", entry.path)
+                return False
+            repo_root = entry.repo_root or os.path.dirname(
+                os.path.realpath(
+                    os.path.join(entry.path, _run_git(entry.path, "rev-parse", "--git-common-dir"))
+                )
+            )
+            with self._lock:
+                if entry.in_use or entry.path in self._pending:
+                    return False
+                self._entries.pop(entry.path, None)
+                self._pending[entry.path] = threading.Event()
+            removed = False
+            try:
+                _run_git(repo_root, "worktree", "remove", "--force", entry.path)
+                removed = True
+            finally:
+                with self._lock:
+                    if not removed:
+                        self._entries[entry.path] = entry
+                    self._pending.pop(entry.path).set()
+        except (OSError, RuntimeError, subprocess.TimeoutExpired) as exc:
+            logger.warning("回收 git worktree 失败：%s (path=%s)", exc, entry.path)
+            return False
+        logger.info("已回收空闲 git worktree：%s", entry.path)
+        return True
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "total": len(self._entries),
+                "in_use": sum(1 for entry in self._entries.values() if entry.in_use),
+            }
@@ -1,29 +1,64 @@
+import asyncio
 import os
-import tempfile
 import urllib.request
-from urllib.parse import urlparse
 
 from app.core.platform_messages import PlatformInboundMessage, PlatformOutboundMessage
+from app.feishu.feishu_image_cache import (
+    FeishuImageKeyCache,
+    hash_key_for_bytes,
+    hash_key_for_file,
+    url_key,
+)
+from app.feishu.feishu_image_fetch import RemoteImageFetcher, download_remote_image
 from app.feishu.feishu_io import (
     FeishuPrivateTextEvent,
     send_private_image,
+    send_private_message,
     send_private_text,
 )
+from app.feishu.feishu_render import (
+    DEFAULT_FILE_THRESHOLD_CHARS,
+    DEFAULT_MESSAGE_MAX_CHARS,
+    render_reply_text,
+)
+
+
+def fetch_remote_etag(url: str) -> str:
+    request = urllib.request.Request(url, method="HEAD")
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return (response.headers.get("ETag") or "").strip()
+    except Exception:
+        return ""
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
 
 
-def download_remote_image(url: str) -> str:
-    parsed = urlparse(url)
-    suffix = os.path.splitext(parsed.path or "")[1] or ".img"
-    with urllib.request.urlopen(url) as response:
-        data = response.read()
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp.write(data)
-        return tmp.name
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as handle:
+        return handle.read()
 
 
 class FeishuAdapter:
     platform_id = "feishu"
 
+    def __init__(
+        self,
+        image_cache: FeishuImageKeyCache | None = None,
+        fetcher: RemoteImageFetcher | None = None,
+        message_max_chars: int = DEFAULT_MESSAGE_MAX_CHARS,
+        file_threshold_chars: int = DEFAULT_FILE_THRESHOLD_CHARS,
+    ):
+        self.image_cache = image_cache
+        self.fetcher = fetcher
+        self.message_max_chars = message_max_chars
+        self.file_threshold_chars = file_threshold_chars
+
     def build_inbound_message(
         self,
         event: FeishuPrivateTextEvent,
@@ -44,20 +79,140 @@ class FeishuAdapter:
         results: list[dict] = []
         for part in outbound.parts:
             if part.kind in {"text", "notice"} and part.text:
-                results.append(send_private_text(client, chat_id, part.text))
+                # SDK 路径不做附件上传，超长内容一律拆成多条消息。
+                for message in render_reply_text(
+                    part.text, self.message_max_chars, file_threshold_chars=0
+                ):
+                    if message.msg_type == "text":
+                        results.append(
+                            send_private_text(client, chat_id, message.content["text"])
+                        )
+                    else:
+                        results.append(
+                            send_private_message(
+                                client, chat_id, message.msg_type, message.content
+                            )
+                        )
                 continue
             if part.kind != "image" or not part.value:
                 continue
-            if part.source_type == "local_path":
-                results.append(send_private_image(client, chat_id, part.value))
-                continue
+            results.append(self._send_image_part(client, chat_id, part))
+        return results
+
+    def _send_image_part(self, client, chat_id: str, part) -> dict:
+        cache = self.image_cache
+        remote = part.source_type != "local_path"
+        etag_key = ""
+        if cache is not None and remote:
+            etag = fetch_remote_etag(part.value)
+            etag_key = url_key(part.value, etag) if etag else ""
+            cached = cache.get(etag_key) if etag_key else ""
+            if cached:
+                return send_private_image(client, chat_id, "", image_key=cached)
 
-            temp_path = download_remote_image(part.value)
-            try:
-                results.append(send_private_image(client, chat_id, temp_path))
-            finally:
-                try:
-                    os.remove(temp_path)
-                except OSError:
-                    pass
+        path = download_remote_image(part.value) if remote else part.value
+        try:
+            if cache is None:
+                return send_private_image(client, chat_id, path)
+            content_key = hash_key_for_file(path)
+            result = send_private_image(
+                client, chat_id, path, image_key=cache.get(content_key)
+            )
+            image_key = result.get("image_key", "") if isinstance(result, dict) else ""
+            cache.put(content_key, image_key)
+            if etag_key:
+                cache.put(etag_key, image_key)
+            cache.save()
+            return result
+        finally:
+            if remote:
+                _remove_quietly(path)
+
+    async def send_outbound_async(
+        self, api, chat_id: str, outbound: PlatformOutboundMessage
+    ) -> list[dict]:
+        # 所有图片的下载与上传立即在后台并发进行；文本照常按顺序先发，
+        # 发到图片时再等待对应任务，消息顺序保持不变。
+        upload_tasks = {
+            id(part): asyncio.create_task(self._upload_image_part(api, part))
+            for part in outbound.parts
+            if part.kind == "image" and part.value
+        }
+        results: list[dict] = []
+        try:
+            for part in outbound.parts:
+                if part.kind in {"text", "notice"} and part.text:
+                    results.extend(await self._send_text_part(api, chat_id, part.text))
+                    continue
+                task = upload_tasks.get(id(part))
+                if task is not None:
+                    results.append(await api.send_image(chat_id, await task))
+        finally:
+            pending = [task for task in upload_tasks.values() if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*upload_tasks.values(), return_exceptions=True)
+        return results
+
+    async def _send_text_part(self, api, chat_id: str, text: str) -> list[dict]:
+        results: list[dict] = []
+        for message in render_reply_text(
+            text, self.message_max_chars, self.file_threshold_chars
+        ):
+            if message.msg_type == "text":
+                results.append(await api.send_text(chat_id, message.content["text"]))
+            elif message.msg_type == "file":
+                file_key = await api.upload_file_bytes(
+                    message.file_text.encode("utf-8"), message.file_name
+                )
+                results.append(await api.send_message(chat_id, "file", {"file_key": file_key}))
+            else:
+                results.append(
+                    await api.send_message(chat_id, message.msg_type, message.content)
+                )
         return results
+
+    async def _fetch_remote(self, url: str) -> tuple[str, str]:
+        if self.fetcher is not None:
+            fetched = await self.fetcher.fetch(url)
+            return fetched.path, fetched.etag
+        return await asyncio.to_thread(download_remote_image, url), ""
+
+    async def _remote_etag(self, url: str) -> str:
+        if self.fetcher is not None:
+            return await self.fetcher.head_etag(url)
+        return await asyncio.to_thread(fetch_remote_etag, url)
+
+    async def _upload_image_part(self, api, part) -> str:
+        cache = self.image_cache
+        remote = part.source_type != "local_path"
+        etag = ""
+        if cache is not None and remote:
+            etag = await self._remote_etag(part.value)
+            cached = cache.get(url_key(part.value, etag)) if etag else ""
+            if cached:
+                return cached
+
+        if remote:
+            path, fetched_etag = await self._fetch_remote(part.value)
+            etag = etag or fetched_etag
+        else:
+            path = part.value
+        try:
+            if cache is None:
+                return await api.upload_image(path)
+            image_bytes = await asyncio.to_thread(_read_bytes, path)
+            content_key = hash_key_for_bytes(image_bytes)
+            image_key = cache.get(content_key)
+            if not image_key:
+                image_key = await api.upload_image_bytes(
+                    image_bytes, os.path.basename(path)
+                )
+            cache.put(content_key, image_key)
+            if remote and etag:
+                cache.put(url_key(part.value, etag), image_key)
+            await asyncio.to_thread(cache.save)
+            return image_key
+        finally:
+            if remote:
+                _remove_quietly(path)
@@ -0,0 +1,300 @@
+import asyncio
+import json
+import os
+import time
+from typing import Callable, Optional
+
+from app.core.lazy_import import LazyModule
+
+httpx = LazyModule("httpx")
+
+DEFAULT_FEISHU_BASE_URL = "https://open.feishu.cn"
+# 租户 token 失效/过期时开放平台返回的业务码，刷新后重试一次。
+TOKEN_INVALID_CODES = {99991661, 99991663, 99991664, 99991668}
+TOKEN_REFRESH_MARGIN_SEC = 120
+
+
+class FeishuApiError(RuntimeError):
+    def __init__(self, message: str, code: int = -1, log_id: str = ""):
+        super().__init__(message)
+        self.code = code
+        self.log_id = log_id
+
+
+# 飞书开放平台的异步 HTTP 客户端：共享一个 keep-alive 连接池，缓存 tenant_access_token，
+# 替代每次调用都用 asyncio.to_thread 包一层同步 SDK 的做法。
+class FeishuApiClient:
+    def __init__(
+        self,
+        app_id: str,
+        app_secret: str,
+        base_url: str = DEFAULT_FEISHU_BASE_URL,
+        timeout_sec: float = 15.0,
+        max_connections: int = 20,
+        clock: Callable[[], float] = time.monotonic,
+        on_call: Optional[Callable[[str, float, bool], None]] = None,
+    ):
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.base_url = base_url.rstrip("/")
+        self.timeout_sec = timeout_sec
+        self.max_connections = max_connections
+        self.clock = clock
+        # 每次 API 调用结束后回调 (action, 耗时秒, 是否成功)，供健康统计使用。
+        self.on_call = on_call
+        self.token_refreshes = 0
+        self._token = ""
+        self._token_expires_at = 0.0
+        self._token_lock: Optional[asyncio.Lock] = None
+        self._http = None
+
+    def _client(self):
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout_sec,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _tenant_token(self, force_refresh: bool = False) -> str:
+        if not force_refresh and self._token and self.clock() < self._token_expires_at:
+            return self._token
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            # 等锁期间可能已被其他协程刷新。
+            if not force_refresh and self._token and self.clock() < self._token_expires_at:
+                return self._token
+            response = await self._client().post(
+                "/open-apis/auth/v3/tenant_access_token/internal",
+                json={"app_id": self.app_id, "app_secret": self.app_secret},
+            )
+            payload = _decode_json(response)
+            if payload.get("code") != 0 or not payload.get("tenant_access_token"):
+                raise FeishuApiError(
+                    f"feishu tenant token failed: code={payload.get('code')} msg={payload.get('msg')}",
+                    code=int(payload.get("code") or -1),
+                    log_id=response.headers.get("X-Tt-Logid", ""),
+                )
+            expire_sec = float(payload.get("expire") or 0)
+            self._token = payload["tenant_access_token"]
+            self._token_expires_at = self.clock() + max(0.0, expire_sec - TOKEN_REFRESH_MARGIN_SEC)
+            self.token_refreshes += 1
+            return self._token
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        action: str,
+        params: Optional[dict] = None,
+        json_body: Optional[dict] = None,
+        data: Optional[dict] = None,
+        files: Optional[dict] = None,
+    ) -> tuple[dict, str]:
+        started = self.clock()
+        ok = False
+        try:
+            result = await self._request(
+                method,
+                path,
+                action=action,
+                params=params,
+                json_body=json_body,
+                data=data,
+                files=files,
+            )
+            ok = True
+            return result
+        finally:
+            if self.on_call is not None:
+                self.on_call(action, self.clock() - started, ok)
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        action: str,
+        params: Optional[dict],
+        json_body: Optional[dict],
+        data: Optional[dict],
+        files: Optional[dict],
+    ) -> tuple[dict, str]:
+        force_refresh = False
+        for _ in range(2):
+            token = await self._tenant_token(force_refresh=force_refresh)
+            response = await self._client().request(
+                method,
+                path,
+                params=params,
+                json=json_body,
+                data=data,
+                files=files,
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            payload = _decode_json(response)
+            log_id = response.headers.get("X-Tt-Logid", "")
+            code = payload.get("code")
+            if code in TOKEN_INVALID_CODES and not force_refresh:
+                force_refresh = True
+                continue
+            if code != 0:
+                raise FeishuApiError(
+                    f"feishu {action} failed: code={code} msg={payload.get('msg')} log_id={log_id}",
+                    code=int(code if code is not None else -1),
+                    log_id=log_id,
+                )
+            return payload, log_id
+        raise FeishuApiError(f"feishu {action} failed: token refresh did not help")
+
+    async def send_message(
+        self,
+        receive_id: str,
+        msg_type: str,
+        content: dict,
+        receive_id_type: str = "chat_id",
+    ) -> dict:
+        payload, log_id = await self.request(
+            "POST",
+            "/open-apis/im/v1/messages",
+            action="send",
+            params={"receive_id_type": receive_id_type},
+            json_body={
+                "receive_id": receive_id,
+                "msg_type": msg_type,
+                "content": json.dumps(content, ensure_ascii=False),
+            },
+        )
+        return {
+            "code": payload.get("code"),
+            "msg": payload.get("msg"),
+            "log_id": log_id,
+            "message_id": (payload.get("data") or {}).get("message_id", ""),
+        }
+
+    async def send_text(
+        self, receive_id: str, text: str, receive_id_type: str = "chat_id"
+    ) -> dict:
+        return await self.send_message(
+            receive_id, "text", {"text": text}, receive_id_type=receive_id_type
+        )
+
+    async def update_card(self, message_id: str, card: dict) -> dict:
+        payload, log_id = await self.request(
+            "PATCH",
+            f"/open-apis/im/v1/messages/{message_id}",
+            action="update card",
+            json_body={"content": json.dumps(card, ensure_ascii=False)},
+        )
+        return {"code": payload.get("code"), "msg": payload.get("msg"), "log_id": log_id}
+
+    async def delete_message(self, message_id: str) -> dict:
+        payload, log_id = await self.request(
+            "DELETE",
+            f"/open-apis/im/v1/messages/{message_id}",
+            action="delete message",
+        )
+        return {"code": payload.get("code"), "msg": payload.get("msg"), "log_id": log_id}
+
+    async def add_reaction(self, message_id: str, emoji_type: str = "Typing") -> dict:
+        payload, log_id = await self.request(
+            "POST",
+            f"/open-apis/im/v1/messages/{message_id}/reactions",
+            action="add reaction",
+            json_body={"reaction_type": {"emoji_type": emoji_type}},
+        )
+        reaction_id = (payload.get("data") or {}).get("reaction_id", "")
+        if not reaction_id:
+            raise FeishuApiError(
+                f"feishu add reaction missing reaction_id: log_id={log_id}", log_id=log_id
+            )
+        return {
+            "code": payload.get("code"),
+            "msg": payload.get("msg"),
+            "log_id": log_id,
+            "reaction_id": reaction_id,
+        }
+
+    async def remove_reaction(self, message_id: str, reaction_id: str) -> dict:
+        payload, log_id = await self.request(
+            "DELETE",
+            f"/open-apis/im/v1/messages/{message_id}/reactions/{reaction_id}",
+            action="delete reaction",
+        )
+        return {
+            "code": payload.get("code"),
+            "msg": payload.get("msg"),
+            "log_id": log_id,
+            "reaction_id": reaction_id,
+        }
+
+    async def upload_image_bytes(self, image_bytes: bytes, filename: str = "image") -> str:
+        payload, log_id = await self.request(
+            "POST",
+            "/open-apis/im/v1/images",
+            action="image upload",
+            data={"image_type": "message"},
+            files={"image": (filename, image_bytes)},
+        )
+        image_key = (payload.get("data") or {}).get("image_key", "")
+        if not image_key:
+            raise FeishuApiError(
+                f"feishu image upload missing image_key: log_id={log_id}", log_id=log_id
+            )
+        return image_key
+
+    async def upload_file_bytes(
+        self, file_bytes: bytes, file_name: str, file_type: str = "stream"
+    ) -> str:
+        payload, log_id = await self.request(
+            "POST",
+            "/open-apis/im/v1/files",
+            action="file upload",
+            data={"file_type": file_type, "file_name": file_name},
+            files={"file": (file_name, file_bytes)},
+        )
+        file_key = (payload.get("data") or {}).get("file_key", "")
+        if not file_key:
+            raise FeishuApiError(
+                f"feishu file upload missing file_key: log_id={log_id}", log_id=log_id
+            )
+        return file_key
+
+    async def upload_image(self, image_path: str) -> str:
+        image_bytes = await asyncio.to_thread(_read_file_bytes, image_path)
+        return await self.upload_image_bytes(image_bytes, os.path.basename(image_path))
+
+    async def send_image(self, chat_id: str, image_key: str) -> dict:
+        result = await self.send_message(chat_id, "image", {"image_key": image_key})
+        result["image_key"] = image_key
+        return result
+
+
+def _read_file_bytes(path: str) -> bytes:
+    with open(path, "rb") as handle:
+        return handle.read()
+
+
+def _decode_json(response) -> dict:
+    try:
+        payload = response.json()
+    except ValueError:
+        raise FeishuApiError(
+            f"feishu http {response.status_code}: non-json body",
+            code=response.status_code,
+            log_id=response.headers.get("X-Tt-Logid", ""),
+        ) from None
+    if not isinstance(payload, dict):
+        raise FeishuApiError(f"feishu http {response.status_code}: unexpected body")
+    return payload
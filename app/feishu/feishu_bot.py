@@ -1,57 +1,121 @@
 import asyncio
-import json
 import logging
 import os
-from dataclasses import replace
-from typing import Optional
-
-import lark_oapi as lark
-from dotenv import load_dotenv
+import signal
+import time
+from dataclasses import asdict, dataclass, replace
+from typing import Callable, Optional
 
 from app.config.chat_store import ChatStore
 from app.config.config import load_config
+from app.config.logging_setup import format_payload, log_context, setup_logging
 from app.config.project_service import ProjectService
+from app.config.settings import (
+    CHAT_HISTORY_FILE,
+    CHAT_PROJECTS_FILE,
+    CODEX_LATENCY_FILE,
+    DEFAULT_MAX_TURNS,
+    REPO_ROOT,
+    SYSTEM_PROMPT,
+    WORKTREES_DIR,
+    read_bool_env,
+    read_positive_float_env,
+    read_positive_int_env,
+)
+from app.core.background_jobs import (
+    DEFAULT_BG_MAX_JOBS_PER_CHAT,
+    DEFAULT_BG_MAX_RUNNING,
+    BackgroundJobManager,
+)
 from app.core.bridge_core import BridgeCore
-from app.core.codex_client import ask_codex_with_meta, get_codex_runtime_info
+from app.core.codex_client import (
+    CodexCancelScope,
+    ask_codex_with_meta,
+    get_codex_runtime_info,
+)
+from app.core.codex_retry import (
+    DEFAULT_CODEX_BREAKER_COOLDOWN_SEC,
+    DEFAULT_CODEX_BREAKER_THRESHOLD,
+    DEFAULT_CODEX_MAX_ATTEMPTS,
+    CodexCircuitBreaker,
+    CodexRetryPolicy,
+)
+from app.core.codex_scheduler import CodexScheduler
 from app.core.command_service import CommandService
+from app.core.lazy_import import LazyModule
+from app.core.latency_tracker import (
+    DEFAULT_TIMEOUT_FLOOR_SEC,
+    DEFAULT_TIMEOUT_PERCENTILE,
+    LatencyTracker,
+    build_eta_estimator,
+)
+from app.core.loop_monitor import LoopLagMonitor
+from app.core.message_inbox import (
+    DEFAULT_INBOX_MAX_ATTEMPTS,
+    DEFAULT_INBOX_RECOVERY_WINDOW_SEC,
+    MessageInbox,
+    render_inbox_expired_notice,
+)
 from app.core.platform_messages import OutboundPart, PlatformOutboundMessage
+from app.core.project_locks import ProjectLockManager
 from app.core.skills import list_available_skills
+from app.core.worktrees import DEFAULT_WORKTREE_IDLE_SEC, WorktreeManager
 from app.feishu.feishu_adapter import FeishuAdapter
+from app.feishu.feishu_api import DEFAULT_FEISHU_BASE_URL, FeishuApiClient
+from app.feishu.feishu_event_dedupe import FeishuEventDedupe
+from app.feishu.feishu_health import FeishuHealthManager, render_feishu_health_lines
+from app.feishu.feishu_image_cache import FeishuImageKeyCache
+from app.feishu.feishu_image_fetch import DEFAULT_IMAGE_MAX_BYTES, RemoteImageFetcher
 from app.feishu.feishu_io import (
     FeishuPrivateTextEvent,
     add_typing_reaction,
-    parse_private_text_event,
+    parse_private_text_event_data,
     remove_typing_reaction,
     send_private_text,
 )
 from app.feishu.feishu_menu import build_menu_help_text, resolve_menu_action
-from app.telegram.bot import CHAT_HISTORY_FILE, DEFAULT_MAX_TURNS, SYSTEM_PROMPT, setup_logging
-
-REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-load_dotenv(os.path.join(REPO_ROOT, ".env"))
-
+from app.feishu.feishu_preview import FeishuPreviewDriver
+from app.feishu.feishu_render import DEFAULT_FILE_THRESHOLD_CHARS, DEFAULT_MESSAGE_MAX_CHARS
+from app.feishu.feishu_runtime import FeishuRuntime
+from app.feishu.feishu_webhook import (
+    DEFAULT_WEBHOOK_HOST,
+    DEFAULT_WEBHOOK_PATH,
+    FeishuWebhookServer,
+)
 
-def _read_positive_int_env(name: str, default: int) -> int:
-    raw = (os.getenv(name, str(default)) or "").strip()
-    try:
-        value = int(raw)
-    except ValueError:
-        return default
-    return value if value > 0 else default
+# lark_oapi 导入耗时约 2 秒，延迟到首次使用 SDK 时再加载。
+lark = LazyModule("lark_oapi")
+FEISHU_EVENT_STATE_FILE = os.path.join(REPO_ROOT, "feishu_event_state.json")
+FEISHU_IMAGE_CACHE_FILE = os.path.join(REPO_ROOT, "feishu_image_cache.json")
+FEISHU_INBOX_FILE = os.path.join(REPO_ROOT, "feishu_inbox.json")
+FEISHU_BUSY_TEXT = "机器人当前排队的任务已满，这条消息没有处理，请稍后重新发送。"
 
 
 class FeishuProjectService:
-    def __init__(self, config_ref: dict, env_path: str):
+    def __init__(self, config_ref: dict, env_path: str, chat_projects_path: Optional[str] = None):
         self._config_ref = config_ref
         self._service = ProjectService(
             initial_project_dir=config_ref["value"].codex_project_dir,
             env_path=env_path,
+            chat_projects_path=chat_projects_path,
         )
 
     @property
     def project_dir(self) -> str:
         return self._service.project_dir
 
+    def project_dir_for(self, chat_key) -> str:
+        return self._service.project_dir_for(chat_key)
+
+    def chat_project_dir(self, chat_key) -> str:
+        return self._service.chat_project_dir(chat_key)
+
+    def set_chat_project_dir(self, chat_key, raw_path: str):
+        return self._service.set_chat_project_dir(chat_key, raw_path)
+
+    def clear_chat_project_dir(self, chat_key) -> None:
+        self._service.clear_chat_project_dir(chat_key)
+
     @property
     def env_path(self) -> str:
         return self._service.env_path
@@ -73,19 +137,77 @@ class FeishuProjectService:
         return self._service.set_default_model(model)
 
 
-def build_bridge_core(config_getter, chat_store: ChatStore) -> BridgeCore:
-    async def request_reply(prompt: str, reasoning_effort: Optional[str] = None):
-        return await asyncio.to_thread(
-            ask_codex_with_meta,
-            config_getter(),
-            prompt,
-            reasoning_effort,
-        )
+def build_bridge_core(
+    config_getter,
+    chat_store: ChatStore,
+    codex_scheduler: Optional[CodexScheduler] = None,
+    project_service: Optional[FeishuProjectService] = None,
+    project_locks: Optional[ProjectLockManager] = None,
+    worktrees: Optional[WorktreeManager] = None,
+    codex_retry: Optional[CodexRetryPolicy] = None,
+    latency: Optional[LatencyTracker] = None,
+) -> BridgeCore:
+    codex_retry = codex_retry or CodexRetryPolicy()
+
+    async def request_reply(
+        prompt: str,
+        reasoning_effort: Optional[str] = None,
+        on_event=None,
+        project_dir: Optional[str] = None,
+    ):
+        async def attempt(resume_thread_id: Optional[str]):
+            config = config_getter()
+            if project_dir:
+                config = replace(config, codex_project_dir=project_dir)
+            cancel_scope = CodexCancelScope()
+            try:
+                if codex_scheduler is not None:
+                    return await codex_scheduler.run(
+                        "feishu",
+                        ask_codex_with_meta,
+                        config,
+                        prompt,
+                        reasoning_effort,
+                        on_event,
+                        resume_thread_id,
+                        latency,
+                        cancel_scope,
+                    )
+                return await asyncio.to_thread(
+                    ask_codex_with_meta,
+                    config,
+                    prompt,
+                    reasoning_effort,
+                    on_event,
+                    resume_thread_id,
+                    latency,
+                    cancel_scope,
+                )
+            except asyncio.CancelledError:
+                # 任务被取消（排空超时/退出）时连同 Codex 子进程一起结束。
+                cancel_scope.cancel()
+                raise
+
+        return await codex_retry.run(attempt)
 
     return BridgeCore(
         chat_store=chat_store,
         system_prompt=SYSTEM_PROMPT,
         request_reply=request_reply,
+        resolve_project_dir=project_service.project_dir_for if project_service else None,
+        project_locks=project_locks,
+        resolve_read_only=lambda: config_getter().codex_sandbox == "read-only",
+        worktrees=worktrees,
+        estimate_eta=build_eta_estimator(latency, config_getter) if latency else None,
+    )
+
+
+def build_preview_driver_factory(api_client: FeishuApiClient):
+    if not read_bool_env("FEISHU_STREAMING_PREVIEW", True):
+        return None
+    throttle_sec = read_positive_float_env("FEISHU_PREVIEW_THROTTLE_SEC", 1.0)
+    return lambda event: FeishuPreviewDriver(
+        api_client, event.chat_id, throttle_sec=throttle_sec
     )
 
 
@@ -93,6 +215,13 @@ def build_command_service(
     config_ref: dict,
     chat_store: ChatStore,
     chat_reasoning_overrides: dict,
+    loop_monitor: Optional[LoopLagMonitor] = None,
+    health: Optional[FeishuHealthManager] = None,
+    codex_scheduler: Optional[CodexScheduler] = None,
+    background_jobs: Optional[BackgroundJobManager] = None,
+    project_service: Optional[FeishuProjectService] = None,
+    worktrees: Optional[WorktreeManager] = None,
+    codex_retry: Optional[CodexRetryPolicy] = None,
 ) -> CommandService:
     def get_config():
         return config_ref["value"]
@@ -100,7 +229,15 @@ def build_command_service(
     def set_config(next_config):
         config_ref["value"] = next_config
 
-    project_service = FeishuProjectService(config_ref, os.path.join(REPO_ROOT, ".env"))
+    def get_health_snapshot() -> dict:
+        if health is None:
+            return {"enabled": False}
+        snapshot = health.snapshot(now=time.monotonic())
+        snapshot["lines"] = render_feishu_health_lines(snapshot)
+        return snapshot
+
+    if project_service is None:
+        project_service = FeishuProjectService(config_ref, os.path.join(REPO_ROOT, ".env"))
 
     return CommandService(
         config_getter=get_config,
@@ -110,9 +247,12 @@ def build_command_service(
         chat_reasoning_overrides=chat_reasoning_overrides,
         get_runtime_info=get_codex_runtime_info,
         list_skills=list_available_skills,
-        get_health_snapshot=lambda: {
-            "enabled": False,
-        },
+        get_health_snapshot=get_health_snapshot,
+        get_loop_lag_snapshot=loop_monitor.snapshot if loop_monitor else None,
+        get_codex_scheduler_snapshot=codex_scheduler.snapshot if codex_scheduler else None,
+        get_codex_backend_snapshot=codex_retry.snapshot if codex_retry else None,
+        background_jobs=background_jobs,
+        worktrees=worktrees,
     )
 
 
@@ -126,6 +266,90 @@ def build_api_client(config):
     )
 
 
+async def _add_typing(client, message_id: str, logger: logging.Logger) -> Optional[str]:
+    try:
+        if isinstance(client, FeishuApiClient):
+            reaction_result = await client.add_reaction(message_id)
+        else:
+            reaction_result = await asyncio.to_thread(
+                add_typing_reaction,
+                client,
+                message_id,
+            )
+        return (reaction_result or {}).get("reaction_id") or None
+    except Exception as exc:
+        logger.warning(
+            "飞书 typing reaction 更新失败：message_id=%s err=%s",
+            message_id,
+            exc,
+        )
+        return None
+
+
+async def _remove_typing(
+    client, message_id: str, reaction_id: str, logger: logging.Logger
+) -> None:
+    try:
+        if isinstance(client, FeishuApiClient):
+            await client.remove_reaction(message_id, reaction_id)
+        else:
+            await asyncio.to_thread(
+                remove_typing_reaction,
+                client,
+                message_id,
+                reaction_id,
+            )
+    except Exception as exc:
+        logger.warning(
+            "飞书 typing reaction 更新失败：message_id=%s err=%s",
+            message_id,
+            exc,
+        )
+
+
+async def _send_outbound(
+    adapter: FeishuAdapter, client, chat_id: str, outbound, logger: logging.Logger
+) -> None:
+    logger.info(
+        "开始发送飞书消息：chat_id=%s reply_len=%s",
+        chat_id,
+        len(outbound.text),
+    )
+    if isinstance(client, FeishuApiClient):
+        send_results = await adapter.send_outbound_async(client, chat_id, outbound)
+    else:
+        send_results = await asyncio.to_thread(
+            adapter.send_outbound,
+            client,
+            chat_id,
+            outbound,
+        )
+    if isinstance(send_results, dict):
+        send_result = send_results
+    elif isinstance(send_results, list) and send_results:
+        send_result = send_results[-1]
+    else:
+        send_result = {}
+    logger.info(
+        "飞书消息发送成功：chat_id=%s message_id=%s log_id=%s",
+        chat_id,
+        send_result.get("message_id", ""),
+        send_result.get("log_id", ""),
+    )
+
+
+async def _send_text(client, receive_id: str, text: str, receive_id_type: str) -> dict:
+    if isinstance(client, FeishuApiClient):
+        return await client.send_text(receive_id, text, receive_id_type=receive_id_type)
+    return await asyncio.to_thread(
+        send_private_text,
+        client,
+        receive_id,
+        text,
+        receive_id_type=receive_id_type,
+    )
+
+
 async def handle_private_text_event(
     core: BridgeCore,
     client,
@@ -134,31 +358,25 @@ async def handle_private_text_event(
     adapter: Optional[FeishuAdapter] = None,
     command_service: Optional[CommandService] = None,
     chat_reasoning_overrides: Optional[dict] = None,
+    preview_driver_factory: Optional[Callable[[FeishuPrivateTextEvent], FeishuPreviewDriver]] = None,
 ) -> None:
-    reaction_id: Optional[str] = None
+    typing_task: Optional[asyncio.Task] = None
+    preview: Optional[FeishuPreviewDriver] = None
     try:
         adapter = adapter or FeishuAdapter()
         chat_reasoning_overrides = chat_reasoning_overrides or {}
         if event.message_id:
-            try:
-                reaction_result = await asyncio.to_thread(
-                    add_typing_reaction,
-                    client,
-                    event.message_id,
-                )
-                reaction_id = (reaction_result or {}).get("reaction_id") or None
-            except Exception as exc:
-                logger.warning(
-                    "飞书 typing reaction 更新失败：message_id=%s err=%s",
-                    event.message_id,
-                    exc,
-                )
+            # typing reaction 与命令处理 / Codex 调用并行，不占用首包时间。
+            typing_task = asyncio.create_task(
+                _add_typing(client, event.message_id, logger)
+            )
         if command_service is not None:
             command_result = await asyncio.to_thread(
                 command_service.try_handle,
                 "feishu",
                 event.user_id,
                 event.text,
+                event.chat_id,
             )
             if command_result.handled:
                 outbound = PlatformOutboundMessage(
@@ -166,79 +384,57 @@ async def handle_private_text_event(
                     meta={},
                     history_key=BridgeCore.build_history_key("feishu", event.chat_id),
                 )
-                logger.info(
-                    "开始发送飞书消息：chat_id=%s reply_len=%s",
-                    event.chat_id,
-                    len(outbound.text),
-                )
-                send_results = await asyncio.to_thread(
-                    adapter.send_outbound,
-                    client,
-                    event.chat_id,
-                    outbound,
-                )
-                if isinstance(send_results, dict):
-                    send_result = send_results
-                elif isinstance(send_results, list) and send_results:
-                    send_result = send_results[-1]
-                else:
-                    send_result = {}
-                logger.info(
-                    "飞书消息发送成功：chat_id=%s message_id=%s log_id=%s",
-                    event.chat_id,
-                    send_result.get("message_id", ""),
-                    send_result.get("log_id", ""),
-                )
+                await _send_outbound(adapter, client, event.chat_id, outbound, logger)
                 return
-        history_key = BridgeCore.build_history_key("feishu", event.chat_id)
         history_key = BridgeCore.build_history_key("feishu", event.user_id)
+        if preview_driver_factory is not None:
+            preview = preview_driver_factory(event)
+            await preview.start()
         outbound = await core.process_user_text(
             adapter.build_inbound_message(
                 event,
                 reasoning_effort=chat_reasoning_overrides.get(history_key),
-            )
-        )
-        logger.info(
-            "开始发送飞书消息：chat_id=%s reply_len=%s",
-            event.chat_id,
-            len(outbound.text),
-        )
-        send_results = await asyncio.to_thread(
-            adapter.send_outbound,
-            client,
-            event.chat_id,
-            outbound,
-        )
-        if isinstance(send_results, dict):
-            send_result = send_results
-        elif isinstance(send_results, list) and send_results:
-            send_result = send_results[-1]
-        else:
-            send_result = {}
-        logger.info(
-            "飞书消息发送成功：chat_id=%s message_id=%s log_id=%s",
-            event.chat_id,
-            send_result.get("message_id", ""),
-            send_result.get("log_id", ""),
+            ),
+            on_event=preview.on_codex_event if preview is not None else None,
+            on_status=preview.update if preview is not None else None,
         )
+        if preview is not None:
+            text_only = all(part.kind in {"text", "notice"} for part in outbound.parts)
+            if text_only and await preview.complete(outbound.text):
+                logger.info(
+                    "飞书回复已写入预览卡片：chat_id=%s message_id=%s reply_len=%s patches=%s",
+                    event.chat_id,
+                    preview.message_id,
+                    len(outbound.text),
+                    preview.patches,
+                )
+                return
+            await preview.finalize()
+        await _send_outbound(adapter, client, event.chat_id, outbound, logger)
     except Exception as exc:
         logger.exception("飞书消息发送失败：chat_id=%s err=%s", event.chat_id, exc)
+        if preview is not None and preview.has_active_message:
+            await preview.fail(f"请求失败：{exc}")
         raise
     finally:
-        if reaction_id and event.message_id:
-            try:
-                await asyncio.to_thread(
-                    remove_typing_reaction,
-                    client,
-                    event.message_id,
-                    reaction_id,
-                )
-            except Exception as exc:
-                logger.warning(
-                    "飞书 typing reaction 更新失败：message_id=%s err=%s",
-                    event.message_id,
-                    exc,
-                )
+        if typing_task is not None:
+            reaction_id = await typing_task
+            if reaction_id:
+                await _remove_typing(client, event.message_id, reaction_id, logger)
+
+
+async def _notify_inbox_expired(client, entry, logger: logging.Logger) -> None:
+    try:
+        await _send_text(client, entry.chat_id, render_inbox_expired_notice(entry), "chat_id")
+    except Exception as exc:
+        logger.warning("通知飞书用户重发失败：chat_id=%s err=%s", entry.chat_id, exc)
+
+
+async def _notify_busy(client, chat_id: str, logger: logging.Logger) -> None:
+    try:
+        await _send_text(client, chat_id, FEISHU_BUSY_TEXT, "chat_id")
+    except Exception as exc:
+        logger.warning("通知飞书用户稍后重发失败：chat_id=%s err=%s", chat_id, exc)
 
 
 async def handle_bot_menu_event(
@@ -271,13 +467,7 @@ async def handle_bot_menu_event(
         reply_text = f"未识别的菜单动作：{value}"
 
     logger.info("开始发送飞书菜单响应：open_id=%s event_key=%s", open_id, event_key)
-    send_result = await asyncio.to_thread(
-        send_private_text,
-        client,
-        open_id,
-        reply_text,
-        receive_id_type="open_id",
-    )
+    send_result = await _send_text(client, open_id, reply_text, "open_id")
     logger.info(
         "飞书菜单响应发送成功：open_id=%s message_id=%s log_id=%s",
         open_id,
@@ -292,13 +482,102 @@ def build_event_handler(
     logger: logging.Logger,
     command_service: Optional[CommandService] = None,
     chat_reasoning_overrides: Optional[dict] = None,
+    loop_monitor: Optional[LoopLagMonitor] = None,
+    event_dedupe: Optional[FeishuEventDedupe] = None,
+    runtime: Optional[FeishuRuntime] = None,
+    preview_driver_factory: Optional[Callable[[FeishuPrivateTextEvent], FeishuPreviewDriver]] = None,
+    adapter: Optional[FeishuAdapter] = None,
+    health: Optional[FeishuHealthManager] = None,
+    encrypt_key: str = "",
+    verification_token: str = "",
+    inbox: Optional[MessageInbox] = None,
+    recovery_ref: Optional[dict] = None,
 ):
+    def ensure_loop_monitor(loop) -> None:
+        # ws 客户端自己管理事件循环，首次收到事件时再挂上延迟采样。
+        if loop_monitor is not None:
+            loop_monitor.start(loop)
+
+    def schedule(chat_key: str, job) -> bool:
+        if runtime is not None:
+            return runtime.submit(chat_key, job)
+        loop = asyncio.get_event_loop()
+        ensure_loop_monitor(loop)
+        loop.create_task(job())
+        return True
+
+    def dispatch(client, event: FeishuPrivateTextEvent, inbox_key: str = "") -> bool:
+        def job():
+            return handle_private_text_event(
+                core,
+                client,
+                event,
+                logger,
+                adapter=adapter,
+                command_service=command_service,
+                chat_reasoning_overrides=chat_reasoning_overrides,
+                preview_driver_factory=preview_driver_factory,
+            )
+
+        # 调度时复制当前 context，chat_id/trace_id 会跟随整个处理流程。
+        with log_context(chat_id=event.chat_id, trace_id=event.message_id):
+            if inbox is None or not inbox_key:
+                return schedule(event.chat_id, job)
+            # 拒收时收件箱条目保留，由调用方决定是留给下次恢复还是告知用户。
+            return schedule(event.chat_id, lambda: inbox.run(inbox_key, job))
+
+    def reject(client, event: FeishuPrivateTextEvent, inbox_key: str) -> None:
+        # 运行时拒收：撤销去重标记，飞书重投时还能再处理。正在退出时收件箱条目留给下次启动恢复；
+        # 队列已满时明确告诉用户稍后重发，这种情况下才移出收件箱，不静默吞掉消息。
+        if event_dedupe is not None:
+            event_dedupe.forget(event.event_id, event.message_id)
+        if runtime is None or not runtime.accepting or runtime.loop is None:
+            return
+        if inbox is not None and inbox_key:
+            inbox.finish(inbox_key)
+        asyncio.run_coroutine_threadsafe(
+            _notify_busy(client, event.chat_id, logger), runtime.loop
+        )
+
+    def recover_inbox() -> None:
+        # 需在运行时的事件循环里调用：上个进程没处理完的消息重新排队或通知用户重发。
+        client = client_ref.get("client")
+        if inbox is None or client is None:
+            return
+        retry, expired = inbox.recover("feishu")
+        for entry in expired:
+            logger.warning(
+                "放弃恢复飞书消息并通知用户重发：chat_id=%s attempts=%s",
+                entry.chat_id,
+                entry.attempts,
+            )
+            schedule(
+                entry.chat_id,
+                lambda entry=entry: _notify_inbox_expired(client, entry, logger),
+            )
+        if retry:
+            logger.info("恢复上次未处理完的 %s 条飞书消息。", len(retry))
+        for entry in retry:
+            event = FeishuPrivateTextEvent(**entry.payload)
+            if not dispatch(client, event, entry.key):
+                reject(client, event, entry.key)
+
+    if recovery_ref is not None:
+        recovery_ref["recover"] = recover_inbox
+
+    def record_delivery(event: Optional[FeishuPrivateTextEvent]) -> None:
+        lag = None
+        if event is not None and event.create_time_ms:
+            lag = max(0.0, time.time() - event.create_time_ms / 1000.0)
+        health.record_event(now=time.monotonic(), delivery_lag_sec=lag)
+
     def on_message(data) -> None:
         try:
-            raw_payload = lark.JSON.marshal(data)
-            logger.info("收到飞书原始事件：%s", raw_payload)
-            payload = json.loads(raw_payload)
-            event = parse_private_text_event(payload)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("收到飞书原始事件：%s", format_payload(lark.JSON.marshal(data)))
+            event = parse_private_text_event_data(data)
+            if health is not None:
+                record_delivery(event)
             if event is None:
                 logger.info("忽略非私聊文本飞书事件。")
                 return
@@ -307,23 +586,27 @@ def build_event_handler(
                 event.chat_id,
                 event.user_id,
                 event.message_id,
-                event.text,
+                format_payload(event.text),
             )
             client = client_ref.get("client")
             if client is None:
                 logger.warning("飞书客户端尚未就绪，忽略消息：chat_id=%s", event.chat_id)
                 return
-            loop = asyncio.get_event_loop()
-            loop.create_task(
-                handle_private_text_event(
-                    core,
-                    client,
-                    event,
-                    logger,
-                    command_service=command_service,
-                    chat_reasoning_overrides=chat_reasoning_overrides,
+            if event_dedupe is not None and event_dedupe.seen(
+                event.event_id, event.message_id
+            ):
+                logger.info(
+                    "忽略重复投递的飞书事件：event_id=%s message_id=%s hits=%s",
+                    event.event_id,
+                    event.message_id,
+                    event_dedupe.hits,
                 )
-            )
+                return
+            inbox_key = event.message_id or event.event_id
+            if inbox is not None and inbox_key:
+                inbox.accept("feishu", inbox_key, event.chat_id, event.text, asdict(event))
+            if not dispatch(client, event, inbox_key):
+                reject(client, event, inbox_key)
         except Exception:
             logger.exception("处理飞书消息事件失败")
 
@@ -336,61 +619,350 @@ def build_event_handler(
             if command_service is None:
                 logger.warning("命令服务尚未就绪，忽略菜单事件。")
                 return
-            loop = asyncio.get_event_loop()
-            loop.create_task(handle_bot_menu_event(client, data, logger, command_service))
+            operator_id = getattr(
+                getattr(getattr(data, "event", None), "operator", None), "operator_id", None
+            )
+            schedule(
+                getattr(operator_id, "open_id", "") or "menu",
+                lambda: handle_bot_menu_event(client, data, logger, command_service),
+            )
         except Exception:
             logger.exception("处理飞书菜单事件失败")
 
     return (
-        lark.EventDispatcherHandler.builder("", "")
+        lark.EventDispatcherHandler.builder(encrypt_key, verification_token)
         .register_p2_im_message_receive_v1(on_message)
         .register_p2_application_bot_menu_v6(on_bot_menu)
         .build()
     )
 
 
-def main() -> int:
-    setup_logging()
-    logger = logging.getLogger(__name__)
-    try:
-        config = load_config(require_telegram_bot_token=False)
-        if not config.feishu_app_id or not config.feishu_app_secret:
-            raise ValueError("缺少 FEISHU_APP_ID 或 FEISHU_APP_SECRET。")
+@dataclass
+class FeishuService:
+    runtime: FeishuRuntime
+    api_client: FeishuApiClient
+    event_handler: object
+    health: FeishuHealthManager
+    loop_monitor: LoopLagMonitor
+    event_mode: str
+    drain_timeout_sec: float
+    health_check_interval_sec: float
+    request_escalation: Callable[[str], None]
+    escalation: dict
+    ws_client: object = None
+    webhook_server: Optional[FeishuWebhookServer] = None
+    recover_inbox: Optional[Callable[[], None]] = None
+    background_jobs: Optional[BackgroundJobManager] = None
+
+    def start_watchers(self) -> None:
+        # 需在运行时所在的事件循环里调用。
+        loop = asyncio.get_running_loop()
+        self.loop_monitor.start(loop)
+        if self.background_jobs is not None:
+            self.background_jobs.attach(loop)
+        if self.recover_inbox is not None:
+            self.recover_inbox()
+        loop.create_task(
+            watch_health(self.health, self.health_check_interval_sec, self.request_escalation)
+        )
 
-        chat_max_turns = _read_positive_int_env("CHAT_MAX_TURNS", DEFAULT_MAX_TURNS)
-        chat_store = ChatStore(history_file=CHAT_HISTORY_FILE, max_turns=chat_max_turns)
-        chat_store.load()
-        chat_reasoning_overrides: dict = {}
-        config_ref = {"value": config}
-        core = build_bridge_core(lambda: config_ref["value"], chat_store)
-        command_service = build_command_service(
-            config_ref,
-            chat_store,
-            chat_reasoning_overrides,
+
+def build_feishu_service(
+    config,
+    chat_store: ChatStore,
+    logger: logging.Logger,
+    codex_scheduler: Optional[CodexScheduler] = None,
+    project_locks: Optional[ProjectLockManager] = None,
+    worktrees: Optional[WorktreeManager] = None,
+    codex_retry: Optional[CodexRetryPolicy] = None,
+    latency: Optional[LatencyTracker] = None,
+) -> FeishuService:
+    if not config.feishu_app_id or not config.feishu_app_secret:
+        raise ValueError("缺少 FEISHU_APP_ID 或 FEISHU_APP_SECRET。")
+    event_mode = os.getenv("FEISHU_EVENT_MODE", "").strip().lower() or "ws"
+    if event_mode not in {"ws", "webhook"}:
+        raise ValueError(f"不支持的 FEISHU_EVENT_MODE：{event_mode}（可选 ws / webhook）")
+    encrypt_key = os.getenv("FEISHU_ENCRYPT_KEY", "").strip()
+    verification_token = os.getenv("FEISHU_VERIFICATION_TOKEN", "").strip()
+    # 两者都为空时 SDK 跳过令牌和签名校验，任何能访问端口的人都能伪造消息事件触发 Codex。
+    if event_mode == "webhook" and not (encrypt_key or verification_token):
+        raise ValueError(
+            "webhook 模式需要设置 FEISHU_VERIFICATION_TOKEN 或 FEISHU_ENCRYPT_KEY，否则无法校验回调来源。"
+        )
+
+    chat_reasoning_overrides: dict = {}
+    escalation: dict = {}
+    config_ref = {"value": config}
+    project_service = FeishuProjectService(
+        config_ref, os.path.join(REPO_ROOT, ".env"), chat_projects_path=CHAT_PROJECTS_FILE
+    )
+    if project_locks is None:
+        project_locks = ProjectLockManager(
+            allow_shared_reads=read_bool_env("PROJECT_LOCK_SHARED_READS", True)
+        )
+    if worktrees is None and read_bool_env("CODEX_WORKTREES", False):
+        worktrees = WorktreeManager(
+            os.getenv("CODEX_WORKTREE_ROOT", "").strip() or WORKTREES_DIR,
+            idle_sec=read_positive_float_env("CODEX_WORKTREE_IDLE_SEC", DEFAULT_WORKTREE_IDLE_SEC),
+        )
+    if codex_retry is None:
+        codex_retry = CodexRetryPolicy(
+            max_attempts=read_positive_int_env("CODEX_MAX_ATTEMPTS", DEFAULT_CODEX_MAX_ATTEMPTS),
+            breaker=CodexCircuitBreaker(
+                failure_threshold=read_positive_int_env(
+                    "CODEX_BREAKER_THRESHOLD", DEFAULT_CODEX_BREAKER_THRESHOLD
+                ),
+                cooldown_sec=read_positive_float_env(
+                    "CODEX_BREAKER_COOLDOWN_SEC", DEFAULT_CODEX_BREAKER_COOLDOWN_SEC
+                ),
+            ),
+        )
+    if latency is None:
+        latency = LatencyTracker(
+            CODEX_LATENCY_FILE,
+            adaptive_timeouts=read_bool_env("CODEX_ADAPTIVE_TIMEOUT", False),
+            percentile=read_positive_float_env(
+                "CODEX_TIMEOUT_PERCENTILE", DEFAULT_TIMEOUT_PERCENTILE
+            ),
+            floor_sec=read_positive_float_env("CODEX_TIMEOUT_FLOOR_SEC", DEFAULT_TIMEOUT_FLOOR_SEC),
+        )
+        latency.load()
+    core = build_bridge_core(
+        lambda: config_ref["value"],
+        chat_store,
+        codex_scheduler=codex_scheduler,
+        project_service=project_service,
+        project_locks=project_locks,
+        worktrees=worktrees,
+        codex_retry=codex_retry,
+        latency=latency,
+    )
+    loop_monitor = LoopLagMonitor(
+        logger,
+        interval_sec=read_positive_float_env("BOT_LOOP_LAG_INTERVAL_SEC", 0.5),
+        stall_threshold_sec=read_positive_float_env("BOT_LOOP_LAG_THRESHOLD_SEC", 0.25),
+    )
+    health = FeishuHealthManager(
+        max_reconnects_per_window=read_positive_int_env("FEISHU_MAX_RECONNECTS_PER_WINDOW", 5),
+        reconnect_window_sec=read_positive_float_env("FEISHU_RECONNECT_WINDOW_SEC", 300.0),
+        max_disconnected_sec=read_positive_float_env("FEISHU_MAX_DISCONNECTED_SEC", 600.0),
+    )
+
+    async def deliver_background_job(job, outbound) -> None:
+        await _send_outbound(adapter, api_client, job.reply_target, outbound, logger)
+
+    background_jobs = BackgroundJobManager(
+        "feishu",
+        core=core,
+        deliver=deliver_background_job,
+        logger=logger,
+        max_running=read_positive_int_env("BG_JOBS_MAX_RUNNING", DEFAULT_BG_MAX_RUNNING),
+        max_jobs_per_chat=read_positive_int_env(
+            "BG_JOBS_MAX_PER_CHAT", DEFAULT_BG_MAX_JOBS_PER_CHAT
+        ),
+    )
+    command_service = build_command_service(
+        config_ref,
+        chat_store,
+        chat_reasoning_overrides,
+        loop_monitor=loop_monitor,
+        health=health,
+        codex_scheduler=codex_scheduler,
+        background_jobs=background_jobs,
+        project_service=project_service,
+        worktrees=worktrees,
+        codex_retry=codex_retry,
+    )
+    event_dedupe = FeishuEventDedupe(path=FEISHU_EVENT_STATE_FILE)
+    event_dedupe.load()
+    image_cache = FeishuImageKeyCache(
+        path=FEISHU_IMAGE_CACHE_FILE,
+        max_entries=read_positive_int_env("FEISHU_IMAGE_CACHE_MAX_ENTRIES", 512),
+    )
+    image_cache.load()
+    inbox = MessageInbox(
+        FEISHU_INBOX_FILE,
+        recovery_window_sec=read_positive_float_env(
+            "INBOX_RECOVERY_WINDOW_SEC", DEFAULT_INBOX_RECOVERY_WINDOW_SEC
+        ),
+        max_attempts=read_positive_int_env("INBOX_MAX_ATTEMPTS", DEFAULT_INBOX_MAX_ATTEMPTS),
+    )
+    inbox.load()
+    recovery_ref: dict = {}
+    image_fetcher = RemoteImageFetcher(
+        max_bytes=read_positive_int_env("FEISHU_IMAGE_MAX_BYTES", DEFAULT_IMAGE_MAX_BYTES),
+    )
+    runtime = FeishuRuntime(
+        logger,
+        max_pending=read_positive_int_env("FEISHU_MAX_PENDING_EVENTS", 256),
+        max_concurrency=read_positive_int_env("FEISHU_MAX_CONCURRENCY", 4),
+    )
+    api_client = FeishuApiClient(
+        config.feishu_app_id,
+        config.feishu_app_secret,
+        base_url=os.getenv("FEISHU_API_BASE_URL", "").strip() or DEFAULT_FEISHU_BASE_URL,
+        on_call=health.record_api_call,
+    )
+    adapter = FeishuAdapter(
+        image_cache=image_cache,
+        fetcher=image_fetcher,
+        message_max_chars=read_positive_int_env(
+            "FEISHU_MESSAGE_MAX_CHARS", DEFAULT_MESSAGE_MAX_CHARS
+        ),
+        file_threshold_chars=read_positive_int_env(
+            "FEISHU_REPLY_FILE_THRESHOLD_CHARS", DEFAULT_FILE_THRESHOLD_CHARS
+        ),
+    )
+    client_ref: dict = {}
+    event_handler = build_event_handler(
+        core,
+        client_ref,
+        logger,
+        command_service=command_service,
+        chat_reasoning_overrides=chat_reasoning_overrides,
+        loop_monitor=loop_monitor,
+        event_dedupe=event_dedupe,
+        runtime=runtime,
+        preview_driver_factory=build_preview_driver_factory(api_client),
+        adapter=adapter,
+        health=health,
+        encrypt_key=encrypt_key,
+        verification_token=verification_token,
+        inbox=inbox,
+        recovery_ref=recovery_ref,
+    )
+    escalate_exit_code = read_positive_int_env("FEISHU_ESCALATE_EXIT_CODE", 75)
+
+    def request_escalation(reason: str) -> None:
+        escalation["exit_code"] = escalate_exit_code
+        logger.error(
+            "Feishu escalation requested: reason=%s exit_code=%s",
+            reason,
+            escalate_exit_code,
         )
-        api_client = build_api_client(config)
-        client_ref: dict = {}
-        event_handler = build_event_handler(
-            core,
-            client_ref,
+        # 信号处理在主线程执行，打断 ws 循环后走正常的收尾流程。
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    def on_reconnecting() -> None:
+        decision = health.record_disconnect(now=time.monotonic())
+        logger.warning("飞书长连接断开，SDK 正在重连：state=%s", health.state)
+        if decision.should_escalate_process:
+            request_escalation(decision.reason)
+
+    def on_reconnected() -> None:
+        health.record_reconnected(now=time.monotonic())
+        logger.info("飞书长连接已恢复。")
+
+    service = FeishuService(
+        runtime=runtime,
+        api_client=api_client,
+        event_handler=event_handler,
+        health=health,
+        loop_monitor=loop_monitor,
+        event_mode=event_mode,
+        drain_timeout_sec=read_positive_float_env("FEISHU_DRAIN_TIMEOUT_SEC", 30.0),
+        health_check_interval_sec=read_positive_float_env(
+            "FEISHU_HEALTH_CHECK_INTERVAL_SEC", 30.0
+        ),
+        request_escalation=request_escalation,
+        escalation=escalation,
+        recover_inbox=recovery_ref.get("recover"),
+        background_jobs=background_jobs,
+    )
+    if event_mode == "webhook":
+        service.webhook_server = FeishuWebhookServer(
+            event_handler,
             logger,
-            command_service=command_service,
-            chat_reasoning_overrides=chat_reasoning_overrides,
+            host=os.getenv("FEISHU_WEBHOOK_HOST", "").strip() or DEFAULT_WEBHOOK_HOST,
+            port=read_positive_int_env("FEISHU_WEBHOOK_PORT", 8080),
+            path=os.getenv("FEISHU_WEBHOOK_PATH", "").strip() or DEFAULT_WEBHOOK_PATH,
         )
+    else:
         ws_client = lark.ws.Client(
             config.feishu_app_id,
             config.feishu_app_secret,
             event_handler=event_handler,
             log_level=lark.LogLevel.INFO,
         )
-        client_ref["client"] = api_client
-        logger.info("Feishu bot is running.")
-        ws_client.start()
-        return 0
+        ws_client.on_reconnecting = on_reconnecting
+        ws_client.on_reconnected = on_reconnected
+        service.ws_client = ws_client
+    client_ref["client"] = api_client
+    runtime.shutdown_hooks.append(api_client.aclose)
+    runtime.shutdown_hooks.append(image_fetcher.aclose)
+    runtime.shutdown_hooks.append(lambda: asyncio.to_thread(event_dedupe.flush))
+    runtime.shutdown_hooks.append(lambda: asyncio.to_thread(latency.flush))
+    return service
+
+
+def main() -> int:
+    setup_logging()
+    logger = logging.getLogger(__name__)
+    escalation: dict = {}
+    try:
+        config = load_config(require_telegram_bot_token=False)
+        chat_max_turns = read_positive_int_env("CHAT_MAX_TURNS", DEFAULT_MAX_TURNS)
+        chat_store = ChatStore(history_file=CHAT_HISTORY_FILE, max_turns=chat_max_turns)
+        chat_store.load()
+        service = build_feishu_service(config, chat_store, logger)
+        escalation = service.escalation
+        runtime = service.runtime
+        webhook_server = service.webhook_server
+        runtime.start()
+        runtime.call_soon(service.start_watchers)
+        previous_sigterm = signal.signal(signal.SIGTERM, _raise_system_exit)
+        logger.info("Feishu bot is running: mode=%s", service.event_mode)
+        try:
+            if webhook_server is not None:
+                asyncio.run_coroutine_threadsafe(webhook_server.start(), runtime.loop).result(
+                    timeout=10
+                )
+                _wait_for_signal()
+            else:
+                service.ws_client.start()
+        finally:
+            signal.signal(signal.SIGTERM, previous_sigterm)
+            if webhook_server is not None and runtime.loop is not None:
+                # 先停止接收新回调，再等待在途任务，避免应答了 200 的事件在收尾时被丢弃。
+                try:
+                    asyncio.run_coroutine_threadsafe(webhook_server.stop(), runtime.loop).result(
+                        timeout=5
+                    )
+                except Exception:
+                    logger.exception("关闭飞书事件回调服务失败")
+            logger.info("飞书 bot 正在退出，等待在途任务完成（剩余 %s 个）。", runtime.pending)
+            runtime.drain(service.drain_timeout_sec)
+        return escalation.get("exit_code", 0)
+    except SystemExit:
+        return escalation.get("exit_code", 0)
     except Exception:
         logger.exception("Feishu bot startup failed")
         return 1
 
 
+async def watch_health(
+    health: FeishuHealthManager,
+    interval_sec: float,
+    request_escalation: Callable[[str], None],
+) -> None:
+    while True:
+        await asyncio.sleep(interval_sec)
+        decision = health.check(now=time.monotonic())
+        if decision.should_escalate_process:
+            request_escalation(decision.reason)
+            return
+
+
+def _wait_for_signal() -> None:
+    # webhook 模式下主线程只负责等待 SIGTERM/SIGINT，业务都在运行时线程里。
+    while True:
+        time.sleep(3600)
+
+
+def _raise_system_exit(signum, frame) -> None:
+    # SIGTERM 打断 ws SDK 的事件循环，交给 main 的 finally 做收尾。
+    raise SystemExit(0)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
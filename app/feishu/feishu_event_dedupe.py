@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+
+# 飞书在 ack 变慢时会重投事件；按 event_id 与 message_id 记录最近处理过的事件，
+# 并落盘，保证重启后同一条消息也不会再触发一次完整的 Codex 调用。
+# 落盘在后台定时器线程里按 flush_interval_sec 合并进行，不阻塞收事件的事件循环；退出时调用 flush。
+class FeishuEventDedupe:
+    def __init__(
+        self,
+        path: Optional[str | Path] = None,
+        max_entries: int = 2048,
+        ttl_sec: float = 24 * 3600,
+        clock: Callable[[], float] = time.time,
+        flush_interval_sec: float = 1.0,
+    ):
+        self.path = Path(path) if path else None
+        self.max_entries = max(1, max_entries)
+        self.ttl_sec = ttl_sec
+        self.clock = clock
+        self.flush_interval_sec = flush_interval_sec
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+
+    def load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return
+        entries = payload.get("entries") if isinstance(payload, dict) else None
+        if not isinstance(entries, list):
+            return
+        with self._lock:
+            self._load_entries_locked(entries)
+
+    def _load_entries_locked(self, entries: list) -> None:
+        self._entries.clear()
+        for item in entries:
+            if (
+                isinstance(item, list)
+                and len(item) == 2
+                and isinstance(item[0], str)
+                and isinstance(item[1], (int, float))
+            ):
+                self._entries[item[0]] = float(item[1])
+        self._prune(self.clock())
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            self._dirty = False
+            payload = {"entries": [[key, ts] for key, ts in self._entries.items()]}
+        with self._save_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            tmp_path.write_text(json.dumps(payload, ensure_ascii=True) + "\n", encoding="utf-8")
+            os.replace(tmp_path, self.path)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            dirty = self._dirty
+        if dirty:
+            self.save()
+
+    def _flush_from_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+        try:
+            self.save()
+        except OSError:
+            # 写盘失败时保留脏标记，下一次变更或退出时再试。
+            with self._lock:
+                self._dirty = True
+
+    def _schedule_save_locked(self) -> None:
+        self._dirty = True
+        if self.path is None or self._timer is not None:
+            return
+        self._timer = threading.Timer(self.flush_interval_sec, self._flush_from_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _prune(self, now: float) -> None:
+        while self._entries:
+            key, ts = next(iter(self._entries.items()))
+            if len(self._entries) > self.max_entries or now - ts > self.ttl_sec:
+                self._entries.popitem(last=False)
+                continue
+            break
+
+    def seen(self, event_id: str = "", message_id: str = "") -> bool:
+        keys = []
+        if event_id:
+            keys.append(f"event:{event_id}")
+        if message_id:
+            keys.append(f"message:{message_id}")
+        if not keys:
+            return False
+        now = self.clock()
+        with self._lock:
+            self._prune(now)
+            if any(key in self._entries for key in keys):
+                self.hits += 1
+                return True
+            self.misses += 1
+            for key in keys:
+                self._entries[key] = now
+            self._prune(now)
+            self._schedule_save_locked()
+        return False
+
+    def forget(self, event_id: str = "", message_id: str = "") -> None:
+        # 事件最终没有被处理（例如运行时拒收）时撤销标记，飞书重投时可以再处理一次。
+        with self._lock:
+            if event_id:
+                self._entries.pop(f"event:{event_id}", None)
+            if message_id:
+                self._entries.pop(f"message:{message_id}", None)
+            self._schedule_save_locked()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
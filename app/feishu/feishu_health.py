@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Optional
+
+from app.config.polling_health import RecoveryDecision
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+# 飞书长连接健康：对应 Telegram 的 PollingHealthManager。
+# SDK 自己负责断线重连，这里只统计重连、事件投递延迟与 API 调用结果，
+# 在重连风暴、长时间断线或持续 API 失败时给出升级（退出进程交给守护脚本拉起）的决定。
+class FeishuHealthManager:
+    def __init__(
+        self,
+        max_reconnects_per_window: int = 5,
+        reconnect_window_sec: float = 300.0,
+        max_disconnected_sec: float = 600.0,
+        error_rate_threshold: float = 0.5,
+        min_error_samples: int = 10,
+        api_sample_size: int = 200,
+    ):
+        self.max_reconnects_per_window = max(1, int(max_reconnects_per_window))
+        self.reconnect_window_sec = max(1.0, float(reconnect_window_sec))
+        self.max_disconnected_sec = max(1.0, float(max_disconnected_sec))
+        self.error_rate_threshold = min(1.0, max(0.0, float(error_rate_threshold)))
+        self.min_error_samples = max(1, int(min_error_samples))
+
+        self.state = "healthy"
+        self.connected = True
+        self.disconnected_since = 0.0
+        self.last_event = ""
+        self.last_event_monotonic = 0.0
+        self.last_delivery_lag_sec = 0.0
+        self.max_delivery_lag_sec = 0.0
+        self.reconnect_timestamps: list[float] = []
+        self.total_reconnects = 0
+        self.escalated_reason = ""
+        # (耗时秒, 是否成功)，只保留最近 api_sample_size 次调用。
+        self._api_samples: deque[tuple[float, bool]] = deque(maxlen=max(1, int(api_sample_size)))
+        self._lock = threading.Lock()
+
+    def _prune_window(self, now: float) -> None:
+        cutoff = now - self.reconnect_window_sec
+        self.reconnect_timestamps = [ts for ts in self.reconnect_timestamps if ts >= cutoff]
+
+    def _escalate(self, reason: str) -> RecoveryDecision:
+        self.state = "escalated"
+        self.escalated_reason = reason
+        return RecoveryDecision(should_escalate_process=True, reason=reason)
+
+    def record_disconnect(self, now: float) -> RecoveryDecision:
+        with self._lock:
+            self.connected = False
+            if not self.disconnected_since:
+                self.disconnected_since = now
+            self.reconnect_timestamps.append(now)
+            self.total_reconnects += 1
+            self._prune_window(now)
+            self.last_event = "disconnected"
+            if self.state == "escalated":
+                return RecoveryDecision(reason="disconnected")
+            if len(self.reconnect_timestamps) > self.max_reconnects_per_window:
+                return self._escalate("reconnect_storm")
+            self.state = "recovering"
+            return RecoveryDecision(reason="disconnected")
+
+    def record_reconnected(self, now: float) -> None:
+        with self._lock:
+            self.connected = True
+            self.disconnected_since = 0.0
+            self.last_event = "reconnected"
+            if self.state != "escalated":
+                self.state = self._state_from_errors()
+
+    def record_event(self, now: float, delivery_lag_sec: Optional[float] = None) -> None:
+        with self._lock:
+            self.last_event_monotonic = now
+            self.last_event = "event"
+            if delivery_lag_sec is not None and delivery_lag_sec >= 0:
+                self.last_delivery_lag_sec = delivery_lag_sec
+                self.max_delivery_lag_sec = max(self.max_delivery_lag_sec, delivery_lag_sec)
+            # 能收到事件说明长连接是通的。
+            if not self.connected:
+                self.connected = True
+                self.disconnected_since = 0.0
+            if self.state != "escalated":
+                self.state = self._state_from_errors()
+
+    def record_api_call(self, action: str, latency_sec: float, ok: bool) -> None:
+        with self._lock:
+            self._api_samples.append((max(0.0, latency_sec), ok))
+            if not ok:
+                self.last_event = f"api_error:{action}"
+            if self.state != "escalated" and self.connected:
+                self.state = self._state_from_errors()
+
+    def _error_rate(self) -> float:
+        if not self._api_samples:
+            return 0.0
+        failures = sum(1 for _, ok in self._api_samples if not ok)
+        return failures / len(self._api_samples)
+
+    def _state_from_errors(self) -> str:
+        if (
+            len(self._api_samples) >= self.min_error_samples
+            and self._error_rate() >= self.error_rate_threshold
+        ):
+            return "degraded"
+        return "healthy"
+
+    def check(self, now: float) -> RecoveryDecision:
+        # 由周期任务调用：断线超时或 API 持续失败都升级为进程重启。
+        with self._lock:
+            if self.state == "escalated":
+                return RecoveryDecision(reason=self.escalated_reason)
+            if not self.connected and now - self.disconnected_since >= self.max_disconnected_sec:
+                return self._escalate(f"disconnected:{now - self.disconnected_since:.0f}s")
+            if (
+                len(self._api_samples) >= self._api_samples.maxlen
+                and self._error_rate() >= self.error_rate_threshold
+            ):
+                return self._escalate(f"api_error_rate:{self._error_rate():.2f}")
+            return RecoveryDecision()
+
+    def snapshot(self, now: float) -> dict:
+        with self._lock:
+            self._prune_window(now)
+            latencies = sorted(latency for latency, _ in self._api_samples)
+            since_event = now - self.last_event_monotonic if self.last_event_monotonic else None
+            return {
+                "enabled": True,
+                "title": "长连接健康",
+                "state": self.state,
+                "connected": self.connected,
+                "reconnects_in_window": len(self.reconnect_timestamps),
+                "total_reconnects": self.total_reconnects,
+                "since_last_event_sec": since_event,
+                "last_delivery_lag_sec": self.last_delivery_lag_sec,
+                "max_delivery_lag_sec": self.max_delivery_lag_sec,
+                "api_calls": len(self._api_samples),
+                "api_error_rate": self._error_rate(),
+                "api_p50_ms": _percentile(latencies, 50) * 1000,
+                "api_p95_ms": _percentile(latencies, 95) * 1000,
+                "api_p99_ms": _percentile(latencies, 99) * 1000,
+                "last_event": self.last_event,
+            }
+
+
+def render_feishu_health_lines(snapshot: dict) -> list[str]:
+    since_event = snapshot.get("since_last_event_sec")
+    since_text = "none" if since_event is None else f"{since_event:.0f}s"
+    return [
+        f"- 状态={snapshot.get('state', 'healthy')}"
+        f"，连接={'在线' if snapshot.get('connected', True) else '断开'}",
+        f"- 窗口内重连次数={snapshot.get('reconnects_in_window', 0)}"
+        f"，累计={snapshot.get('total_reconnects', 0)}",
+        f"- 距上次事件={since_text}"
+        f"，投递延迟 最近={snapshot.get('last_delivery_lag_sec', 0.0):.1f}s"
+        f" 最大={snapshot.get('max_delivery_lag_sec', 0.0):.1f}s",
+        f"- API：样本={snapshot.get('api_calls', 0)}"
+        f"，错误率={snapshot.get('api_error_rate', 0.0) * 100:.0f}%"
+        f"，p50={snapshot.get('api_p50_ms', 0.0):.0f}ms"
+        f" p95={snapshot.get('api_p95_ms', 0.0):.0f}ms"
+        f" p99={snapshot.get('api_p99_ms', 0.0):.0f}ms",
+        f"- 最近事件={snapshot.get('last_event') or 'none'}",
+    ]
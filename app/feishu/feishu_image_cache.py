@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+def hash_key_for_bytes(data: bytes) -> str:
+    return f"sha256:{hashlib.sha256(data).hexdigest()}"
+
+
+def hash_key_for_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def url_key(url: str, etag: str) -> str:
+    return f"url:{url}|etag:{etag}"
+
+
+# 内容哈希（或 URL + ETag）到飞书 image_key 的 LRU 映射并落盘：
+# 同一张图重复发送时只需一次发消息调用，不必重新上传。
+class FeishuImageKeyCache:
+    def __init__(self, path: Optional[str | Path] = None, max_entries: int = 512):
+        self.path = Path(path) if path else None
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return
+        entries = payload.get("entries") if isinstance(payload, dict) else None
+        if not isinstance(entries, list):
+            return
+        with self._lock:
+            self._entries.clear()
+            for item in entries[-self.max_entries :]:
+                if (
+                    isinstance(item, list)
+                    and len(item) == 2
+                    and all(isinstance(value, str) and value for value in item)
+                ):
+                    self._entries[item[0]] = item[1]
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {"entries": [[key, value] for key, value in self._entries.items()]}
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=True) + "\n", encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str) -> str:
+        with self._lock:
+            image_key = self._entries.get(key, "")
+            if image_key:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return image_key
+
+    def put(self, key: str, image_key: str) -> None:
+        if not key or not image_key:
+            return
+        with self._lock:
+            self._entries[key] = image_key
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,196 @@
+import asyncio
+import itertools
+import os
+import tempfile
+import urllib.request
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlparse
+
+from app.core.lazy_import import LazyModule
+
+httpx = LazyModule("httpx")
+
+# 飞书图片上传上限为 10MB。
+DEFAULT_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_CHUNK_BYTES = 64 * 1024
+ALLOWED_CONTENT_TYPE_PREFIXES = ("image/",)
+# 很多对象存储/CDN 不设置图片类型，这类响应按文件头判断是不是图片。
+OCTET_STREAM_CONTENT_TYPES = ("application/octet-stream", "binary/octet-stream", "")
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+)
+
+
+class ImageFetchError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class FetchedImage:
+    path: str
+    size: int
+    content_type: str
+    etag: str = ""
+
+
+def _temp_suffix(url: str) -> str:
+    return os.path.splitext(urlparse(url).path or "")[1] or ".img"
+
+
+def sniff_image_type(head: bytes) -> str:
+    for signature, content_type in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return ""
+
+
+def _check_content_type(url: str, content_type: str) -> str:
+    # 返回规范化后的类型；octet-stream 先放行，等读到首块数据再用 _resolve_content_type 确认。
+    normalized = (content_type or "").split(";", 1)[0].strip().lower()
+    if normalized in OCTET_STREAM_CONTENT_TYPES:
+        return normalized
+    if not normalized.startswith(ALLOWED_CONTENT_TYPE_PREFIXES):
+        raise ImageFetchError(f"远程图片类型不支持：{normalized or 'unknown'} url={url}")
+    return normalized
+
+
+def _resolve_content_type(url: str, content_type: str, head: bytes) -> str:
+    if content_type.startswith(ALLOWED_CONTENT_TYPE_PREFIXES):
+        return content_type
+    sniffed = sniff_image_type(head)
+    if not sniffed:
+        raise ImageFetchError(f"远程图片类型不支持：{content_type or 'unknown'} url={url}")
+    return sniffed
+
+
+def _check_declared_size(url: str, content_length: Optional[str], max_bytes: int) -> None:
+    try:
+        declared = int(content_length or 0)
+    except ValueError:
+        declared = 0
+    if declared > max_bytes:
+        raise ImageFetchError(f"远程图片过大：{declared} > {max_bytes} url={url}")
+
+
+def download_remote_image(
+    url: str,
+    max_bytes: int = DEFAULT_IMAGE_MAX_BYTES,
+    timeout_sec: float = 15.0,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> str:
+    # 同步版本（SDK 传输路径使用）：分块写盘并限制大小与类型。
+    with urllib.request.urlopen(url, timeout=timeout_sec) as response:
+        content_type = _check_content_type(url, response.headers.get("Content-Type", ""))
+        _check_declared_size(url, response.headers.get("Content-Length"), max_bytes)
+        head = response.read(chunk_bytes)
+        _resolve_content_type(url, content_type, head)
+        chunks = itertools.chain((head,), iter(lambda: response.read(chunk_bytes), b""))
+        return _write_chunks(url, chunks, max_bytes)
+
+
+def _write_chunks(url: str, chunks, max_bytes: int) -> str:
+    size = 0
+    with tempfile.NamedTemporaryFile(delete=False, suffix=_temp_suffix(url)) as tmp:
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ImageFetchError(f"远程图片过大：>{max_bytes} url={url}")
+                tmp.write(chunk)
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+        return tmp.name
+
+
+def _discard_temp(tmp) -> None:
+    tmp.close()
+    os.remove(tmp.name)
+
+
+# 复用连接池的异步图片下载器：流式写入临时文件，限制大小/类型，带连接与读取超时。
+# 临时文件的创建和写入放到线程里，不占用事件循环。
+class RemoteImageFetcher:
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_IMAGE_MAX_BYTES,
+        connect_timeout_sec: float = 5.0,
+        read_timeout_sec: float = 15.0,
+        max_connections: int = 10,
+        chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.connect_timeout_sec = connect_timeout_sec
+        self.read_timeout_sec = read_timeout_sec
+        self.max_connections = max_connections
+        self.chunk_bytes = chunk_bytes
+        self._http = None
+
+    def _client(self):
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    self.read_timeout_sec, connect=self.connect_timeout_sec
+                ),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                follow_redirects=True,
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def head_etag(self, url: str) -> str:
+        try:
+            response = await self._client().head(url)
+        except Exception:
+            return ""
+        if response.status_code >= 400:
+            return ""
+        return (response.headers.get("ETag") or "").strip()
+
+    async def fetch(self, url: str) -> FetchedImage:
+        async with self._client().stream("GET", url) as response:
+            if response.status_code >= 400:
+                raise ImageFetchError(f"远程图片下载失败：HTTP {response.status_code} url={url}")
+            content_type = _check_content_type(url, response.headers.get("Content-Type", ""))
+            _check_declared_size(url, response.headers.get("Content-Length"), self.max_bytes)
+            tmp = await asyncio.to_thread(
+                tempfile.NamedTemporaryFile, delete=False, suffix=_temp_suffix(url)
+            )
+            size = 0
+            try:
+                async for chunk in response.aiter_bytes(self.chunk_bytes):
+                    if size == 0:
+                        content_type = _resolve_content_type(url, content_type, chunk)
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise ImageFetchError(f"远程图片过大：>{self.max_bytes} url={url}")
+                    await asyncio.to_thread(tmp.write, chunk)
+                if size == 0:
+                    content_type = _resolve_content_type(url, content_type, b"")
+                await asyncio.to_thread(tmp.close)
+            except BaseException:
+                _discard_temp(tmp)
+                raise
+            return FetchedImage(
+                path=tmp.name,
+                size=size,
+                content_type=content_type,
+                etag=(response.headers.get("ETag") or "").strip(),
+            )
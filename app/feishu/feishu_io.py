@@ -9,27 +9,72 @@ class FeishuPrivateTextEvent:
     user_id: str
     message_id: str
     text: str
+    event_id: str = ""
+    # 事件在开放平台侧的创建时间（毫秒），用于统计投递延迟。
+    create_time_ms: int = 0
 
 
 def parse_private_text_event(payload: dict) -> Optional[FeishuPrivateTextEvent]:
     event = payload.get("event") or {}
     message = event.get("message") or {}
     sender = ((event.get("sender") or {}).get("sender_id") or {})
+    return _build_private_text_event(
+        chat_type=message.get("chat_type"),
+        message_type=message.get("message_type"),
+        content_raw=message.get("content"),
+        chat_id=message.get("chat_id"),
+        user_id=sender.get("open_id"),
+        message_id=message.get("message_id"),
+        event_id=(payload.get("header") or {}).get("event_id"),
+        create_time=(payload.get("header") or {}).get("create_time"),
+    )
+
+
+def parse_private_text_event_data(data) -> Optional[FeishuPrivateTextEvent]:
+    # 直接读取 SDK 事件对象（P2ImMessageReceiveV1）的属性，省去 marshal 再 json.loads 的往返。
+    event = getattr(data, "event", None)
+    message = getattr(event, "message", None)
+    if message is None:
+        return None
+    sender_id = getattr(getattr(event, "sender", None), "sender_id", None)
+    return _build_private_text_event(
+        chat_type=getattr(message, "chat_type", None),
+        message_type=getattr(message, "message_type", None),
+        content_raw=getattr(message, "content", None),
+        chat_id=getattr(message, "chat_id", None),
+        user_id=getattr(sender_id, "open_id", None),
+        message_id=getattr(message, "message_id", None),
+        event_id=getattr(getattr(data, "header", None), "event_id", None),
+        create_time=getattr(getattr(data, "header", None), "create_time", None),
+    )
+
 
-    if message.get("chat_type") != "p2p":
+def _build_private_text_event(
+    *,
+    chat_type,
+    message_type,
+    content_raw,
+    chat_id,
+    user_id,
+    message_id,
+    event_id,
+    create_time=None,
+) -> Optional[FeishuPrivateTextEvent]:
+    if chat_type != "p2p":
         return None
-    if message.get("message_type") != "text":
+    if message_type != "text":
         return None
 
-    content_raw = message.get("content") or ""
     try:
-        content = json.loads(content_raw)
+        content = json.loads(content_raw or "")
     except json.JSONDecodeError:
         return None
+    if not isinstance(content, dict):
+        return None
 
-    chat_id = (message.get("chat_id") or "").strip()
-    user_id = (sender.get("open_id") or "").strip()
-    message_id = (message.get("message_id") or "").strip()
+    chat_id = (chat_id or "").strip()
+    user_id = (user_id or "").strip()
+    message_id = (message_id or "").strip()
     text = (content.get("text") or "").strip()
     if not chat_id or not user_id or not message_id or not text:
         return None
@@ -39,9 +84,18 @@ def parse_private_text_event(payload: dict) -> Optional[FeishuPrivateTextEvent]:
         user_id=user_id,
         message_id=message_id,
         text=text,
+        event_id=(event_id or "").strip(),
+        create_time_ms=_parse_millis(create_time),
     )
 
 
+def _parse_millis(value) -> int:
+    try:
+        return max(0, int(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
 def build_text_message_request(receive_id: str, text: str, receive_id_type: str = "chat_id"):
     return build_message_request(
         receive_id,
@@ -106,19 +160,8 @@ def build_message_request(
     )
 
 
-def send_private_text(
-    client,
-    receive_id: str,
-    text: str,
-    receive_id_type: str = "chat_id",
-) -> dict:
-    response = client.im.v1.message.create(
-        build_text_message_request(
-            receive_id,
-            text,
-            receive_id_type=receive_id_type,
-        )
-    )
+def _create_message(client, request) -> dict:
+    response = client.im.v1.message.create(request)
     log_id = response.get_log_id() if hasattr(response, "get_log_id") else ""
     if not response.success():
         raise RuntimeError(
@@ -134,6 +177,35 @@ def send_private_text(
     }
 
 
+def send_private_message(
+    client,
+    receive_id: str,
+    msg_type: str,
+    content: dict,
+    receive_id_type: str = "chat_id",
+) -> dict:
+    return _create_message(
+        client,
+        build_message_request(receive_id, msg_type, content, receive_id_type=receive_id_type),
+    )
+
+
+def send_private_text(
+    client,
+    receive_id: str,
+    text: str,
+    receive_id_type: str = "chat_id",
+) -> dict:
+    return _create_message(
+        client,
+        build_text_message_request(
+            receive_id,
+            text,
+            receive_id_type=receive_id_type,
+        ),
+    )
+
+
 def add_typing_reaction(client, message_id: str, emoji_type: str = "Typing") -> dict:
     response = client.im.v1.message_reaction.create(
         build_add_reaction_request(message_id, emoji_type)
@@ -200,8 +272,9 @@ def upload_image(client, image_path: str) -> str:
     return image_key
 
 
-def send_private_image(client, chat_id: str, image_path: str) -> dict:
-    image_key = upload_image(client, image_path)
+def send_private_image(client, chat_id: str, image_path: str, image_key: str = "") -> dict:
+    # 传入已缓存的 image_key 时跳过上传。
+    image_key = image_key or upload_image(client, image_path)
     response = client.im.v1.message.create(
         build_image_message_request(chat_id, image_key)
     )
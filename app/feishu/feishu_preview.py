@@ -0,0 +1,146 @@
+import asyncio
+import time
+from typing import Optional
+
+from app.core.codex_client import extract_progress_text
+from app.core.preview_driver import PreviewDriver
+from app.feishu.feishu_render import DEFAULT_MESSAGE_MAX_CHARS, build_markdown_card
+
+DEFAULT_PREVIEW_TEXT = "已收到，正在思考中，请稍等..."
+DEFAULT_CARD_MAX_CHARS = DEFAULT_MESSAGE_MAX_CHARS
+
+
+# 先发一张交互卡片，随 Codex 事件 PATCH 更新；更新按 throttle_sec 节流合并，
+# 只保留最新文本（尾沿触发），最终答复直接写回同一张卡片。
+class FeishuPreviewDriver(PreviewDriver):
+    def __init__(
+        self,
+        api,
+        chat_id: str,
+        *,
+        initial_text: str = DEFAULT_PREVIEW_TEXT,
+        throttle_sec: float = 1.0,
+        max_chars: int = DEFAULT_CARD_MAX_CHARS,
+    ) -> None:
+        self.api = api
+        self.chat_id = chat_id
+        self.initial_text = initial_text
+        self.throttle_sec = max(0.0, throttle_sec)
+        self.max_chars = max(1, max_chars)
+        self.message_id = ""
+        self.patches = 0
+        self._pending_text: Optional[str] = None
+        self._last_text: Optional[str] = None
+        self._last_update_at = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = asyncio.Lock()
+        self._disabled = False
+
+    @property
+    def has_active_message(self) -> bool:
+        return bool(self.message_id) and not self._disabled
+
+    async def start(self) -> None:
+        if self._disabled or self.message_id:
+            return
+        self._loop = asyncio.get_running_loop()
+        try:
+            result = await self.api.send_message(
+                self.chat_id, "interactive", build_markdown_card(self.initial_text)
+            )
+        except Exception:
+            self._disabled = True
+            return
+        self.message_id = result.get("message_id", "")
+        if not self.message_id:
+            self._disabled = True
+            return
+        self._last_text = self.initial_text
+        self._last_update_at = time.monotonic()
+
+    def on_codex_event(self, evt: dict) -> None:
+        # 在 Codex 工作线程里被调用，切回事件循环再更新卡片。
+        text = extract_progress_text(evt)
+        if not text or self._loop is None or self._disabled:
+            return
+        self._loop.call_soon_threadsafe(self._schedule, text)
+
+    async def update(self, text: str) -> None:
+        self._schedule(text)
+
+    def _schedule(self, text: str) -> None:
+        normalized = self._normalize_text(text)
+        if self._disabled or not self.message_id or not normalized:
+            return
+        self._pending_text = normalized
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        delay = max(0.0, self._last_update_at + self.throttle_sec - time.monotonic())
+        self._flush_task = asyncio.get_running_loop().create_task(self._flush_after(delay))
+
+    async def _flush_after(self, delay: float) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        text, self._pending_text = self._pending_text, None
+        if text is not None:
+            await self._patch(text)
+
+    async def _patch(self, text: str) -> bool:
+        async with self._lock:
+            if self._disabled or not self.message_id:
+                return False
+            if text == self._last_text:
+                return True
+            try:
+                await self.api.update_card(self.message_id, build_markdown_card(text))
+            except Exception:
+                self._disabled = True
+                return False
+            self.patches += 1
+            self._last_text = text
+            self._last_update_at = time.monotonic()
+            return True
+
+    async def _cancel_flush(self) -> None:
+        self._pending_text = None
+        task = self._flush_task
+        self._flush_task = None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def can_complete(self, text: str) -> bool:
+        return self.has_active_message and len((text or "").strip()) <= self.max_chars
+
+    async def complete(self, text: str) -> bool:
+        # 最终答复直接写入预览卡片；放不下或失败时返回 False，由调用方改用普通发送。
+        await self._cancel_flush()
+        if not self.can_complete(text):
+            return False
+        return await self._patch(text.strip())
+
+    async def finalize(self) -> None:
+        await self._cancel_flush()
+        if not self.message_id:
+            return
+        try:
+            await self.api.delete_message(self.message_id)
+        except Exception:
+            pass
+        self.message_id = ""
+
+    async def fail(self, error_text: str) -> None:
+        await self._cancel_flush()
+        normalized = self._normalize_text(error_text)
+        if normalized:
+            await self._patch(normalized)
+
+    def _normalize_text(self, text: str) -> str:
+        value = (text or "").strip()
+        if not value:
+            return ""
+        return value[: self.max_chars]
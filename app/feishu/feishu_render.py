@@ -0,0 +1,155 @@
+import re
+from dataclasses import dataclass
+
+# 卡片消息体上限约 30KB，留出 JSON 结构与转义的余量；中文按 3 字节计约 24KB。
+DEFAULT_MESSAGE_MAX_CHARS = 8000
+# 超过该长度的答复改为上传 Markdown 附件，只在卡片里放开头摘要。
+DEFAULT_FILE_THRESHOLD_CHARS = 30000
+DEFAULT_EXCERPT_CHARS = 1500
+REPLY_FILE_NAME = "reply.md"
+
+_FENCE_PREFIXES = ("```", "~~~")
+_MARKDOWN_RE = re.compile(
+    r"^\s*(```|~~~|#{1,6}\s|[-*+]\s|\d+\.\s|>\s?)|\*\*[^*]+\*\*|`[^`\n]+`|\[[^\]]+\]\([^)]+\)",
+    re.MULTILINE,
+)
+
+
+@dataclass(frozen=True)
+class FeishuRenderedMessage:
+    msg_type: str
+    content: dict
+    # msg_type == "file" 时待上传的全文，上传后 content 才会带上 file_key。
+    file_text: str = ""
+    file_name: str = ""
+
+
+def build_markdown_card(text: str) -> dict:
+    return {
+        "config": {"wide_screen_mode": True, "update_multi": True},
+        "elements": [{"tag": "markdown", "content": text}],
+    }
+
+
+def has_markdown(text: str) -> bool:
+    return bool(_MARKDOWN_RE.search(text or ""))
+
+
+def _is_fence(line: str) -> bool:
+    return line.lstrip().startswith(_FENCE_PREFIXES)
+
+
+def split_blocks(text: str) -> list[str]:
+    # 按结构切块：代码块整体保留，其余按空行分段。
+    blocks: list[str] = []
+    current: list[str] = []
+    in_fence = False
+
+    def flush() -> None:
+        if current:
+            blocks.append("\n".join(current))
+            current.clear()
+
+    for line in text.split("\n"):
+        if _is_fence(line):
+            if in_fence:
+                current.append(line)
+                flush()
+                in_fence = False
+            else:
+                flush()
+                current.append(line)
+                in_fence = True
+            continue
+        if in_fence:
+            current.append(line)
+        elif line.strip():
+            current.append(line)
+        else:
+            flush()
+    flush()
+    return blocks
+
+
+def _hard_slices(text: str, size: int) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)] or [""]
+
+
+def _split_lines(lines: list[str], capacity: int) -> list[list[str]]:
+    pieces: list[list[str]] = []
+    current: list[str] = []
+    used = 0
+    for line in lines:
+        for segment in _hard_slices(line, capacity):
+            cost = len(segment) + (1 if current else 0)
+            if current and used + cost > capacity:
+                pieces.append(current)
+                current, used, cost = [], 0, len(segment)
+            current.append(segment)
+            used += cost
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _split_oversized_block(block: str, max_chars: int) -> list[str]:
+    lines = block.split("\n")
+    if not _is_fence(lines[0]):
+        return ["\n".join(piece) for piece in _split_lines(lines, max_chars)]
+    # 超长代码块按行拆开，每段重新补齐围栏，保证各自都能正确渲染。
+    opening = lines[0]
+    closing = lines[-1] if len(lines) > 1 and _is_fence(lines[-1]) else opening.strip()[:3]
+    inner = lines[1:-1] if len(lines) > 1 and _is_fence(lines[-1]) else lines[1:]
+    capacity = max(1, max_chars - len(opening) - len(closing) - 2)
+    return [
+        "\n".join([opening, *piece, closing]) for piece in _split_lines(inner, capacity)
+    ]
+
+
+def pack_blocks(blocks: list[str], max_chars: int) -> list[str]:
+    # 贪心合并相邻块，尽量少发消息；单块超限时再拆。
+    chunks: list[str] = []
+    current = ""
+    for block in blocks:
+        pieces = [block] if len(block) <= max_chars else _split_oversized_block(block, max_chars)
+        for piece in pieces:
+            if current and len(current) + 2 + len(piece) <= max_chars:
+                current = f"{current}\n\n{piece}"
+                continue
+            if current:
+                chunks.append(current)
+            current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def render_reply_text(
+    text: str,
+    max_chars: int = DEFAULT_MESSAGE_MAX_CHARS,
+    file_threshold_chars: int = DEFAULT_FILE_THRESHOLD_CHARS,
+    excerpt_chars: int = DEFAULT_EXCERPT_CHARS,
+) -> list[FeishuRenderedMessage]:
+    body = (text or "").strip()
+    if not body:
+        return []
+    max_chars = max(1, max_chars)
+    markdown = has_markdown(body)
+
+    if file_threshold_chars > 0 and len(body) > file_threshold_chars:
+        excerpt = pack_blocks(split_blocks(body), max(1, min(excerpt_chars, max_chars)))[0]
+        note = f"（全文共 {len(body)} 字，完整内容见附件 {REPLY_FILE_NAME}）"
+        return [
+            FeishuRenderedMessage("interactive", build_markdown_card(f"{excerpt}\n\n{note}")),
+            FeishuRenderedMessage("file", {}, file_text=body, file_name=REPLY_FILE_NAME),
+        ]
+
+    if len(body) <= max_chars and not markdown:
+        return [FeishuRenderedMessage("text", {"text": body})]
+
+    chunks = pack_blocks(split_blocks(body), max_chars)
+    if not markdown:
+        return [FeishuRenderedMessage("text", {"text": chunk}) for chunk in chunks]
+    return [
+        FeishuRenderedMessage("interactive", build_markdown_card(chunk)) for chunk in chunks
+    ]
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Optional
+
+
+# 飞书 ws SDK 自己占用主线程的事件循环；业务处理放到独立线程的事件循环里执行，
+# 待处理任务数有上限，超出时 submit 返回 False 拒收，由调用方保留或告知用户；
+# 不同会话并行、同一会话按到达顺序串行，退出时等待在途任务完成。
+class FeishuRuntime:
+    def __init__(
+        self,
+        logger: logging.Logger,
+        max_pending: int = 256,
+        max_concurrency: int = 4,
+    ):
+        self.logger = logger
+        self.max_pending = max(1, max_pending)
+        self.max_concurrency = max(1, max_concurrency)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.rejected = 0
+        self._pending = 0
+        self._accepting = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._chat_locks: dict[str, asyncio.Lock] = {}
+        self._chat_waiters: dict[str, int] = {}
+        self.shutdown_hooks: list[Callable[[], Awaitable[None]]] = []
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return self._pending
+
+    @property
+    def accepting(self) -> bool:
+        with self._cond:
+            return self._accepting
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(
+            target=self._thread_main, name="feishu-runtime", daemon=True
+        )
+        self._thread.start()
+        self._ready.wait()
+        with self._cond:
+            self._accepting = True
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        # 多平台同进程时直接复用宿主的事件循环，不再单独起线程。
+        self.loop = loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        with self._cond:
+            self._accepting = True
+
+    def _thread_main(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.loop = loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            pending_tasks = asyncio.all_tasks(loop)
+            for task in pending_tasks:
+                task.cancel()
+            if pending_tasks:
+                loop.run_until_complete(
+                    asyncio.gather(*pending_tasks, return_exceptions=True)
+                )
+            loop.close()
+
+    def call_soon(self, callback: Callable[[], object]) -> None:
+        if self.loop is None:
+            raise RuntimeError("FeishuRuntime 尚未启动")
+        self.loop.call_soon_threadsafe(callback)
+
+    def submit(self, chat_key: str, job: Callable[[], Awaitable[None]]) -> bool:
+        with self._cond:
+            if not self._accepting or self.loop is None:
+                self.rejected += 1
+                self.logger.warning("飞书运行时未在接收任务，拒收：chat=%s", chat_key)
+                return False
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                self.logger.warning(
+                    "飞书待处理任务已满（%s），拒收：chat=%s", self.max_pending, chat_key
+                )
+                return False
+            self._pending += 1
+        # call_soon_threadsafe 会复制调用方的 contextvars，日志上下文随任务一起传过去。
+        self.loop.call_soon_threadsafe(self._spawn, chat_key, job)
+        return True
+
+    def _spawn(self, chat_key: str, job: Callable[[], Awaitable[None]]) -> None:
+        lock = self._chat_locks.get(chat_key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._chat_locks[chat_key] = lock
+        self._chat_waiters[chat_key] = self._chat_waiters.get(chat_key, 0) + 1
+        asyncio.get_running_loop().create_task(self._run(chat_key, lock, job))
+
+    async def _run(
+        self, chat_key: str, lock: asyncio.Lock, job: Callable[[], Awaitable[None]]
+    ) -> None:
+        try:
+            # 先排会话锁再占并发名额，避免同一会话的排队任务占满全局名额。
+            async with lock:
+                async with self._semaphore:
+                    await job()
+        except Exception:
+            self.logger.exception("飞书任务执行失败：chat=%s", chat_key)
+        finally:
+            remaining = self._chat_waiters.get(chat_key, 1) - 1
+            if remaining <= 0:
+                self._chat_waiters.pop(chat_key, None)
+                self._chat_locks.pop(chat_key, None)
+            else:
+                self._chat_waiters[chat_key] = remaining
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify_all()
+
+    def drain(self, timeout_sec: float = 30.0) -> bool:
+        with self._cond:
+            self._accepting = False
+            drained = self._cond.wait_for(lambda: self._pending == 0, timeout=timeout_sec)
+            left = self._pending
+        if not drained:
+            self.logger.warning("飞书在途任务未在 %.0f 秒内完成，剩余 %s 个将被取消。", timeout_sec, left)
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            for hook in self.shutdown_hooks:
+                try:
+                    asyncio.run_coroutine_threadsafe(hook(), loop).result(timeout=5)
+                except Exception:
+                    self.logger.exception("飞书运行时关闭回调执行失败")
+            loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+        self.loop = None
+        return drained
+
+    async def drain_async(self, timeout_sec: float = 30.0) -> bool:
+        # attach 模式下的收尾：在宿主循环里等待在途任务，不能用阻塞的 drain。
+        with self._cond:
+            self._accepting = False
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_sec
+        while self.pending and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        left = self.pending
+        if left:
+            self.logger.warning("飞书在途任务未在 %.0f 秒内完成，剩余 %s 个将被取消。", timeout_sec, left)
+        for hook in self.shutdown_hooks:
+            try:
+                await asyncio.wait_for(hook(), timeout=5)
+            except Exception:
+                self.logger.exception("飞书运行时关闭回调执行失败")
+        self.loop = None
+        return left == 0
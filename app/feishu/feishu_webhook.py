@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from http import HTTPStatus
+from typing import Optional
+
+from app.core.lazy_import import LazyModule
+
+lark = LazyModule("lark_oapi")
+
+DEFAULT_WEBHOOK_HOST = "127.0.0.1"
+DEFAULT_WEBHOOK_PATH = "/feishu/events"
+DEFAULT_MAX_BODY_BYTES = 1024 * 1024
+READ_TIMEOUT_SEC = 10.0
+
+
+# 飞书 HTTP 事件订阅模式：进程内的 asyncio HTTP 服务，把请求交给 SDK 的
+# EventDispatcherHandler 做 challenge 应答、token/签名校验与解密。注册的事件回调只负责
+# 投递到 FeishuRuntime，因此请求在毫秒级内应答，不会因为 3 秒超时触发重推。
+class FeishuWebhookServer:
+    def __init__(
+        self,
+        dispatcher,
+        logger: logging.Logger,
+        host: str = DEFAULT_WEBHOOK_HOST,
+        port: int = 8080,
+        path: str = DEFAULT_WEBHOOK_PATH,
+        max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+    ):
+        self.dispatcher = dispatcher
+        self.logger = logger
+        self.host = host
+        self.port = port
+        self.path = path
+        self.max_body_bytes = max(1, max_body_bytes)
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def bound_port(self) -> int:
+        if self._server is None or not self._server.sockets:
+            return self.port
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.logger.info("飞书事件回调服务已启动：http://%s:%s%s", self.host, self.bound_port, self.path)
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                keep_alive = await self._handle_request(reader, writer)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception:
+            self.logger.exception("处理飞书事件回调连接失败")
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _handle_request(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> bool:
+        request_line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT_SEC)
+        if not request_line:
+            return False
+        try:
+            method, target, version = request_line.decode("latin-1").strip().split(" ", 2)
+        except ValueError:
+            await self._write(writer, HTTPStatus.BAD_REQUEST, b"", keep_alive=False)
+            return False
+        headers = await self._read_headers(reader)
+        keep_alive = version == "HTTP/1.1" and headers.get("Connection", "").lower() != "close"
+
+        try:
+            length = int(headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > self.max_body_bytes:
+            await self._write(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, b"", keep_alive=False)
+            return False
+        # 请求体与请求头共用读超时，慢速发送的连接不会一直占着。
+        body = (
+            await asyncio.wait_for(reader.readexactly(length), READ_TIMEOUT_SEC) if length else b""
+        )
+
+        if target.split("?", 1)[0] != self.path:
+            await self._write(writer, HTTPStatus.NOT_FOUND, b"", keep_alive)
+            return keep_alive
+        if method != "POST":
+            await self._write(writer, HTTPStatus.METHOD_NOT_ALLOWED, b"", keep_alive)
+            return keep_alive
+
+        self.requests += 1
+        raw_request = lark.RawRequest()
+        raw_request.uri = target
+        raw_request.headers = headers
+        raw_request.body = body
+        # dispatcher 只做校验、反序列化和投递，同步调用即可，不会阻塞事件循环太久。
+        response = self.dispatcher.do(raw_request)
+        status = response.status_code or HTTPStatus.OK
+        if status != HTTPStatus.OK:
+            self.logger.warning("飞书事件回调处理失败：status=%s body=%s", status, response.content)
+        await self._write(
+            writer,
+            status,
+            response.content or b"",
+            keep_alive,
+            content_type=(response.headers or {}).get("Content-Type", "application/json"),
+        )
+        return keep_alive
+
+    @staticmethod
+    async def _read_headers(reader: asyncio.StreamReader) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT_SEC)
+            if line in {b"\r\n", b"\n", b""}:
+                return headers
+            name, _, value = line.decode("latin-1").partition(":")
+            # SDK 按 X-Lark-Signature 这类规范大小写取头，这里统一成首字母大写形式。
+            headers["-".join(part.capitalize() for part in name.strip().split("-"))] = value.strip()
+
+    @staticmethod
+    async def _write(
+        writer: asyncio.StreamWriter,
+        status: int,
+        body: bytes,
+        keep_alive: bool,
+        content_type: str = "application/json",
+    ) -> None:
+        phrase = HTTPStatus(status).phrase
+        head = (
+            f"HTTP/1.1 {int(status)} {phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
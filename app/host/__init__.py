@@ -0,0 +1 @@
+"""Multi-platform host that runs every enabled platform in one process."""
@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import os
+import signal
+import threading
+from typing import Optional
+
+from app.config.chat_store import ChatStore
+from app.config.config import load_config
+from app.config.logging_setup import setup_logging
+from app.config.settings import (
+    CHAT_HISTORY_FILE,
+    CODEX_LATENCY_FILE,
+    DEFAULT_MAX_TURNS,
+    WORKTREES_DIR,
+    read_bool_env,
+    read_positive_float_env,
+    read_positive_int_env,
+)
+from app.core.codex_retry import (
+    DEFAULT_CODEX_BREAKER_COOLDOWN_SEC,
+    DEFAULT_CODEX_BREAKER_THRESHOLD,
+    DEFAULT_CODEX_MAX_ATTEMPTS,
+    CodexCircuitBreaker,
+    CodexRetryPolicy,
+)
+from app.core.codex_scheduler import DEFAULT_CODEX_MAX_CONCURRENCY, CodexScheduler
+from app.core.latency_tracker import (
+    DEFAULT_TIMEOUT_FLOOR_SEC,
+    DEFAULT_TIMEOUT_PERCENTILE,
+    LatencyTracker,
+)
+from app.core.metrics import MetricsRegistry
+from app.core.platform_registry import load_platform_registry, select_enabled_platforms
+from app.core.project_locks import ProjectLockManager
+from app.core.worktrees import DEFAULT_WORKTREE_IDLE_SEC, WorktreeManager
+
+SUPPORTED_PLATFORMS = ("telegram", "feishu")
+
+
+# 多平台宿主：同一进程、同一事件循环里跑所有启用的平台，
+# 共用会话存储、Codex 调度器、重试熔断、耗时统计、项目目录锁和指标注册表，全局并发上限与目录互斥才能跨平台生效。
+class MultiPlatformHost:
+    def __init__(
+        self,
+        platforms: list[str],
+        logger: logging.Logger,
+        chat_store: ChatStore,
+        codex_scheduler: CodexScheduler,
+        project_locks: Optional[ProjectLockManager] = None,
+        worktrees: Optional[WorktreeManager] = None,
+        codex_retry: Optional[CodexRetryPolicy] = None,
+        latency: Optional[LatencyTracker] = None,
+    ):
+        self.platforms = platforms
+        self.logger = logger
+        self.chat_store = chat_store
+        self.codex_scheduler = codex_scheduler
+        self.project_locks = project_locks or ProjectLockManager(metrics=codex_scheduler.metrics)
+        self.worktrees = worktrees
+        self.codex_retry = codex_retry or CodexRetryPolicy(metrics=codex_scheduler.metrics)
+        self.latency = latency or LatencyTracker()
+        self.telegram_handlers = None
+        self.telegram_app = None
+        self.feishu_service = None
+        self._stop_event: Optional[asyncio.Event] = None
+
+    def build(self) -> None:
+        # 飞书 ws SDK 在导入时就取走了当前线程的事件循环，必须在 asyncio.run 之前构建，
+        # 否则它会拿到宿主正在运行的循环，后台线程里无法再驱动。
+        if "telegram" in self.platforms:
+            from app.telegram.bot import build_application, build_handlers
+
+            self.telegram_handlers = build_handlers(
+                self.logger,
+                chat_store=self.chat_store,
+                codex_scheduler=self.codex_scheduler,
+                project_locks=self.project_locks,
+                worktrees=self.worktrees,
+                codex_retry=self.codex_retry,
+                latency=self.latency,
+            )
+            self.telegram_handlers.stop_requested_callback = self.request_stop
+            self.telegram_app = build_application(self.telegram_handlers, self.logger)
+        if "feishu" in self.platforms:
+            from app.feishu.feishu_bot import build_feishu_service
+
+            self.feishu_service = build_feishu_service(
+                load_config(require_telegram_bot_token=False),
+                self.chat_store,
+                self.logger,
+                codex_scheduler=self.codex_scheduler,
+                project_locks=self.project_locks,
+                worktrees=self.worktrees,
+                codex_retry=self.codex_retry,
+                latency=self.latency,
+            )
+
+    @property
+    def exit_code(self) -> int:
+        if self.telegram_handlers and self.telegram_handlers.escalate_exit_code_requested:
+            return self.telegram_handlers.escalate_exit_code_requested
+        if self.feishu_service is not None:
+            return self.feishu_service.escalation.get("exit_code", 0)
+        return 0
+
+    def request_stop(self) -> None:
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    async def serve(self) -> int:
+        loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.request_stop)
+        try:
+            await self._start_platforms(loop)
+            self.logger.info("多平台宿主已启动：platforms=%s", ",".join(self.platforms))
+            watcher = loop.create_task(self._watch_platforms())
+            await self._stop_event.wait()
+            watcher.cancel()
+        finally:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(signum)
+            await self._stop_platforms()
+        return self.exit_code
+
+    async def _start_platforms(self, loop: asyncio.AbstractEventLoop) -> None:
+        service = self.feishu_service
+        if service is not None:
+            service.runtime.attach(loop)
+            service.start_watchers()
+            if service.webhook_server is not None:
+                await service.webhook_server.start()
+            else:
+                threading.Thread(
+                    target=service.ws_client.start, name="feishu-ws", daemon=True
+                ).start()
+        app = self.telegram_app
+        if app is not None:
+            handlers = self.telegram_handlers
+            await app.initialize()
+            await handlers.post_init(app)
+            await app.updater.start_polling(
+                timeout=handlers.polling_timeout_sec,
+                bootstrap_retries=handlers.polling_bootstrap_retries,
+                error_callback=lambda exc: handlers.forward_polling_error(app, exc),
+            )
+            await app.start()
+
+    async def _watch_platforms(self) -> None:
+        # Telegram 遇到冲突或升级退出时会自行 stop，宿主跟着整体退出，交给外部守护重启。
+        while True:
+            await asyncio.sleep(1.0)
+            if self.telegram_app is not None and not self.telegram_app.running:
+                self.logger.warning("Telegram 已停止运行，宿主准备退出。")
+                self.request_stop()
+                return
+
+    async def _stop_platforms(self) -> None:
+        app = self.telegram_app
+        if app is not None:
+            try:
+                await self.telegram_handlers.drain(app, "shutdown")
+                if app.updater and app.updater.running:
+                    await app.updater.stop()
+                if app.running:
+                    await app.stop()
+                await self.telegram_handlers.post_shutdown(app)
+                await app.shutdown()
+            except Exception:
+                self.logger.exception("关闭 Telegram 失败")
+        service = self.feishu_service
+        if service is not None:
+            if service.webhook_server is not None:
+                try:
+                    await service.webhook_server.stop()
+                except Exception:
+                    self.logger.exception("关闭飞书事件回调服务失败")
+            self.logger.info(
+                "飞书正在退出，等待在途任务完成（剩余 %s 个）。", service.runtime.pending
+            )
+            await service.runtime.drain_async(service.drain_timeout_sec)
+            await service.loop_monitor.stop()
+        await asyncio.to_thread(self.latency.flush)
+        self.codex_scheduler.shutdown()
+
+
+def main() -> int:
+    setup_logging()
+    logger = logging.getLogger(__name__)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("httpcore").setLevel(logging.WARNING)
+    try:
+        platforms = [
+            platform_id
+            for platform_id in select_enabled_platforms(load_platform_registry())
+            if platform_id in SUPPORTED_PLATFORMS
+        ]
+        if not platforms:
+            raise ValueError("没有可启动的平台：请检查 .env 中的平台凭据或 BOT_PLATFORMS。")
+        chat_max_turns = read_positive_int_env("CHAT_MAX_TURNS", DEFAULT_MAX_TURNS)
+        chat_store = ChatStore(history_file=CHAT_HISTORY_FILE, max_turns=chat_max_turns)
+        chat_store.load()
+        metrics = MetricsRegistry()
+        codex_scheduler = CodexScheduler(
+            max_concurrency=read_positive_int_env(
+                "CODEX_MAX_CONCURRENCY", DEFAULT_CODEX_MAX_CONCURRENCY
+            ),
+            metrics=metrics,
+        )
+        project_locks = ProjectLockManager(
+            allow_shared_reads=read_bool_env("PROJECT_LOCK_SHARED_READS", True),
+            metrics=metrics,
+        )
+        worktrees = None
+        if read_bool_env("CODEX_WORKTREES", False):
+            worktrees = WorktreeManager(
+                os.getenv("CODEX_WORKTREE_ROOT", "").strip() or WORKTREES_DIR,
+                idle_sec=read_positive_float_env(
+                    "CODEX_WORKTREE_IDLE_SEC", DEFAULT_WORKTREE_IDLE_SEC
+                ),
+            )
+        codex_retry = CodexRetryPolicy(
+            max_attempts=read_positive_int_env("CODEX_MAX_ATTEMPTS", DEFAULT_CODEX_MAX_ATTEMPTS),
+            breaker=CodexCircuitBreaker(
+                failure_threshold=read_positive_int_env(
+                    "CODEX_BREAKER_THRESHOLD", DEFAULT_CODEX_BREAKER_THRESHOLD
+                ),
+                cooldown_sec=read_positive_float_env(
+                    "CODEX_BREAKER_COOLDOWN_SEC", DEFAULT_CODEX_BREAKER_COOLDOWN_SEC
+                ),
+                metrics=metrics,
+            ),
+        )
+        latency = LatencyTracker(
+            CODEX_LATENCY_FILE,
+            adaptive_timeouts=read_bool_env("CODEX_ADAPTIVE_TIMEOUT", False),
+            percentile=read_positive_float_env(
+                "CODEX_TIMEOUT_PERCENTILE", DEFAULT_TIMEOUT_PERCENTILE
+            ),
+            floor_sec=read_positive_float_env("CODEX_TIMEOUT_FLOOR_SEC", DEFAULT_TIMEOUT_FLOOR_SEC),
+        )
+        latency.load()
+        host = MultiPlatformHost(
+            platforms,
+            logger,
+            chat_store,
+            codex_scheduler,
+            project_locks,
+            worktrees,
+            codex_retry,
+            latency,
+        )
+        host.build()
+        return asyncio.run(host.serve())
+    except Exception:
+        logger.exception("Multi-platform host startup failed")
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
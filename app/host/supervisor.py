@@ -0,0 +1,313 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.config.logging_setup import setup_logging
+from app.config.settings import REPO_ROOT, read_positive_float_env, read_positive_int_env
+from app.core.platform_registry import (
+    PlatformDefinition,
+    load_platform_registry,
+    select_enabled_platforms,
+)
+
+SUPERVISOR_PID_FILE = "supervisor.pid"
+SUPERVISOR_SOCKET_FILE = "supervisor.sock"
+DEFAULT_ESCALATE_EXIT_CODE = 75
+
+
+# 重启策略：升级退出码表示进程主动要求重启，立即拉起；其他异常退出按指数退避，
+# 进程稳定运行足够久后退避清零；正常退出（0）视为有意停止，不再拉起。
+@dataclass
+class RestartPolicy:
+    base_delay_sec: float = 1.0
+    max_delay_sec: float = 60.0
+    stable_after_sec: float = 60.0
+    escalate_exit_code: int = DEFAULT_ESCALATE_EXIT_CODE
+
+    def next_delay(self, exit_code: int, uptime_sec: float, failures: int) -> Optional[float]:
+        if exit_code == 0:
+            return None
+        if exit_code == self.escalate_exit_code:
+            return 0.0
+        if uptime_sec >= self.stable_after_sec:
+            failures = 0
+        return min(self.max_delay_sec, self.base_delay_sec * (2**failures))
+
+
+@dataclass
+class SupervisedProcess:
+    definition: PlatformDefinition
+    state: str = "pending"
+    pid: Optional[int] = None
+    restarts: int = 0
+    failures: int = 0
+    last_exit_code: Optional[int] = None
+    started_at: float = 0.0
+    next_start_in_sec: float = 0.0
+    process: Optional[asyncio.subprocess.Process] = field(default=None, repr=False)
+
+    def snapshot(self, now: float) -> dict:
+        return {
+            "id": self.definition.id,
+            "state": self.state,
+            "pid": self.pid,
+            "restarts": self.restarts,
+            "last_exit_code": self.last_exit_code,
+            "uptime_sec": round(now - self.started_at, 1) if self.state == "running" else 0.0,
+            "next_start_in_sec": self.next_start_in_sec,
+        }
+
+
+# 进程守护：按 platforms.json 拉起各平台子进程，写 pid 文件与启动日志，
+# 崩溃后按策略重启；收到 SIGTERM 时转发给子进程，等它们排空在途任务后再退出。
+class Supervisor:
+    def __init__(
+        self,
+        definitions: list[PlatformDefinition],
+        logger: logging.Logger,
+        runtime_dir: str = REPO_ROOT,
+        policy: Optional[RestartPolicy] = None,
+        stop_timeout_sec: float = 40.0,
+        python_bin: str = sys.executable,
+        socket_path: str = "",
+    ):
+        self.logger = logger
+        self.runtime_dir = runtime_dir
+        self.policy = policy or RestartPolicy()
+        self.stop_timeout_sec = stop_timeout_sec
+        self.python_bin = python_bin
+        self.socket_path = socket_path or os.path.join(runtime_dir, SUPERVISOR_SOCKET_FILE)
+        self.processes = {d.id: SupervisedProcess(definition=d) for d in definitions}
+        self._stopping: Optional[asyncio.Event] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.runtime_dir, name)
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            "pid": os.getpid(),
+            "processes": [item.snapshot(now) for item in self.processes.values()],
+        }
+
+    def request_stop(self) -> None:
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run(self) -> int:
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.request_stop)
+        await self._start_status_server()
+        tasks = [
+            loop.create_task(self._supervise(item), name=f"supervise-{item.definition.id}")
+            for item in self.processes.values()
+        ]
+        try:
+            await self._stopping.wait()
+        finally:
+            self.logger.info("守护进程正在停止，转发 SIGTERM 给子进程。")
+            await self._stop_children()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._stop_status_server()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(signum)
+        return 0
+
+    async def _supervise(self, item: SupervisedProcess) -> None:
+        while not self._stopping.is_set():
+            await self._spawn(item)
+            exit_code = await item.process.wait()
+            uptime = time.monotonic() - item.started_at
+            item.last_exit_code = exit_code
+            item.pid = None
+            self._remove_pid_file(item)
+            if self._stopping.is_set():
+                item.state = "stopped"
+                return
+            delay = self.policy.next_delay(exit_code, uptime, item.failures)
+            if delay is None:
+                item.state = "exited"
+                self.logger.info("%s 正常退出，不再拉起。", item.definition.id)
+                return
+            if exit_code == self.policy.escalate_exit_code or uptime >= self.policy.stable_after_sec:
+                item.failures = 0
+            else:
+                item.failures += 1
+            item.state = "backoff"
+            item.next_start_in_sec = delay
+            self.logger.warning(
+                "%s 退出：code=%s uptime=%.1fs，%.1f 秒后重启。",
+                item.definition.id,
+                exit_code,
+                uptime,
+                delay,
+            )
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+                item.state = "stopped"
+                return
+            except asyncio.TimeoutError:
+                pass
+            item.restarts += 1
+
+    async def _spawn(self, item: SupervisedProcess) -> None:
+        definition = item.definition
+        log_path = self._path(definition.launch_log_file)
+        env = dict(os.environ)
+        env["PYTHONPATH"] = REPO_ROOT + (
+            os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else ""
+        )
+        with open(log_path, "ab") as log_file:
+            log_file.write(
+                f"[supervisor] ts={time.strftime('%Y-%m-%d %H:%M:%S')} "
+                f"start platform={definition.id} restarts={item.restarts}\n".encode("utf-8")
+            )
+            log_file.flush()
+            item.process = await asyncio.create_subprocess_exec(
+                self.python_bin,
+                os.path.join(REPO_ROOT, definition.entry_script),
+                cwd=self.runtime_dir,
+                env=env,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=log_file,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+        item.pid = item.process.pid
+        item.state = "running"
+        item.started_at = time.monotonic()
+        item.next_start_in_sec = 0.0
+        with open(self._path(definition.pid_file), "w", encoding="utf-8") as f:
+            f.write(f"{item.pid}\n")
+        self.logger.info("已启动 %s：pid=%s", definition.id, item.pid)
+
+    def _remove_pid_file(self, item: SupervisedProcess) -> None:
+        try:
+            os.remove(self._path(item.definition.pid_file))
+        except FileNotFoundError:
+            pass
+
+    async def _stop_children(self) -> None:
+        running = [
+            item
+            for item in self.processes.values()
+            if item.process is not None and item.process.returncode is None
+        ]
+        for item in running:
+            item.state = "stopping"
+            item.process.send_signal(signal.SIGTERM)
+        for item in running:
+            try:
+                await asyncio.wait_for(item.process.wait(), timeout=self.stop_timeout_sec)
+            except asyncio.TimeoutError:
+                self.logger.warning(
+                    "%s 未在 %.0f 秒内退出，强制结束。", item.definition.id, self.stop_timeout_sec
+                )
+                item.process.kill()
+                await item.process.wait()
+            item.state = "stopped"
+            item.last_exit_code = item.process.returncode
+            item.pid = None
+            self._remove_pid_file(item)
+
+    async def _start_status_server(self) -> None:
+        try:
+            os.remove(self.socket_path)
+        except FileNotFoundError:
+            pass
+        self._server = await asyncio.start_unix_server(self._handle_status, path=self.socket_path)
+
+    async def _stop_status_server(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+        try:
+            os.remove(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+    async def _handle_status(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            writer.write(json.dumps(self.snapshot(), ensure_ascii=False).encode("utf-8") + b"\n")
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+async def read_supervisor_status(socket_path: str, timeout_sec: float = 2.0) -> dict:
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_unix_connection(socket_path), timeout=timeout_sec
+    )
+    try:
+        line = await asyncio.wait_for(reader.readline(), timeout=timeout_sec)
+    finally:
+        writer.close()
+    return json.loads(line.decode("utf-8"))
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="按 platforms.json 守护各平台进程")
+    parser.add_argument("platforms", nargs="*", help="要守护的平台 id，默认凭据齐全的全部平台")
+    parser.add_argument("--status", action="store_true", help="打印正在运行的守护进程状态")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    socket_path = os.path.join(REPO_ROOT, SUPERVISOR_SOCKET_FILE)
+    if args.status:
+        try:
+            status = asyncio.run(read_supervisor_status(socket_path))
+        except (OSError, asyncio.TimeoutError):
+            print("守护进程未运行。")
+            return 1
+        print(json.dumps(status, indent=2, ensure_ascii=False))
+        return 0
+
+    setup_logging()
+    logger = logging.getLogger(__name__)
+    registry = load_platform_registry()
+    platform_ids = args.platforms or select_enabled_platforms(registry)
+    unknown = [item for item in platform_ids if item not in registry]
+    if unknown or not platform_ids:
+        logger.error("没有可守护的平台：unknown=%s", ",".join(unknown) or "-")
+        return 1
+    supervisor = Supervisor(
+        [registry[item] for item in platform_ids],
+        logger,
+        policy=RestartPolicy(
+            base_delay_sec=read_positive_float_env("SUPERVISOR_BACKOFF_BASE_SEC", 1.0),
+            max_delay_sec=read_positive_float_env("SUPERVISOR_BACKOFF_MAX_SEC", 60.0),
+            stable_after_sec=read_positive_float_env("SUPERVISOR_STABLE_AFTER_SEC", 60.0),
+            escalate_exit_code=read_positive_int_env(
+                "SUPERVISOR_ESCALATE_EXIT_CODE", DEFAULT_ESCALATE_EXIT_CODE
+            ),
+        ),
+        stop_timeout_sec=read_positive_float_env("SUPERVISOR_STOP_TIMEOUT_SEC", 40.0),
+        socket_path=socket_path,
+    )
+    pid_path = os.path.join(REPO_ROOT, SUPERVISOR_PID_FILE)
+    with open(pid_path, "w", encoding="utf-8") as f:
+        f.write(f"{os.getpid()}\n")
+    try:
+        return asyncio.run(supervisor.run())
+    finally:
+        try:
+            os.remove(pid_path)
+        except FileNotFoundError:
+            pass
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
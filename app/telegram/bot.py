@@ -1,99 +1,53 @@
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-
-from dotenv import load_dotenv
-from telegram.ext import (
-    ApplicationBuilder,
-    CallbackQueryHandler,
-    CommandHandler,
-    MessageHandler,
-    filters,
-)
+from typing import Optional
 
 from app.config.chat_store import ChatStore
 from app.config.config import load_config, migrate_codex_bin_env_if_needed
+from app.config.logging_setup import setup_logging
 from app.config.project_service import ProjectService
+from app.config.settings import (
+    CHAT_HISTORY_FILE,
+    CHAT_PROJECTS_FILE,
+    CODEX_LATENCY_FILE,
+    DEFAULT_MAX_TURNS,
+    REPO_ROOT,
+    SYSTEM_PROMPT,
+    WORKTREES_DIR,
+    read_bool_env,
+    read_positive_float_env,
+    read_positive_int_env,
+)
+from app.core.background_jobs import DEFAULT_BG_MAX_JOBS_PER_CHAT, DEFAULT_BG_MAX_RUNNING
+from app.core.codex_retry import (
+    DEFAULT_CODEX_BREAKER_COOLDOWN_SEC,
+    DEFAULT_CODEX_BREAKER_THRESHOLD,
+    CodexCircuitBreaker,
+    CodexRetryPolicy,
+)
+from app.core.codex_scheduler import CodexScheduler
+from app.core.latency_tracker import (
+    DEFAULT_TIMEOUT_FLOOR_SEC,
+    DEFAULT_TIMEOUT_PERCENTILE,
+    LatencyTracker,
+)
+from app.core.message_inbox import (
+    DEFAULT_INBOX_MAX_ATTEMPTS,
+    DEFAULT_INBOX_RECOVERY_WINDOW_SEC,
+    MessageInbox,
+)
+from app.core.project_locks import ProjectLockManager
+from app.core.reply_outbox import ReplyOutbox
+from app.core.worktrees import DEFAULT_WORKTREE_IDLE_SEC, WorktreeManager
 from app.telegram.handlers import BotHandlers
 
-REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-load_dotenv(os.path.join(REPO_ROOT, ".env"))
-LOG_FILE = os.getenv("BOT_LOG_FILE", os.path.join(REPO_ROOT, "bot.log"))
-
-DEFAULT_MAX_TURNS = 12
 CODEX_MAX_RETRIES = 3
-CHAT_HISTORY_FILE = os.path.join(REPO_ROOT, "chat_histories.json")
 UPDATE_STATE_FILE = os.path.join(REPO_ROOT, "telegram_update_state.json")
+OUTBOX_FILE = os.path.join(REPO_ROOT, "telegram_outbox.json")
+INBOX_FILE = os.path.join(REPO_ROOT, "telegram_inbox.json")
 POLLING_TIMEOUT_SEC = 30
 POLLING_BOOTSTRAP_RETRIES = -1
 
-SYSTEM_PROMPT = (
-    "You are Codex, a pragmatic coding assistant. "
-    "Answer clearly and concisely. Prefer actionable code-level guidance. "
-    "When you want Telegram to send a local image file, always include a Markdown image "
-    "reference with an absolute path, e.g. ![screenshot](/tmp/example.png). "
-    "Only Markdown image syntax starting with ![ triggers Telegram image sending. "
-    "A normal Markdown link like [text](url) is just a link and must not be used when you want Telegram to send an image. "
-    "Do not return only a plain file path for images."
-)
-
-
-def _read_positive_int_env(name: str, default: int) -> int:
-    raw = (os.getenv(name, str(default)) or "").strip()
-    try:
-        value = int(raw)
-    except ValueError:
-        return default
-    return value if value > 0 else default
-
-
-def _read_positive_float_env(name: str, default: float) -> float:
-    raw = (os.getenv(name, str(default)) or "").strip()
-    try:
-        value = float(raw)
-    except ValueError:
-        return default
-    return value if value > 0 else default
-
-
-def _read_bool_env(name: str, default: bool) -> bool:
-    raw = os.getenv(name)
-    if raw is None:
-        return default
-    return raw.strip().lower() not in {"0", "false", "no", "off"}
-
-
-def setup_logging() -> None:
-    max_bytes = _read_positive_int_env("BOT_LOG_MAX_BYTES", 5 * 1024 * 1024)
-    backup_count = _read_positive_int_env("BOT_LOG_BACKUP_COUNT", 5)
-    log_to_stdout = os.getenv("BOT_LOG_TO_STDOUT", "1").strip().lower() not in {
-        "0",
-        "false",
-        "no",
-        "off",
-    }
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
-    root_logger.handlers.clear()
-
-    file_handler = RotatingFileHandler(
-        LOG_FILE,
-        maxBytes=max_bytes,
-        backupCount=backup_count,
-        encoding="utf-8",
-    )
-    file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
-
-    if log_to_stdout:
-        stream_handler = logging.StreamHandler()
-        stream_handler.setFormatter(formatter)
-        root_logger.addHandler(stream_handler)
-
 
 def parse_allowed_user_ids(raw_ids: str, logger: logging.Logger) -> set[int]:
     allowed_user_ids: set[int] = set()
@@ -118,7 +72,15 @@ def resolve_telegram_proxy_url(handlers: BotHandlers, logger: logging.Logger) ->
     return proxy_url
 
 
-def build_handlers(logger: logging.Logger) -> BotHandlers:
+def build_handlers(
+    logger: logging.Logger,
+    chat_store: Optional[ChatStore] = None,
+    codex_scheduler: Optional[CodexScheduler] = None,
+    project_locks: Optional[ProjectLockManager] = None,
+    worktrees: Optional[WorktreeManager] = None,
+    codex_retry: Optional[CodexRetryPolicy] = None,
+    latency: Optional[LatencyTracker] = None,
+) -> BotHandlers:
     config = load_config()
     migrate_codex_bin_env_if_needed(
         env_path=os.path.join(REPO_ROOT, ".env"),
@@ -129,10 +91,53 @@ def build_handlers(logger: logging.Logger) -> BotHandlers:
     project_service = ProjectService(
         initial_project_dir=config.codex_project_dir,
         env_path=os.path.join(REPO_ROOT, ".env"),
+        chat_projects_path=CHAT_PROJECTS_FILE,
     )
-    chat_max_turns = _read_positive_int_env("CHAT_MAX_TURNS", DEFAULT_MAX_TURNS)
-    chat_store = ChatStore(history_file=CHAT_HISTORY_FILE, max_turns=chat_max_turns)
-    chat_store.load()
+    if project_locks is None:
+        project_locks = ProjectLockManager(
+            allow_shared_reads=read_bool_env("PROJECT_LOCK_SHARED_READS", True)
+        )
+    if worktrees is None and read_bool_env("CODEX_WORKTREES", False):
+        worktrees = WorktreeManager(
+            os.getenv("CODEX_WORKTREE_ROOT", "").strip() or WORKTREES_DIR,
+            idle_sec=read_positive_float_env("CODEX_WORKTREE_IDLE_SEC", DEFAULT_WORKTREE_IDLE_SEC),
+        )
+    if codex_retry is None:
+        codex_retry = CodexRetryPolicy(
+            max_attempts=read_positive_int_env("CODEX_MAX_ATTEMPTS", CODEX_MAX_RETRIES),
+            breaker=CodexCircuitBreaker(
+                failure_threshold=read_positive_int_env(
+                    "CODEX_BREAKER_THRESHOLD", DEFAULT_CODEX_BREAKER_THRESHOLD
+                ),
+                cooldown_sec=read_positive_float_env(
+                    "CODEX_BREAKER_COOLDOWN_SEC", DEFAULT_CODEX_BREAKER_COOLDOWN_SEC
+                ),
+            ),
+        )
+    if latency is None:
+        latency = LatencyTracker(
+            CODEX_LATENCY_FILE,
+            adaptive_timeouts=read_bool_env("CODEX_ADAPTIVE_TIMEOUT", False),
+            percentile=read_positive_float_env(
+                "CODEX_TIMEOUT_PERCENTILE", DEFAULT_TIMEOUT_PERCENTILE
+            ),
+            floor_sec=read_positive_float_env("CODEX_TIMEOUT_FLOOR_SEC", DEFAULT_TIMEOUT_FLOOR_SEC),
+        )
+        latency.load()
+    if chat_store is None:
+        chat_max_turns = read_positive_int_env("CHAT_MAX_TURNS", DEFAULT_MAX_TURNS)
+        chat_store = ChatStore(history_file=CHAT_HISTORY_FILE, max_turns=chat_max_turns)
+        chat_store.load()
+    outbox = ReplyOutbox(OUTBOX_FILE)
+    outbox.load()
+    inbox = MessageInbox(
+        INBOX_FILE,
+        recovery_window_sec=read_positive_float_env(
+            "INBOX_RECOVERY_WINDOW_SEC", DEFAULT_INBOX_RECOVERY_WINDOW_SEC
+        ),
+        max_attempts=read_positive_int_env("INBOX_MAX_ATTEMPTS", DEFAULT_INBOX_MAX_ATTEMPTS),
+    )
+    inbox.load()
 
     return BotHandlers(
         config=config,
@@ -143,32 +148,103 @@ def build_handlers(logger: logging.Logger) -> BotHandlers:
         codex_max_retries=CODEX_MAX_RETRIES,
         polling_timeout_sec=POLLING_TIMEOUT_SEC,
         polling_bootstrap_retries=POLLING_BOOTSTRAP_RETRIES,
-        polling_restart_threshold=_read_positive_int_env(
+        polling_restart_threshold=read_positive_int_env(
             "TELEGRAM_POLLING_RESTART_THRESHOLD", 3
         ),
-        polling_restart_cooldown_sec=_read_positive_float_env(
+        polling_restart_cooldown_sec=read_positive_float_env(
             "TELEGRAM_POLLING_RESTART_COOLDOWN_SEC", 20.0
         ),
-        wake_watchdog_interval_sec=_read_positive_float_env(
+        wake_watchdog_interval_sec=read_positive_float_env(
             "TELEGRAM_WAKE_WATCHDOG_INTERVAL_SEC", 20.0
         ),
-        wake_gap_threshold_sec=_read_positive_float_env(
+        wake_gap_threshold_sec=read_positive_float_env(
             "TELEGRAM_WAKE_GAP_THRESHOLD_SEC", 90.0
         ),
         system_prompt=SYSTEM_PROMPT,
-        polling_max_restarts_per_window=_read_positive_int_env(
+        polling_max_restarts_per_window=read_positive_int_env(
             "TELEGRAM_POLLING_MAX_RESTARTS_PER_WINDOW", 4
         ),
-        polling_restart_window_sec=_read_positive_float_env(
+        polling_restart_window_sec=read_positive_float_env(
             "TELEGRAM_POLLING_RESTART_WINDOW_SEC", 300.0
         ),
-        polling_escalate_exit_code=_read_positive_int_env(
+        polling_escalate_exit_code=read_positive_int_env(
             "TELEGRAM_ESCALATE_EXIT_CODE", 75
         ),
         update_state_path=UPDATE_STATE_FILE,
+        loop_lag_interval_sec=read_positive_float_env("BOT_LOOP_LAG_INTERVAL_SEC", 0.5),
+        loop_lag_threshold_sec=read_positive_float_env(
+            "BOT_LOOP_LAG_THRESHOLD_SEC", 0.25
+        ),
+        codex_scheduler=codex_scheduler,
+        drain_timeout_sec=read_positive_float_env("TELEGRAM_DRAIN_TIMEOUT_SEC", 30.0),
+        outbox=outbox,
+        inbox=inbox,
+        project_locks=project_locks,
+        worktrees=worktrees,
+        codex_retry=codex_retry,
+        latency=latency,
+        bg_max_running=read_positive_int_env("BG_JOBS_MAX_RUNNING", DEFAULT_BG_MAX_RUNNING),
+        bg_max_jobs_per_chat=read_positive_int_env(
+            "BG_JOBS_MAX_PER_CHAT", DEFAULT_BG_MAX_JOBS_PER_CHAT
+        ),
     )
 
 
+def build_application(
+    handlers: BotHandlers, logger: logging.Logger, base_url: str = ""
+):
+    # telegram.ext 较重，只在真正构建 Application 时导入。
+    from telegram.ext import (
+        ApplicationBuilder,
+        CallbackQueryHandler,
+        CommandHandler,
+        MessageHandler,
+        filters,
+    )
+
+    from app.telegram.telegram_drain import build_update_processor
+
+    effective_proxy_url = resolve_telegram_proxy_url(handlers, logger)
+
+    builder = ApplicationBuilder().token(handlers.config.telegram_bot_token)
+    if base_url:
+        builder = builder.base_url(base_url)
+    if effective_proxy_url:
+        builder = builder.proxy(effective_proxy_url).get_updates_proxy(
+            effective_proxy_url
+        )
+    builder = builder.post_init(handlers.post_init).post_shutdown(
+        handlers.post_shutdown
+    )
+    builder = builder.concurrent_updates(
+        build_update_processor(handlers.inflight_updates)
+    )
+    app = builder.build()
+
+    app.add_handler(CommandHandler("start", handlers.start))
+    app.add_handler(CommandHandler("new", handlers.new_chat))
+    app.add_handler(CommandHandler("skills", handlers.skills))
+    app.add_handler(CommandHandler("status", handlers.status))
+    app.add_handler(CommandHandler("setproject", handlers.setproject))
+    app.add_handler(CommandHandler("setreasoning", handlers.setreasoning))
+    app.add_handler(
+        CallbackQueryHandler(handlers.on_reasoning_button, pattern=r"^set_reasoning:")
+    )
+    app.add_handler(CommandHandler("models", handlers.models))
+    app.add_handler(CallbackQueryHandler(handlers.on_model_button, pattern=r"^set_model:"))
+    app.add_handler(CommandHandler("getproject", handlers.getproject))
+    app.add_handler(CommandHandler("history", handlers.history))
+    app.add_handler(
+        CommandHandler(["bg", "jobs", "job"], handlers.background_job_command)
+    )
+    app.add_handler(CommandHandler("drain", handlers.drain_command))
+    app.add_handler(
+        MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.handle_message)
+    )
+    app.add_error_handler(handlers.on_error)
+    return app
+
+
 def main() -> int:
     setup_logging()
     logger = logging.getLogger(__name__)
@@ -176,42 +252,18 @@ def main() -> int:
     logging.getLogger("httpcore").setLevel(logging.WARNING)
     try:
         handlers = build_handlers(logger)
-        effective_proxy_url = resolve_telegram_proxy_url(handlers, logger)
-
-        builder = ApplicationBuilder().token(handlers.config.telegram_bot_token)
-        if effective_proxy_url:
-            builder = builder.proxy(effective_proxy_url).get_updates_proxy(
-                effective_proxy_url
-            )
-        builder = builder.post_init(handlers.post_init).post_shutdown(
-            handlers.post_shutdown
-        )
-        app = builder.build()
-
-        app.add_handler(CommandHandler("start", handlers.start))
-        app.add_handler(CommandHandler("new", handlers.new_chat))
-        app.add_handler(CommandHandler("skills", handlers.skills))
-        app.add_handler(CommandHandler("status", handlers.status))
-        app.add_handler(CommandHandler("setproject", handlers.setproject))
-        app.add_handler(CommandHandler("setreasoning", handlers.setreasoning))
-        app.add_handler(
-            CallbackQueryHandler(handlers.on_reasoning_button, pattern=r"^set_reasoning:")
-        )
-        app.add_handler(CommandHandler("models", handlers.models))
-        app.add_handler(CallbackQueryHandler(handlers.on_model_button, pattern=r"^set_model:"))
-        app.add_handler(CommandHandler("getproject", handlers.getproject))
-        app.add_handler(CommandHandler("history", handlers.history))
-        app.add_handler(
-            MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.handle_message)
-        )
-        app.add_error_handler(handlers.on_error)
+        handlers.handle_stop_signals = True
+        app = build_application(handlers, logger)
 
         logger.info(
             "Bot is running with model: %s",
             handlers.config.codex_model or "default codex config",
         )
+        # 停止信号由 handlers 接管：先排空在途 update 再退出。
         app.run_polling(
-            timeout=POLLING_TIMEOUT_SEC, bootstrap_retries=POLLING_BOOTSTRAP_RETRIES
+            timeout=POLLING_TIMEOUT_SEC,
+            bootstrap_retries=POLLING_BOOTSTRAP_RETRIES,
+            stop_signals=None,
         )
         if handlers.escalate_exit_code_requested is not None:
             return handlers.escalate_exit_code_requested
@@ -1,21 +1,47 @@
+from __future__ import annotations
+
 import asyncio
 import logging
+import signal
 import time
 from dataclasses import replace
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, Optional
 
 from app.config.chat_store import ChatStore
 from app.config.config import AppConfig, normalize_reasoning_effort
 from app.config.env_store import read_env_key
+from app.config.logging_setup import format_payload, log_context
 from app.config.polling_health import PollingHealthManager
 from app.config.project_service import ProjectService
+from app.core.background_jobs import (
+    DEFAULT_BG_MAX_JOBS_PER_CHAT,
+    DEFAULT_BG_MAX_RUNNING,
+    BackgroundJobManager,
+)
 from app.core.bridge_core import BridgeCore
-from app.core.codex_client import ask_codex_with_meta, get_codex_runtime_info
+from app.core.codex_client import (
+    CodexCancelScope,
+    ask_codex_with_meta,
+    get_codex_runtime_info,
+)
+from app.core.codex_retry import CodexRetryPolicy
+from app.core.codex_scheduler import CodexScheduler
 from app.core.command_service import CommandResult, CommandService, render_status_text
+from app.core.latency_tracker import LatencyTracker, build_eta_estimator
+from app.core.loop_monitor import LoopLagMonitor
+from app.core.message_inbox import MessageInbox, render_inbox_expired_notice
+from app.core.preview_driver import PreviewDriver
+from app.core.project_locks import ProjectLockManager
+from app.core.reply_outbox import ReplyOutbox
 from app.core.skills import list_available_skills
-from app.telegram.preview_driver import PreviewDriver
+from app.core.worktrees import WorktreeManager
 from app.telegram.telegram_adapter import TelegramAdapter
-from app.telegram.telegram_io import keep_typing, reply_text_with_retry
+from app.telegram.telegram_drain import (
+    InflightUpdates,
+    inbox_key_for_update,
+    take_queued_updates,
+)
+from app.telegram.telegram_io import ChatReplyTarget, keep_typing, reply_text_with_retry
 from app.telegram.telegram_preview import TelegramPreviewDriver
 from app.telegram.telegram_update_state import (
     RecentUpdateDedupe,
@@ -24,7 +50,9 @@ from app.telegram.telegram_update_state import (
 )
 from telegram import BotCommand, InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.error import Conflict, NetworkError, TimedOut
-from telegram.ext import ContextTypes
+
+if TYPE_CHECKING:
+    from telegram.ext import ContextTypes
 
 
 class BotHandlers:
@@ -48,6 +76,18 @@ class BotHandlers:
         polling_escalate_exit_code: int,
         update_state_path: Optional[str] = None,
         preview_driver_factory=None,
+        loop_lag_interval_sec: float = 0.5,
+        loop_lag_threshold_sec: float = 0.25,
+        codex_scheduler: Optional[CodexScheduler] = None,
+        drain_timeout_sec: float = 30.0,
+        outbox: Optional[ReplyOutbox] = None,
+        inbox: Optional[MessageInbox] = None,
+        bg_max_running: int = DEFAULT_BG_MAX_RUNNING,
+        bg_max_jobs_per_chat: int = DEFAULT_BG_MAX_JOBS_PER_CHAT,
+        project_locks: Optional[ProjectLockManager] = None,
+        worktrees: Optional[WorktreeManager] = None,
+        codex_retry: Optional[CodexRetryPolicy] = None,
+        latency: Optional[LatencyTracker] = None,
     ):
         self.config = config
         self.project_service = project_service
@@ -55,6 +95,10 @@ class BotHandlers:
         self.allowed_user_ids = allowed_user_ids
         self.logger = logger
         self.codex_max_retries = codex_max_retries
+        # 多平台同进程时由宿主传入共享实例，熔断状态对所有会话生效。
+        self.codex_retry = codex_retry or CodexRetryPolicy(max_attempts=codex_max_retries)
+        self.codex_scheduler = codex_scheduler
+        self.latency = latency
         self.polling_timeout_sec = polling_timeout_sec
         self.polling_bootstrap_retries = polling_bootstrap_retries
         self.polling_restart_threshold = polling_restart_threshold
@@ -64,14 +108,45 @@ class BotHandlers:
         self.system_prompt = system_prompt
         self.polling_escalate_exit_code = polling_escalate_exit_code
         self.escalate_exit_code_requested: Optional[int] = None
+        self.stop_requested_callback: Optional[Callable[[], None]] = None
+        # 独立进程运行时由 bot.main 打开：SIGTERM/SIGINT 先排空再退出。
+        self.handle_stop_signals = False
+        self.drain_timeout_sec = drain_timeout_sec
+        self.draining = False
+        self.inflight_updates = InflightUpdates()
+        self.pending_updates: list[dict] = []
+        # 已生成但未送达的答复；启动、轮询恢复或收到新消息时补发。
+        self.outbox = outbox or ReplyOutbox()
+        self.application = None
+        self.outbox_flush_task: Optional[asyncio.Task] = None
+        # 已接收但未处理完的消息；update 水位在 Codex 运行前就已推进，崩溃后靠它恢复。
+        self.inbox = inbox or MessageInbox()
+        # 本次启动要重放的 update：它们可能低于已处理水位，_begin_update 需放行一次。
+        self.replay_update_ids: set[int] = set()
         self.chat_reasoning_overrides: dict[int, str] = {}
+        # 多平台同进程时由宿主传入共享实例，同一目录的运行才能跨平台串行。
+        self.project_locks = project_locks or ProjectLockManager()
         self.bridge_core = BridgeCore(
             chat_store=chat_store,
             system_prompt=system_prompt,
             request_reply=self.ask_codex_with_retry,
-            resolve_asset_base_dir=lambda: self.project_service.project_dir,
+            resolve_project_dir=self.project_service.project_dir_for,
+            project_locks=self.project_locks,
+            resolve_read_only=lambda: self.config.codex_sandbox == "read-only",
+            worktrees=worktrees,
+            estimate_eta=(
+                build_eta_estimator(latency, lambda: self.config) if latency is not None else None
+            ),
         )
         self.telegram_adapter = TelegramAdapter()
+        self.background_jobs = BackgroundJobManager(
+            self.telegram_adapter.platform_id,
+            core=self.bridge_core,
+            deliver=self.deliver_background_job,
+            logger=logger,
+            max_running=bg_max_running,
+            max_jobs_per_chat=bg_max_jobs_per_chat,
+        )
         self.update_state_path = update_state_path
         self.recent_updates = RecentUpdateDedupe()
         self.last_handled_update_id: Optional[int] = None
@@ -88,6 +163,11 @@ class BotHandlers:
         )
         self.polling_restart_lock = asyncio.Lock()
         self.wake_watchdog_task: Optional[asyncio.Task] = None
+        self.loop_monitor = LoopLagMonitor(
+            logger,
+            interval_sec=loop_lag_interval_sec,
+            stall_threshold_sec=loop_lag_threshold_sec,
+        )
         self.command_service = CommandService(
             config_getter=lambda: self.config,
             config_setter=self._set_config,
@@ -99,6 +179,13 @@ class BotHandlers:
             get_health_snapshot=lambda: self.polling_health.snapshot(
                 now=time.monotonic()
             ),
+            get_loop_lag_snapshot=self.loop_monitor.snapshot,
+            get_codex_scheduler_snapshot=(
+                codex_scheduler.snapshot if codex_scheduler is not None else None
+            ),
+            get_codex_backend_snapshot=self.codex_retry.snapshot,
+            background_jobs=self.background_jobs,
+            worktrees=worktrees,
         )
 
     def _load_update_state(self) -> None:
@@ -107,6 +194,7 @@ class BotHandlers:
             return
         state = load_update_state(self.update_state_path)
         self.last_handled_update_id = state.get("last_handled_update_id")
+        self.pending_updates = state.get("pending_updates") or []
 
     def _save_update_state(self) -> None:
         if not self.update_state_path:
@@ -114,7 +202,10 @@ class BotHandlers:
         try:
             save_update_state(
                 self.update_state_path,
-                {"last_handled_update_id": self.last_handled_update_id},
+                {
+                    "last_handled_update_id": self.last_handled_update_id,
+                    "pending_updates": self.pending_updates,
+                },
             )
         except Exception as exc:
             self.logger.warning("写入 Telegram update state 失败：%s", exc)
@@ -123,6 +214,13 @@ class BotHandlers:
         update_id = getattr(update, "update_id", None)
         if not isinstance(update_id, int):
             return True
+        if update_id in self.replay_update_ids:
+            self.replay_update_ids.discard(update_id)
+            self.recent_updates.seen(update_id)
+            if self.last_handled_update_id is None or update_id > self.last_handled_update_id:
+                self.last_handled_update_id = update_id
+                self._save_update_state()
+            return True
         if (
             self.last_handled_update_id is not None
             and update_id <= self.last_handled_update_id
@@ -143,8 +241,10 @@ class BotHandlers:
     async def _run_command_async(self, chat_id: int, text: str) -> CommandResult:
         return await asyncio.to_thread(self._run_command, chat_id, text)
 
-    def runtime_config(self) -> AppConfig:
-        return replace(self.config, codex_project_dir=self.project_service.project_dir)
+    def runtime_config(self, project_dir: Optional[str] = None) -> AppConfig:
+        return replace(
+            self.config, codex_project_dir=project_dir or self.project_service.project_dir
+        )
 
     def is_allowed(self, update: Update) -> bool:
         if not self.allowed_user_ids:
@@ -165,6 +265,68 @@ class BotHandlers:
                 prev_errors,
             )
         self.polling_health.mark_healthy(now=time.monotonic())
+        self.schedule_outbox_flush()
+
+    def schedule_outbox_flush(self) -> None:
+        # 能收到 update 说明网络已通，顺带把发件箱里积压的答复补发出去。
+        if self.application is None or not self.outbox.pending_count(
+            self.telegram_adapter.platform_id
+        ):
+            return
+        if self.outbox_flush_task is not None and not self.outbox_flush_task.done():
+            return
+        self.outbox_flush_task = self.application.create_task(
+            self.flush_outbox(self.application)
+        )
+
+    async def deliver_background_job(self, job, outbound) -> None:
+        # 后台任务结果同样先进发件箱，网络异常时等待补发。
+        application = self.application
+        entry = self.outbox.enqueue(self.telegram_adapter.platform_id, job.reply_target, outbound)
+        try:
+            await self.telegram_adapter.send_outbound(
+                ChatReplyTarget(application.bot, job.reply_target),
+                outbound,
+                logger=self.logger,
+                on_part_delivered=lambda index: self.outbox.mark_delivered(entry.id, index),
+            )
+        except (TimedOut, NetworkError) as exc:
+            self.outbox.record_failure(entry.id, f"{exc.__class__.__name__}: {exc}")
+            self.logger.warning("后台任务 #%s 结果发送失败，已留在发件箱等待补发：%s", job.id, exc)
+        finally:
+            self.outbox.release(entry.id)
+
+    async def flush_outbox(self, application) -> int:
+        entries = self.outbox.claim_pending(self.telegram_adapter.platform_id)
+        delivered = 0
+        try:
+            for entry in entries:
+                try:
+                    await self.telegram_adapter.send_outbound(
+                        ChatReplyTarget(application.bot, entry.chat_id),
+                        entry.to_outbound(),
+                        logger=self.logger,
+                        skip_parts=frozenset(entry.delivered),
+                        on_part_delivered=lambda index, entry_id=entry.id: (
+                            self.outbox.mark_delivered(entry_id, index)
+                        ),
+                    )
+                    delivered += 1
+                except (TimedOut, NetworkError) as exc:
+                    self.outbox.record_failure(entry.id, f"{exc.__class__.__name__}: {exc}")
+                    self.logger.warning("补发答复失败，网络仍不可用，稍后重试：%s", exc)
+                    break
+                except Exception as exc:
+                    self.outbox.record_failure(entry.id, f"{exc.__class__.__name__}: {exc}")
+                    self.logger.warning(
+                        "补发答复失败：chat=%s err=%s", entry.chat_id, exc
+                    )
+        finally:
+            for entry in entries:
+                self.outbox.release(entry.id)
+        if delivered:
+            self.logger.info("已补发 %s 条积压答复。", delivered)
+        return delivered
 
     def request_process_escalation(self, reason: str) -> None:
         self.escalate_exit_code_requested = self.polling_escalate_exit_code
@@ -174,6 +336,117 @@ class BotHandlers:
             self.polling_escalate_exit_code,
         )
 
+    def stop_application(self, application) -> None:
+        # run_polling 下只能用 stop_running 让进程真正退出、把退出码交给外部守护；
+        # 多平台宿主自己管理生命周期，通过回调通知它整体收尾。
+        if self.stop_requested_callback is not None:
+            self.stop_requested_callback()
+            return
+        application.stop_running()
+
+    async def drain(self, application, reason: str, restart: bool = False) -> bool:
+        # 排空：停止拉取新 update，等待已拉取的处理完；超时则取消在途任务并把它们落盘，
+        # 最后刷写会话与 update 状态。新进程启动时重放落盘的 update，不丢也不重。
+        if self.draining:
+            return True
+        self.draining = True
+        self.logger.warning(
+            "Telegram 开始排空：reason=%s 在途=%s 排队=%s",
+            reason,
+            len(self.inflight_updates),
+            application.update_queue.qsize(),
+        )
+        if application.updater and application.updater.running:
+            await application.updater.stop()
+        try:
+            await asyncio.wait_for(
+                application.update_queue.join(), timeout=self.drain_timeout_sec
+            )
+            drained = True
+        except asyncio.TimeoutError:
+            drained = False
+        if not drained:
+            leftovers = self.inflight_updates.abandon_all() + take_queued_updates(
+                application.update_queue
+            )
+            await self.inflight_updates.wait_abandoned()
+            leftovers.sort(key=lambda item: item.update_id)
+            self.pending_updates = [item.to_dict() for item in leftovers]
+            if leftovers:
+                self.last_handled_update_id = leftovers[0].update_id - 1
+            self.logger.warning(
+                "Telegram 排空超时（%.0f 秒），%s 个 update 已落盘待下次启动重放。",
+                self.drain_timeout_sec,
+                len(leftovers),
+            )
+        self.chat_store.save()
+        self._save_update_state()
+        if restart:
+            self.escalate_exit_code_requested = self.polling_escalate_exit_code
+        self.logger.info("Telegram 排空完成：drained=%s restart=%s", drained, restart)
+        self.stop_application(application)
+        return drained
+
+    async def replay_pending_updates(self, application) -> int:
+        # 两个来源：排空超时落盘的 update，以及收件箱里上次已接收但没处理完的消息。
+        # 合并后按 update_id 顺序放回队列，走和新消息完全相同的处理路径。
+        retry, expired = self.inbox.recover(self.telegram_adapter.platform_id)
+        pending = {item["update_id"]: item for item in self.pending_updates}
+        for entry in expired:
+            # 反复失败的消息可能正是导致崩溃的那条，不再重放。
+            pending.pop(entry.payload.get("update_id"), None)
+            if not self.outbox.has_source(entry.key):
+                await self._notify_inbox_expired(application, entry)
+        for entry in retry:
+            update_id = entry.payload.get("update_id")
+            if isinstance(update_id, int):
+                pending.setdefault(update_id, entry.payload)
+        for update_id, payload in list(pending.items()):
+            # 答复已经生成并留在发件箱里（上次在发送途中退出）的，交给补发流程，不再重跑 Codex。
+            inbox_key = inbox_key_for_update(payload)
+            if inbox_key and self.outbox.has_source(inbox_key):
+                pending.pop(update_id)
+                self.inbox.finish(inbox_key)
+        if not pending and not self.pending_updates:
+            return 0
+        self.pending_updates = []
+        for update_id in sorted(pending):
+            self.replay_update_ids.add(update_id)
+            await application.update_queue.put(Update.de_json(pending[update_id], application.bot))
+        self._save_update_state()
+        if pending:
+            self.logger.info(
+                "重放上次未处理完的 %s 个 update（其中收件箱恢复 %s 条）。",
+                len(pending),
+                len(retry),
+            )
+        return len(pending)
+
+    async def _notify_inbox_expired(self, application, entry) -> None:
+        self.logger.warning(
+            "放弃恢复消息并通知用户重发：chat=%s attempts=%s", entry.chat_id, entry.attempts
+        )
+        try:
+            await reply_text_with_retry(
+                ChatReplyTarget(application.bot, entry.chat_id),
+                render_inbox_expired_notice(entry),
+            )
+        except Exception as exc:
+            self.logger.warning("通知用户重发失败：chat=%s err=%s", entry.chat_id, exc)
+
+    def _install_stop_signal_handlers(self, application) -> None:
+        loop = asyncio.get_running_loop()
+
+        def on_signal() -> None:
+            # 第二次信号不再等待，直接退出。
+            if self.draining:
+                self.stop_application(application)
+                return
+            application.create_task(self.drain(application, "signal"))
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, on_signal)
+
     def forward_polling_error(self, app, exc: Exception) -> None:
         app.create_task(app.process_error(error=exc, update=None))
 
@@ -195,6 +468,7 @@ class BotHandlers:
                 )
                 self.polling_health.record_restart_result(now=time.monotonic(), success=True)
                 self.logger.info("Telegram polling 重启成功。")
+                self.schedule_outbox_flush()
             except Exception as exc:
                 self.polling_health.record_restart_result(
                     now=time.monotonic(), success=False
@@ -203,7 +477,7 @@ class BotHandlers:
                 snapshot = self.polling_health.snapshot(now=time.monotonic())
                 if snapshot.get("state") == "escalated":
                     self.request_process_escalation("restart_failed")
-                    await application.stop()
+                    self.stop_application(application)
 
     async def wake_watchdog(self, application) -> None:
         last_tick = time.monotonic()
@@ -222,7 +496,7 @@ class BotHandlers:
                 decision = self.polling_health.record_watchdog_gap(now=now, gap_sec=gap)
                 if decision.should_escalate_process:
                     self.request_process_escalation("watchdog_gap")
-                    await application.stop()
+                    self.stop_application(application)
                     return
                 if decision.should_restart_polling:
                     await self.restart_polling(application)
@@ -231,23 +505,42 @@ class BotHandlers:
             raise
 
     async def ask_codex_with_retry(
-        self, prompt: str, reasoning_effort: Optional[str] = None
+        self,
+        prompt: str,
+        reasoning_effort: Optional[str] = None,
+        project_dir: Optional[str] = None,
     ) -> tuple[str, dict]:
-        last_exc: Optional[Exception] = None
-        for attempt in range(self.codex_max_retries):
+        async def attempt(resume_thread_id: Optional[str]) -> tuple[str, dict]:
+            cancel_scope = CodexCancelScope()
             try:
+                if self.codex_scheduler is not None:
+                    return await self.codex_scheduler.run(
+                        "telegram",
+                        ask_codex_with_meta,
+                        self.runtime_config(project_dir),
+                        prompt,
+                        reasoning_effort,
+                        None,
+                        resume_thread_id,
+                        self.latency,
+                        cancel_scope,
+                    )
                 return await asyncio.to_thread(
                     ask_codex_with_meta,
-                    self.runtime_config(),
+                    self.runtime_config(project_dir),
                     prompt,
                     reasoning_effort,
+                    None,
+                    resume_thread_id,
+                    self.latency,
+                    cancel_scope,
                 )
-            except Exception as exc:
-                last_exc = exc
-                if attempt >= self.codex_max_retries - 1:
-                    break
-                await asyncio.sleep(1.0 * (2**attempt))
-        raise RuntimeError(str(last_exc) if last_exc else "codex request failed")
+            except asyncio.CancelledError:
+                # 任务被取消（排空超时/退出）时连同 Codex 子进程一起结束。
+                cancel_scope.cancel()
+                raise
+
+        return await self.codex_retry.run(attempt)
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         self.mark_polling_healthy()
@@ -260,7 +553,8 @@ class BotHandlers:
             update,
             "已连接 Codex。直接发消息即可对话。\n"
             "命令：/new 新对话，/skills 查看可用技能，/status 查看 Codex 状态，"
-            "/setproject 切换目录，/setreasoning 设置推理等级，/models 查看/设置模型，/getproject 查看目录，/history 查看历史",
+            "/setproject 切换目录，/setreasoning 设置推理等级，/models 查看/设置模型，/getproject 查看目录，/history 查看历史，"
+            "/bg 后台运行长任务，/jobs 查看后台任务",
         )
 
     async def new_chat(
@@ -320,6 +614,7 @@ class BotHandlers:
             health=self.polling_health.snapshot(now=time.monotonic()),
             reasoning_override=reasoning_override,
             effective_reasoning_effort=effective_reasoning_effort,
+            loop_lag=self.loop_monitor.snapshot(),
         )
 
     async def setreasoning(
@@ -560,22 +855,68 @@ class BotHandlers:
         result = await self._run_command_async(chat_id, "/history")
         await reply_text_with_retry(update, result.reply_text)
 
+    async def background_job_command(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        # /bg、/jobs、/job 共用：把原始文本交给命令服务，保留任务描述里的换行。
+        self.mark_polling_healthy()
+        if not self._begin_update(update):
+            return
+        if not self.is_allowed(update):
+            await reply_text_with_retry(update, "你没有权限使用这个 bot。")
+            return
+        chat_id = self.get_chat_id(update)
+        if chat_id is None or not update.message or not update.message.text:
+            return
+        command, _, rest = update.message.text.strip().partition(" ")
+        text = f"{command.split('@', 1)[0]} {rest}".strip()
+        result = await self._run_command_async(chat_id, text)
+        await reply_text_with_retry(update, result.reply_text)
+
+    async def drain_command(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ) -> None:
+        self.mark_polling_healthy()
+        if not self._begin_update(update):
+            return
+        if not self.is_allowed(update):
+            await reply_text_with_retry(update, "你没有权限使用这个 bot。")
+            return
+        await reply_text_with_retry(
+            update, "开始排空：不再接收新消息，处理完在途请求后重启进程。"
+        )
+        # 排空要等当前 update 处理结束，必须放到独立任务里，不能在这里 await。
+        context.application.create_task(
+            self.drain(context.application, "command", restart=True)
+        )
+
     async def post_init(self, app) -> None:
+        if self.handle_stop_signals:
+            self._install_stop_signal_handlers(app)
+        await self.replay_pending_updates(app)
+        self.application = app
+        self.background_jobs.attach(asyncio.get_running_loop())
+        self.schedule_outbox_flush()
+        # 重新跑 Codex 可能要几分钟，放到后台，不阻塞启动。
         if not self.wake_watchdog_task or self.wake_watchdog_task.done():
             self.wake_watchdog_task = asyncio.create_task(
                 self.wake_watchdog(app), name="wake_watchdog"
             )
+        self.loop_monitor.start()
         try:
             await app.bot.set_my_commands(
                 [
                     BotCommand("new", "新建对话（清空上下文）"),
                     BotCommand("skills", "查看可用 skills"),
                     BotCommand("status", "查看 Codex 状态"),
-                    BotCommand("setproject", "切换 Codex 项目目录"),
+                    BotCommand("setproject", "切换当前会话的项目目录"),
                     BotCommand("setreasoning", "设置推理等级"),
                     BotCommand("models", "查看并设置模型"),
                     BotCommand("getproject", "查看当前项目目录与 .env"),
                     BotCommand("history", "查看当前会话历史信息"),
+                    BotCommand("bg", "后台运行长任务，完成后通知"),
+                    BotCommand("jobs", "查看后台任务"),
+                    BotCommand("job", "查看单个后台任务进度"),
                     BotCommand("start", "显示帮助"),
                 ]
             )
@@ -585,6 +926,10 @@ class BotHandlers:
             )
 
     async def post_shutdown(self, app) -> None:
+        await self.loop_monitor.stop()
+        await self.background_jobs.shutdown()
+        if self.latency is not None:
+            await asyncio.to_thread(self.latency.flush)
         task = self.wake_watchdog_task
         if not task:
             return
@@ -605,7 +950,7 @@ class BotHandlers:
             self.logger.error(
                 "Telegram 冲突：检测到同一 token 的重复轮询实例，当前进程将停止。"
             )
-            await context.application.stop()
+            self.stop_application(context.application)
             return
         if update is None and isinstance(err, (NetworkError, TimedOut)):
             decision = self.polling_health.record_network_error(now=time.monotonic())
@@ -619,7 +964,7 @@ class BotHandlers:
             )
             if decision.should_escalate_process:
                 self.request_process_escalation("network_error_loop")
-                await context.application.stop()
+                self.stop_application(context.application)
                 return
             if decision.should_restart_polling:
                 asyncio.create_task(self.restart_polling(context.application))
@@ -648,11 +993,26 @@ class BotHandlers:
         if inbound is None:
             return
 
+        entry = self.inbox.accept(
+            self.telegram_adapter.platform_id,
+            f"{inbound.chat_id}:{inbound.message_id}",
+            inbound.chat_id,
+            inbound.text,
+            update.to_dict(),
+        )
+        with log_context(chat_id=inbound.chat_id):
+            await self.inbox.run(
+                entry.key, lambda: self._reply_to_inbound(update, inbound, entry.key)
+            )
+
+    async def _reply_to_inbound(self, update: Update, inbound, inbox_key: str = "") -> None:
         chat_id = inbound.chat_id
         user_id = inbound.user_id
         user_text = inbound.text
 
-        self.logger.info("[chat:%s user:%s] USER: %s", chat_id, user_id, user_text)
+        self.logger.info(
+            "[chat:%s user:%s] USER: %s", chat_id, user_id, format_payload(user_text)
+        )
 
         preview: PreviewDriver = self.preview_driver_factory(update)
         await preview.start()
@@ -669,10 +1029,23 @@ class BotHandlers:
             stop_typing_event.set()
             await asyncio.sleep(0)
 
+        entry = None
         try:
-            outbound = await self.bridge_core.process_user_text(inbound)
+            outbound = await self.bridge_core.process_user_text(
+                inbound, on_status=preview.update
+            )
+            # 先落盘再发送：发送失败或进程中途退出时，答复留在发件箱里等待补发。
+            # 答复入箱即算处理完，同一步移出收件箱；之后再崩溃只补发，不会重跑 Codex。
+            entry = self.outbox.enqueue(
+                self.telegram_adapter.platform_id, chat_id, outbound, source_key=inbox_key
+            )
+            if inbox_key:
+                self.inbox.finish(inbox_key)
             self.logger.info(
-                "[chat:%s user:%s] ASSISTANT: %s", chat_id, user_id, outbound.text
+                "[chat:%s user:%s] ASSISTANT: %s",
+                chat_id,
+                user_id,
+                format_payload(outbound.text),
             )
 
             await stop_typing_once()
@@ -682,15 +1055,29 @@ class BotHandlers:
                 update,
                 outbound,
                 logger=self.logger,
+                on_part_delivered=lambda index: self.outbox.mark_delivered(entry.id, index),
             )
 
         except Exception as exc:
+            if entry is not None and isinstance(exc, (TimedOut, NetworkError)):
+                self.outbox.record_failure(entry.id, f"{exc.__class__.__name__}: {exc}")
+                self.logger.warning(
+                    "[chat:%s user:%s] 答复发送失败，已留在发件箱等待补发：%s",
+                    chat_id,
+                    user_id,
+                    exc,
+                )
+                await stop_typing_once()
+                await preview.fail("回复发送失败，网络恢复后会自动补发。")
+                return
+            if entry is not None:
+                self.outbox.record_failure(entry.id, f"{exc.__class__.__name__}: {exc}")
             self.logger.exception("Codex request failed")
             self.logger.error(
                 "[chat:%s user:%s] ERROR for USER input: %s | err=%s",
                 chat_id,
                 user_id,
-                user_text,
+                format_payload(user_text),
                 exc,
             )
             await stop_typing_once()
@@ -698,5 +1085,7 @@ class BotHandlers:
             if not getattr(preview, "has_active_message", False):
                 await reply_text_with_retry(update, f"请求失败：{exc}")
         finally:
+            if entry is not None:
+                self.outbox.release(entry.id)
             stop_typing_event.set()
             await typing_task
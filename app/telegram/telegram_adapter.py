@@ -1,8 +1,13 @@
+from __future__ import annotations
+
 import logging
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, Collection, Optional
 
-from app.core.platform_messages import PlatformInboundMessage, PlatformOutboundMessage
-from telegram import Update
+from app.core.platform_messages import (
+    OutboundPart,
+    PlatformInboundMessage,
+    PlatformOutboundMessage,
+)
 
 from app.telegram.telegram_io import (
     reply_text_with_retry,
@@ -10,6 +15,9 @@ from app.telegram.telegram_io import (
     send_photo_with_retry,
 )
 
+if TYPE_CHECKING:
+    from telegram import Update
+
 
 class TelegramAdapter:
     platform_id = "telegram"
@@ -41,47 +49,59 @@ class TelegramAdapter:
         update: Update,
         outbound: PlatformOutboundMessage,
         logger: Optional[logging.Logger] = None,
+        skip_parts: Collection[int] = (),
+        on_part_delivered: Optional[Callable[[int], None]] = None,
     ) -> None:
-        for part in outbound.parts:
-            if part.kind in {"text", "notice"} and part.text:
-                for chunk in self._chunk_text(part.text):
-                    await reply_text_with_retry(update, chunk)
+        # 逐个部分发送；网络异常直接抛出，已送达的部分通过回调登记，补发时跳过。
+        for index, part in enumerate(outbound.parts):
+            if index in skip_parts:
                 continue
+            await self._send_part(update, part, logger)
+            if on_part_delivered is not None:
+                on_part_delivered(index)
 
-            if part.kind != "image" or not part.value:
-                continue
+    async def _send_part(
+        self, update: Update, part: OutboundPart, logger: Optional[logging.Logger]
+    ) -> None:
+        if part.kind in {"text", "notice"} and part.text:
+            for chunk in self._chunk_text(part.text):
+                await reply_text_with_retry(update, chunk)
+            return
 
-            sent, photo_err = await send_photo_with_retry(update, part.value)
-            if sent:
-                continue
+        if part.kind != "image" or not part.value:
+            return
 
-            if part.source_type == "local_path":
-                sent_as_doc, doc_err = await send_document_with_retry(update, part.value)
-                if sent_as_doc:
-                    continue
-                if logger:
-                    logger.warning(
-                        "Telegram local image send failed: path=%s photo_err=%s doc_err=%s",
-                        part.value,
-                        photo_err or "unknown",
-                        doc_err or "unknown",
-                    )
-                await reply_text_with_retry(
-                    update,
-                    f"图片发送失败：{part.value}\nphoto_err={photo_err or 'unknown'}\ndoc_err={doc_err or 'unknown'}",
-                )
-                continue
+        sent, photo_err = await send_photo_with_retry(update, part.value)
+        if sent:
+            return
 
+        if part.source_type == "local_path":
+            sent_as_doc, doc_err = await send_document_with_retry(update, part.value)
+            if sent_as_doc:
+                return
             if logger:
                 logger.warning(
-                    "Telegram remote image send failed: url=%s err=%s",
+                    "Telegram local image send failed: path=%s photo_err=%s doc_err=%s",
                     part.value,
                     photo_err or "unknown",
+                    doc_err or "unknown",
                 )
             await reply_text_with_retry(
                 update,
-                f"图片发送失败：{part.value}\nerr={photo_err or 'unknown'}",
+                f"图片发送失败：{part.value}\nphoto_err={photo_err or 'unknown'}\ndoc_err={doc_err or 'unknown'}",
             )
+            return
+
+        if logger:
+            logger.warning(
+                "Telegram remote image send failed: url=%s err=%s",
+                part.value,
+                photo_err or "unknown",
+            )
+        await reply_text_with_retry(
+            update,
+            f"图片发送失败：{part.value}\nerr={photo_err or 'unknown'}",
+        )
 
     @staticmethod
     def _chunk_text(text: str, chunk_size: int = 3900) -> list[str]:
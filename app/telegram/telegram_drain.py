@@ -0,0 +1,85 @@
+import asyncio
+from typing import Any, Awaitable
+
+
+# 在途 update 登记表：记录正在处理的 update 及其任务，排空超时时可以取消并落盘，
+# 交给下一个进程重放。不依赖 telegram.ext，handlers 可以直接持有。
+class InflightUpdates:
+    def __init__(self):
+        self._tasks: dict[int, tuple[Any, asyncio.Future]] = {}
+        self._abandoned: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def run(self, update: Any, coroutine: Awaitable[Any]) -> None:
+        update_id = getattr(update, "update_id", None)
+        if not isinstance(update_id, int):
+            await coroutine
+            return
+        task = asyncio.ensure_future(coroutine)
+        self._tasks[update_id] = (update, task)
+        try:
+            await task
+        except asyncio.CancelledError:
+            # 被排空流程放弃的 update 已经落盘，不再向上抛出，让 PTB 正常走完收尾。
+            if update_id not in self._abandoned:
+                raise
+        finally:
+            self._tasks.pop(update_id, None)
+            self._abandoned.discard(update_id)
+
+    def abandon_all(self) -> list[Any]:
+        updates = []
+        for update_id, (update, task) in list(self._tasks.items()):
+            self._abandoned.add(update_id)
+            task.cancel()
+            updates.append(update)
+        return updates
+
+    async def wait_abandoned(self, timeout_sec: float = 5.0) -> None:
+        # 等被取消的任务走完收尾（结束 Codex 子进程、收件箱条目留给重放）再落盘，
+        # 避免旧进程的 Codex 还在后台跑、新进程又重放同一条消息。
+        tasks = [
+            task for update_id, (_update, task) in self._tasks.items() if update_id in self._abandoned
+        ]
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout_sec)
+
+
+def take_queued_updates(update_queue: "asyncio.Queue[object]") -> list[Any]:
+    # 取走已拉取但还没开始处理的 update；updater.stop 时它们已在 Telegram 侧标记为已读。
+    updates = []
+    while not update_queue.empty():
+        item = update_queue.get_nowait()
+        update_queue.task_done()
+        if isinstance(getattr(item, "update_id", None), int):
+            updates.append(item)
+    return updates
+
+
+def inbox_key_for_update(payload: dict) -> str:
+    # 与 handle_message 写收件箱时的 key（chat_id:message_id）一致；不是文本消息时返回空串。
+    message = payload.get("message") if isinstance(payload, dict) else None
+    chat = message.get("chat") if isinstance(message, dict) else None
+    if not isinstance(chat, dict) or "id" not in chat or "message_id" not in message:
+        return ""
+    return f"{chat['id']}:{message['message_id']}"
+
+
+def build_update_processor(inflight: InflightUpdates):
+    # telegram.ext 较重，只在构建 Application 时导入。
+    from telegram.ext import BaseUpdateProcessor
+
+    class TrackingUpdateProcessor(BaseUpdateProcessor):
+        async def do_process_update(self, update, coroutine) -> None:
+            await inflight.run(update, coroutine)
+
+        async def initialize(self) -> None:
+            return None
+
+        async def shutdown(self) -> None:
+            return None
+
+    # 并发度保持 1：与 PTB 默认一致，按到达顺序逐条处理。
+    return TrackingUpdateProcessor(1)
@@ -1,13 +1,38 @@
+from __future__ import annotations
+
 import asyncio
 import os
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from urllib.parse import urlparse
 
-from telegram import Message, Update
-from telegram import InlineKeyboardMarkup
 from telegram.error import NetworkError, TimedOut
 from app.core.platform_messages import extract_image_sources, remove_markdown_images
 
+if TYPE_CHECKING:
+    from telegram import InlineKeyboardMarkup, Message, Update
+
+
+# 没有原始 update 时（如重启后补发答复）按 chat_id 直接发送；接口与 update.message 的
+# reply_* 一致，*_with_retry 系列函数和 TelegramAdapter.send_outbound 可以原样复用。
+class ChatReplyTarget:
+    def __init__(self, bot, chat_id: int):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message = self
+
+    async def reply_text(self, text: str, reply_markup=None):
+        return await self.bot.send_message(
+            chat_id=self.chat_id, text=text, reply_markup=reply_markup
+        )
+
+    async def reply_photo(self, photo, caption: Optional[str] = None):
+        return await self.bot.send_photo(chat_id=self.chat_id, photo=photo, caption=caption)
+
+    async def reply_document(self, document, caption: Optional[str] = None):
+        return await self.bot.send_document(
+            chat_id=self.chat_id, document=document, caption=caption
+        )
+
 
 async def reply_text_with_retry(
     update: Update, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None
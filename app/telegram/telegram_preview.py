@@ -1,10 +1,9 @@
 from __future__ import annotations
 
 import time
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-from app.telegram.preview_driver import PreviewDriver
-from telegram import Message, Update
+from app.core.preview_driver import PreviewDriver
 
 from app.telegram.telegram_io import (
     delete_message_with_retry,
@@ -12,6 +11,9 @@ from app.telegram.telegram_io import (
     send_message_with_retry,
 )
 
+if TYPE_CHECKING:
+    from telegram import Message, Update
+
 DEFAULT_PREVIEW_TEXT = "已收到，正在思考中，请稍等..."
 
 
@@ -17,20 +17,33 @@ def _normalize_update_id(value: Any) -> int | None:
     return None
 
 
-def load_update_state(path: str | Path) -> dict[str, int | None]:
+def _normalize_pending_updates(value: Any) -> list[dict]:
+    # 排空超时时落盘的未处理 update（Bot API 原始 JSON），下次启动按 update_id 顺序重放。
+    if not isinstance(value, list):
+        return []
+    pending = [
+        item
+        for item in value
+        if isinstance(item, dict) and _normalize_update_id(item.get("update_id")) is not None
+    ]
+    return sorted(pending, key=lambda item: item["update_id"])
+
+
+def load_update_state(path: str | Path) -> dict[str, Any]:
     state_path = Path(path)
     if not state_path.exists():
-        return dict(DEFAULT_UPDATE_STATE)
+        return {**DEFAULT_UPDATE_STATE, "pending_updates": []}
     try:
         payload = json.loads(state_path.read_text(encoding="utf-8"))
     except (OSError, json.JSONDecodeError):
-        return dict(DEFAULT_UPDATE_STATE)
+        return {**DEFAULT_UPDATE_STATE, "pending_updates": []}
     if not isinstance(payload, dict):
-        return dict(DEFAULT_UPDATE_STATE)
+        return {**DEFAULT_UPDATE_STATE, "pending_updates": []}
     return {
         "last_handled_update_id": _normalize_update_id(
             payload.get("last_handled_update_id")
-        )
+        ),
+        "pending_updates": _normalize_pending_updates(payload.get("pending_updates")),
     }
 
 
@@ -42,6 +55,9 @@ def save_update_state(path: str | Path, state: dict[str, Any]) -> None:
             state.get("last_handled_update_id")
         )
     }
+    pending = _normalize_pending_updates(state.get("pending_updates"))
+    if pending:
+        payload["pending_updates"] = pending
     state_path.write_text(
         json.dumps(payload, ensure_ascii=True, indent=2) + "\n", encoding="utf-8"
     )
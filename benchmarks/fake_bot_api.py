@@ -0,0 +1,215 @@
+"""Local fake of the Telegram Bot API used by load tests.
+
+Only the methods the bridge calls are implemented. Updates are injected with
+`push_text_update`; every outgoing call is recorded so the load generator can
+match replies to the messages that triggered them.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs
+
+
+@dataclass
+class SentCall:
+    method: str
+    params: dict[str, Any]
+    at: float = field(default_factory=time.monotonic)
+
+
+class FakeBotApi:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self._lock = threading.Condition()
+        self._updates: list[dict] = []
+        self._next_update_id = 1
+        self._next_message_id = 1000
+        self._confirmed_offset = 0
+        self.calls: list[SentCall] = []
+        self.on_call: Optional[Callable[[SentCall], None]] = None
+        self.get_updates_count = 0
+        self._server = ThreadingHTTPServer((host, port), self._build_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/bot"
+
+    def start(self) -> "FakeBotApi":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-bot-api", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stopped = True
+            self._lock.notify_all()
+        if self._thread:
+            self._server.shutdown()
+            self._thread.join(timeout=5)
+        self._server.server_close()
+
+    def push_text_update(self, chat_id: int, text: str, user_id: Optional[int] = None) -> int:
+        with self._lock:
+            update_id = self._next_update_id
+            self._next_update_id += 1
+            message_id = self._next_message_id
+            self._next_message_id += 1
+            self._updates.append(
+                {
+                    "update_id": update_id,
+                    "message": {
+                        "message_id": message_id,
+                        "date": int(time.time()),
+                        "chat": {"id": chat_id, "type": "private"},
+                        "from": {
+                            "id": user_id if user_id is not None else chat_id,
+                            "is_bot": False,
+                            "first_name": "Load",
+                        },
+                        "text": text,
+                    },
+                }
+            )
+            self._lock.notify_all()
+            return update_id
+
+    def pending_updates(self) -> int:
+        with self._lock:
+            return sum(
+                1 for item in self._updates if item["update_id"] >= self._confirmed_offset
+            )
+
+    def calls_for(self, method: str) -> list[SentCall]:
+        with self._lock:
+            return [call for call in self.calls if call.method == method]
+
+    def _record(self, method: str, params: dict[str, Any]) -> None:
+        call = SentCall(method=method, params=params)
+        with self._lock:
+            self.calls.append(call)
+        if self.on_call is not None:
+            self.on_call(call)
+
+    def _get_updates(self, params: dict[str, Any]) -> list[dict]:
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+        limit = int(params.get("limit") or 100)
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self.get_updates_count += 1
+            if offset:
+                self._confirmed_offset = max(self._confirmed_offset, offset)
+                self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            while True:
+                ready = [u for u in self._updates if u["update_id"] >= offset]
+                if ready:
+                    return ready[:limit]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stopped:
+                    return []
+                self._lock.wait(timeout=remaining)
+
+    def _message_result(self, params: dict[str, Any]) -> dict:
+        with self._lock:
+            message_id = self._next_message_id
+            self._next_message_id += 1
+        chat_id = params.get("chat_id")
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            pass
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": params.get("text") or "",
+        }
+
+    def dispatch(self, method: str, params: dict[str, Any]) -> Any:
+        if method == "getUpdates":
+            return self._get_updates(params)
+        self._record(method, params)
+        if method == "getMe":
+            return {
+                "id": 1,
+                "is_bot": True,
+                "first_name": "FakeBot",
+                "username": "fake_bot",
+                "can_join_groups": False,
+                "can_read_all_group_messages": False,
+                "supports_inline_queries": False,
+            }
+        if method in {"sendMessage", "sendPhoto", "sendDocument"}:
+            return self._message_result(params)
+        if method == "editMessageText":
+            return self._message_result(params)
+        return True
+
+    def _build_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # noqa: A002 - stdlib signature
+                return
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                method = self.path.rstrip("/").rsplit("/", 1)[-1]
+                params = _parse_params(self.headers.get("Content-Type") or "", body)
+                try:
+                    result = api.dispatch(method, params)
+                    payload = {"ok": True, "result": result}
+                except Exception as exc:  # pragma: no cover - diagnostic path
+                    payload = {"ok": False, "error_code": 500, "description": str(exc)}
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # 客户端已放弃长轮询（例如 updater.stop()），无需回写。
+                    return
+
+            do_GET = do_POST
+
+        return Handler
+
+
+def _parse_params(content_type: str, body: bytes) -> dict[str, Any]:
+    if not body:
+        return {}
+    if content_type.startswith("application/json"):
+        try:
+            payload = json.loads(body.decode("utf-8"))
+        except ValueError:
+            return {}
+        return payload if isinstance(payload, dict) else {}
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        params: dict[str, Any] = {}
+        for key, values in parse_qs(body.decode("utf-8")).items():
+            value = values[-1]
+            try:
+                params[key] = json.loads(value)
+            except ValueError:
+                params[key] = value
+        return params
+    # multipart uploads (photos/documents) only need to be acknowledged.
+    return {}
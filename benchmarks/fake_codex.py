@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Fake `codex` executable for load tests.
+
+Behaviour is driven by environment variables so the bridge can spawn it exactly
+like the real CLI:
+
+- FAKE_CODEX_DELAY_SEC: total wall time of one `exec` run (default 0.5)
+- FAKE_CODEX_JITTER_SEC: random extra delay in [0, jitter] (default 0)
+- FAKE_CODEX_EVENTS: number of intermediate reasoning events (default 3)
+- FAKE_CODEX_REPLY_CHARS: size of the agent reply in characters (default 200)
+- FAKE_CODEX_EXIT_CODE: non-zero makes `exec` fail with that code (default 0)
+- FAKE_CODEX_STDERR: text written to stderr on failure
+"""
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _emit(event: dict) -> None:
+    sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def _last_user_line(prompt: str) -> str:
+    last = ""
+    for line in prompt.splitlines():
+        if line.startswith("User: "):
+            last = line[len("User: ") :]
+    return last
+
+
+def build_reply(prompt: str, reply_chars: int) -> str:
+    head = f"echo: {_last_user_line(prompt)}"
+    if len(head) >= reply_chars:
+        return head
+    filler = " lorem ipsum dolor sit amet"
+    body = (filler * (reply_chars // len(filler) + 1))[: reply_chars - len(head)]
+    return head + body
+
+
+def run_exec(args: list[str]) -> int:
+    prompt = args[-1] if args else ""
+    delay = _env_float("FAKE_CODEX_DELAY_SEC", 0.5)
+    jitter = _env_float("FAKE_CODEX_JITTER_SEC", 0.0)
+    if jitter > 0:
+        delay += random.uniform(0.0, jitter)
+    events = max(0, _env_int("FAKE_CODEX_EVENTS", 3))
+    reply_chars = max(1, _env_int("FAKE_CODEX_REPLY_CHARS", 200))
+    exit_code = _env_int("FAKE_CODEX_EXIT_CODE", 0)
+
+    _emit({"type": "thread.started", "thread_id": str(uuid.uuid4())})
+    _emit({"type": "turn.started"})
+    step = delay / (events + 1)
+    for idx in range(events):
+        time.sleep(step)
+        _emit(
+            {
+                "type": "item.completed",
+                "item": {"id": f"item_{idx}", "type": "reasoning", "text": f"step {idx}"},
+            }
+        )
+    time.sleep(step)
+
+    if exit_code:
+        sys.stderr.write(os.getenv("FAKE_CODEX_STDERR", "fake codex failure") + "\n")
+        return exit_code
+
+    _emit(
+        {
+            "type": "item.completed",
+            "item": {
+                "id": f"item_{events}",
+                "type": "agent_message",
+                "text": build_reply(prompt, reply_chars),
+            },
+        }
+    )
+    _emit(
+        {
+            "type": "turn.completed",
+            "usage": {
+                "input_tokens": len(prompt) // 4,
+                "cached_input_tokens": 0,
+                "output_tokens": reply_chars // 4,
+            },
+        }
+    )
+    return 0
+
+
+def main(argv: list[str]) -> int:
+    if argv[:1] == ["--version"]:
+        print("codex-cli 0.0.0-fake")
+        return 0
+    if argv[:2] == ["login", "status"]:
+        print("Logged in using fake credentials")
+        return 0
+    if argv[:1] == ["exec"]:
+        return run_exec(argv[1:])
+    sys.stderr.write(f"fake codex: unsupported arguments {argv!r}\n")
+    return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,157 @@
+"""Local fake of the Feishu Open Platform endpoints the bridge calls.
+
+Implements tenant token issuance, message send, reaction add/delete and image
+and file upload. Every request is recorded with the HTTP connection it arrived on so
+tests can check that the client reuses keep-alive connections.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class FeishuCall:
+    method: str
+    path: str
+    query: dict[str, str]
+    body: Any
+    token: str
+    connection_id: int
+    at: float = field(default_factory=time.monotonic)
+
+
+class FakeFeishuApi:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        token_expire_sec: int = 7200,
+        response_delay_sec: float = 0.0,
+    ):
+        self._lock = threading.Lock()
+        self.calls: list[FeishuCall] = []
+        self.token_expire_sec = token_expire_sec
+        self.response_delay_sec = response_delay_sec
+        self.tokens_issued = 0
+        self.valid_tokens: set[str] = set()
+        self._next_id = 1
+        self._server = ThreadingHTTPServer((host, port), self._build_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "FakeFeishuApi":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-feishu-api", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread:
+            self._server.shutdown()
+            self._thread.join(timeout=5)
+        self._server.server_close()
+
+    def revoke_tokens(self) -> None:
+        with self._lock:
+            self.valid_tokens.clear()
+
+    def calls_for(self, method: str, path: str, prefix: bool = False) -> list[FeishuCall]:
+        with self._lock:
+            return [
+                call
+                for call in self.calls
+                if call.method == method
+                and (call.path.startswith(path) if prefix else call.path == path)
+            ]
+
+    def _new_id(self, prefix: str) -> str:
+        with self._lock:
+            value = self._next_id
+            self._next_id += 1
+        return f"{prefix}_{value}"
+
+    def dispatch(self, call: FeishuCall) -> dict:
+        with self._lock:
+            self.calls.append(call)
+        if call.path == "/open-apis/auth/v3/tenant_access_token/internal":
+            token = self._new_id("t")
+            with self._lock:
+                self.tokens_issued += 1
+                self.valid_tokens.add(token)
+            return {
+                "code": 0,
+                "msg": "ok",
+                "tenant_access_token": token,
+                "expire": self.token_expire_sec,
+            }
+        with self._lock:
+            token_ok = call.token in self.valid_tokens
+        if not token_ok:
+            return {"code": 99991663, "msg": "Invalid access token for authorization."}
+        if call.method == "POST" and call.path == "/open-apis/im/v1/messages":
+            return {"code": 0, "msg": "success", "data": {"message_id": self._new_id("om")}}
+        if call.method == "POST" and call.path == "/open-apis/im/v1/images":
+            return {"code": 0, "msg": "success", "data": {"image_key": self._new_id("img")}}
+        if call.method == "POST" and call.path == "/open-apis/im/v1/files":
+            return {"code": 0, "msg": "success", "data": {"file_key": self._new_id("file")}}
+        if call.method == "POST" and call.path.endswith("/reactions"):
+            return {"code": 0, "msg": "success", "data": {"reaction_id": self._new_id("re")}}
+        if call.method == "DELETE" and "/reactions/" in call.path:
+            return {"code": 0, "msg": "success", "data": {}}
+        if call.method in {"PATCH", "DELETE"} and call.path.startswith("/open-apis/im/v1/messages/"):
+            return {"code": 0, "msg": "success", "data": {}}
+        return {"code": 404, "msg": f"unknown endpoint {call.method} {call.path}"}
+
+    def _build_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # noqa: A002 - stdlib signature
+                return
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                parsed = urlparse(self.path)
+                content_type = self.headers.get("Content-Type") or ""
+                body: Any = raw
+                if content_type.startswith("application/json") and raw:
+                    body = json.loads(raw.decode("utf-8"))
+                auth = self.headers.get("Authorization") or ""
+                call = FeishuCall(
+                    method=self.command,
+                    path=parsed.path,
+                    query={k: v[-1] for k, v in parse_qs(parsed.query).items()},
+                    body=body,
+                    token=auth[len("Bearer ") :] if auth.startswith("Bearer ") else "",
+                    connection_id=id(self.connection),
+                )
+                if api.response_delay_sec:
+                    time.sleep(api.response_delay_sec)
+                data = json.dumps(api.dispatch(call)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("X-Tt-Logid", f"log_{id(call)}")
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_POST = _handle
+            do_DELETE = _handle
+            do_PATCH = _handle
+            do_GET = _handle
+
+        return Handler
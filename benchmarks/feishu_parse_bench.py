@@ -0,0 +1,84 @@
+"""Per-event parse cost of Feishu message events.
+
+Compares the old path (`lark.JSON.marshal` -> `json.loads` -> dict parser)
+with reading the typed `P2ImMessageReceiveV1` attributes directly.
+
+Usage:
+    python -m benchmarks.feishu_parse_bench
+    python -m benchmarks.feishu_parse_bench --iterations 20000 --text-chars 4000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import timeit
+from typing import Optional
+
+from app.feishu.feishu_io import parse_private_text_event, parse_private_text_event_data
+
+
+def build_sample_event(text_chars: int = 200):
+    import lark_oapi as lark
+    from lark_oapi.api.im.v1 import P2ImMessageReceiveV1
+
+    payload = {
+        "schema": "2.0",
+        "header": {
+            "event_id": "ev_bench",
+            "event_type": "im.message.receive_v1",
+            "create_time": "1700000000000",
+            "token": "",
+            "app_id": "cli_bench",
+            "tenant_key": "tenant",
+        },
+        "event": {
+            "sender": {
+                "sender_id": {"open_id": "ou_bench", "union_id": "on_bench", "user_id": "u1"},
+                "sender_type": "user",
+                "tenant_key": "tenant",
+            },
+            "message": {
+                "message_id": "om_bench",
+                "create_time": "1700000000000",
+                "chat_id": "oc_bench",
+                "chat_type": "p2p",
+                "message_type": "text",
+                "content": json.dumps({"text": "x" * text_chars}),
+            },
+        },
+    }
+    return lark.JSON.unmarshal(json.dumps(payload), P2ImMessageReceiveV1)
+
+
+def parse_via_marshal(data):
+    import lark_oapi as lark
+
+    return parse_private_text_event(json.loads(lark.JSON.marshal(data)))
+
+
+def measure(iterations: int = 5000, text_chars: int = 200) -> dict:
+    data = build_sample_event(text_chars)
+    assert parse_via_marshal(data) == parse_private_text_event_data(data)
+    marshal_sec = timeit.timeit(lambda: parse_via_marshal(data), number=iterations)
+    direct_sec = timeit.timeit(lambda: parse_private_text_event_data(data), number=iterations)
+    return {
+        "iterations": iterations,
+        "text_chars": text_chars,
+        "marshal_us_per_event": round(marshal_sec / iterations * 1e6, 2),
+        "direct_us_per_event": round(direct_sec / iterations * 1e6, 2),
+        "speedup": round(marshal_sec / direct_sec, 1) if direct_sec else 0.0,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--text-chars", type=int, default=200)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    print(json.dumps(measure(args.iterations, args.text_chars), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,95 @@
+"""Cost of rendering long Codex replies into Feishu messages.
+
+For 1k/10k/100k-character replies (Markdown prose mixed with code blocks) it
+reports the render time, how many messages are produced, and how many API
+calls the async adapter makes against the local fake Feishu API.
+
+Usage:
+    python -m benchmarks.feishu_render_bench
+    python -m benchmarks.feishu_render_bench --sizes 1000 10000 100000 --iterations 50
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import timeit
+from typing import Optional
+
+from app.core.platform_messages import OutboundPart, PlatformOutboundMessage
+from app.feishu.feishu_adapter import FeishuAdapter
+from app.feishu.feishu_api import FeishuApiClient
+from app.feishu.feishu_render import render_reply_text
+from benchmarks.fake_feishu_api import FakeFeishuApi
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+def build_sample_reply(chars: int) -> str:
+    section = (
+        "## 修改说明\n\n"
+        "这里解释了本次修改的原因，以及对 **调用方** 的影响，涉及 `FeishuAdapter` 的发送路径。\n\n"
+        "- 第一点：拆分长答复\n- 第二点：代码块保持完整\n\n"
+        "```python\n"
+        + "".join(f"def step_{i}(value):\n    return value * {i}\n\n" for i in range(6))
+        + "```\n\n"
+    )
+    repeats = chars // len(section) + 1
+    return (section * repeats)[:chars]
+
+
+async def _send_once(base_url: str, text: str) -> float:
+    api = FeishuApiClient("cli_bench", "secret", base_url=base_url)
+    try:
+        await api.send_text("oc_bench", "warm up")
+        outbound = PlatformOutboundMessage(
+            parts=(OutboundPart.text_part(text),), meta={}, history_key="feishu:oc_bench"
+        )
+        started = time.perf_counter()
+        await FeishuAdapter().send_outbound_async(api, "oc_bench", outbound)
+        return time.perf_counter() - started
+    finally:
+        await api.aclose()
+
+
+def measure(sizes=DEFAULT_SIZES, iterations: int = 20) -> list[dict]:
+    rows = []
+    for size in sizes:
+        text = build_sample_reply(size)
+        messages = render_reply_text(text)
+        render_sec = timeit.timeit(lambda: render_reply_text(text), number=iterations)
+
+        server = FakeFeishuApi().start()
+        try:
+            send_sec = asyncio.run(_send_once(server.base_url, text))
+            sends = server.calls_for("POST", "/open-apis/im/v1/messages")
+            uploads = server.calls_for("POST", "/open-apis/im/v1/files")
+        finally:
+            server.stop()
+
+        rows.append(
+            {
+                "reply_chars": size,
+                "render_ms": round(render_sec / iterations * 1000, 3),
+                "messages": [message.msg_type for message in messages],
+                # 减去预热用的那一条文本消息。
+                "api_calls": len(sends) - 1 + len(uploads),
+                "send_ms": round(send_sec * 1000, 1),
+            }
+        )
+    return rows
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    print(json.dumps(measure(args.sizes, args.iterations), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,356 @@
+"""End-to-end load test for the Telegram pipeline.
+
+Runs the real `BotHandlers` + `BridgeCore` + `ChatStore` stack against
+`FakeBotApi` and `fake_codex.py`, simulating N chats x M messages, and reports
+reply latency percentiles, throughput, peak RSS and state-file write counts.
+
+Usage:
+    python -m benchmarks.load_test --chats 8 --messages 5 --codex-delay 0.3
+    python -m benchmarks.load_test --baseline default --save-baseline
+    python -m benchmarks.load_test --baseline default   # compare against stored
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import stat
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+from app.config.chat_store import ChatStore
+from app.config.config import AppConfig
+from app.config.project_service import ProjectService
+from app.core.message_inbox import MessageInbox
+from app.core.reply_outbox import ReplyOutbox
+from app.telegram.bot import SYSTEM_PROMPT, build_application
+from app.telegram.handlers import BotHandlers
+from benchmarks.fake_bot_api import FakeBotApi, SentCall
+
+BENCH_DIR = Path(__file__).resolve().parent
+FAKE_CODEX_PATH = BENCH_DIR / "fake_codex.py"
+BASELINE_DIR = BENCH_DIR / "baselines"
+REPLY_PREFIX = "echo: "
+
+
+@dataclass(frozen=True)
+class LoadTestConfig:
+    chats: int = 4
+    messages_per_chat: int = 3
+    codex_delay_sec: float = 0.3
+    codex_jitter_sec: float = 0.0
+    codex_events: int = 3
+    reply_chars: int = 400
+    mode: str = "closed"
+    timeout_sec: float = 120.0
+    polling_timeout_sec: int = 1
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _peak_rss_mb(who: int) -> float:
+    raw = resource.getrusage(who).ru_maxrss
+    # Linux 报告 KB，macOS 报告字节。
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(raw / divisor, 1)
+
+
+def ensure_fake_codex_executable() -> str:
+    mode = FAKE_CODEX_PATH.stat().st_mode
+    if not mode & stat.S_IXUSR:
+        FAKE_CODEX_PATH.chmod(mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return str(FAKE_CODEX_PATH)
+
+
+def build_fake_handlers(workdir: str, logger: logging.Logger) -> BotHandlers:
+    config = AppConfig(
+        telegram_bot_token="123456:fake-token",
+        telegram_proxy_url="",
+        codex_model="",
+        codex_reasoning_effort="",
+        codex_bin=ensure_fake_codex_executable(),
+        codex_project_dir=workdir,
+        codex_timeout_sec=120,
+        codex_sandbox="danger-full-access",
+        allowed_user_ids_raw="",
+    )
+    project_service = ProjectService(
+        initial_project_dir=workdir, env_path=os.path.join(workdir, ".env")
+    )
+    chat_store = ChatStore(
+        history_file=os.path.join(workdir, "chat_histories.json"), max_turns=12
+    )
+    inbox = MessageInbox(os.path.join(workdir, "telegram_inbox.json"))
+    inbox.load()
+    outbox = ReplyOutbox(os.path.join(workdir, "telegram_outbox.json"))
+    outbox.load()
+    return BotHandlers(
+        config=config,
+        project_service=project_service,
+        chat_store=chat_store,
+        allowed_user_ids=set(),
+        logger=logger,
+        codex_max_retries=1,
+        polling_timeout_sec=1,
+        polling_bootstrap_retries=0,
+        polling_restart_threshold=3,
+        polling_restart_cooldown_sec=20.0,
+        wake_watchdog_interval_sec=20.0,
+        wake_gap_threshold_sec=90.0,
+        system_prompt=SYSTEM_PROMPT,
+        polling_max_restarts_per_window=4,
+        polling_restart_window_sec=300.0,
+        polling_escalate_exit_code=75,
+        update_state_path=os.path.join(workdir, "telegram_update_state.json"),
+        inbox=inbox,
+        outbox=outbox,
+    )
+
+
+class _WriteCounter:
+    def __init__(self):
+        self.counts = {"chat_store_save": 0, "update_state_save": 0}
+
+    def wrap(self, key: str, func):
+        def wrapped(*args, **kwargs):
+            self.counts[key] += 1
+            return func(*args, **kwargs)
+
+        return wrapped
+
+
+def _reply_token(call: SentCall) -> str:
+    if call.method != "sendMessage":
+        return ""
+    text = str(call.params.get("text") or "")
+    if not text.startswith(REPLY_PREFIX):
+        return ""
+    return text[len(REPLY_PREFIX) :].split(" ", 1)[0]
+
+
+async def run_load_test(cfg: LoadTestConfig) -> dict:
+    logger = logging.getLogger("benchmarks.load_test")
+    env_overrides = {
+        "FAKE_CODEX_DELAY_SEC": str(cfg.codex_delay_sec),
+        "FAKE_CODEX_JITTER_SEC": str(cfg.codex_jitter_sec),
+        "FAKE_CODEX_EVENTS": str(cfg.codex_events),
+        "FAKE_CODEX_REPLY_CHARS": str(cfg.reply_chars),
+    }
+    saved_env = {key: os.environ.get(key) for key in env_overrides}
+    os.environ.update(env_overrides)
+
+    loop = asyncio.get_running_loop()
+    api = FakeBotApi().start()
+    waiters: dict[str, asyncio.Future] = {}
+    reply_at: dict[str, float] = {}
+    errors: list[str] = []
+
+    def on_call(call: SentCall) -> None:
+        token = _reply_token(call)
+        if token:
+            loop.call_soon_threadsafe(_resolve, token, call.at)
+            return
+        text = str(call.params.get("text") or "")
+        if call.method == "sendMessage" and text.startswith("请求失败"):
+            errors.append(text)
+
+    def _resolve(token: str, at: float) -> None:
+        reply_at.setdefault(token, at)
+        waiter = waiters.get(token)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(at)
+
+    api.on_call = on_call
+    counter = _WriteCounter()
+    sent_at: dict[str, float] = {}
+    latencies: list[float] = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        handlers = build_fake_handlers(workdir, logger)
+        handlers.chat_store.save = counter.wrap(
+            "chat_store_save", handlers.chat_store.save
+        )
+        handlers._save_update_state = counter.wrap(
+            "update_state_save", handlers._save_update_state
+        )
+        app = build_application(handlers, logger, base_url=api.base_url)
+
+        async def send_one(chat_id: int, index: int) -> None:
+            token = f"load-{chat_id}-{index}"
+            waiters[token] = loop.create_future()
+            sent_at[token] = time.monotonic()
+            api.push_text_update(chat_id, token)
+            try:
+                done_at = await asyncio.wait_for(waiters[token], timeout=cfg.timeout_sec)
+            except asyncio.TimeoutError:
+                errors.append(f"timeout:{token}")
+                return
+            latencies.append(done_at - sent_at[token])
+
+        async def run_chat(chat_id: int) -> None:
+            for index in range(cfg.messages_per_chat):
+                await send_one(chat_id, index)
+
+        await app.initialize()
+        await handlers.post_init(app)
+        await app.start()
+        await app.updater.start_polling(
+            timeout=cfg.polling_timeout_sec,
+            bootstrap_retries=0,
+        )
+        started = time.monotonic()
+        try:
+            chat_ids = [10_000 + idx for idx in range(cfg.chats)]
+            if cfg.mode == "burst":
+                await asyncio.gather(
+                    *(
+                        send_one(chat_id, index)
+                        for index in range(cfg.messages_per_chat)
+                        for chat_id in chat_ids
+                    )
+                )
+            else:
+                await asyncio.gather(*(run_chat(chat_id) for chat_id in chat_ids))
+        finally:
+            elapsed = time.monotonic() - started
+            await app.updater.stop()
+            await app.stop()
+            await handlers.post_shutdown(app)
+            await app.shutdown()
+            api.stop()
+            for key, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+    total = cfg.chats * cfg.messages_per_chat
+    return {
+        "config": asdict(cfg),
+        "messages": total,
+        "completed": len(latencies),
+        "errors": len(errors),
+        "elapsed_sec": round(elapsed, 3),
+        "messages_per_sec": round(len(latencies) / elapsed, 3) if elapsed > 0 else 0.0,
+        "latency_sec": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3) if latencies else 0.0,
+        },
+        "peak_rss_mb": {
+            "bridge": _peak_rss_mb(resource.RUSAGE_SELF),
+            "codex_children": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+        },
+        "file_writes": dict(counter.counts),
+        "bot_api_calls": len(api.calls),
+    }
+
+
+def baseline_path(name: str, directory: Path = BASELINE_DIR) -> Path:
+    return directory / f"{name}.json"
+
+
+def save_baseline(name: str, report: dict, directory: Path = BASELINE_DIR) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = baseline_path(name, directory)
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return path
+
+
+def load_baseline(name: str, directory: Path = BASELINE_DIR) -> Optional[dict]:
+    path = baseline_path(name, directory)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def compare_with_baseline(report: dict, baseline: dict, tolerance: float = 0.2) -> list[str]:
+    regressions: list[str] = []
+    for key in ("p50", "p95", "p99"):
+        current = float(report["latency_sec"].get(key) or 0.0)
+        previous = float(baseline.get("latency_sec", {}).get(key) or 0.0)
+        if previous > 0 and current > previous * (1 + tolerance):
+            regressions.append(f"latency {key}: {previous:.3f}s -> {current:.3f}s")
+    current_rate = float(report.get("messages_per_sec") or 0.0)
+    previous_rate = float(baseline.get("messages_per_sec") or 0.0)
+    if previous_rate > 0 and current_rate < previous_rate * (1 - tolerance):
+        regressions.append(
+            f"throughput: {previous_rate:.3f}/s -> {current_rate:.3f}/s"
+        )
+    for key, current_writes in (report.get("file_writes") or {}).items():
+        previous_writes = int((baseline.get("file_writes") or {}).get(key) or 0)
+        if previous_writes and current_writes > previous_writes * (1 + tolerance):
+            regressions.append(f"file writes {key}: {previous_writes} -> {current_writes}")
+    return regressions
+
+
+def _parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--chats", type=int, default=LoadTestConfig.chats)
+    parser.add_argument("--messages", type=int, default=LoadTestConfig.messages_per_chat)
+    parser.add_argument("--codex-delay", type=float, default=LoadTestConfig.codex_delay_sec)
+    parser.add_argument("--codex-jitter", type=float, default=LoadTestConfig.codex_jitter_sec)
+    parser.add_argument("--codex-events", type=int, default=LoadTestConfig.codex_events)
+    parser.add_argument("--reply-chars", type=int, default=LoadTestConfig.reply_chars)
+    parser.add_argument("--mode", choices=("closed", "burst"), default=LoadTestConfig.mode)
+    parser.add_argument("--timeout", type=float, default=LoadTestConfig.timeout_sec)
+    parser.add_argument("--baseline", default="", help="baseline name under benchmarks/baselines")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(level=logging.WARNING)
+    cfg = LoadTestConfig(
+        chats=max(1, args.chats),
+        messages_per_chat=max(1, args.messages),
+        codex_delay_sec=max(0.0, args.codex_delay),
+        codex_jitter_sec=max(0.0, args.codex_jitter),
+        codex_events=max(0, args.codex_events),
+        reply_chars=max(1, args.reply_chars),
+        mode=args.mode,
+        timeout_sec=args.timeout,
+    )
+    report = asyncio.run(run_load_test(cfg))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if not args.baseline:
+        return 0
+    if args.save_baseline:
+        path = save_baseline(args.baseline, report)
+        print(f"baseline saved: {path}")
+        return 0
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"baseline not found: {baseline_path(args.baseline)}")
+        return 1
+    regressions = compare_with_baseline(report, baseline, tolerance=args.tolerance)
+    if regressions:
+        print("regressions:")
+        for line in regressions:
+            print(f"- {line}")
+        return 1
+    print("no regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,108 @@
+"""Cold-start import benchmark for the bot entry points.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+reports the cumulative import time plus the slowest top-level imports.
+
+Usage:
+    python -m benchmarks.startup_bench
+    python -m benchmarks.startup_bench app.feishu.feishu_bot --top 15
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+ENTRY_MODULES = ("app.telegram.bot", "app.feishu.feishu_bot")
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    rows: list[dict] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0].strip())
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            continue
+        raw_name = parts[2].rstrip()
+        name = raw_name.strip()
+        depth = (len(raw_name) - len(raw_name.lstrip(" "))) // 2
+        rows.append(
+            {
+                "module": name,
+                "self_us": self_us,
+                "cumulative_us": cumulative_us,
+                "depth": depth,
+            }
+        )
+    return rows
+
+
+def measure_import(module: str, python: str = sys.executable) -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(REPO_ROOT) + (
+        os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else ""
+    )
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else module)
+    rows = parse_importtime(result.stderr)
+    target = next((row for row in reversed(rows) if row["module"] == module), None)
+    return {
+        "module": module,
+        "total_ms": round((target or {}).get("cumulative_us", 0) / 1000, 1),
+        "modules": {row["module"] for row in rows},
+        "rows": rows,
+    }
+
+
+def _top_level_rows(rows: list[dict], top: int) -> list[dict]:
+    # depth==1 为目标模块直接触发的导入，最能反映“谁拖慢了启动”。
+    direct = [row for row in rows if row["depth"] == 1]
+    return sorted(direct, key=lambda row: row["cumulative_us"], reverse=True)[:top]
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("modules", nargs="*", default=list(ENTRY_MODULES))
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    report = []
+    for module in args.modules:
+        measured = measure_import(module)
+        report.append(
+            {
+                "module": module,
+                "total_ms": measured["total_ms"],
+                "loads_telegram": "telegram" in measured["modules"],
+                "loads_lark_oapi": "lark_oapi" in measured["modules"],
+                "slowest_imports": [
+                    {"module": row["module"], "ms": round(row["cumulative_us"] / 1000, 1)}
+                    for row in _top_level_rows(measured["rows"], args.top)
+                ],
+            }
+        )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -11,6 +11,12 @@ resolve_target_script() {
     feishu)
       echo "app/feishu/feishu_bot.py"
       ;;
+    all|host)
+      echo "app/host/multi_host.py"
+      ;;
+    supervise)
+      echo "app/host/supervisor.py"
+      ;;
     "")
       return 0
       ;;
@@ -24,10 +30,12 @@ prompt_platform() {
   echo "Select platform:" >&2
   echo "1) Telegram" >&2
   echo "2) Feishu" >&2
+  echo "3) All enabled platforms (single process)" >&2
   read -r choice
   case "$choice" in
     1) echo "app/telegram/bot.py" ;;
     2) echo "app/feishu/feishu_bot.py" ;;
+    3) echo "app/host/multi_host.py" ;;
     *)
       echo "Invalid selection" >&2
       return 1
@@ -81,7 +89,7 @@ main() {
   fi
 
   target_script="$(resolve_target_script "${1:-}")" || {
-    echo "Usage: ./start.sh [tg|telegram|feishu]"
+    echo "Usage: ./start.sh [tg|telegram|feishu|all|supervise]"
     exit 1
   }
   if [[ -z "$target_script" ]]; then
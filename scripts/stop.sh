@@ -3,17 +3,51 @@ set -euo pipefail
 
 ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
 PID_FILE="$ROOT_DIR/bot.pid"
+SUPERVISOR_PID_FILE="$ROOT_DIR/supervisor.pid"
+SUPERVISOR_STOP_TIMEOUT_SEC="${SUPERVISOR_STOP_TIMEOUT_SEC:-45}"
 BOT_ENTRYPOINTS=(
   "$ROOT_DIR/app/telegram/bot.py"
   "$ROOT_DIR/app/feishu/feishu_bot.py"
+  "$ROOT_DIR/app/host/multi_host.py"
 )
 
+stop_supervisor() {
+  local pid
+  local waited=0
+
+  [[ -f "$SUPERVISOR_PID_FILE" ]] || return 1
+  pid="$(cat "$SUPERVISOR_PID_FILE" 2>/dev/null || true)"
+  if [[ -z "$pid" ]] || ! kill -0 "$pid" >/dev/null 2>&1; then
+    rm -f "$SUPERVISOR_PID_FILE"
+    return 1
+  fi
+
+  # 交给守护进程转发 SIGTERM，等各平台排空在途任务后自行退出。
+  echo "Stopping supervisor (pid $pid), waiting for bots to drain..."
+  kill -TERM "$pid" >/dev/null 2>&1 || true
+  while kill -0 "$pid" >/dev/null 2>&1; do
+    if (( waited >= SUPERVISOR_STOP_TIMEOUT_SEC * 10 )); then
+      echo "Force stopping supervisor..."
+      kill -9 "$pid" >/dev/null 2>&1 || true
+      break
+    fi
+    sleep 0.1
+    waited=$((waited + 1))
+  done
+  rm -f "$SUPERVISOR_PID_FILE"
+  return 0
+}
+
 main() {
   local stopped=0
   local entry
 
   cd "$ROOT_DIR"
 
+  if stop_supervisor; then
+    stopped=1
+  fi
+
   for entry in "${BOT_ENTRYPOINTS[@]}"; do
     if pgrep -f "$entry" >/dev/null 2>&1; then
       echo "Stopping $(basename "$entry")..."
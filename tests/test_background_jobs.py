@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import tempfile
+import unittest
+
+from app.config.chat_store import ChatStore
+from app.core.background_jobs import JOB_DONE, JOB_FAILED, JOB_RUNNING, BackgroundJobManager
+from app.core.bridge_core import BridgeCore
+
+
+class BackgroundJobManagerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.chat_store = ChatStore(history_file=f"{tmpdir.name}/chat.json", max_turns=12)
+        self.release = asyncio.Event()
+        self.prompts: list[str] = []
+        self.delivered: list[tuple] = []
+
+    def build_manager(self, **kwargs) -> BackgroundJobManager:
+        async def request_reply(prompt, reasoning_effort=None):
+            self.prompts.append(prompt)
+            await self.release.wait()
+            if "boom" in prompt:
+                raise RuntimeError("codex crashed")
+            return "refactor finished", {}
+
+        async def deliver(job, outbound):
+            self.delivered.append((job.id, job.reply_target, outbound))
+
+        manager = BackgroundJobManager(
+            "telegram",
+            core=BridgeCore(
+                chat_store=self.chat_store,
+                system_prompt="system",
+                request_reply=request_reply,
+            ),
+            deliver=deliver,
+            logger=logging.getLogger("test.bg"),
+            **kwargs,
+        )
+        manager.attach(asyncio.get_running_loop())
+        self.addAsyncCleanup(manager.shutdown)
+        return manager
+
+    async def wait_for(self, predicate) -> None:
+        for _ in range(200):
+            if predicate():
+                return
+            await asyncio.sleep(0.01)
+        self.fail("等待超时")
+
+    async def test_job_runs_detached_and_delivers_result(self):
+        manager = self.build_manager()
+        self.chat_store.append_user_message(1, "earlier question")
+        job = await asyncio.to_thread(manager.submit, 1, 1, "refactor the parser")
+
+        await self.wait_for(lambda: job.state == JOB_RUNNING)
+        self.assertIn("earlier question", self.prompts[0])
+        self.assertIn("refactor the parser", self.prompts[0])
+        self.release.set()
+        await self.wait_for(lambda: self.delivered)
+
+        self.assertEqual(job.state, JOB_DONE)
+        job_id, target, outbound = self.delivered[0]
+        self.assertEqual((job_id, target), (job.id, 1))
+        self.assertIn(f"后台任务 #{job.id} 已完成", outbound.parts[0].text)
+        self.assertEqual(outbound.parts[1].text, "refactor finished")
+        self.assertEqual(
+            self.chat_store.histories[1][-2:],
+            [
+                {"role": "user", "content": "/bg refactor the parser"},
+                {"role": "assistant", "content": "refactor finished"},
+            ],
+        )
+
+    async def test_jobs_run_in_parallel_up_to_limit(self):
+        manager = self.build_manager(max_running=2, max_jobs_per_chat=5)
+        jobs = [manager.submit(1, 1, f"task {index}") for index in range(3)]
+
+        await self.wait_for(lambda: len(self.prompts) == 2)
+        await asyncio.sleep(0.05)
+        self.assertEqual(manager.snapshot(), {"max_running": 2, "running": 2, "queued": 1})
+        self.release.set()
+        await self.wait_for(lambda: len(self.delivered) == 3)
+
+        self.assertTrue(all(job.state == JOB_DONE for job in jobs))
+
+    async def test_failed_job_reports_error_and_chat_cap_is_enforced(self):
+        manager = self.build_manager(max_jobs_per_chat=1)
+        job = manager.submit(1, 1, "boom")
+        with self.assertRaises(RuntimeError):
+            manager.submit(1, 1, "second")
+        other_chat = manager.submit(2, 2, "other chat")
+
+        self.release.set()
+        await self.wait_for(lambda: len(self.delivered) == 2)
+
+        self.assertEqual(job.state, JOB_FAILED)
+        self.assertEqual(job.error, "codex crashed")
+        failure = next(outbound for job_id, _, outbound in self.delivered if job_id == job.id)
+        self.assertEqual(failure.parts[0].text, f"后台任务 #{job.id} 失败：codex crashed")
+        self.assertIsNone(manager.get(1, other_chat.id))
+        self.assertEqual([item.id for item in manager.list_jobs(2)], [other_chat.id])
+
+    def test_submit_requires_attached_loop(self):
+        manager = BackgroundJobManager(
+            "feishu",
+            core=None,
+            deliver=None,
+            logger=logging.getLogger("test.bg"),
+        )
+
+        with self.assertRaises(RuntimeError):
+            manager.submit("oc_1", "feishu:ou_1", "task")
+
+
+if __name__ == "__main__":
+    unittest.main()
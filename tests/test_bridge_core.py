@@ -1,9 +1,11 @@
+import asyncio
 import tempfile
 import unittest
 from unittest.mock import AsyncMock
 
 from app.core.bridge_core import BridgeCore, BridgeInboundMessage
 from app.config.chat_store import ChatStore
+from app.core.project_locks import ProjectLockManager
 
 
 class BridgeCoreTests(unittest.IsolatedAsyncioTestCase):
@@ -65,6 +67,37 @@ class BridgeCoreTests(unittest.IsolatedAsyncioTestCase):
             self.assertEqual(reply.parts[1].source_type, "local_path")
             self.assertEqual(reply.parts[1].value, image_path)
 
+    async def test_process_user_text_runs_in_chat_project_under_directory_lock(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = ChatStore(history_file=f"{tmpdir}/hist.json", max_turns=12)
+            locks = ProjectLockManager(notify_interval_sec=0.1)
+            requester = AsyncMock(return_value=("done", {"usage": {}}))
+            statuses: list[str] = []
+
+            async def on_status(text):
+                statuses.append(text)
+
+            core = BridgeCore(
+                chat_store=store,
+                system_prompt="system",
+                request_reply=requester,
+                resolve_project_dir=lambda key: f"{tmpdir}/{key}",
+                project_locks=locks,
+            )
+            inbound = BridgeInboundMessage(
+                platform="telegram", chat_id=7, user_id=7, text="hello"
+            )
+
+            async with locks.hold(f"{tmpdir}/7"):
+                task = asyncio.create_task(core.process_user_text(inbound, on_status=on_status))
+                await asyncio.sleep(0.25)
+                requester.assert_not_awaited()
+            reply = await task
+
+            self.assertEqual(requester.await_args.kwargs, {"project_dir": f"{tmpdir}/7"})
+            self.assertIn("排队等待", statuses[0])
+            self.assertGreater(reply.meta["project_lock_wait_sec"], 0.2)
+
     def test_chat_store_load_preserves_platform_history_key(self):
         with tempfile.TemporaryDirectory() as tmpdir:
             history_file = f"{tmpdir}/hist.json"
@@ -5,13 +5,6 @@ from app.core.codex_client import ask_codex_with_meta
 from app.config.config import AppConfig
 
 
-class _Result:
-    def __init__(self, returncode: int, stdout: str = "", stderr: str = ""):
-        self.returncode = returncode
-        self.stdout = stdout
-        self.stderr = stderr
-
-
 class CodexClientReasoningTests(unittest.TestCase):
     def _build_config(self, default_effort: str = "") -> AppConfig:
         return AppConfig(
@@ -34,7 +27,10 @@ class CodexClientReasoningTests(unittest.TestCase):
                 '{"type":"item.completed","item":{"type":"agent_message","text":"ok"}}',
             ]
         )
-        with patch("app.core.codex_client.subprocess.run", return_value=_Result(0, stdout=fake_stdout)) as run_mock:
+        with patch(
+            "app.core.codex_client._run_codex_process",
+            return_value=(0, fake_stdout.splitlines(), "", {}),
+        ) as run_mock:
             reply, _ = ask_codex_with_meta(config, "hello", reasoning_effort="high")
 
         called_cmd = run_mock.call_args.args[0]
@@ -45,7 +41,10 @@ class CodexClientReasoningTests(unittest.TestCase):
     def test_passes_reasoning_effort_from_config_default(self):
         config = self._build_config(default_effort="medium")
         fake_stdout = '{"type":"item.completed","item":{"type":"agent_message","text":"ok"}}'
-        with patch("app.core.codex_client.subprocess.run", return_value=_Result(0, stdout=fake_stdout)) as run_mock:
+        with patch(
+            "app.core.codex_client._run_codex_process",
+            return_value=(0, fake_stdout.splitlines(), "", {}),
+        ) as run_mock:
             ask_codex_with_meta(config, "hello")
 
         called_cmd = run_mock.call_args.args[0]
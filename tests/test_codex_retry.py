@@ -0,0 +1,303 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from app.config.config import AppConfig
+from app.core.codex_client import CodexCancelScope, CodexRunError, ask_codex_with_meta
+from app.core.codex_retry import (
+    CodexCircuitBreaker,
+    CodexError,
+    CodexRetryPolicy,
+    classify_codex_error,
+)
+from benchmarks.load_test import ensure_fake_codex_executable
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ClassifyCodexErrorTests(unittest.TestCase):
+    def test_classifies_by_stderr_exit_code_and_exception_type(self):
+        cases = [
+            (CodexRunError("Error: Not logged in. Run codex login", returncode=1), "auth"),
+            (CodexRunError("stream error: 429 Too Many Requests", returncode=1), "quota"),
+            (CodexRunError("You've hit your usage limit", returncode=1), "quota"),
+            (CodexRunError("model gpt-9 does not exist", returncode=1), "config"),
+            (CodexRunError("error: bad flag", returncode=2), "config"),
+            (CodexRunError("stream disconnected before completion", returncode=1), "transient"),
+            (CodexRunError("codex returned empty output", returncode=0), "transient"),
+            (CodexRunError("codex timed out after 600s", thread_id="t1", timed_out=True), "timeout"),
+            (FileNotFoundError("No such file or directory: 'codex'"), "config"),
+            (subprocess.TimeoutExpired(["codex"], 5), "timeout"),
+        ]
+        for exc, kind in cases:
+            with self.subTest(exc=str(exc)):
+                self.assertEqual(classify_codex_error(exc).kind, kind)
+
+        # 日志里的行号、文件名或普通说明文字不算鉴权/额度错误。
+        for text in (
+            "warning: src/auth.rs:401 retrying",
+            "updated quota.py and rate_limit.py",
+            "see docs/codex login flow",
+        ):
+            with self.subTest(text=text):
+                self.assertEqual(
+                    classify_codex_error(CodexRunError(text, returncode=1)).kind, "transient"
+                )
+
+        error = classify_codex_error(CodexRunError("Not logged in", returncode=1))
+        self.assertIn("codex login", str(error))
+        self.assertEqual(error.details, "Not logged in")
+
+
+class CodexFailureDetailsTests(unittest.TestCase):
+    def test_failure_details_come_from_stderr_and_error_events_only(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        script = os.path.join(tmpdir.name, "codex")
+        with open(script, "w", encoding="utf-8") as f:
+            f.write(
+                f"#!{sys.executable}\n"
+                "import json\n"
+                "print(json.dumps({'type': 'thread.started', 'thread_id': 't-1'}))\n"
+                "print(json.dumps({'type': 'item.completed', 'item': {'type': 'agent_message',"
+                " 'text': 'HTTP 401 and 429 Too Many Requests are handled in quota.py'}}))\n"
+                "print(json.dumps({'type': 'turn.failed', 'error': {'message': 'stream disconnected'}}))\n"
+                "raise SystemExit(1)\n"
+            )
+        os.chmod(script, 0o755)
+        config = AppConfig(
+            telegram_bot_token="",
+            telegram_proxy_url="",
+            codex_model="",
+            codex_reasoning_effort="",
+            codex_bin=script,
+            codex_project_dir="",
+            codex_timeout_sec=30,
+            codex_sandbox="",
+            allowed_user_ids_raw="",
+        )
+
+        with self.assertRaises(CodexRunError) as ctx:
+            ask_codex_with_meta(config, "User: hi\n")
+
+        self.assertEqual(str(ctx.exception), "stream disconnected")
+        self.assertEqual(ctx.exception.thread_id, "t-1")
+        self.assertEqual(classify_codex_error(ctx.exception).kind, "transient")
+
+
+class CodexRetryPolicyTests(unittest.IsolatedAsyncioTestCase):
+    def build_policy(self, **breaker_kwargs) -> CodexRetryPolicy:
+        return CodexRetryPolicy(
+            max_attempts=3, base_delay_sec=0, breaker=CodexCircuitBreaker(**breaker_kwargs)
+        )
+
+    async def test_retries_only_transient_failures(self):
+        policy = self.build_policy()
+        calls: list = []
+
+        async def flaky(resume_thread_id):
+            calls.append(resume_thread_id)
+            if len(calls) < 3:
+                raise CodexRunError("connection reset by peer", returncode=1)
+            return "ok", {}
+
+        self.assertEqual(await policy.run(flaky), ("ok", {}))
+        self.assertEqual(calls, [None, None, None])
+
+        calls.clear()
+
+        async def not_logged_in(resume_thread_id):
+            calls.append(resume_thread_id)
+            raise CodexRunError("Not logged in", returncode=1)
+
+        with self.assertRaises(CodexError) as ctx:
+            await policy.run(not_logged_in)
+        self.assertEqual(ctx.exception.kind, "auth")
+        self.assertEqual(len(calls), 1)
+
+    async def test_timeout_resumes_thread_once(self):
+        policy = self.build_policy()
+        calls: list = []
+
+        async def slow(resume_thread_id):
+            calls.append(resume_thread_id)
+            if resume_thread_id is None:
+                raise CodexRunError("codex timed out after 5s", thread_id="thread-1", timed_out=True)
+            return "resumed", {}
+
+        self.assertEqual(await policy.run(slow), ("resumed", {}))
+        self.assertEqual(calls, [None, "thread-1"])
+
+        # 续跑成功时，那次超时不计入熔断，阈值为 1 也不会挡住续跑。
+        calls.clear()
+        strict = self.build_policy(failure_threshold=1)
+        self.assertEqual(await strict.run(slow), ("resumed", {}))
+        self.assertEqual(calls, [None, "thread-1"])
+        self.assertEqual(strict.snapshot()["state"], "closed")
+
+        calls.clear()
+
+        async def always_slow(resume_thread_id):
+            calls.append(resume_thread_id)
+            raise CodexRunError("codex timed out after 5s", thread_id="thread-2", timed_out=True)
+
+        with self.assertRaises(CodexError) as ctx:
+            await policy.run(always_slow)
+        self.assertEqual(ctx.exception.kind, "timeout")
+        self.assertEqual(calls, [None, "thread-2"])
+
+        calls.clear()
+
+        async def slow_without_thread(resume_thread_id):
+            calls.append(resume_thread_id)
+            raise CodexRunError("codex timed out after 5s", timed_out=True)
+
+        with self.assertRaises(CodexError):
+            await policy.run(slow_without_thread)
+        self.assertEqual(calls, [None])
+
+    async def test_breaker_fails_fast_then_probes_after_cooldown(self):
+        clock = FakeClock()
+        policy = CodexRetryPolicy(
+            max_attempts=1,
+            breaker=CodexCircuitBreaker(failure_threshold=2, cooldown_sec=30, clock=clock),
+        )
+        calls: list = []
+        healthy = False
+
+        async def backend(resume_thread_id):
+            calls.append(resume_thread_id)
+            if not healthy:
+                raise CodexRunError("503 Service Unavailable", returncode=1)
+            return "ok", {}
+
+        for _ in range(2):
+            with self.assertRaises(CodexError):
+                await policy.run(backend)
+        self.assertEqual(policy.snapshot()["state"], "open")
+
+        with self.assertRaises(CodexError) as ctx:
+            await policy.run(backend)
+        self.assertEqual(ctx.exception.kind, "unavailable")
+        self.assertIn("503", str(ctx.exception))
+        self.assertEqual(len(calls), 2)
+
+        # 冷却结束后放行一个试探请求，失败则重新打开。
+        clock.now += 31
+        with self.assertRaises(CodexError) as ctx:
+            await policy.run(backend)
+        self.assertEqual(ctx.exception.kind, "transient")
+        self.assertEqual(policy.snapshot()["state"], "open")
+
+        clock.now += 31
+        healthy = True
+        self.assertEqual(await policy.run(backend), ("ok", {}))
+        snapshot = policy.snapshot()
+        self.assertEqual(snapshot["state"], "closed")
+        self.assertEqual(snapshot["consecutive_failures"], 0)
+
+    async def test_repeated_auth_failure_trips_but_config_does_not(self):
+        policy = self.build_policy(failure_threshold=5)
+
+        async def bad_model(resume_thread_id):
+            raise CodexRunError("unknown model gpt-9", returncode=1)
+
+        for _ in range(6):
+            with self.assertRaises(CodexError):
+                await policy.run(bad_model)
+        self.assertEqual(policy.snapshot()["state"], "closed")
+
+        async def logged_out(resume_thread_id):
+            raise CodexRunError("401 Unauthorized", returncode=1)
+
+        # 单次鉴权失败可能是误判，连续第二次才打开熔断。
+        with self.assertRaises(CodexError):
+            await policy.run(logged_out)
+        self.assertEqual(policy.snapshot()["state"], "closed")
+        with self.assertRaises(CodexError):
+            await policy.run(logged_out)
+        self.assertEqual(policy.snapshot()["state"], "open")
+
+
+class CodexTimeoutTests(unittest.TestCase):
+    def test_timed_out_run_reports_thread_id(self):
+        config = AppConfig(
+            telegram_bot_token="",
+            telegram_proxy_url="",
+            codex_model="",
+            codex_reasoning_effort="",
+            codex_bin=ensure_fake_codex_executable(),
+            codex_project_dir="",
+            codex_timeout_sec=1,
+            codex_sandbox="",
+            allowed_user_ids_raw="",
+        )
+        with patch.dict("os.environ", {"FAKE_CODEX_DELAY_SEC": "5", "FAKE_CODEX_EVENTS": "0"}):
+            with self.assertRaises(CodexRunError) as ctx:
+                ask_codex_with_meta(config, "User: slow\n")
+
+        self.assertTrue(ctx.exception.timed_out)
+        self.assertTrue(ctx.exception.thread_id)
+
+    def test_resume_sends_short_continuation_prompt(self):
+        config = AppConfig(
+            telegram_bot_token="",
+            telegram_proxy_url="",
+            codex_model="",
+            codex_reasoning_effort="",
+            codex_bin=ensure_fake_codex_executable(),
+            codex_project_dir="",
+            codex_timeout_sec=30,
+            codex_sandbox="",
+            allowed_user_ids_raw="",
+        )
+        env = {"FAKE_CODEX_DELAY_SEC": "0", "FAKE_CODEX_EVENTS": "0", "FAKE_CODEX_REPLY_CHARS": "1"}
+        with patch.dict("os.environ", env):
+            fresh, _ = ask_codex_with_meta(config, "User: long history\n")
+            resumed, _ = ask_codex_with_meta(
+                config, "User: long history\n", resume_thread_id="thread-1"
+            )
+
+        # fake codex 把提示词里最后一行 User: 回显出来；续跑时不再带上原提示词。
+        self.assertEqual(fresh, "echo: long history")
+        self.assertEqual(resumed, "echo:")
+
+    def test_cancel_scope_kills_running_process(self):
+        config = AppConfig(
+            telegram_bot_token="",
+            telegram_proxy_url="",
+            codex_model="",
+            codex_reasoning_effort="",
+            codex_bin=ensure_fake_codex_executable(),
+            codex_project_dir="",
+            codex_timeout_sec=30,
+            codex_sandbox="",
+            allowed_user_ids_raw="",
+        )
+        scope = CodexCancelScope()
+        threading.Timer(0.3, scope.cancel).start()
+        started = time.monotonic()
+        with patch.dict("os.environ", {"FAKE_CODEX_DELAY_SEC": "10", "FAKE_CODEX_EVENTS": "0"}):
+            with self.assertRaises(CodexRunError) as ctx:
+                ask_codex_with_meta(config, "User: slow\n", cancel_scope=scope)
+
+        self.assertIn("cancelled", str(ctx.exception))
+        self.assertLess(time.monotonic() - started, 5)
+        # 已取消的 scope 不再启动新的子进程。
+        with self.assertRaises(CodexRunError):
+            ask_codex_with_meta(config, "User: slow\n", cancel_scope=scope)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from app.core.codex_scheduler import CodexScheduler, render_codex_scheduler_text
+from app.core.metrics import MetricsRegistry
+
+
+class CodexSchedulerTests(unittest.TestCase):
+    def test_global_cap_holds_across_platforms_and_loops(self):
+        metrics = MetricsRegistry()
+        scheduler = CodexScheduler(max_concurrency=2, metrics=metrics)
+        self.addCleanup(scheduler.shutdown)
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def fake_codex(_prompt):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.05)
+            with lock:
+                state["running"] -= 1
+            return "ok"
+
+        async def burst(platform):
+            return await asyncio.gather(
+                *(scheduler.run(platform, fake_codex, f"p{i}") for i in range(4))
+            )
+
+        # 两个平台各自在自己的事件循环里并发提交，模拟不同线程的运行时。
+        results = {}
+        threads = [
+            threading.Thread(target=lambda p=p: results.__setitem__(p, asyncio.run(burst(p))))
+            for p in ("telegram", "feishu")
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results["telegram"], ["ok"] * 4)
+        self.assertEqual(results["feishu"], ["ok"] * 4)
+        self.assertEqual(state["peak"], 2)
+        self.assertEqual(scheduler.snapshot()["peak_inflight"], 2)
+        self.assertEqual(metrics.counter("codex_requests_total", platform="feishu", outcome="ok"), 4)
+        self.assertEqual(metrics.summary("codex_run_sec", platform="telegram")["count"], 4)
+        self.assertEqual(metrics.gauge("codex_inflight"), 0)
+
+    def test_errors_are_counted_and_reraised(self):
+        metrics = MetricsRegistry()
+        scheduler = CodexScheduler(max_concurrency=1, metrics=metrics)
+        self.addCleanup(scheduler.shutdown)
+
+        def boom():
+            raise RuntimeError("codex failed")
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(scheduler.run("telegram", boom))
+
+        self.assertEqual(
+            metrics.counter("codex_requests_total", platform="telegram", outcome="error"), 1
+        )
+
+    def test_render_text_includes_cap_and_queue_wait(self):
+        scheduler = CodexScheduler(max_concurrency=3)
+        self.addCleanup(scheduler.shutdown)
+        asyncio.run(scheduler.run("feishu", lambda: None))
+
+        text = render_codex_scheduler_text(scheduler.snapshot())
+
+        self.assertIn("并发上限=3", text)
+        self.assertIn("{platform=feishu}", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,11 @@
+import subprocess
 import tempfile
 import unittest
 
 from app.config.chat_store import ChatStore
 from app.config.config import AppConfig
 from app.config.project_service import ProjectService
+from app.core.worktrees import WorktreeManager
 
 
 def build_service(
@@ -28,7 +30,11 @@ def build_service(
         codex_sandbox="danger-full-access",
         allowed_user_ids_raw="",
     )
-    project_service = ProjectService(initial_project_dir=tmpdir.name, env_path=env_path)
+    project_service = ProjectService(
+        initial_project_dir=tmpdir.name,
+        env_path=env_path,
+        chat_projects_path=f"{tmpdir.name}/chat_projects.json",
+    )
     chat_store = ChatStore(history_file=history_path, max_turns=12)
     reasoning_overrides: dict[object, str] = {}
     service = CommandService(
@@ -90,7 +96,7 @@ class CommandServiceTests(unittest.TestCase):
         self.assertEqual(chat_store.histories[history_key], [])
         self.assertNotIn(history_key, overrides)
 
-    def test_setproject_updates_directory_and_env(self):
+    def test_setproject_only_switches_current_chat(self):
         service, _config, project_service, _chat_store, _overrides, tmpdir = build_service()
         self.addCleanup(tmpdir.cleanup)
 
@@ -102,9 +108,35 @@ class CommandServiceTests(unittest.TestCase):
         )
 
         self.assertTrue(result.handled)
-        self.assertEqual(project_service.project_dir, target)
         self.assertIn("已创建并切换项目目录", result.reply_text)
         self.assertIn(target, result.reply_text)
+        self.assertEqual(project_service.project_dir_for("feishu:oc_1"), target)
+        self.assertEqual(project_service.project_dir_for("feishu:oc_2"), tmpdir.name)
+        self.assertEqual(project_service.project_dir, tmpdir.name)
+        reloaded = ProjectService(
+            initial_project_dir=tmpdir.name,
+            env_path=project_service.env_path,
+            chat_projects_path=project_service.chat_projects_path,
+        )
+        self.assertEqual(reloaded.project_dir_for("feishu:oc_1"), target)
+
+        result = service.try_handle(platform="feishu", chat_id="oc_1", text="/setproject default")
+
+        self.assertIn("已恢复默认项目目录", result.reply_text)
+        self.assertEqual(project_service.project_dir_for("feishu:oc_1"), tmpdir.name)
+
+    def test_getproject_shows_chat_worktree_when_enabled(self):
+        service, _config, _project_service, _chat_store, _overrides, tmpdir = build_service()
+        self.addCleanup(tmpdir.cleanup)
+        service.worktrees = WorktreeManager(f"{tmpdir.name}/worktrees")
+
+        result = service.try_handle(platform="telegram", chat_id=7, text="/getproject")
+        self.assertIn("项目目录不是 git 仓库", result.reply_text)
+
+        subprocess.run(["git", "init", "-q", tmpdir.name], check=True)
+        result = service.try_handle(platform="telegram", chat_id=7, text="/getproject")
+        self.assertIn(f"会话 worktree：{service.worktrees.root_dir}/", result.reply_text)
+        self.assertIn("（首次运行时创建）", result.reply_text)
 
     def test_setreasoning_updates_override_and_env(self):
         service, config, project_service, _chat_store, overrides, tmpdir = build_service()
@@ -158,6 +190,95 @@ class CommandServiceTests(unittest.TestCase):
         self.assertIn("gpt-5", result.reply_text)
         self.assertIn("状态=degraded", result.reply_text)
 
+    def test_status_shows_process_stats_after_codex_run(self):
+        service, _config, _project_service, chat_store, _overrides, tmpdir = build_service()
+        self.addCleanup(tmpdir.cleanup)
+
+        before = service.try_handle(platform="feishu", chat_id="oc_1", text="/status")
+        chat_store.update_process_stats("feishu:oc_1", {"peak_rss_mb": 300.5, "cpu_sec": 2.5})
+        chat_store.update_process_stats("feishu:oc_1", {"peak_rss_mb": 120.0, "cpu_sec": 1.25})
+        after = service.try_handle(platform="feishu", chat_id="oc_1", text="/status")
+
+        self.assertNotIn("进程资源", before.reply_text)
+        self.assertIn("最近一次：峰值内存=120.0MB，CPU=1.25s", after.reply_text)
+        self.assertIn("累计：最大峰值内存=300.5MB，CPU=3.75s", after.reply_text)
+
+    def test_status_appends_loop_lag_even_when_health_disabled(self):
+        service, _config, _project_service, _chat_store, _overrides, tmpdir = build_service(
+            health_snapshot={"enabled": False},
+        )
+        self.addCleanup(tmpdir.cleanup)
+        service.get_loop_lag_snapshot = lambda: {
+            "samples": 3,
+            "max_lag_ms": 12.0,
+            "stall_threshold_ms": 250.0,
+            "stalls": 0,
+            "histogram": {"<=25ms": 3},
+        }
+
+        result = service.try_handle(platform="feishu", chat_id="oc_1", text="/status")
+
+        self.assertNotIn("轮询健康", result.reply_text)
+        self.assertIn("事件循环延迟", result.reply_text)
+        self.assertIn("<=25ms:3", result.reply_text)
+
+
+    def test_background_job_commands_submit_list_and_show(self):
+        service, *_rest, tmpdir = build_service()
+        self.addCleanup(tmpdir.cleanup)
+        jobs = FakeBackgroundJobs()
+        service.background_jobs = jobs
+
+        submitted = service.try_handle(
+            platform="feishu", chat_id="ou_1", text="/bg 重构解析器\n并补测试", reply_target="oc_1"
+        )
+        listed = service.try_handle(platform="feishu", chat_id="ou_1", text="/jobs")
+        shown = service.try_handle(platform="feishu", chat_id="ou_1", text="/job #1")
+        missing = service.try_handle(platform="feishu", chat_id="ou_1", text="/job 9")
+
+        self.assertEqual(jobs.submitted, [("oc_1", "feishu:ou_1", "重构解析器\n并补测试", None)])
+        self.assertIn("已创建后台任务 #1", submitted.reply_text)
+        self.assertFalse(submitted.store_history)
+        self.assertIn("- #1 排队中：重构解析器 并补测试", listed.reply_text)
+        self.assertIn("后台任务 #1：排队中", shown.reply_text)
+        self.assertEqual(missing.reply_text, "未找到后台任务 #9。")
+
+    def test_background_job_commands_without_manager(self):
+        service, *_rest, tmpdir = build_service()
+        self.addCleanup(tmpdir.cleanup)
+
+        result = service.try_handle(platform="telegram", chat_id=1, text="/bg hello")
+
+        self.assertEqual(result.reply_text, "当前入口未启用后台任务。")
+
+
+class FakeBackgroundJobs:
+    def __init__(self):
+        self.submitted = []
+        self.jobs = {}
+
+    def submit(self, reply_target, history_key, prompt, reasoning_effort=None):
+        from app.core.background_jobs import BackgroundJob
+
+        self.submitted.append((reply_target, history_key, prompt, reasoning_effort))
+        job = BackgroundJob(
+            id=len(self.jobs) + 1,
+            platform="feishu",
+            reply_target=reply_target,
+            history_key=history_key,
+            prompt=prompt,
+            created_at=0.0,
+        )
+        self.jobs[job.id] = job
+        return job
+
+    def list_jobs(self, history_key):
+        return [job for job in self.jobs.values() if job.history_key == history_key]
+
+    def get(self, history_key, job_id):
+        job = self.jobs.get(job_id)
+        return job if job is not None and job.history_key == history_key else None
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,121 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.core.bridge_core import BridgeReply
+from app.core.platform_messages import OutboundPart, PlatformOutboundMessage
+from app.feishu.feishu_adapter import FeishuAdapter
+from app.feishu.feishu_api import FeishuApiClient, FeishuApiError
+from app.feishu.feishu_bot import handle_private_text_event
+from app.feishu.feishu_io import FeishuPrivateTextEvent
+from benchmarks.fake_feishu_api import FakeFeishuApi
+
+
+class FeishuApiClientTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = FakeFeishuApi().start()
+        self.addCleanup(self.server.stop)
+
+    async def asyncSetUp(self):
+        self.api = FeishuApiClient("cli_test", "secret", base_url=self.server.base_url)
+
+    async def asyncTearDown(self):
+        await self.api.aclose()
+
+    async def test_token_is_cached_and_connection_reused(self):
+        for index in range(3):
+            result = await self.api.send_text("oc_1", f"hello {index}")
+            self.assertTrue(result["message_id"].startswith("om_"))
+            self.assertTrue(result["log_id"])
+
+        sends = self.server.calls_for("POST", "/open-apis/im/v1/messages")
+        self.assertEqual(self.server.tokens_issued, 1)
+        self.assertEqual(len(sends), 3)
+        self.assertEqual(sends[0].query, {"receive_id_type": "chat_id"})
+        self.assertEqual(len({call.connection_id for call in self.server.calls}), 1)
+
+    async def test_invalid_token_is_refreshed_once(self):
+        await self.api.send_text("oc_1", "first")
+        self.server.revoke_tokens()
+
+        await self.api.send_text("oc_1", "second")
+
+        self.assertEqual(self.server.tokens_issued, 2)
+
+    async def test_api_error_raises_with_code(self):
+        with self.assertRaises(FeishuApiError) as ctx:
+            await self.api.request("GET", "/open-apis/unknown", action="probe")
+
+        self.assertEqual(ctx.exception.code, 404)
+
+    async def test_on_call_reports_action_latency_and_outcome(self):
+        calls = []
+        self.api.on_call = lambda action, latency, ok: calls.append((action, latency, ok))
+
+        await self.api.send_text("oc_1", "hi")
+        with self.assertRaises(FeishuApiError):
+            await self.api.request("GET", "/open-apis/unknown", action="probe")
+
+        self.assertEqual([(action, ok) for action, _, ok in calls], [("send", True), ("probe", False)])
+        self.assertTrue(all(latency >= 0 for _, latency, _ in calls))
+
+    async def test_adapter_uploads_images_concurrently_and_keeps_order(self):
+        self.server.response_delay_sec = 0.2
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = []
+            for name in ("a.png", "b.png"):
+                path = os.path.join(tmpdir, name)
+                with open(path, "wb") as handle:
+                    handle.write(b"\x89PNG fake")
+                paths.append(path)
+            await self.api.send_text("oc_1", "warm up token")
+            outbound = PlatformOutboundMessage(
+                parts=(
+                    OutboundPart.text_part("look"),
+                    OutboundPart.image_part("local_path", paths[0]),
+                    OutboundPart.image_part("local_path", paths[1]),
+                ),
+                meta={},
+                history_key="feishu:ou_1",
+            )
+
+            started = time.monotonic()
+            results = await FeishuAdapter().send_outbound_async(self.api, "oc_1", outbound)
+            elapsed = time.monotonic() - started
+
+        uploads = self.server.calls_for("POST", "/open-apis/im/v1/images")
+        self.assertEqual(len(uploads), 2)
+        # 两次上传并发：总耗时 ≈ 1 次上传 + 3 次发送。
+        self.assertLess(elapsed, 6 * 0.2)
+        self.assertEqual([r.get("image_key", "") for r in results][0], "")
+        self.assertTrue(results[1]["image_key"])
+        sends = self.server.calls_for("POST", "/open-apis/im/v1/messages")[1:]
+        self.assertEqual([call.body["msg_type"] for call in sends], ["text", "image", "image"])
+
+    async def test_handle_private_text_event_uses_async_transport(self):
+        core = AsyncMock()
+        core.process_user_text.return_value = BridgeReply(
+            parts=(OutboundPart.text_part("hi"),),
+            meta={},
+            history_key="feishu:ou_1",
+        )
+
+        await handle_private_text_event(
+            core=core,
+            client=self.api,
+            event=FeishuPrivateTextEvent(
+                chat_id="oc_1", user_id="ou_1", message_id="om_in", text="hello"
+            ),
+            logger=MagicMock(),
+        )
+
+        self.assertEqual(len(self.server.calls_for("POST", "/open-apis/im/v1/messages/om_in/reactions")), 1)
+        self.assertEqual(len(self.server.calls_for("DELETE", "/open-apis/im/v1/messages/om_in/reactions/", prefix=True)), 1)
+        sends = self.server.calls_for("POST", "/open-apis/im/v1/messages")
+        self.assertEqual(sends[-1].body["receive_id"], "oc_1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,18 @@
+import asyncio
+import os
+import tempfile
 import unittest
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
 from app.core.bridge_core import BridgeReply
 from app.core.command_service import CommandResult
+from app.core.message_inbox import MessageInbox
 from app.config.config import AppConfig
+from app.feishu.feishu_event_dedupe import FeishuEventDedupe
 from app.feishu.feishu_io import FeishuPrivateTextEvent
 from app.feishu.feishu_bot import (
+    FEISHU_BUSY_TEXT,
     build_command_service,
     build_api_client,
     build_event_handler,
@@ -253,7 +259,7 @@ class FeishuBotTests(unittest.IsolatedAsyncioTestCase):
                 command_service=command_service,
             )
 
-        command_service.try_handle.assert_called_once_with("feishu", "ou_123", "/new")
+        command_service.try_handle.assert_called_once_with("feishu", "ou_123", "/new", "oc_123")
         core.process_user_text.assert_not_called()
         adapter.send_outbound.assert_called_once()
         outbound = adapter.send_outbound.call_args.args[2]
@@ -336,7 +342,7 @@ class FeishuBotTests(unittest.IsolatedAsyncioTestCase):
                 command_service=command_service,
             )
 
-        command_service.try_handle.assert_called_once_with("feishu", "ou_123", "/new")
+        command_service.try_handle.assert_called_once_with("feishu", "ou_123", "/new", "oc_123")
         send_mock.assert_called_once_with(
             unittest.mock.ANY,
             "ou_123",
@@ -355,6 +361,197 @@ class FeishuBotTests(unittest.IsolatedAsyncioTestCase):
 
         builder.register_p2_application_bot_menu_v6.assert_called_once()
 
+    def test_event_handler_drops_redelivered_message(self):
+        builder = MagicMock()
+        builder.register_p2_im_message_receive_v1.return_value = builder
+        builder.register_p2_application_bot_menu_v6.return_value = builder
+        data = SimpleNamespace(
+            header=SimpleNamespace(event_id="ev_1"),
+            event=SimpleNamespace(
+                sender=SimpleNamespace(sender_id=SimpleNamespace(open_id="ou_1")),
+                message=SimpleNamespace(
+                    chat_id="oc_1",
+                    chat_type="p2p",
+                    message_type="text",
+                    content='{"text":"hello"}',
+                    message_id="om_1",
+                ),
+            ),
+        )
+        loop = MagicMock()
+
+        with (
+            patch(
+                "app.feishu.feishu_bot.lark.EventDispatcherHandler.builder",
+                return_value=builder,
+            ),
+            patch("app.feishu.feishu_bot.asyncio.get_event_loop", return_value=loop),
+            patch("app.feishu.feishu_bot.handle_private_text_event", new=MagicMock()),
+        ):
+            build_event_handler(
+                core=object(),
+                client_ref={"client": object()},
+                logger=MagicMock(),
+                event_dedupe=FeishuEventDedupe(),
+            )
+            on_message = builder.register_p2_im_message_receive_v1.call_args.args[0]
+            on_message(data)
+            on_message(data)
+
+        loop.create_task.assert_called_once()
+
+    def test_event_handler_submits_to_runtime_keyed_by_chat(self):
+        builder = MagicMock()
+        builder.register_p2_im_message_receive_v1.return_value = builder
+        builder.register_p2_application_bot_menu_v6.return_value = builder
+        data = SimpleNamespace(
+            header=SimpleNamespace(event_id="ev_1"),
+            event=SimpleNamespace(
+                sender=SimpleNamespace(sender_id=SimpleNamespace(open_id="ou_1")),
+                message=SimpleNamespace(
+                    chat_id="oc_1",
+                    chat_type="p2p",
+                    message_type="text",
+                    content='{"text":"hello"}',
+                    message_id="om_1",
+                ),
+            ),
+        )
+        runtime = MagicMock()
+
+        with (
+            patch(
+                "app.feishu.feishu_bot.lark.EventDispatcherHandler.builder",
+                return_value=builder,
+            ),
+            patch("app.feishu.feishu_bot.handle_private_text_event", new=MagicMock()),
+        ):
+            build_event_handler(
+                core=object(),
+                client_ref={"client": object()},
+                logger=MagicMock(),
+                runtime=runtime,
+            )
+            on_message = builder.register_p2_im_message_receive_v1.call_args.args[0]
+            on_message(data)
+
+        runtime.submit.assert_called_once()
+        self.assertEqual(runtime.submit.call_args.args[0], "oc_1")
+
+    async def test_event_handler_recovers_unfinished_message_from_inbox(self):
+        builder = MagicMock()
+        builder.register_p2_im_message_receive_v1.return_value = builder
+        builder.register_p2_application_bot_menu_v6.return_value = builder
+        data = SimpleNamespace(
+            header=SimpleNamespace(event_id="ev_1"),
+            event=SimpleNamespace(
+                sender=SimpleNamespace(sender_id=SimpleNamespace(open_id="ou_1")),
+                message=SimpleNamespace(
+                    chat_id="oc_1",
+                    chat_type="p2p",
+                    message_type="text",
+                    content='{"text":"hello"}',
+                    message_id="om_1",
+                ),
+            ),
+        )
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        inbox_path = os.path.join(tmpdir.name, "feishu_inbox.json")
+
+        def build(inbox, runtime, recovery_ref=None):
+            build_event_handler(
+                core=object(),
+                client_ref={"client": object()},
+                logger=MagicMock(),
+                runtime=runtime,
+                inbox=inbox,
+                recovery_ref=recovery_ref,
+            )
+            return builder.register_p2_im_message_receive_v1.call_args.args[0]
+
+        handle_mock = AsyncMock()
+        with (
+            patch(
+                "app.feishu.feishu_bot.lark.EventDispatcherHandler.builder",
+                return_value=builder,
+            ),
+            patch("app.feishu.feishu_bot.handle_private_text_event", new=handle_mock),
+        ):
+            # 第一个进程收下消息后崩溃，任务没来得及跑。
+            build(MessageInbox(inbox_path), MagicMock())(data)
+
+            inbox = MessageInbox(inbox_path)
+            inbox.load()
+            runtime = MagicMock()
+            recovery_ref: dict = {}
+            build(inbox, runtime, recovery_ref)
+            recovery_ref["recover"]()
+            chat_key, job = runtime.submit.call_args.args
+            await job()
+
+        self.assertEqual(chat_key, "oc_1")
+        self.assertEqual(handle_mock.await_args.args[2].text, "hello")
+        self.assertEqual(inbox.pending_count(), 0)
+
+    async def test_rejected_message_is_not_silently_dropped(self):
+        builder = MagicMock()
+        builder.register_p2_im_message_receive_v1.return_value = builder
+        builder.register_p2_application_bot_menu_v6.return_value = builder
+        data = SimpleNamespace(
+            header=SimpleNamespace(event_id="ev_1"),
+            event=SimpleNamespace(
+                sender=SimpleNamespace(sender_id=SimpleNamespace(open_id="ou_1")),
+                message=SimpleNamespace(
+                    chat_id="oc_1",
+                    chat_type="p2p",
+                    message_type="text",
+                    content='{"text":"hello"}',
+                    message_id="om_1",
+                ),
+            ),
+        )
+        inbox = MessageInbox()
+        dedupe = FeishuEventDedupe()
+        runtime = MagicMock()
+        runtime.submit.return_value = False
+        runtime.accepting = False
+        send_mock = AsyncMock(return_value={})
+
+        with (
+            patch(
+                "app.feishu.feishu_bot.lark.EventDispatcherHandler.builder",
+                return_value=builder,
+            ),
+            patch("app.feishu.feishu_bot._send_text", new=send_mock),
+        ):
+            build_event_handler(
+                core=object(),
+                client_ref={"client": object()},
+                logger=MagicMock(),
+                event_dedupe=dedupe,
+                runtime=runtime,
+                inbox=inbox,
+            )
+            on_message = builder.register_p2_im_message_receive_v1.call_args.args[0]
+
+            # 正在退出：撤销去重标记，收件箱条目留给下次启动恢复。
+            on_message(data)
+            self.assertEqual(inbox.pending_count(), 1)
+            self.assertEqual(dedupe.stats()["entries"], 0)
+            send_mock.assert_not_awaited()
+
+            # 队列已满：告诉用户稍后重发。
+            runtime.accepting = True
+            runtime.loop = asyncio.get_running_loop()
+            on_message(data)
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+
+        self.assertEqual(inbox.pending_count(), 0)
+        self.assertEqual(dedupe.stats()["entries"], 0)
+        self.assertEqual(send_mock.await_args.args[2], FEISHU_BUSY_TEXT)
+
     async def test_main_starts_without_feishu_enabled_flag(self):
         config = AppConfig(
             telegram_bot_token="",
@@ -0,0 +1,77 @@
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from app.feishu.feishu_event_dedupe import FeishuEventDedupe
+
+
+class FeishuEventDedupeTests(unittest.TestCase):
+    def test_seen_matches_on_event_id_or_message_id(self):
+        dedupe = FeishuEventDedupe()
+
+        self.assertFalse(dedupe.seen("ev_1", "om_1"))
+        self.assertTrue(dedupe.seen("ev_1", "om_1"))
+        # 重投时 event_id 可能变化，但 message_id 不变。
+        self.assertTrue(dedupe.seen("ev_2", "om_1"))
+        self.assertFalse(dedupe.seen("ev_3", "om_3"))
+        self.assertEqual(dedupe.stats(), {"hits": 2, "misses": 2, "entries": 4})
+
+    def test_entries_are_bounded_and_expire(self):
+        now = [1000.0]
+        dedupe = FeishuEventDedupe(max_entries=2, ttl_sec=60, clock=lambda: now[0])
+
+        dedupe.seen("", "om_1")
+        dedupe.seen("", "om_2")
+        dedupe.seen("", "om_3")
+        self.assertFalse(dedupe.seen("", "om_1"))
+
+        now[0] += 120
+        self.assertFalse(dedupe.seen("", "om_3"))
+
+    def test_state_survives_restart(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "feishu_event_state.json"
+            first = FeishuEventDedupe(path=path)
+            first.seen("ev_1", "om_1")
+            # 落盘是批量进行的，未 flush 前不写文件。
+            self.assertFalse(path.exists())
+            first.flush()
+
+            second = FeishuEventDedupe(path=path)
+            second.load()
+
+            self.assertTrue(second.seen("", "om_1"))
+            self.assertIn("entries", json.loads(path.read_text(encoding="utf-8")))
+
+    def test_saves_are_batched_in_background(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "feishu_event_state.json"
+            dedupe = FeishuEventDedupe(path=path, flush_interval_sec=0.05)
+            dedupe.seen("ev_1", "om_1")
+            dedupe.seen("ev_2", "om_2")
+            dedupe.forget("ev_2", "om_2")
+
+            for _ in range(100):
+                if path.exists():
+                    break
+                time.sleep(0.02)
+
+            entries = json.loads(path.read_text(encoding="utf-8"))["entries"]
+            self.assertEqual([key for key, _ts in entries], ["event:ev_1", "message:om_1"])
+            self.assertFalse(dedupe.seen("ev_2", "om_2"))
+
+    def test_load_ignores_corrupt_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "feishu_event_state.json"
+            path.write_text("{broken", encoding="utf-8")
+            dedupe = FeishuEventDedupe(path=path)
+
+            dedupe.load()
+
+            self.assertFalse(dedupe.seen("ev_1", "om_1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
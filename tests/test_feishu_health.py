@@ -0,0 +1,94 @@
+import unittest
+
+from app.core.command_service import render_status_text
+from app.feishu.feishu_health import FeishuHealthManager, render_feishu_health_lines
+
+
+class FeishuHealthManagerTests(unittest.TestCase):
+    def test_reconnect_storm_escalates(self):
+        mgr = FeishuHealthManager(max_reconnects_per_window=2, reconnect_window_sec=60.0)
+
+        first = mgr.record_disconnect(now=100.0)
+        mgr.record_reconnected(now=101.0)
+        second = mgr.record_disconnect(now=110.0)
+        mgr.record_reconnected(now=111.0)
+        third = mgr.record_disconnect(now=120.0)
+
+        self.assertFalse(first.should_escalate_process)
+        self.assertFalse(second.should_escalate_process)
+        self.assertTrue(third.should_escalate_process)
+        self.assertEqual(third.reason, "reconnect_storm")
+        self.assertEqual(mgr.state, "escalated")
+
+    def test_reconnects_outside_window_do_not_escalate(self):
+        mgr = FeishuHealthManager(max_reconnects_per_window=1, reconnect_window_sec=60.0)
+
+        mgr.record_disconnect(now=100.0)
+        mgr.record_reconnected(now=101.0)
+        decision = mgr.record_disconnect(now=200.0)
+
+        self.assertFalse(decision.should_escalate_process)
+        self.assertEqual(mgr.snapshot(now=200.0)["reconnects_in_window"], 1)
+
+    def test_long_disconnect_escalates_on_check(self):
+        mgr = FeishuHealthManager(max_disconnected_sec=60.0)
+        mgr.record_disconnect(now=100.0)
+
+        self.assertFalse(mgr.check(now=130.0).should_escalate_process)
+        self.assertTrue(mgr.check(now=161.0).should_escalate_process)
+
+    def test_event_marks_connection_alive_and_tracks_lag(self):
+        mgr = FeishuHealthManager()
+        mgr.record_disconnect(now=100.0)
+
+        mgr.record_event(now=105.0, delivery_lag_sec=1.5)
+        snapshot = mgr.snapshot(now=110.0)
+
+        self.assertTrue(snapshot["connected"])
+        self.assertEqual(snapshot["state"], "healthy")
+        self.assertEqual(snapshot["since_last_event_sec"], 5.0)
+        self.assertEqual(snapshot["max_delivery_lag_sec"], 1.5)
+
+    def test_api_error_rate_degrades_then_escalates_when_window_full(self):
+        mgr = FeishuHealthManager(error_rate_threshold=0.5, min_error_samples=4, api_sample_size=6)
+        for _ in range(4):
+            mgr.record_api_call("send", 0.1, ok=False)
+
+        self.assertEqual(mgr.state, "degraded")
+        self.assertFalse(mgr.check(now=1.0).should_escalate_process)
+
+        mgr.record_api_call("send", 0.1, ok=True)
+        mgr.record_api_call("send", 0.1, ok=False)
+        decision = mgr.check(now=2.0)
+
+        self.assertTrue(decision.should_escalate_process)
+        self.assertTrue(decision.reason.startswith("api_error_rate"))
+
+    def test_snapshot_reports_latency_percentiles(self):
+        mgr = FeishuHealthManager()
+        for latency_ms in range(1, 101):
+            mgr.record_api_call("send", latency_ms / 1000.0, ok=True)
+
+        snapshot = mgr.snapshot(now=0.0)
+
+        self.assertAlmostEqual(snapshot["api_p50_ms"], 50.0)
+        self.assertAlmostEqual(snapshot["api_p95_ms"], 95.0)
+        self.assertAlmostEqual(snapshot["api_p99_ms"], 99.0)
+        self.assertEqual(snapshot["api_error_rate"], 0.0)
+
+    def test_status_text_renders_feishu_health_section(self):
+        mgr = FeishuHealthManager()
+        mgr.record_disconnect(now=100.0)
+        snapshot = mgr.snapshot(now=100.0)
+        snapshot["lines"] = render_feishu_health_lines(snapshot)
+
+        text = render_status_text({"model": "gpt-5"}, {}, health=snapshot)
+
+        self.assertIn("长连接健康：", text)
+        self.assertIn("连接=断开", text)
+        self.assertIn("窗口内重连次数=1", text)
+        self.assertNotIn("轮询健康", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
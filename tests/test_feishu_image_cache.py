@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from app.core.platform_messages import OutboundPart, PlatformOutboundMessage
+from app.feishu.feishu_adapter import FeishuAdapter
+from app.feishu.feishu_api import FeishuApiClient
+from app.feishu.feishu_image_cache import FeishuImageKeyCache, hash_key_for_file, url_key
+from benchmarks.fake_feishu_api import FakeFeishuApi
+
+
+def image_outbound(source_type: str, value: str) -> PlatformOutboundMessage:
+    return PlatformOutboundMessage(
+        parts=(OutboundPart.image_part(source_type, value),),
+        meta={},
+        history_key="feishu:oc_1",
+    )
+
+
+class FeishuImageKeyCacheTests(unittest.TestCase):
+    def test_lru_evicts_least_recently_used(self):
+        cache = FeishuImageKeyCache(max_entries=2)
+        cache.put("a", "img_a")
+        cache.put("b", "img_b")
+        cache.get("a")
+        cache.put("c", "img_c")
+
+        self.assertEqual(cache.get("a"), "img_a")
+        self.assertEqual(cache.get("b"), "")
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_entries_persist_across_restart(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "feishu_image_cache.json"
+            first = FeishuImageKeyCache(path=path)
+            first.put("sha256:abc", "img_1")
+            first.save()
+
+            second = FeishuImageKeyCache(path=path)
+            second.load()
+
+            self.assertEqual(second.get("sha256:abc"), "img_1")
+
+    def test_sync_adapter_reuses_cached_key_for_same_content(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            image_path = os.path.join(tmpdir, "chart.png")
+            with open(image_path, "wb") as handle:
+                handle.write(b"chart-bytes")
+            adapter = FeishuAdapter(image_cache=FeishuImageKeyCache())
+            outbound = image_outbound("local_path", image_path)
+
+            with patch(
+                "app.feishu.feishu_adapter.send_private_image",
+                return_value={"message_id": "m1", "image_key": "img_1"},
+            ) as image_mock:
+                adapter.send_outbound(Mock(), "oc_1", outbound)
+                adapter.send_outbound(Mock(), "oc_1", outbound)
+
+        self.assertEqual(image_mock.call_args_list[0].kwargs["image_key"], "")
+        self.assertEqual(image_mock.call_args_list[1].kwargs["image_key"], "img_1")
+
+
+class FeishuImageKeyCacheAsyncTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FakeFeishuApi().start()
+        self.addCleanup(self.server.stop)
+        self.api = FeishuApiClient("cli", "secret", base_url=self.server.base_url)
+        self.addAsyncCleanup(self.api.aclose)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _write_image(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "wb") as handle:
+            handle.write(data)
+        return path
+
+    async def test_same_content_is_uploaded_once(self):
+        cache = FeishuImageKeyCache(path=os.path.join(self.tmpdir.name, "cache.json"))
+        adapter = FeishuAdapter(image_cache=cache)
+        first = self._write_image("a.png", b"same-bytes")
+        second = self._write_image("b.png", b"same-bytes")
+
+        await adapter.send_outbound_async(self.api, "oc_1", image_outbound("local_path", first))
+        await adapter.send_outbound_async(self.api, "oc_1", image_outbound("local_path", second))
+
+        self.assertEqual(len(self.server.calls_for("POST", "/open-apis/im/v1/images")), 1)
+        self.assertEqual(len(self.server.calls_for("POST", "/open-apis/im/v1/messages")), 2)
+        self.assertTrue(os.path.exists(cache.path))
+
+    async def test_remote_url_with_known_etag_skips_download(self):
+        cache = FeishuImageKeyCache()
+        url = "https://example.com/chart.png"
+        cache.put(url_key(url, '"v1"'), "img_cached")
+        adapter = FeishuAdapter(image_cache=cache)
+
+        with (
+            patch("app.feishu.feishu_adapter.fetch_remote_etag", return_value='"v1"'),
+            patch("app.feishu.feishu_adapter.download_remote_image") as download_mock,
+        ):
+            results = await adapter.send_outbound_async(
+                self.api, "oc_1", image_outbound("remote_url", url)
+            )
+
+        download_mock.assert_not_called()
+        self.assertEqual(results[0]["image_key"], "img_cached")
+        self.assertEqual(self.server.calls_for("POST", "/open-apis/im/v1/images"), [])
+
+    def test_hash_key_for_file_is_content_based(self):
+        first = self._write_image("x.png", b"abc")
+        second = self._write_image("y.png", b"abc")
+
+        self.assertEqual(hash_key_for_file(first), hash_key_for_file(second))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,229 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.core.platform_messages import OutboundPart, PlatformOutboundMessage
+from app.feishu.feishu_adapter import FeishuAdapter
+from app.feishu.feishu_image_fetch import (
+    ImageFetchError,
+    RemoteImageFetcher,
+    download_remote_image,
+)
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"x" * 200_000
+
+
+class ImageServer:
+    def __init__(self):
+        self.slow_delay_sec = 0.0
+        self.connections: set[int] = set()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._build_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}{path}"
+
+    def start(self) -> "ImageServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._thread.join(timeout=5)
+        self._server.server_close()
+
+    def _build_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # noqa: A002 - stdlib signature
+                return
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("ETag", '"v1"')
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                server.connections.add(id(self.connection))
+                if self.path == "/slow.png":
+                    time.sleep(server.slow_delay_sec)
+                if self.path == "/page.html":
+                    return self._send(b"<html></html>", "text/html")
+                if self.path == "/blob":
+                    return self._send(PNG_BYTES, "application/octet-stream")
+                if self.path == "/blob.html":
+                    return self._send(b"<html></html>", "binary/octet-stream")
+                if self.path == "/chunked-huge.png":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "image/png")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    chunk = b"y" * 65536
+                    for _ in range(40):
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                    self.wfile.write(b"0\r\n\r\n")
+                    return
+                self._send(PNG_BYTES, "image/png")
+
+            def _send(self, body: bytes, content_type: str):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+class RecordingApi:
+    def __init__(self):
+        self.events: list[str] = []
+
+    async def send_text(self, chat_id, text):
+        self.events.append(f"text:{text}")
+        return {"message_id": "m_text"}
+
+    async def upload_image(self, path):
+        with open(path, "rb") as handle:
+            size = len(handle.read())
+        self.events.append(f"upload:{size}")
+        return "img_1"
+
+    async def send_image(self, chat_id, image_key):
+        self.events.append(f"image:{image_key}")
+        return {"message_id": "m_image", "image_key": image_key}
+
+
+class DownloadRemoteImageTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ImageServer().start()
+        self.addCleanup(self.server.stop)
+
+    def test_downloads_image_to_temp_file(self):
+        path = download_remote_image(self.server.url("/chart.png"))
+        self.addCleanup(os.remove, path)
+
+        with open(path, "rb") as handle:
+            self.assertEqual(handle.read(), PNG_BYTES)
+        self.assertTrue(path.endswith(".png"))
+
+    def test_rejects_declared_oversized_body(self):
+        with self.assertRaises(ImageFetchError):
+            download_remote_image(self.server.url("/chart.png"), max_bytes=1024)
+
+    def test_rejects_non_image_content_type(self):
+        with self.assertRaises(ImageFetchError):
+            download_remote_image(self.server.url("/page.html"))
+
+    def test_octet_stream_is_accepted_only_when_bytes_are_an_image(self):
+        path = download_remote_image(self.server.url("/blob"))
+        self.addCleanup(os.remove, path)
+        with open(path, "rb") as handle:
+            self.assertEqual(handle.read(), PNG_BYTES)
+
+        with self.assertRaises(ImageFetchError):
+            download_remote_image(self.server.url("/blob.html"))
+
+
+class RemoteImageFetcherTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = ImageServer().start()
+        self.addCleanup(self.server.stop)
+        self.fetcher = RemoteImageFetcher(max_bytes=1024 * 1024, chunk_bytes=16 * 1024)
+        self.addAsyncCleanup(self.fetcher.aclose)
+
+    async def test_fetch_streams_to_disk_and_reuses_connection(self):
+        first = await self.fetcher.fetch(self.server.url("/a.png"))
+        second = await self.fetcher.fetch(self.server.url("/b.png"))
+        self.addCleanup(os.remove, first.path)
+        self.addCleanup(os.remove, second.path)
+
+        self.assertEqual(first.size, len(PNG_BYTES))
+        self.assertEqual(first.content_type, "image/png")
+        self.assertEqual(first.etag, '"v1"')
+        with open(second.path, "rb") as handle:
+            self.assertEqual(handle.read(), PNG_BYTES)
+        self.assertEqual(len(self.server.connections), 1)
+
+    async def test_chunked_body_over_limit_is_aborted_and_cleaned_up(self):
+        before = set(os.listdir(tempfile.gettempdir()))
+        with self.assertRaises(ImageFetchError):
+            await self.fetcher.fetch(self.server.url("/chunked-huge.png"))
+
+        leftover = set(os.listdir(tempfile.gettempdir())) - before
+        self.assertEqual([name for name in leftover if name.endswith(".png")], [])
+
+    async def test_rejects_non_image_content_type(self):
+        with self.assertRaises(ImageFetchError):
+            await self.fetcher.fetch(self.server.url("/page.html"))
+
+    async def test_octet_stream_is_sniffed(self):
+        image = await self.fetcher.fetch(self.server.url("/blob"))
+        self.addCleanup(os.remove, image.path)
+        self.assertEqual(image.content_type, "image/png")
+        self.assertEqual(image.size, len(PNG_BYTES))
+
+        with self.assertRaises(ImageFetchError):
+            await self.fetcher.fetch(self.server.url("/blob.html"))
+
+    async def test_head_etag(self):
+        self.assertEqual(await self.fetcher.head_etag(self.server.url("/a.png")), '"v1"')
+
+    async def test_text_is_sent_while_remote_image_downloads(self):
+        self.server.slow_delay_sec = 0.3
+        api = RecordingApi()
+        adapter = FeishuAdapter(fetcher=self.fetcher)
+        outbound = PlatformOutboundMessage(
+            parts=(
+                OutboundPart.image_part("remote_url", self.server.url("/slow.png")),
+                OutboundPart.text_part("说明文字"),
+                OutboundPart.image_part("remote_url", self.server.url("/slow.png")),
+            ),
+            meta={},
+            history_key="feishu:oc_1",
+        )
+
+        started = time.monotonic()
+        results = await adapter.send_outbound_async(api, "oc_1", outbound)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(
+            [event.split(":")[0] for event in api.events if not event.startswith("upload")],
+            ["image", "text", "image"],
+        )
+        # 两张慢图并发下载，总耗时接近单张而不是两张之和。
+        self.assertLess(elapsed, 0.55)
+
+    async def test_failed_image_cancels_remaining_prefetch(self):
+        api = RecordingApi()
+        adapter = FeishuAdapter(fetcher=self.fetcher)
+        outbound = PlatformOutboundMessage(
+            parts=(
+                OutboundPart.image_part("remote_url", self.server.url("/page.html")),
+                OutboundPart.image_part("remote_url", self.server.url("/a.png")),
+            ),
+            meta={},
+            history_key="feishu:oc_1",
+        )
+
+        with self.assertRaises(ImageFetchError):
+            await adapter.send_outbound_async(api, "oc_1", outbound)
+        await asyncio.sleep(0)
+
+        self.assertNotIn("image:img_1", api.events)
+
+
+if __name__ == "__main__":
+    unittest.main()
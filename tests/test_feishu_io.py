@@ -4,6 +4,7 @@ from unittest.mock import patch
 
 from app.feishu.feishu_io import (
     parse_private_text_event,
+    parse_private_text_event_data,
     send_private_image,
     send_private_text,
 )
@@ -12,6 +13,7 @@ from app.feishu.feishu_io import (
 class FeishuIOTests(unittest.TestCase):
     def test_parse_private_text_event_accepts_p2p_text(self):
         evt = {
+            "header": {"event_id": "ev_123", "create_time": "1700000000123"},
             "event": {
                 "sender": {"sender_id": {"open_id": "ou_123"}},
                 "message": {
@@ -30,6 +32,19 @@ class FeishuIOTests(unittest.TestCase):
         self.assertEqual(parsed.chat_id, "oc_123")
         self.assertEqual(parsed.user_id, "ou_123")
         self.assertEqual(parsed.text, "hello")
+        self.assertEqual(parsed.event_id, "ev_123")
+        self.assertEqual(parsed.create_time_ms, 1700000000123)
+
+    def test_parse_private_text_event_data_reads_sdk_object_directly(self):
+        from benchmarks.feishu_parse_bench import build_sample_event, parse_via_marshal
+
+        data = build_sample_event(text_chars=10)
+
+        parsed = parse_private_text_event_data(data)
+
+        self.assertEqual(parsed, parse_via_marshal(data))
+        self.assertEqual(parsed.event_id, "ev_bench")
+        self.assertEqual(parsed.text, "x" * 10)
 
     def test_parse_private_text_event_ignores_group(self):
         evt = {
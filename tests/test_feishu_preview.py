@@ -0,0 +1,151 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.config.chat_store import ChatStore
+from app.config.config import AppConfig
+from app.core.codex_client import ask_codex_with_meta, extract_progress_text
+from app.feishu.feishu_api import FeishuApiClient
+from app.feishu.feishu_bot import build_bridge_core, handle_private_text_event
+from app.feishu.feishu_io import FeishuPrivateTextEvent
+from app.feishu.feishu_preview import FeishuPreviewDriver
+from benchmarks.fake_feishu_api import FakeFeishuApi
+from benchmarks.load_test import ensure_fake_codex_executable
+
+
+class RecordingApi:
+    def __init__(self):
+        self.sent = []
+        self.patched = []
+        self.deleted = []
+
+    async def send_message(self, receive_id, msg_type, content, receive_id_type="chat_id"):
+        self.sent.append((msg_type, content))
+        return {"message_id": "om_card"}
+
+    async def update_card(self, message_id, card):
+        self.patched.append(card["elements"][0]["content"])
+        return {}
+
+    async def delete_message(self, message_id):
+        self.deleted.append(message_id)
+        return {}
+
+
+def build_fake_codex_config() -> AppConfig:
+    return AppConfig(
+        telegram_bot_token="",
+        telegram_proxy_url="",
+        codex_model="",
+        codex_reasoning_effort="",
+        codex_bin=ensure_fake_codex_executable(),
+        codex_project_dir="",
+        codex_timeout_sec=30,
+        codex_sandbox="",
+        allowed_user_ids_raw="",
+    )
+
+
+class FeishuPreviewDriverTests(unittest.IsolatedAsyncioTestCase):
+    async def test_updates_are_throttled_and_merged(self):
+        api = RecordingApi()
+        driver = FeishuPreviewDriver(api, "oc_1", throttle_sec=0.2)
+        await driver.start()
+
+        for index in range(5):
+            await driver.update(f"step {index}")
+        await asyncio.sleep(0.35)
+
+        self.assertEqual(api.sent[0][0], "interactive")
+        self.assertEqual(api.patched, ["step 4"])
+
+    async def test_codex_events_from_worker_thread_update_card(self):
+        api = RecordingApi()
+        driver = FeishuPreviewDriver(api, "oc_1", throttle_sec=0)
+        await driver.start()
+
+        worker = threading.Thread(
+            target=driver.on_codex_event,
+            args=({"type": "item.completed", "item": {"type": "reasoning", "text": "plan"}},),
+        )
+        worker.start()
+        worker.join()
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(api.patched, ["思考中：plan"])
+
+    async def test_complete_writes_final_text_into_same_card(self):
+        api = RecordingApi()
+        driver = FeishuPreviewDriver(api, "oc_1", throttle_sec=10, max_chars=20)
+        await driver.start()
+        await driver.update("pending")
+
+        self.assertTrue(await driver.complete("final answer"))
+        self.assertFalse(await driver.complete("x" * 21))
+
+        self.assertEqual(api.patched, ["final answer"])
+        self.assertEqual(len(api.sent), 1)
+
+    def test_extract_progress_text_skips_lifecycle_events(self):
+        self.assertEqual(extract_progress_text({"type": "turn.started"}), "")
+        self.assertEqual(
+            extract_progress_text(
+                {"type": "item.started", "item": {"type": "command_execution", "command": "ls"}}
+            ),
+            "正在执行命令：ls",
+        )
+
+
+class FeishuStreamingReplyTests(unittest.IsolatedAsyncioTestCase):
+    def test_streaming_codex_reports_events_before_returning(self):
+        events = []
+        with patch.dict(os.environ, {"FAKE_CODEX_DELAY_SEC": "0", "FAKE_CODEX_EVENTS": "2"}):
+            reply, meta = ask_codex_with_meta(
+                build_fake_codex_config(), "User: ping\n", on_event=events.append
+            )
+
+        self.assertTrue(reply.startswith("echo: ping"))
+        self.assertTrue(meta["thread_id"])
+        self.assertEqual(events[0]["type"], "thread.started")
+        self.assertEqual(events[-1]["type"], "turn.completed")
+
+    async def test_reply_lands_in_preview_card_without_second_send(self):
+        server = FakeFeishuApi().start()
+        self.addCleanup(server.stop)
+        api = FeishuApiClient("cli", "secret", base_url=server.base_url)
+        self.addAsyncCleanup(api.aclose)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        chat_store = ChatStore(
+            history_file=os.path.join(tmpdir.name, "chat_histories.json"), max_turns=12
+        )
+        core = build_bridge_core(build_fake_codex_config, chat_store)
+
+        with patch.dict(
+            os.environ,
+            {"FAKE_CODEX_DELAY_SEC": "0.2", "FAKE_CODEX_EVENTS": "3", "FAKE_CODEX_REPLY_CHARS": "60"},
+        ):
+            await handle_private_text_event(
+                core=core,
+                client=api,
+                event=FeishuPrivateTextEvent(
+                    chat_id="oc_1", user_id="ou_1", message_id="om_in", text="hello"
+                ),
+                logger=MagicMock(),
+                preview_driver_factory=lambda event: FeishuPreviewDriver(
+                    api, event.chat_id, throttle_sec=0
+                ),
+            )
+
+        sends = server.calls_for("POST", "/open-apis/im/v1/messages")
+        patches = server.calls_for("PATCH", "/open-apis/im/v1/messages/", prefix=True)
+        self.assertEqual([call.body["msg_type"] for call in sends], ["interactive"])
+        self.assertGreaterEqual(len(patches), 1)
+        self.assertIn("echo: hello", patches[-1].body["content"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import Mock, patch
+
+from app.core.platform_messages import OutboundPart, PlatformOutboundMessage
+from app.feishu.feishu_adapter import FeishuAdapter
+from app.feishu.feishu_api import FeishuApiClient
+from app.feishu.feishu_render import pack_blocks, render_reply_text, split_blocks
+from benchmarks.fake_feishu_api import FakeFeishuApi
+from benchmarks.feishu_render_bench import build_sample_reply
+
+
+def text_outbound(text: str) -> PlatformOutboundMessage:
+    return PlatformOutboundMessage(
+        parts=(OutboundPart.text_part(text),), meta={}, history_key="feishu:oc_1"
+    )
+
+
+class FeishuRenderTests(unittest.TestCase):
+    def test_code_block_with_blank_lines_stays_one_block(self):
+        text = "说明\n\n```python\na = 1\n\nb = 2\n```\n\n结尾"
+
+        blocks = split_blocks(text)
+
+        self.assertEqual(blocks, ["说明", "```python\na = 1\n\nb = 2\n```", "结尾"])
+
+    def test_pack_merges_small_blocks_and_respects_limit(self):
+        chunks = pack_blocks(["a" * 40, "b" * 40, "c" * 40], max_chars=90)
+
+        self.assertEqual(chunks, ["a" * 40 + "\n\n" + "b" * 40, "c" * 40])
+
+    def test_oversized_code_block_is_refenced_per_chunk(self):
+        block = "```python\n" + "\n".join(f"line_{i} = {i}" for i in range(50)) + "\n```"
+
+        chunks = pack_blocks([block], max_chars=120)
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk), 120)
+            self.assertTrue(chunk.startswith("```python\n"))
+            self.assertTrue(chunk.endswith("\n```"))
+
+    def test_short_plain_reply_is_single_text_message(self):
+        messages = render_reply_text("好的，已经处理完成。")
+
+        self.assertEqual(
+            [(m.msg_type, m.content) for m in messages],
+            [("text", {"text": "好的，已经处理完成。"})],
+        )
+
+    def test_markdown_reply_uses_cards_within_limit(self):
+        # 截到完整小节，保证原文里的代码块都是闭合的。
+        text = build_sample_reply(10000).rsplit("## ", 1)[0]
+
+        messages = render_reply_text(text, max_chars=4000)
+
+        self.assertTrue(all(m.msg_type == "interactive" for m in messages))
+        contents = [m.content["elements"][0]["content"] for m in messages]
+        self.assertTrue(all(len(content) <= 4000 for content in contents))
+        self.assertTrue(all(content.count("```") % 2 == 0 for content in contents))
+        self.assertLessEqual(len(messages), 4)
+
+    def test_huge_reply_becomes_excerpt_card_plus_file(self):
+        text = build_sample_reply(100000)
+
+        messages = render_reply_text(text, file_threshold_chars=30000)
+
+        self.assertEqual([m.msg_type for m in messages], ["interactive", "file"])
+        self.assertEqual(messages[1].file_text, text.strip())
+        self.assertIn("reply.md", messages[0].content["elements"][0]["content"])
+
+    def test_sync_adapter_sends_cards_without_file_upload(self):
+        adapter = FeishuAdapter(message_max_chars=4000, file_threshold_chars=100)
+
+        with (
+            patch("app.feishu.feishu_adapter.send_private_text") as text_mock,
+            patch(
+                "app.feishu.feishu_adapter.send_private_message", return_value={"message_id": "m"}
+            ) as message_mock,
+        ):
+            results = adapter.send_outbound(
+                Mock(), "oc_1", text_outbound(build_sample_reply(10000))
+            )
+
+        text_mock.assert_not_called()
+        self.assertEqual(len(results), message_mock.call_count)
+        self.assertTrue(all(call.args[2] == "interactive" for call in message_mock.call_args_list))
+
+
+class FeishuRenderAsyncTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FakeFeishuApi().start()
+        self.addCleanup(self.server.stop)
+        self.api = FeishuApiClient("cli", "secret", base_url=self.server.base_url)
+        self.addAsyncCleanup(self.api.aclose)
+
+    async def test_huge_reply_uploads_file_with_three_calls(self):
+        adapter = FeishuAdapter(file_threshold_chars=30000)
+
+        results = await adapter.send_outbound_async(
+            self.api, "oc_1", text_outbound(build_sample_reply(100000))
+        )
+
+        sends = self.server.calls_for("POST", "/open-apis/im/v1/messages")
+        self.assertEqual([call.body["msg_type"] for call in sends], ["interactive", "file"])
+        self.assertEqual(len(self.server.calls_for("POST", "/open-apis/im/v1/files")), 1)
+        self.assertEqual(len(results), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
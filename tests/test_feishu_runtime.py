@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import threading
+import time
+import unittest
+
+from app.feishu.feishu_runtime import FeishuRuntime
+
+
+class FeishuRuntimeTests(unittest.TestCase):
+    def setUp(self):
+        self.runtime = FeishuRuntime(logging.getLogger("test"), max_pending=8, max_concurrency=4)
+        self.runtime.start()
+        self.addCleanup(self.runtime.drain, 5)
+
+    def test_same_chat_runs_in_order_and_chats_run_in_parallel(self):
+        events = []
+        lock = threading.Lock()
+
+        def job(name, delay):
+            async def run():
+                with lock:
+                    events.append(("start", name))
+                await asyncio.sleep(delay)
+                with lock:
+                    events.append(("end", name))
+
+            return run
+
+        self.runtime.submit("oc_a", job("a1", 0.1))
+        self.runtime.submit("oc_a", job("a2", 0.0))
+        self.runtime.submit("oc_b", job("b1", 0.0))
+
+        self.assertTrue(self.runtime.drain(5))
+        self.assertLess(events.index(("end", "a1")), events.index(("start", "a2")))
+        # b1 不需要等 a1 结束。
+        self.assertLess(events.index(("end", "b1")), events.index(("end", "a1")))
+
+    def test_submit_rejects_when_pending_is_full(self):
+        runtime = FeishuRuntime(logging.getLogger("test"), max_pending=1)
+        runtime.start()
+        release = threading.Event()
+
+        async def blocked():
+            await asyncio.get_running_loop().run_in_executor(None, release.wait)
+
+        self.assertTrue(runtime.submit("oc_a", blocked))
+        self.assertFalse(runtime.submit("oc_b", blocked))
+        self.assertEqual(runtime.rejected, 1)
+        release.set()
+        self.assertTrue(runtime.drain(5))
+
+    def test_drain_waits_for_in_flight_work_and_stops_accepting(self):
+        finished = threading.Event()
+
+        async def slow():
+            await asyncio.sleep(0.2)
+            finished.set()
+
+        self.runtime.submit("oc_a", slow)
+        started = time.monotonic()
+
+        self.assertTrue(self.runtime.drain(5))
+
+        self.assertTrue(finished.is_set())
+        self.assertGreaterEqual(time.monotonic() - started, 0.15)
+        self.assertFalse(self.runtime.submit("oc_a", slow))
+
+    def test_job_failure_does_not_block_the_chat(self):
+        done = threading.Event()
+
+        async def broken():
+            raise RuntimeError("boom")
+
+        async def ok():
+            done.set()
+
+        with self.assertLogs("test", level="ERROR"):
+            self.runtime.submit("oc_a", broken)
+            self.runtime.submit("oc_a", ok)
+            self.assertTrue(self.runtime.drain(5))
+
+        self.assertTrue(done.is_set())
+
+
+class FeishuRuntimeAttachTests(unittest.IsolatedAsyncioTestCase):
+    async def test_attach_runs_jobs_on_host_loop_and_drains(self):
+        runtime = FeishuRuntime(logging.getLogger("test"))
+        runtime.attach(asyncio.get_running_loop())
+        loops = []
+        closed = []
+
+        async def job():
+            await asyncio.sleep(0.05)
+            loops.append(asyncio.get_running_loop())
+
+        async def hook():
+            closed.append(True)
+
+        runtime.shutdown_hooks.append(hook)
+        # 模拟 ws 线程回调里提交任务。
+        await asyncio.to_thread(runtime.submit, "oc_a", job)
+
+        self.assertTrue(await runtime.drain_async(5))
+        self.assertEqual(loops, [asyncio.get_running_loop()])
+        self.assertEqual(closed, [True])
+        self.assertFalse(runtime.submit("oc_a", job))
+
+
+if __name__ == "__main__":
+    unittest.main()
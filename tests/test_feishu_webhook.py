@@ -0,0 +1,184 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+
+from app.feishu.feishu_bot import build_event_handler, build_feishu_service
+from app.feishu.feishu_runtime import FeishuRuntime
+from app.feishu.feishu_webhook import FeishuWebhookServer
+
+ENCRYPT_KEY = "test-encrypt-key"
+VERIFICATION_TOKEN = "test-verification-token"
+
+
+def encrypt_payload(payload: dict, key: str = ENCRYPT_KEY) -> bytes:
+    from Crypto.Cipher import AES
+
+    plaintext = json.dumps(payload).encode("utf-8")
+    pad = AES.block_size - len(plaintext) % AES.block_size
+    plaintext += bytes([pad]) * pad
+    iv = os.urandom(AES.block_size)
+    cipher = AES.new(hashlib.sha256(key.encode("utf-8")).digest(), AES.MODE_CBC, iv)
+    encrypted = base64.b64encode(iv + cipher.encrypt(plaintext)).decode("ascii")
+    return json.dumps({"encrypt": encrypted}).encode("utf-8")
+
+
+def signed_headers(body: bytes, key: str = ENCRYPT_KEY) -> dict:
+    timestamp, nonce = str(int(time.time())), "nonce-1"
+    signature = hashlib.sha256((timestamp + nonce + key).encode("utf-8") + body).hexdigest()
+    return {
+        "content-type": "application/json",
+        "x-lark-request-timestamp": timestamp,
+        "x-lark-request-nonce": nonce,
+        "x-lark-signature": signature,
+    }
+
+
+def message_event(event_id: str = "ev_1", text: str = "hello") -> dict:
+    return {
+        "schema": "2.0",
+        "header": {
+            "event_id": event_id,
+            "event_type": "im.message.receive_v1",
+            "token": VERIFICATION_TOKEN,
+            "create_time": str(int(time.time() * 1000)),
+            "app_id": "cli_test",
+        },
+        "event": {
+            "sender": {"sender_id": {"open_id": "ou_1"}, "sender_type": "user"},
+            "message": {
+                "message_id": "om_1",
+                "chat_id": "oc_1",
+                "chat_type": "p2p",
+                "message_type": "text",
+                "content": json.dumps({"text": text}),
+            },
+        },
+    }
+
+
+class FeishuWebhookServerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.logger = logging.getLogger("test_feishu_webhook")
+        self.runtime = FeishuRuntime(self.logger)
+        self.runtime.start()
+        self.addCleanup(self.runtime.drain, 5)
+        self.handled: list[str] = []
+        self.done = asyncio.Event()
+        test_loop = asyncio.get_running_loop()
+
+        async def slow_handle(core, client, event, logger, **kwargs):
+            await asyncio.sleep(0.5)
+            self.handled.append(event.text)
+            test_loop.call_soon_threadsafe(self.done.set)
+
+        patcher = patch("app.feishu.feishu_bot.handle_private_text_event", new=slow_handle)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        dispatcher = build_event_handler(
+            core=object(),
+            client_ref={"client": object()},
+            logger=self.logger,
+            runtime=self.runtime,
+            encrypt_key=ENCRYPT_KEY,
+            verification_token=VERIFICATION_TOKEN,
+        )
+        self.server = FeishuWebhookServer(dispatcher, self.logger, host="127.0.0.1", port=0)
+        await self.server.start()
+        self.addAsyncCleanup(self.server.stop)
+        self.http = httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{self.server.bound_port}", timeout=5
+        )
+        self.addAsyncCleanup(self.http.aclose)
+
+    async def test_challenge_handshake(self):
+        body = encrypt_payload(
+            {"type": "url_verification", "challenge": "abc123", "token": VERIFICATION_TOKEN}
+        )
+
+        response = await self.http.post("/feishu/events", content=body)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"challenge": "abc123"})
+
+    async def test_event_is_acked_before_processing_finishes(self):
+        body = encrypt_payload(message_event(text="你好"))
+
+        started = time.monotonic()
+        response = await self.http.post("/feishu/events", content=body, headers=signed_headers(body))
+        ack_sec = time.monotonic() - started
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(ack_sec, 0.3)
+        self.assertEqual(self.handled, [])
+        await asyncio.wait_for(self.done.wait(), timeout=5)
+        self.assertEqual(self.handled, ["你好"])
+
+    async def test_bad_signature_is_rejected(self):
+        body = encrypt_payload(message_event())
+        headers = signed_headers(body)
+        headers["x-lark-signature"] = "0" * 64
+
+        response = await self.http.post("/feishu/events", content=body, headers=headers)
+        await asyncio.sleep(0.6)
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(self.handled, [])
+
+    async def test_wrong_token_is_rejected(self):
+        payload = message_event()
+        payload["header"]["token"] = "forged"
+        body = encrypt_payload(payload)
+
+        response = await self.http.post("/feishu/events", content=body, headers=signed_headers(body))
+
+        self.assertEqual(response.status_code, 500)
+
+    async def test_unknown_path_and_method(self):
+        self.assertEqual((await self.http.post("/other", content=b"{}")).status_code, 404)
+        self.assertEqual((await self.http.get("/feishu/events")).status_code, 405)
+
+    async def test_oversized_body_is_rejected(self):
+        self.server.max_body_bytes = 16
+
+        response = await self.http.post("/feishu/events", content=b"x" * 64)
+
+        self.assertEqual(response.status_code, 413)
+
+    async def test_slow_body_times_out(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.server.bound_port)
+        self.addAsyncCleanup(writer.wait_closed)
+        self.addCleanup(writer.close)
+
+        with patch("app.feishu.feishu_webhook.READ_TIMEOUT_SEC", 0.2):
+            writer.write(
+                b"POST /feishu/events HTTP/1.1\r\nHost: x\r\nContent-Length: 100\r\n\r\n{"
+            )
+            await writer.drain()
+            # 服务端读请求体超时后直接断开连接。
+            self.assertEqual(await asyncio.wait_for(reader.read(), timeout=2), b"")
+
+
+class FeishuWebhookStartupTests(unittest.TestCase):
+    def test_webhook_mode_requires_a_secret(self):
+        config = SimpleNamespace(feishu_app_id="cli_test", feishu_app_secret="secret")
+        env = {
+            "FEISHU_EVENT_MODE": "webhook",
+            "FEISHU_ENCRYPT_KEY": "",
+            "FEISHU_VERIFICATION_TOKEN": "",
+        }
+        with patch.dict(os.environ, env):
+            with self.assertRaisesRegex(ValueError, "FEISHU_VERIFICATION_TOKEN"):
+                build_feishu_service(config, chat_store=None, logger=logging.getLogger("test"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,6 +8,7 @@ from telegram.error import NetworkError, TimedOut
 from app.config.chat_store import ChatStore
 from app.config.config import AppConfig
 from app.config.project_service import ProjectService
+from app.core.platform_messages import OutboundPart, PlatformOutboundMessage
 from app.telegram.handlers import BotHandlers
 
 
@@ -122,6 +123,7 @@ class HandlerStabilityTests(unittest.IsolatedAsyncioTestCase):
             effective_user=SimpleNamespace(id=1, full_name="User"),
             effective_chat=SimpleNamespace(id=123),
             message=SimpleNamespace(text="hello", message_id=9),
+            to_dict=lambda: {"update_id": 10},
         )
 
         with (
@@ -136,6 +138,96 @@ class HandlerStabilityTests(unittest.IsolatedAsyncioTestCase):
         preview.fail.assert_not_awaited()
         handlers.telegram_adapter.send_outbound.assert_awaited_once()
 
+    async def test_handle_message_keeps_reply_in_outbox_when_send_fails(self):
+        handlers, tmp = build_handlers_for_test()
+        self.addCleanup(tmp.cleanup)
+
+        preview = SimpleNamespace(
+            start=AsyncMock(),
+            update=AsyncMock(),
+            finalize=AsyncMock(),
+            fail=AsyncMock(),
+            has_active_message=True,
+        )
+        handlers.preview_driver_factory = lambda update: preview
+        handlers.bridge_core.process_user_text = AsyncMock(
+            return_value=PlatformOutboundMessage(
+                parts=(OutboundPart.text_part("first"), OutboundPart.text_part("second")),
+                meta={},
+                history_key=123,
+            )
+        )
+        sent = []
+
+        async def flaky_reply(_update, text):
+            if text == "second":
+                raise TimedOut("send timeout")
+            sent.append(text)
+
+        update = SimpleNamespace(
+            update_id=10,
+            effective_user=SimpleNamespace(id=1, full_name="User"),
+            effective_chat=SimpleNamespace(id=123),
+            message=SimpleNamespace(text="hello", message_id=9),
+            to_dict=lambda: {"update_id": 10},
+        )
+        with (
+            patch("app.telegram.handlers.keep_typing", new=AsyncMock()),
+            patch("app.telegram.telegram_adapter.reply_text_with_retry", new=flaky_reply),
+        ):
+            await handlers.handle_message(update, context=None)
+
+        self.assertEqual(sent, ["first"])
+        preview.fail.assert_awaited_once_with("回复发送失败，网络恢复后会自动补发。")
+        self.assertEqual(handlers.outbox.pending_count("telegram"), 1)
+
+        bot = SimpleNamespace(send_message=AsyncMock())
+        delivered = await handlers.flush_outbox(SimpleNamespace(bot=bot))
+
+        self.assertEqual(delivered, 1)
+        bot.send_message.assert_awaited_once_with(chat_id=123, text="second", reply_markup=None)
+        self.assertEqual(handlers.outbox.pending_count(), 0)
+
+    async def test_flush_outbox_stops_on_network_error(self):
+        handlers, tmp = build_handlers_for_test()
+        self.addCleanup(tmp.cleanup)
+        outbound = PlatformOutboundMessage(
+            parts=(OutboundPart.text_part("hi"),), meta={}, history_key=1
+        )
+        for chat_id in (1, 2):
+            entry = handlers.outbox.enqueue("telegram", chat_id, outbound)
+            handlers.outbox.release(entry.id)
+
+        bot = SimpleNamespace(send_message=AsyncMock(side_effect=NetworkError("down")))
+        with patch("app.telegram.telegram_io.asyncio.sleep", new=AsyncMock()):
+            delivered = await handlers.flush_outbox(SimpleNamespace(bot=bot))
+
+        self.assertEqual(delivered, 0)
+        self.assertEqual(bot.send_message.await_count, 3)
+        self.assertEqual(handlers.outbox.pending_count("telegram"), 2)
+        self.assertEqual(len(handlers.outbox.claim_pending("telegram")), 2)
+
+    async def test_background_job_command_keeps_full_prompt_text(self):
+        handlers, tmp = build_handlers_for_test()
+        self.addCleanup(tmp.cleanup)
+        handlers._run_command_async = AsyncMock(
+            return_value=SimpleNamespace(reply_text="已创建后台任务 #1")
+        )
+        update = SimpleNamespace(
+            update_id=11,
+            effective_user=SimpleNamespace(id=1),
+            effective_chat=SimpleNamespace(id=123),
+            message=SimpleNamespace(text="/bg@codex_bot 重构解析器\n并补测试"),
+        )
+
+        with patch(
+            "app.telegram.handlers.reply_text_with_retry", new=AsyncMock()
+        ) as reply_mock:
+            await handlers.background_job_command(update, context=None)
+
+        handlers._run_command_async.assert_awaited_once_with(123, "/bg 重构解析器\n并补测试")
+        reply_mock.assert_awaited_once_with(update, "已创建后台任务 #1")
+
     async def test_handle_message_skips_duplicate_update(self):
         handlers, tmp = build_handlers_for_test()
         self.addCleanup(tmp.cleanup)
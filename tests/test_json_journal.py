@@ -0,0 +1,90 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app.core.json_journal import JsonJournal
+
+
+class JsonJournalTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = Path(tmpdir.name) / "outbox.json"
+
+    def test_changes_are_appended_and_replayed(self):
+        state = {"a": {"id": "a", "n": 1}}
+        journal = JsonJournal(self.path, key_field="id", label="测试")
+        snapshot = lambda: list(state.values())
+
+        journal.put(state["a"], snapshot)
+        state["b"] = {"id": "b", "n": 1}
+        journal.put(state["b"], snapshot)
+        state["a"] = {"id": "a", "n": 2}
+        journal.put(state["a"], snapshot)
+        del state["b"]
+        journal.delete("b", snapshot)
+
+        # 只追加日志，不写快照文件。
+        self.assertFalse(self.path.exists())
+        self.assertEqual(len(journal.journal_path.read_text(encoding="utf-8").splitlines()), 4)
+        reloaded = JsonJournal(self.path, key_field="id", label="测试")
+        self.assertEqual(reloaded.load(), [{"id": "a", "n": 2}])
+
+    def test_compacts_after_threshold(self):
+        state: dict = {}
+        journal = JsonJournal(self.path, key_field="id", label="测试", compact_every=3)
+        for index in range(5):
+            state[str(index)] = {"id": str(index)}
+            journal.put(state[str(index)], lambda: list(state.values()))
+        journal.wait_compaction(5)
+
+        self.assertFalse(journal.rotated_path.exists())
+        snapshot = json.loads(self.path.read_text(encoding="utf-8"))
+        self.assertEqual([item["id"] for item in snapshot["entries"]], ["0", "1", "2"])
+        self.assertEqual(len(journal.journal_path.read_text(encoding="utf-8").splitlines()), 2)
+        reloaded = JsonJournal(self.path, key_field="id", label="测试")
+        self.assertEqual([item["id"] for item in reloaded.load()], ["0", "1", "2", "3", "4"])
+
+    def test_appends_are_fsynced(self):
+        journal = JsonJournal(self.path, key_field="id", label="测试")
+        with patch("app.core.json_journal.os.fsync") as fsync:
+            journal.put({"id": "a"}, lambda: [])
+
+        self.assertGreaterEqual(fsync.call_count, 1)
+
+    def test_unfinished_background_compaction_is_replayed(self):
+        # 模拟日志已轮转、快照还没写完就崩溃：旧日志和新日志都要重放。
+        journal = JsonJournal(self.path, key_field="id", label="测试")
+        journal.put({"id": "a", "n": 1}, lambda: [])
+        journal.journal_path.replace(journal.rotated_path)
+        journal.put({"id": "a", "n": 2}, lambda: [])
+        journal.put({"id": "b"}, lambda: [])
+
+        reloaded = JsonJournal(self.path, key_field="id", label="测试")
+        self.assertEqual(reloaded.load(), [{"id": "a", "n": 2}, {"id": "b"}])
+        self.assertFalse(reloaded.rotated_path.exists())
+        self.assertEqual(
+            JsonJournal(self.path, key_field="id", label="测试").load(),
+            [{"id": "a", "n": 2}, {"id": "b"}],
+        )
+
+    def test_torn_last_line_is_dropped_and_compacted(self):
+        journal = JsonJournal(self.path, key_field="id", label="测试")
+        journal.put({"id": "a"}, lambda: [])
+        with open(journal.journal_path, "a", encoding="utf-8") as f:
+            f.write('{"op": "put", "item": {"id": "b"')
+
+        reloaded = JsonJournal(self.path, key_field="id", label="测试")
+        self.assertEqual(reloaded.load(), [{"id": "a"}])
+        reloaded.put({"id": "c"}, lambda: [])
+
+        self.assertEqual(
+            [item["id"] for item in JsonJournal(self.path, key_field="id", label="测试").load()],
+            ["a", "c"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
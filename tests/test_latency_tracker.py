@@ -0,0 +1,169 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from app.config.chat_store import ChatStore
+from app.config.config import AppConfig
+from app.core.bridge_core import BridgeCore
+from app.core.codex_client import CodexRunError, ask_codex_with_meta
+from app.core.codex_retry import CodexCircuitBreaker, classify_codex_error
+from app.core.latency_tracker import (
+    LatencyTracker,
+    build_eta_estimator,
+    prompt_size_bucket,
+    render_eta_text,
+)
+from benchmarks.load_test import ensure_fake_codex_executable
+
+
+def build_config(**overrides) -> AppConfig:
+    values = dict(
+        telegram_bot_token="",
+        telegram_proxy_url="",
+        codex_model="gpt-5",
+        codex_reasoning_effort="low",
+        codex_bin=ensure_fake_codex_executable(),
+        codex_project_dir="",
+        codex_timeout_sec=30,
+        codex_sandbox="",
+        allowed_user_ids_raw="",
+    )
+    values.update(overrides)
+    return AppConfig(**values)
+
+
+class LatencyTrackerTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = f"{tmpdir.name}/latency.json"
+
+    def test_keys_split_by_model_effort_and_prompt_size(self):
+        self.assertEqual(prompt_size_bucket(100), "s")
+        self.assertEqual(prompt_size_bucket(20_000), "l")
+        self.assertEqual(prompt_size_bucket(100_000), "xl")
+        self.assertEqual(LatencyTracker.key_for("", "", 10), "default|default|s")
+        self.assertEqual(LatencyTracker.key_for("gpt-5", "xhigh", 5_000), "gpt-5|xhigh|m")
+
+    def test_timeout_follows_high_percentile_within_floor_and_ceiling(self):
+        tracker = LatencyTracker(self.path, adaptive_timeouts=True, floor_sec=60, min_samples=5)
+        key = tracker.key_for("gpt-5", "minimal", 100)
+        for _ in range(4):
+            tracker.record(key, 10)
+        # 样本不足时沿用全局超时。
+        self.assertEqual(tracker.timeout_for(key, 600), 600)
+        self.assertIsNone(tracker.typical_sec(key))
+
+        for value in (20, 30, 40, 50, 200):
+            tracker.record(key, value)
+        self.assertEqual(tracker.timeout_for(key, 600), 400)
+        self.assertEqual(tracker.timeout_for(key, 300), 300)
+        self.assertEqual(tracker.typical_sec(key), 20)
+
+        fast = tracker.key_for("gpt-5", "minimal", 100_000)
+        for _ in range(5):
+            tracker.record(fast, 3)
+        self.assertEqual(tracker.timeout_for(fast, 600), 60)
+
+        # 默认关闭自适应超时，始终沿用全局超时。
+        fixed = LatencyTracker(min_samples=5)
+        for _ in range(5):
+            fixed.record(key, 3)
+        self.assertEqual(fixed.timeout_for(key, 600), 600)
+        self.assertEqual(fixed.typical_sec(key), 3)
+
+    def test_samples_survive_restart(self):
+        tracker = LatencyTracker(self.path, min_samples=2, max_samples=3)
+        key = tracker.key_for("gpt-5", "high", 100)
+        for value in (1, 2, 3, 4):
+            tracker.record(key, value)
+        # 落盘是批量进行的，未 flush 前不写文件。
+        self.assertFalse(os.path.exists(self.path))
+        tracker.flush()
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {key: [2, 3, 4]})
+        reloaded = LatencyTracker(self.path, min_samples=2, max_samples=3)
+        reloaded.load()
+        self.assertEqual(reloaded.typical_sec(key), 3)
+
+    def test_saves_are_batched_in_background(self):
+        tracker = LatencyTracker(self.path, flush_interval_sec=0.05)
+        key = tracker.key_for("gpt-5", "high", 100)
+        with patch("app.core.latency_tracker.os.replace", wraps=os.replace) as replace:
+            for value in (1, 2, 3):
+                tracker.record(key, value)
+            for _ in range(100):
+                if os.path.exists(self.path):
+                    break
+                time.sleep(0.02)
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {key: [1, 2, 3]})
+        self.assertEqual(replace.call_count, 1)
+
+    def test_eta_text_and_estimator(self):
+        self.assertEqual(render_eta_text(None), "")
+        self.assertEqual(render_eta_text(40.4), "通常约 40s")
+        self.assertEqual(render_eta_text(300), "通常约 5 分钟")
+
+        tracker = LatencyTracker(min_samples=1)
+        config = build_config()
+        tracker.record(tracker.key_for("gpt-5", "high", 6), 42)
+        estimate = build_eta_estimator(tracker, lambda: config)
+        self.assertEqual(estimate("prompt", "high"), 42)
+        self.assertIsNone(estimate("prompt", None))
+
+    def test_codex_runs_feed_tracker_and_use_adaptive_timeout(self):
+        tracker = LatencyTracker(self.path, adaptive_timeouts=True, floor_sec=1, min_samples=1)
+        config = build_config()
+        with patch.dict("os.environ", {"FAKE_CODEX_DELAY_SEC": "0.2", "FAKE_CODEX_EVENTS": "0"}):
+            _reply, meta = ask_codex_with_meta(config, "User: hi\n", latency=tracker)
+        key = tracker.key_for("gpt-5", "low", len("User: hi\n"))
+        self.assertGreater(meta["codex_run_sec"], 0)
+        self.assertEqual(tracker.timeout_for(key, 30), 1)
+
+        # 按历史耗时收紧后的超时生效，超时本身也记为一个样本。
+        with patch.dict("os.environ", {"FAKE_CODEX_DELAY_SEC": "5", "FAKE_CODEX_EVENTS": "0"}):
+            with self.assertRaises(CodexRunError) as ctx:
+                ask_codex_with_meta(config, "User: hi\n", latency=tracker)
+        self.assertIn("after 1s", str(ctx.exception))
+        self.assertTrue(ctx.exception.adaptive_timeout)
+        self.assertEqual(len(tracker._values(key)), 2)
+
+        # 自适应超时是本地收紧的结果，不计入熔断。
+        breaker = CodexCircuitBreaker(failure_threshold=1, cooldown_sec=60)
+        breaker.record_failure(classify_codex_error(ctx.exception))
+        self.assertEqual(breaker.snapshot()["state"], "closed")
+
+
+class BridgeCoreEtaTests(unittest.IsolatedAsyncioTestCase):
+    async def test_preview_shows_typical_duration(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        statuses: list[str] = []
+
+        async def request_reply(prompt, reasoning_effort=None):
+            return "ok", {}
+
+        async def on_status(text):
+            statuses.append(text)
+
+        core = BridgeCore(
+            chat_store=ChatStore(history_file=f"{tmpdir.name}/hist.json", max_turns=12),
+            system_prompt="system",
+            request_reply=request_reply,
+            estimate_eta=lambda prompt, effort: 40.0 if effort == "xhigh" else None,
+        )
+
+        await core.request_chat_reply(1, "prompt", "xhigh", on_status=on_status)
+        await core.request_chat_reply(1, "prompt", "low", on_status=on_status)
+
+        self.assertEqual(statuses, ["正在请求 Codex（通常约 40s）..."])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import json
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+from app.config.config import AppConfig
+from app.core.codex_client import ask_codex_with_meta
+from benchmarks.fake_bot_api import FakeBotApi
+from benchmarks.load_test import (
+    FAKE_CODEX_PATH,
+    LoadTestConfig,
+    compare_with_baseline,
+    ensure_fake_codex_executable,
+    percentile,
+    run_load_test,
+)
+
+
+class FakeCodexTests(unittest.TestCase):
+    def test_fake_codex_output_is_parsed_by_codex_client(self):
+        config = AppConfig(
+            telegram_bot_token="",
+            telegram_proxy_url="",
+            codex_model="",
+            codex_reasoning_effort="",
+            codex_bin=ensure_fake_codex_executable(),
+            codex_project_dir="",
+            codex_timeout_sec=30,
+            codex_sandbox="",
+            allowed_user_ids_raw="",
+        )
+        with patch.dict(
+            "os.environ",
+            {"FAKE_CODEX_DELAY_SEC": "0", "FAKE_CODEX_REPLY_CHARS": "50"},
+        ):
+            reply, meta = ask_codex_with_meta(config, "system\nUser: ping-1\n")
+
+        self.assertTrue(reply.startswith("echo: ping-1"))
+        self.assertEqual(len(reply), 50)
+        self.assertTrue(meta["thread_id"])
+        self.assertIn("output_tokens", meta["usage"])
+
+    def test_fake_codex_reports_configured_failure(self):
+        result = subprocess.run(
+            [sys.executable, str(FAKE_CODEX_PATH), "exec", "--json", "hi"],
+            capture_output=True,
+            text=True,
+            env={"FAKE_CODEX_DELAY_SEC": "0", "FAKE_CODEX_EXIT_CODE": "3"},
+            check=False,
+        )
+
+        self.assertEqual(result.returncode, 3)
+        events = [json.loads(line) for line in result.stdout.splitlines()]
+        self.assertEqual(events[0]["type"], "thread.started")
+
+
+class LoadHarnessTests(unittest.IsolatedAsyncioTestCase):
+    def test_percentile_interpolates(self):
+        self.assertEqual(percentile([], 95), 0.0)
+        self.assertAlmostEqual(percentile([1.0, 2.0, 3.0, 4.0], 50), 2.5)
+        self.assertAlmostEqual(percentile([1.0, 2.0, 3.0, 4.0], 100), 4.0)
+
+    def test_compare_with_baseline_flags_latency_and_write_regressions(self):
+        baseline = {
+            "latency_sec": {"p50": 1.0, "p95": 2.0, "p99": 3.0},
+            "messages_per_sec": 4.0,
+            "file_writes": {"chat_store_save": 10},
+        }
+        report = {
+            "latency_sec": {"p50": 1.0, "p95": 3.0, "p99": 3.1},
+            "messages_per_sec": 2.0,
+            "file_writes": {"chat_store_save": 20},
+        }
+
+        regressions = compare_with_baseline(report, baseline, tolerance=0.2)
+
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(any("p95" in line for line in regressions))
+        self.assertTrue(any("throughput" in line for line in regressions))
+        self.assertTrue(any("chat_store_save" in line for line in regressions))
+
+    def test_fake_bot_api_returns_pushed_updates(self):
+        api = FakeBotApi()
+        api.push_text_update(7, "hello")
+
+        updates = api.dispatch("getUpdates", {"offset": 0, "timeout": 0})
+
+        self.assertEqual(updates[0]["message"]["text"], "hello")
+        self.assertEqual(api.dispatch("getUpdates", {"offset": 2, "timeout": 0}), [])
+        api.stop()
+
+    async def test_run_load_test_completes_all_messages(self):
+        report = await run_load_test(
+            LoadTestConfig(
+                chats=2,
+                messages_per_chat=2,
+                codex_delay_sec=0.05,
+                codex_events=1,
+                reply_chars=80,
+                timeout_sec=30,
+            )
+        )
+
+        self.assertEqual(report["completed"], 4)
+        self.assertEqual(report["errors"], 0)
+        self.assertGreater(report["latency_sec"]["p50"], 0)
+        self.assertGreaterEqual(report["file_writes"]["update_state_save"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
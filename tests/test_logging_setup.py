@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+import queue
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.config.logging_setup import (
+    DroppingQueueHandler,
+    JsonLogFormatter,
+    LogContextFilter,
+    format_payload,
+    log_context,
+    setup_logging,
+    shutdown_logging,
+)
+
+
+class LoggingSetupTests(unittest.TestCase):
+    def tearDown(self):
+        shutdown_logging()
+        logging.getLogger().handlers.clear()
+
+    def test_format_payload_truncates_long_text(self):
+        text = "x" * 50
+
+        self.assertEqual(format_payload(text, max_chars=100), text)
+        self.assertEqual(format_payload(text, max_chars=10), "x" * 10 + "…(+40 chars)")
+        self.assertEqual(format_payload(text, max_chars=0), "<omitted len=50>")
+
+    def test_format_payload_sampling_can_omit_body(self):
+        self.assertEqual(
+            format_payload("secret", max_chars=100, sample_rate=0.0),
+            "<omitted len=6>",
+        )
+
+    def test_json_formatter_includes_context_fields(self):
+        record = logging.LogRecord("bot", logging.INFO, __file__, 1, "hi %s", ("there",), None)
+        with log_context(chat_id=123, trace_id="trace-1"):
+            LogContextFilter().filter(record)
+
+        payload = json.loads(JsonLogFormatter().format(record))
+
+        self.assertEqual(payload["msg"], "hi there")
+        self.assertEqual(payload["chat_id"], "123")
+        self.assertEqual(payload["trace_id"], "trace-1")
+
+    def test_queue_handler_drops_instead_of_blocking_when_full(self):
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.LogRecord("bot", logging.INFO, __file__, 1, "msg", None, None)
+
+        handler.emit(record)
+        handler.emit(record)
+
+        self.assertEqual(handler.dropped, 1)
+
+    def test_setup_logging_writes_through_background_listener(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_file = os.path.join(tmpdir, "bot.log")
+            with patch.dict(
+                os.environ,
+                {"BOT_LOG_TO_STDOUT": "0", "BOT_LOG_FORMAT": "json"},
+            ):
+                setup_logging(log_file=log_file)
+                root = logging.getLogger()
+                self.assertIsInstance(root.handlers[0], DroppingQueueHandler)
+                with log_context(chat_id="oc_1"):
+                    logging.getLogger("bot").info("hello %s", "world")
+                shutdown_logging()
+
+            with open(log_file, "r", encoding="utf-8") as f:
+                line = json.loads(f.readline())
+
+        self.assertEqual(line["msg"], "hello world")
+        self.assertEqual(line["chat_id"], "oc_1")
+        self.assertTrue(line["trace_id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
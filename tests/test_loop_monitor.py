@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import time
+import unittest
+
+from app.core.loop_monitor import LoopLagMonitor, render_loop_lag_text
+
+
+def block_event_loop_for(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+class LoopLagMonitorTests(unittest.IsolatedAsyncioTestCase):
+    def test_record_lag_fills_histogram_and_counts_stalls(self):
+        monitor = LoopLagMonitor(logging.getLogger("test"), stall_threshold_sec=0.1)
+
+        monitor.record_lag(0.001)
+        monitor.record_lag(0.04)
+        monitor.record_lag(0.3)
+
+        snapshot = monitor.snapshot()
+        self.assertEqual(snapshot["samples"], 3)
+        self.assertEqual(snapshot["stalls"], 1)
+        self.assertEqual(snapshot["max_lag_ms"], 300.0)
+        self.assertEqual(snapshot["histogram"], {"<=5ms": 1, "<=50ms": 1, "<=500ms": 1})
+
+    async def test_watchdog_captures_stack_of_blocking_call(self):
+        monitor = LoopLagMonitor(
+            logging.getLogger("test"), interval_sec=0.02, stall_threshold_sec=0.05
+        )
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            with self.assertLogs("test", level="WARNING") as logs:
+                block_event_loop_for(0.3)
+                await asyncio.sleep(0.05)
+        finally:
+            await monitor.stop()
+
+        snapshot = monitor.snapshot()
+        self.assertGreaterEqual(snapshot["stalls"], 1)
+        self.assertIn("block_event_loop_for", snapshot["last_stall_where"])
+        self.assertTrue(any("block_event_loop_for" in line for line in logs.output))
+
+    def test_render_loop_lag_text_mentions_last_stall(self):
+        text = render_loop_lag_text(
+            {
+                "samples": 10,
+                "max_lag_ms": 320.0,
+                "stall_threshold_ms": 250.0,
+                "stalls": 1,
+                "last_stall_ms": 320.0,
+                "last_stall_where": "chat_store.py:40 in save",
+                "histogram": {"<=5ms": 9, "<=500ms": 1},
+            }
+        )
+
+        self.assertIn("事件循环延迟", text)
+        self.assertIn("<=500ms:1", text)
+        self.assertIn("chat_store.py:40 in save", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
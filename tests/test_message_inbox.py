@@ -0,0 +1,92 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.core.message_inbox import INBOX_QUEUED, MessageInbox
+
+
+class MessageInboxTests(unittest.IsolatedAsyncioTestCase):
+    async def test_finished_message_leaves_inbox(self):
+        inbox = MessageInbox()
+        entry = inbox.accept("telegram", "1:9", 1, "hello", {"update_id": 3})
+
+        async def job():
+            raise RuntimeError("codex failed")
+
+        with self.assertRaises(RuntimeError):
+            await inbox.run(entry.key, job)
+
+        self.assertEqual(inbox.pending_count(), 0)
+
+    async def test_cancelled_message_survives_restart_and_is_recovered(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "telegram_inbox.json"
+            first = MessageInbox(path)
+            entry = first.accept("telegram", "1:9", 1, "hello", {"update_id": 3})
+            task = asyncio.create_task(first.run(entry.key, lambda: asyncio.sleep(10)))
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+            second = MessageInbox(path)
+            second.load()
+            retry, expired = second.recover("telegram")
+
+        self.assertEqual(expired, [])
+        self.assertEqual([item.key for item in retry], ["1:9"])
+        self.assertEqual(retry[0].state, INBOX_QUEUED)
+        self.assertEqual(retry[0].attempts, 1)
+        self.assertEqual(retry[0].payload, {"update_id": 3})
+
+    def test_recover_expires_old_or_exhausted_messages(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "inbox.json"
+            first = MessageInbox(path)
+            early = first.accept("feishu", "om_early", "oc_1", "early", {})
+            poison = first.accept("feishu", "om_poison", "oc_1", "poison", {})
+            first.accept("feishu", "om_fresh", "oc_1", "fresh", {})
+            first.accept("telegram", "1:9", 1, "other platform", {})
+            first.mark_running(poison.key)
+            first.mark_running(poison.key)
+
+            second = MessageInbox(path, recovery_window_sec=60.0, max_attempts=2)
+            second.load()
+            retry, expired = second.recover("feishu", now=early.accepted_at + 30.0)
+            second.accept("feishu", "om_new", "oc_1", "new", {})
+            again = second.recover("feishu")
+
+        self.assertEqual([item.key for item in retry], ["om_early", "om_fresh"])
+        self.assertEqual([item.key for item in expired], ["om_poison"])
+        self.assertEqual(again, ([], []))
+        self.assertEqual(second.pending_count("feishu"), 3)
+        self.assertEqual(second.pending_count("telegram"), 1)
+
+    def test_recover_expires_messages_outside_recovery_window(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "inbox.json"
+            first = MessageInbox(path)
+            entry = first.accept("feishu", "om_1", "oc_1", "hello", {})
+
+            second = MessageInbox(path, recovery_window_sec=60.0)
+            second.load()
+            retry, expired = second.recover("feishu", now=entry.accepted_at + 120.0)
+
+        self.assertEqual(retry, [])
+        self.assertEqual([item.key for item in expired], ["om_1"])
+        self.assertEqual(second.pending_count(), 0)
+
+    def test_accept_is_idempotent_for_replayed_message(self):
+        inbox = MessageInbox()
+        first = inbox.accept("telegram", "1:9", 1, "hello", {"update_id": 3})
+        inbox.mark_running(first.key)
+
+        second = inbox.accept("telegram", "1:9", 1, "hello", {"update_id": 3})
+
+        self.assertIs(first, second)
+        self.assertEqual(second.attempts, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
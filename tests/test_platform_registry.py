@@ -1,6 +1,6 @@
 import unittest
 
-from app.core.platform_registry import load_platform_registry
+from app.core.platform_registry import load_platform_registry, select_enabled_platforms
 
 
 class PlatformRegistryTests(unittest.TestCase):
@@ -19,5 +19,36 @@ class PlatformRegistryTests(unittest.TestCase):
         )
 
 
+
+class SelectEnabledPlatformsTests(unittest.TestCase):
+    def setUp(self):
+        self.registry = load_platform_registry()
+
+    def test_enables_platforms_with_all_required_env(self):
+        environ = {
+            "TELEGRAM_BOT_TOKEN": "token",
+            "FEISHU_APP_ID": "cli",
+            "FEISHU_APP_SECRET": "secret",
+        }
+
+        self.assertEqual(select_enabled_platforms(self.registry, environ), ["telegram", "feishu"])
+
+    def test_skips_platform_missing_credentials(self):
+        environ = {"TELEGRAM_BOT_TOKEN": "token", "FEISHU_APP_ID": "cli", "FEISHU_APP_SECRET": " "}
+
+        self.assertEqual(select_enabled_platforms(self.registry, environ), ["telegram"])
+
+    def test_bot_platforms_filters_enabled_set(self):
+        environ = {
+            "TELEGRAM_BOT_TOKEN": "token",
+            "FEISHU_APP_ID": "cli",
+            "FEISHU_APP_SECRET": "secret",
+            "BOT_PLATFORMS": "feishu",
+        }
+
+        self.assertEqual(select_enabled_platforms(self.registry, environ), ["feishu"])
+
+
+
 if __name__ == "__main__":
     unittest.main()
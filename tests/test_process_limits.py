@@ -0,0 +1,113 @@
+import os
+import resource
+import subprocess
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+from app.config.config import ProcessLimits, load_process_limits
+from app.core.codex_client import _run_codex_process
+from app.core.process_limits import apply_process_limits, build_command_prefix
+
+
+PROBE = (
+    "import os, resource\n"
+    "print(os.nice(0))\n"
+    "print(resource.getrlimit(resource.RLIMIT_CPU)[0])\n"
+    "print(resource.getrlimit(resource.RLIMIT_AS)[0])\n"
+    "blob = bytearray(32 * 1024 * 1024)\n"
+)
+
+
+class ProcessLimitsTests(unittest.TestCase):
+    def test_load_process_limits_parses_env(self):
+        env = {
+            "CODEX_NICE": "40",
+            "CODEX_IONICE": "best-effort:3",
+            "CODEX_MAX_MEMORY_MB": "2048",
+            "CODEX_MAX_CPU_SEC": "-5",
+            "CODEX_CGROUP_DIR": "",
+        }
+        with patch.dict("os.environ", env):
+            limits = load_process_limits()
+
+        self.assertEqual(
+            limits,
+            ProcessLimits(nice=19, ionice_class="best-effort", ionice_level=3, max_memory_mb=2048),
+        )
+        with patch.dict("os.environ", {"CODEX_IONICE": "realtime"}):
+            self.assertEqual(load_process_limits().ionice_class, "")
+
+    def test_run_applies_limits_and_reports_usage(self):
+        base_nice = os.nice(0)
+        limits = ProcessLimits(nice=5, max_memory_mb=4096, max_cpu_sec=60)
+
+        returncode, lines, _stderr, usage = _run_codex_process(
+            [sys.executable, "-c", PROBE], 30, limits=limits
+        )
+
+        self.assertEqual(returncode, 0)
+        self.assertEqual(int(lines[0]), min(19, base_nice + 5))
+        self.assertEqual(int(lines[1]), 60)
+        self.assertEqual(int(lines[2]), 4096 * 1024 * 1024)
+        self.assertGreaterEqual(usage["peak_rss_mb"], 32)
+        self.assertGreaterEqual(usage["cpu_sec"], 0)
+
+    def test_limits_are_applied_from_the_parent(self):
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+        self.addCleanup(child.wait)
+        self.addCleanup(child.kill)
+        base_nice = os.getpriority(os.PRIO_PROCESS, child.pid)
+
+        apply_process_limits(child.pid, ProcessLimits(nice=3, max_memory_mb=1024, max_cpu_sec=30))
+
+        self.assertEqual(os.getpriority(os.PRIO_PROCESS, child.pid), min(19, base_nice + 3))
+        self.assertEqual(resource.prlimit(child.pid, resource.RLIMIT_CPU), (30, 35))
+        self.assertEqual(
+            resource.prlimit(child.pid, resource.RLIMIT_AS), (1024 * 1024 * 1024,) * 2
+        )
+
+    def test_run_without_limits_keeps_defaults(self):
+        returncode, lines, _stderr, usage = _run_codex_process(
+            [sys.executable, "-c", PROBE], 30
+        )
+
+        self.assertEqual(returncode, 0)
+        self.assertEqual(int(lines[0]), os.nice(0))
+        self.assertEqual(int(lines[1]), resource.getrlimit(resource.RLIMIT_CPU)[0])
+        self.assertIn("peak_rss_mb", usage)
+
+    def test_timeout_kills_process(self):
+        with self.assertRaises(subprocess.TimeoutExpired):
+            _run_codex_process([sys.executable, "-c", "import time; time.sleep(30)"], 1)
+
+    def test_timeout_kills_the_whole_process_group(self):
+        # 孙进程继承了 stdout，只杀直接子进程时读取会一直阻塞到孙进程退出。
+        script = (
+            "import subprocess, sys, time\n"
+            "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])\n"
+            "time.sleep(30)\n"
+        )
+        started = time.monotonic()
+        with self.assertRaises(subprocess.TimeoutExpired):
+            _run_codex_process([sys.executable, "-c", script], 1)
+        self.assertLess(time.monotonic() - started, 10)
+
+    def test_ionice_prefix_depends_on_class_and_binary(self):
+        self.assertEqual(build_command_prefix(ProcessLimits()), [])
+        with patch("app.core.process_limits.shutil.which", return_value="/usr/bin/ionice"):
+            self.assertEqual(
+                build_command_prefix(ProcessLimits(ionice_class="idle")),
+                ["/usr/bin/ionice", "-c", "3"],
+            )
+            self.assertEqual(
+                build_command_prefix(ProcessLimits(ionice_class="best-effort", ionice_level=4)),
+                ["/usr/bin/ionice", "-c", "2", "-n", "4"],
+            )
+        with patch("app.core.process_limits.shutil.which", return_value=None):
+            self.assertEqual(build_command_prefix(ProcessLimits(ionice_class="idle")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
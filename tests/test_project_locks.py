@@ -0,0 +1,108 @@
+import asyncio
+import tempfile
+import unittest
+
+from app.core.project_locks import ProjectLockManager
+
+
+class ProjectLockManagerTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir_a = f"{tmpdir.name}/a"
+        self.dir_b = f"{tmpdir.name}/b"
+        self.events: list[str] = []
+
+    async def run_holder(self, manager, name, project_dir, release, read_only=False, on_wait=None):
+        async with manager.hold(project_dir, read_only, on_wait) as waited_sec:
+            self.events.append(f"{name}:start")
+            await release.wait()
+            self.events.append(f"{name}:end")
+        return waited_sec
+
+    async def test_same_directory_runs_serialize_and_report_wait(self):
+        manager = ProjectLockManager(notify_interval_sec=0.1)
+        release_first, release_second = asyncio.Event(), asyncio.Event()
+        waits: list[float] = []
+
+        async def on_wait(waited_sec):
+            waits.append(waited_sec)
+
+        first = asyncio.create_task(self.run_holder(manager, "first", self.dir_a, release_first))
+        await asyncio.sleep(0)
+        # 同一目录的不同写法解析到同一把锁。
+        second = asyncio.create_task(
+            self.run_holder(manager, "second", f"{self.dir_a}/../a", release_second, on_wait=on_wait)
+        )
+        await asyncio.sleep(0.25)
+        self.assertEqual(self.events, ["first:start"])
+        self.assertTrue(waits)
+
+        release_first.set()
+        release_second.set()
+        self.assertEqual(await first, 0.0)
+        self.assertGreater(await second, 0.2)
+        self.assertEqual(self.events, ["first:start", "first:end", "second:start", "second:end"])
+        self.assertEqual(manager.snapshot(), {})
+
+    async def test_different_directories_run_concurrently(self):
+        manager = ProjectLockManager()
+        release = asyncio.Event()
+
+        tasks = [
+            asyncio.create_task(self.run_holder(manager, "a", self.dir_a, release)),
+            asyncio.create_task(self.run_holder(manager, "b", self.dir_b, release)),
+        ]
+        await asyncio.sleep(0.05)
+        self.assertEqual(sorted(self.events), ["a:start", "b:start"])
+
+        release.set()
+        self.assertEqual(await asyncio.gather(*tasks), [0.0, 0.0])
+
+    async def test_read_only_runs_share_the_directory_unless_disabled(self):
+        release = asyncio.Event()
+        manager = ProjectLockManager()
+        readers = [
+            asyncio.create_task(self.run_holder(manager, f"r{i}", self.dir_a, release, True))
+            for i in range(2)
+        ]
+        writer = asyncio.create_task(self.run_holder(manager, "w", self.dir_a, release))
+        await asyncio.sleep(0.05)
+        self.assertEqual(sorted(self.events), ["r0:start", "r1:start"])
+        release.set()
+        await asyncio.gather(*readers, writer)
+        self.assertEqual(self.events[-2:], ["w:start", "w:end"])
+
+        self.events.clear()
+        release = asyncio.Event()
+        manager = ProjectLockManager(allow_shared_reads=False)
+        readers = [
+            asyncio.create_task(self.run_holder(manager, f"r{i}", self.dir_a, release, True))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.events, ["r0:start"])
+        release.set()
+        await asyncio.gather(*readers)
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        manager = ProjectLockManager()
+        release = asyncio.Event()
+        first = asyncio.create_task(self.run_holder(manager, "first", self.dir_a, release))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(self.run_holder(manager, "cancelled", self.dir_a, release))
+        third = asyncio.create_task(self.run_holder(manager, "third", self.dir_a, release))
+        await asyncio.sleep(0.05)
+
+        cancelled.cancel()
+        release.set()
+        await asyncio.gather(first, third)
+
+        self.assertTrue(cancelled.cancelled())
+        self.assertNotIn("cancelled:start", self.events)
+        self.assertEqual(self.events[-2:], ["third:start", "third:end"])
+        self.assertEqual(manager.snapshot(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.core.platform_messages import OutboundPart, PlatformOutboundMessage
+from app.core.reply_outbox import ReplyOutbox
+
+
+def two_part_outbound() -> PlatformOutboundMessage:
+    return PlatformOutboundMessage(
+        parts=(
+            OutboundPart.text_part("hello"),
+            OutboundPart.image_part("remote_url", "https://example.com/a.png"),
+        ),
+        meta={},
+        history_key=123,
+    )
+
+
+class ReplyOutboxTests(unittest.TestCase):
+    def test_undelivered_parts_survive_restart(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "telegram_outbox.json"
+            first = ReplyOutbox(path)
+            entry = first.enqueue("telegram", 123, two_part_outbound())
+            first.mark_delivered(entry.id, 0)
+
+            second = ReplyOutbox(path)
+            second.load()
+            pending = second.claim_pending("telegram")
+
+        self.assertEqual(len(pending), 1)
+        self.assertEqual(pending[0].chat_id, 123)
+        self.assertEqual(pending[0].delivered, {0})
+        self.assertEqual(pending[0].to_outbound(), two_part_outbound())
+
+    def test_fully_delivered_entry_is_removed(self):
+        outbox = ReplyOutbox()
+        entry = outbox.enqueue("telegram", 123, two_part_outbound())
+        outbox.mark_delivered(entry.id, 0)
+        outbox.mark_delivered(entry.id, 1)
+
+        self.assertEqual(outbox.pending_count(), 0)
+
+    def test_claimed_entries_are_not_handed_out_twice(self):
+        outbox = ReplyOutbox()
+        entry = outbox.enqueue("telegram", 123, two_part_outbound())
+
+        self.assertEqual(outbox.claim_pending("telegram"), [])
+        outbox.release(entry.id)
+        self.assertEqual([item.id for item in outbox.claim_pending("telegram")], [entry.id])
+        self.assertEqual(outbox.claim_pending("feishu"), [])
+
+    def test_expired_or_exhausted_entries_are_dropped(self):
+        outbox = ReplyOutbox(max_age_sec=60.0, max_attempts=2)
+        stale = outbox.enqueue("telegram", 1, two_part_outbound())
+        failing = outbox.enqueue("telegram", 2, two_part_outbound())
+        outbox.release(stale.id)
+        outbox.release(failing.id)
+        outbox.record_failure(failing.id, "TimedOut")
+        outbox.record_failure(failing.id, "TimedOut")
+
+        self.assertEqual(outbox.claim_pending("telegram", now=stale.created_at + 120.0), [])
+        self.assertEqual(outbox.pending_count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
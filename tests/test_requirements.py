@@ -6,14 +6,21 @@ ROOT = Path(__file__).resolve().parent.parent
 REQUIREMENTS = ROOT / "requirements.txt"
 
 
+def requirement_lines() -> list[str]:
+    return [
+        line.strip()
+        for line in REQUIREMENTS.read_text(encoding="utf-8").splitlines()
+        if line.strip() and not line.lstrip().startswith("#")
+    ]
+
+
 class RequirementsTests(unittest.TestCase):
     def test_python_telegram_bot_includes_socks_extra(self):
-        lines = [
-            line.strip()
-            for line in REQUIREMENTS.read_text(encoding="utf-8").splitlines()
-            if line.strip() and not line.lstrip().startswith("#")
-        ]
-        self.assertIn("python-telegram-bot[socks]>=21.7", lines)
+        self.assertIn("python-telegram-bot[socks]>=21.7", requirement_lines())
+
+    def test_httpx_is_a_direct_dependency(self):
+        # 飞书客户端直接使用 httpx，不能依赖 python-telegram-bot 间接带进来。
+        self.assertIn("httpx>=0.27,<1.0", requirement_lines())
 
 
 if __name__ == "__main__":
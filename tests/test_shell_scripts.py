@@ -32,6 +32,23 @@ class ShellScriptTests(unittest.TestCase):
         self.assertEqual(result.returncode, 0, msg=result.stderr)
         self.assertEqual(result.stdout.strip(), "app/feishu/feishu_bot.py")
 
+    def test_start_sh_resolves_all_to_multi_host(self):
+        result = run_shell('source "./start.sh"; resolve_target_script all')
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        self.assertEqual(result.stdout.strip(), "app/host/multi_host.py")
+
+    def test_start_sh_resolves_supervise(self):
+        result = run_shell('source "./start.sh"; resolve_target_script supervise')
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        self.assertEqual(result.stdout.strip(), "app/host/supervisor.py")
+
+    def test_stop_sh_skips_stale_supervisor_pid(self):
+        result = run_shell(
+            'source "./stop.sh"; SUPERVISOR_PID_FILE="$(mktemp)"; echo 999999 > "$SUPERVISOR_PID_FILE"; '
+            'code=0; stop_supervisor || code=$?; printf "%s %s\n" "$code" "$([[ -f "$SUPERVISOR_PID_FILE" ]] && echo kept || echo removed)"'
+        )
+        self.assertEqual(result.stdout.strip(), "1 removed", msg=result.stderr)
+
     def test_prompt_platform_emits_menu_to_stderr_only(self):
         result = run_shell('printf "1\\n" | { source "./start.sh"; prompt_platform; }')
         self.assertEqual(result.returncode, 0, msg=result.stderr)
@@ -48,6 +65,7 @@ class ShellScriptTests(unittest.TestCase):
             [
                 str(ROOT / "app" / "telegram" / "bot.py"),
                 str(ROOT / "app" / "feishu" / "feishu_bot.py"),
+                str(ROOT / "app" / "host" / "multi_host.py"),
             ],
         )
 
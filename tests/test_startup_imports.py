@@ -0,0 +1,34 @@
+import unittest
+
+from benchmarks.startup_bench import measure_import, parse_importtime
+
+
+class StartupImportTests(unittest.TestCase):
+    def test_parse_importtime_reads_depth_and_cumulative(self):
+        rows = parse_importtime(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   json.decoder\n"
+            "import time:       300 |        420 | json\n"
+        )
+
+        self.assertEqual([row["module"] for row in rows], ["json.decoder", "json"])
+        self.assertEqual(rows[0]["depth"], 1)
+        self.assertEqual(rows[1]["cumulative_us"], 420)
+
+    def test_feishu_entry_does_not_import_telegram_or_lark_sdk(self):
+        measured = measure_import("app.feishu.feishu_bot")
+
+        self.assertNotIn("telegram", measured["modules"])
+        self.assertNotIn("telegram.ext", measured["modules"])
+        self.assertNotIn("lark_oapi", measured["modules"])
+        self.assertLess(measured["total_ms"], 1000)
+
+    def test_telegram_entry_defers_telegram_ext_and_skips_lark_sdk(self):
+        measured = measure_import("app.telegram.bot")
+
+        self.assertNotIn("telegram.ext", measured["modules"])
+        self.assertNotIn("lark_oapi", measured["modules"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import os
+import tempfile
+import textwrap
+import time
+import unittest
+
+from app.core.platform_registry import PlatformDefinition
+from app.host.supervisor import RestartPolicy, Supervisor, read_supervisor_status
+
+# 第一次启动以升级退出码退出，之后常驻；收到 SIGTERM 时写标记再退出。
+CHILD_SCRIPT = textwrap.dedent(
+    """
+    import os, signal, sys, time
+    counter = os.path.join(os.getcwd(), "starts")
+    starts = int(open(counter).read()) if os.path.exists(counter) else 0
+    open(counter, "w").write(str(starts + 1))
+    if starts == 0:
+        sys.exit(75)
+
+    def on_term(signum, frame):
+        open(os.path.join(os.getcwd(), "drained"), "w").write("1")
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, on_term)
+    open(os.path.join(os.getcwd(), "ready"), "w").write("1")
+    while True:
+        time.sleep(0.05)
+    """
+)
+
+
+def make_definition(script_path: str) -> PlatformDefinition:
+    return PlatformDefinition(
+        id="fake",
+        display_name="Fake",
+        entry_script=script_path,
+        required_env_keys=(),
+        pid_file="fake.pid",
+        launch_log_file="fake.launch.log",
+        supports_images=False,
+        supports_commands=False,
+    )
+
+
+class RestartPolicyTests(unittest.TestCase):
+    def test_escalation_restarts_immediately_and_crashes_back_off(self):
+        policy = RestartPolicy(base_delay_sec=1.0, max_delay_sec=8.0, stable_after_sec=60.0)
+
+        self.assertEqual(policy.next_delay(75, uptime_sec=1.0, failures=3), 0.0)
+        self.assertEqual(policy.next_delay(1, uptime_sec=1.0, failures=0), 1.0)
+        self.assertEqual(policy.next_delay(1, uptime_sec=1.0, failures=2), 4.0)
+        self.assertEqual(policy.next_delay(1, uptime_sec=1.0, failures=10), 8.0)
+        # 稳定运行过一段时间后再崩溃，退避从头开始。
+        self.assertEqual(policy.next_delay(1, uptime_sec=120.0, failures=5), 1.0)
+        self.assertIsNone(policy.next_delay(0, uptime_sec=1.0, failures=0))
+
+
+class SupervisorTests(unittest.IsolatedAsyncioTestCase):
+    async def test_escalation_restart_status_socket_and_graceful_stop(self):
+        runtime_dir = tempfile.mkdtemp()
+        script_path = os.path.join(runtime_dir, "child.py")
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(CHILD_SCRIPT)
+        supervisor = Supervisor(
+            [make_definition(script_path)],
+            logging.getLogger("test"),
+            runtime_dir=runtime_dir,
+            policy=RestartPolicy(base_delay_sec=5.0),
+            stop_timeout_sec=5.0,
+        )
+        run_task = asyncio.create_task(supervisor.run())
+        started = time.monotonic()
+        item = supervisor.processes["fake"]
+        ready_path = os.path.join(runtime_dir, "ready")
+        while not (item.restarts == 1 and os.path.exists(ready_path)):
+            self.assertLess(time.monotonic() - started, 5.0)
+            await asyncio.sleep(0.05)
+        # 升级退出码不走退避，秒级就重新拉起。
+        self.assertLess(time.monotonic() - started, 3.0)
+        self.assertTrue(os.path.exists(os.path.join(runtime_dir, "fake.pid")))
+
+        status = await read_supervisor_status(supervisor.socket_path)
+        self.assertEqual(status["processes"][0]["id"], "fake")
+        self.assertEqual(status["processes"][0]["last_exit_code"], 75)
+        self.assertEqual(status["processes"][0]["restarts"], 1)
+
+        supervisor.request_stop()
+        self.assertEqual(await asyncio.wait_for(run_task, 10), 0)
+        self.assertTrue(os.path.exists(os.path.join(runtime_dir, "drained")))
+        self.assertFalse(os.path.exists(os.path.join(runtime_dir, "fake.pid")))
+        self.assertFalse(os.path.exists(supervisor.socket_path))
+        with open(os.path.join(runtime_dir, "fake.launch.log"), encoding="utf-8") as f:
+            self.assertEqual(f.read().count("[supervisor]"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
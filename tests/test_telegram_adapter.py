@@ -30,6 +30,26 @@ class TelegramAdapterTests(unittest.IsolatedAsyncioTestCase):
         reply_mock.assert_awaited_once_with(update, "hello")
         photo_mock.assert_awaited_once_with(update, "/tmp/demo.png")
 
+    async def test_send_outbound_skips_delivered_parts_and_reports_progress(self):
+        update = Mock()
+        adapter = TelegramAdapter()
+        outbound = PlatformOutboundMessage(
+            parts=(OutboundPart.text_part("first"), OutboundPart.text_part("second")),
+            meta={},
+            history_key=123,
+        )
+        delivered = []
+
+        with patch(
+            "app.telegram.telegram_adapter.reply_text_with_retry", new=AsyncMock()
+        ) as reply_mock:
+            await adapter.send_outbound(
+                update, outbound, skip_parts={0}, on_part_delivered=delivered.append
+            )
+
+        reply_mock.assert_awaited_once_with(update, "second")
+        self.assertEqual(delivered, [1])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from app.core.message_inbox import MessageInbox
+from app.core.platform_messages import OutboundPart, PlatformOutboundMessage
+from app.core.reply_outbox import ReplyOutbox
+from app.telegram.bot import build_application
+from app.telegram.telegram_update_state import load_update_state, save_update_state
+from benchmarks.fake_bot_api import FakeBotApi
+from benchmarks.load_test import REPLY_PREFIX, build_fake_handlers
+
+CHAT_ID = 4242
+
+
+class TelegramDrainIntegrationTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        env = patch.dict(
+            "os.environ",
+            {
+                "FAKE_CODEX_DELAY_SEC": "0.5",
+                "FAKE_CODEX_EVENTS": "1",
+                "FAKE_CODEX_REPLY_CHARS": "60",
+            },
+        )
+        env.start()
+        self.addCleanup(env.stop)
+        self.api = FakeBotApi().start()
+        self.addCleanup(self.api.stop)
+        self.workdir = tempfile.mkdtemp()
+        self.state_path = os.path.join(self.workdir, "telegram_update_state.json")
+        self.logger = logging.getLogger("test.drain")
+
+    async def start_bot(self, drain_timeout_sec: float):
+        handlers = build_fake_handlers(self.workdir, self.logger)
+        handlers.drain_timeout_sec = drain_timeout_sec
+        stopped = asyncio.Event()
+        handlers.stop_requested_callback = stopped.set
+        app = build_application(handlers, self.logger, base_url=self.api.base_url)
+        await app.initialize()
+        await handlers.post_init(app)
+        await app.start()
+        await app.updater.start_polling(timeout=1, bootstrap_retries=0)
+        return handlers, app, stopped
+
+    async def stop_bot(self, handlers, app) -> None:
+        if app.updater.running:
+            await app.updater.stop()
+        if app.running:
+            await app.stop()
+        await handlers.post_shutdown(app)
+        await app.shutdown()
+
+    def replies(self) -> list[str]:
+        tokens = []
+        for call in self.api.calls_for("sendMessage"):
+            text = str(call.params.get("text") or "")
+            if text.startswith(REPLY_PREFIX):
+                tokens.append(text[len(REPLY_PREFIX) :].split(" ", 1)[0])
+        return tokens
+
+    async def wait_until(self, predicate, timeout_sec: float = 20.0) -> None:
+        deadline = time.monotonic() + timeout_sec
+        while not predicate():
+            self.assertLess(time.monotonic(), deadline, "等待超时")
+            await asyncio.sleep(0.05)
+
+    async def test_drain_timeout_checkpoints_and_next_process_replays_once(self):
+        handlers, app, stopped = await self.start_bot(drain_timeout_sec=0.2)
+        for index in range(1, 4):
+            self.api.push_text_update(CHAT_ID, f"drain-{index}")
+        await self.wait_until(lambda: len(handlers.inflight_updates) == 1)
+
+        drained = await handlers.drain(app, "test")
+        await self.stop_bot(handlers, app)
+
+        self.assertFalse(drained)
+        self.assertTrue(stopped.is_set())
+        state = load_update_state(self.state_path)
+        self.assertEqual([item["update_id"] for item in state["pending_updates"]], [1, 2, 3])
+        self.assertEqual(state["last_handled_update_id"], 0)
+        # Telegram 侧已经确认过这些 update，只能靠落盘重放找回。
+        self.assertEqual(self.api.pending_updates(), 0)
+        self.assertEqual(self.replies(), [])
+
+        handlers, app, _ = await self.start_bot(drain_timeout_sec=5)
+        self.api.push_text_update(CHAT_ID, "drain-4")
+        await self.wait_until(lambda: len(self.replies()) >= 4)
+        await asyncio.sleep(0.3)
+        await self.stop_bot(handlers, app)
+
+        self.assertEqual(self.replies(), ["drain-1", "drain-2", "drain-3", "drain-4"])
+        state = load_update_state(self.state_path)
+        self.assertEqual(state["pending_updates"], [])
+        self.assertEqual(state["last_handled_update_id"], 4)
+
+    async def test_drain_finishes_inflight_and_queued_updates(self):
+        handlers, app, stopped = await self.start_bot(drain_timeout_sec=10)
+        self.api.push_text_update(CHAT_ID, "clean-1")
+        self.api.push_text_update(CHAT_ID, "clean-2")
+        await self.wait_until(lambda: len(handlers.inflight_updates) == 1)
+
+        drained = await handlers.drain(app, "test", restart=True)
+        await self.stop_bot(handlers, app)
+
+        self.assertTrue(drained)
+        self.assertTrue(stopped.is_set())
+        self.assertEqual(self.replies(), ["clean-1", "clean-2"])
+        self.assertEqual(handlers.escalate_exit_code_requested, 75)
+        with open(self.state_path, encoding="utf-8") as f:
+            self.assertNotIn("pending_updates", json.load(f))
+
+    def seed_crashed_message(self, text: str, attempts: int) -> None:
+        # 模拟上个进程已推进水位、Codex 跑到一半就崩溃：只剩收件箱里的记录。
+        update = {
+            "update_id": 7,
+            "message": {
+                "message_id": 70,
+                "date": int(time.time()),
+                "chat": {"id": CHAT_ID, "type": "private"},
+                "from": {"id": CHAT_ID, "is_bot": False, "first_name": "Load"},
+                "text": text,
+            },
+        }
+        inbox = MessageInbox(os.path.join(self.workdir, "telegram_inbox.json"))
+        entry = inbox.accept("telegram", f"{CHAT_ID}:70", CHAT_ID, text, update)
+        for _ in range(attempts):
+            inbox.mark_running(entry.key)
+        save_update_state(self.state_path, {"last_handled_update_id": 7})
+
+    async def test_crashed_message_is_rerun_from_inbox_once(self):
+        self.seed_crashed_message("crash-1", attempts=1)
+
+        handlers, app, _ = await self.start_bot(drain_timeout_sec=5)
+        await self.wait_until(lambda: len(self.replies()) >= 1)
+        await asyncio.sleep(0.3)
+        await self.stop_bot(handlers, app)
+
+        self.assertEqual(self.replies(), ["crash-1"])
+        self.assertEqual(handlers.inbox.pending_count(), 0)
+        self.assertEqual(load_update_state(self.state_path)["last_handled_update_id"], 7)
+
+    async def test_repeatedly_failing_message_notifies_user_instead_of_rerun(self):
+        self.seed_crashed_message("crash-2", attempts=2)
+
+        handlers, app, _ = await self.start_bot(drain_timeout_sec=5)
+        await asyncio.sleep(0.5)
+        await self.stop_bot(handlers, app)
+
+        self.assertEqual(self.replies(), [])
+        notices = [str(call.params.get("text")) for call in self.api.calls_for("sendMessage")]
+        self.assertEqual(len(notices), 1)
+        self.assertIn("请重新发送", notices[0])
+        self.assertIn("crash-2", notices[0])
+        self.assertEqual(handlers.inbox.pending_count(), 0)
+
+
+    async def test_message_with_reply_in_outbox_is_not_rerun(self):
+        # 上个进程答复已入发件箱、还没发出去就退出了：只补发，不再跑一遍 Codex。
+        self.seed_crashed_message("crash-3", attempts=1)
+        outbox = ReplyOutbox(os.path.join(self.workdir, "telegram_outbox.json"))
+        outbox.enqueue(
+            "telegram",
+            CHAT_ID,
+            PlatformOutboundMessage(
+                parts=(OutboundPart.text_part(f"{REPLY_PREFIX}crash-3 saved"),),
+                meta={},
+                history_key=CHAT_ID,
+            ),
+            source_key=f"{CHAT_ID}:70",
+        )
+
+        handlers, app, _ = await self.start_bot(drain_timeout_sec=5)
+        await self.wait_until(lambda: len(self.replies()) >= 1)
+        await asyncio.sleep(1.0)
+        await self.stop_bot(handlers, app)
+
+        self.assertEqual(self.replies(), ["crash-3"])
+        self.assertEqual(handlers.inbox.pending_count(), 0)
+        self.assertEqual(handlers.outbox.pending_count(), 0)
+
+
+class PendingUpdateStateTests(unittest.TestCase):
+    def test_pending_updates_round_trip_sorted_and_validated(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "state.json")
+
+            save_update_state(
+                path,
+                {
+                    "last_handled_update_id": 4,
+                    "pending_updates": [{"update_id": 7}, {"update_id": 5}, {"bad": 1}],
+                },
+            )
+
+            state = load_update_state(path)
+
+        self.assertEqual(state["pending_updates"], [{"update_id": 5}, {"update_id": 7}])
+
+
+if __name__ == "__main__":
+    unittest.main()
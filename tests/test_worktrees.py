@@ -0,0 +1,161 @@
+import asyncio
+import os
+import subprocess
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from app.config.chat_store import ChatStore
+from app.core.bridge_core import BridgeCore
+from app.core.project_locks import ProjectLockManager
+from app.core import worktrees
+from app.core.worktrees import WorktreeManager
+
+
+def init_repo(path: str) -> str:
+    os.makedirs(os.path.join(path, "pkg"), exist_ok=True)
+    with open(os.path.join(path, "pkg", "main.py"), "w", encoding="utf-8") as f:
+        f.write("print('hi')\n")
+    for args in (
+        ["init", "-q"],
+        ["add", "."],
+        ["-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-q", "-m", "init"],
+    ):
+        subprocess.run(["git", "-C", path, *args], check=True, capture_output=True)
+    return os.path.realpath(path)
+
+
+class WorktreeManagerTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.repo = init_repo(os.path.join(tmpdir.name, "repo"))
+        self.plain_dir = os.path.join(tmpdir.name, "plain")
+        os.makedirs(self.plain_dir)
+        self.manager = WorktreeManager(os.path.join(tmpdir.name, "worktrees"), idle_sec=60)
+
+    def test_acquire_creates_isolated_worktree_per_chat(self):
+        first = self.manager.acquire(self.repo, 1)
+        second = self.manager.acquire(os.path.join(self.repo, "pkg"), "feishu:ou_2")
+
+        self.assertTrue(first.startswith(self.manager.root_dir))
+        self.assertTrue(os.path.isfile(os.path.join(first, "pkg", "main.py")))
+        self.assertEqual(os.path.basename(second), "pkg")
+        self.assertNotEqual(os.path.dirname(second), first)
+        self.assertEqual(self.manager.peek(self.repo, 1), first)
+        self.assertEqual(self.manager.acquire(self.repo, 1), first)
+        self.assertEqual(self.manager.snapshot(), {"total": 2, "in_use": 2})
+        # 非 git 目录直接使用原目录。
+        self.assertEqual(self.manager.acquire(self.plain_dir, 1), self.plain_dir)
+        self.assertIsNone(self.manager.peek(self.plain_dir, 1))
+
+    def test_collect_idle_removes_only_clean_unused_worktrees(self):
+        clean = self.manager.acquire(self.repo, "clean")
+        dirty = self.manager.acquire(self.repo, "dirty")
+        busy = self.manager.acquire(self.repo, "busy")
+        self.manager.release(clean)
+        self.manager.release(dirty)
+        with open(os.path.join(dirty, "pkg", "main.py"), "a", encoding="utf-8") as f:
+            f.write("print('edited')\n")
+
+        removed = self.manager.collect_idle(now=self.manager._last_gc + 3600)
+
+        self.assertEqual(removed, [clean])
+        self.assertFalse(os.path.exists(clean))
+        self.assertTrue(os.path.isdir(dirty))
+        self.assertTrue(os.path.isdir(busy))
+        listed = subprocess.run(
+            ["git", "-C", self.repo, "worktree", "list"], capture_output=True, text=True
+        ).stdout
+        self.assertNotIn(clean, listed)
+        # 回收后再次使用会重新创建。
+        self.assertEqual(self.manager.acquire(self.repo, "clean"), clean)
+        self.assertTrue(os.path.isdir(clean))
+
+    def test_git_runs_outside_the_lock(self):
+        ready = self.manager.acquire(self.repo, "ready")
+        started, unblock = threading.Event(), threading.Event()
+        real_run_git = worktrees._run_git
+
+        def slow_run_git(cwd, *args):
+            if args[:2] == ("worktree", "add"):
+                started.set()
+                unblock.wait(5)
+            return real_run_git(cwd, *args)
+
+        results = []
+
+        def acquire_slow():
+            results.append(self.manager.acquire(self.repo, "slow"))
+
+        with patch("app.core.worktrees._run_git", new=slow_run_git):
+            first = threading.Thread(target=acquire_slow)
+            second = threading.Thread(target=acquire_slow)
+            first.start()
+            self.assertTrue(started.wait(5))
+            second.start()
+            # 另一个会话创建 worktree 期间，release/snapshot 不用等 git。
+            releaser = threading.Thread(target=self.manager.release, args=(ready,))
+            releaser.start()
+            releaser.join(1)
+            self.assertFalse(releaser.is_alive())
+            self.assertEqual(self.manager.snapshot(), {"total": 1, "in_use": 0})
+            unblock.set()
+            first.join(5)
+            second.join(5)
+
+        # 同一路径的并发 acquire 等创建完成后复用同一个 worktree。
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(self.manager._entries[results[0]].in_use, 2)
+
+    def test_restart_discovers_existing_worktrees(self):
+        path = self.manager.acquire(self.repo, 1)
+        self.manager.release(path)
+
+        reloaded = WorktreeManager(self.manager.root_dir, idle_sec=0)
+
+        self.assertEqual(reloaded.collect_idle(), [path])
+        self.assertFalse(os.path.exists(path))
+
+
+class WorktreeBridgeCoreTests(unittest.IsolatedAsyncioTestCase):
+    async def test_chats_on_one_repo_run_in_parallel_worktrees(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        repo = init_repo(os.path.join(tmpdir.name, "repo"))
+        release = asyncio.Event()
+        running: list[str] = []
+
+        async def request_reply(prompt, reasoning_effort=None, project_dir=None):
+            running.append(project_dir)
+            await release.wait()
+            return "ok", {}
+
+        core = BridgeCore(
+            chat_store=ChatStore(history_file=f"{tmpdir.name}/hist.json", max_turns=12),
+            system_prompt="system",
+            request_reply=request_reply,
+            resolve_project_dir=lambda _key: repo,
+            project_locks=ProjectLockManager(),
+            worktrees=WorktreeManager(os.path.join(tmpdir.name, "worktrees")),
+        )
+
+        tasks = [
+            asyncio.create_task(core.request_chat_reply(key, "prompt")) for key in (1, 2)
+        ]
+        for _ in range(200):
+            if len(running) == 2:
+                break
+            await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        self.assertEqual(len(set(running)), 2)
+        self.assertNotIn(repo, running)
+        self.assertEqual(sorted(meta["worktree"] for _, meta in results), sorted(running))
+        self.assertEqual(core.worktrees.snapshot(), {"total": 2, "in_use": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()